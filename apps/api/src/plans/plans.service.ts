@@ -235,7 +235,11 @@ export class PlansService {
           optimizerInput,
           {
             timeout: optimizerTimeoutMs,
-            headers: requestId ? { "x-request-id": requestId } : undefined,
+            headers: {
+              // Optimizer bu andan sonra çözümü iptal eder (epoch ms).
+              "x-request-deadline": String(Date.now() + optimizerTimeoutMs),
+              ...(requestId ? { "x-request-id": requestId } : {}),
+            },
           }
         )
       );
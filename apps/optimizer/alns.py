@@ -0,0 +1,511 @@
+"""
+Adaptive Large Neighborhood Search (Ropke & Pisinger style).
+
+Selected with parameters.algorithm = "alns". Instead of rebuilding the
+solution from scratch many times, one constructive candidate is improved
+under a time budget by repeatedly removing part of it (destroy) and
+re-inserting the removed cargos (repair):
+
+- destroy: random, worst-cost, related (Shaw: close + similar weight),
+  whole-route removal
+- repair: greedy cheapest insertion, regret-2 / regret-3 insertion
+- operator weights adapt to how often each operator finds better solutions
+- acceptance: simulated annealing with a time-based cooling schedule
+
+Split-cargo semantics are kept: a station's cargos can be spread over
+several routes, and repair inserts as many of a station's open cargos as
+fit into the chosen route (merging into an existing stop of the same
+station when the route already visits it).
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+import math
+import os
+import random
+import time
+import zlib
+
+from decomposition import cheapest_insertion, place_stop
+from optimizer import CandidateSolution, StopAssignment, Vehicle, VRPOptimizer
+
+
+DESTROY_OPERATORS = ("random", "worst", "shaw", "route")
+REPAIR_OPERATORS = ("greedy", "regret2", "regret3")
+
+# Adaptive weights: scores per outcome, reaction factor, segment length
+SCORE_BEST = 33.0
+SCORE_BETTER = 9.0
+SCORE_ACCEPTED = 13.0
+REACTION = 0.1
+SEGMENT_ITERATIONS = 50
+
+# Number of stops removed per iteration: fraction of all stops, clamped
+REMOVE_MIN = 2
+REMOVE_MAX = 40
+REMOVE_FRACTION = 0.25
+WORST_RANDOMNESS = 3.0
+SHAW_RANDOMNESS = 6.0
+
+# Annealing: accept a 5% worse routing cost with p=0.5 at the start, and
+# cool down to END_TEMPERATURE_RATIO of that temperature at the deadline.
+START_WORSE = 0.05
+END_TEMPERATURE_RATIO = 0.002
+
+# Unassigned cargos dominate distance (payload first, cost second)
+UNASSIGNED_PENALTY = 1e6
+# Limited problems: constructive starts tried before the search
+INITIAL_LIMITED_ATTEMPTS = 6
+# Stop this long before a request deadline so the result can still be sent
+DEADLINE_MARGIN_S = 0.5
+EPS = 1e-9
+
+
+def default_time_budget_s() -> float:
+    try:
+        return float(os.getenv("ALNS_TIME_BUDGET_SECONDS", "5") or 5)
+    except ValueError:
+        return 5.0
+
+
+@dataclass
+class _State:
+    """Routes + open (unassigned) cargos per station index."""
+    routes: List[List[StopAssignment]]
+    vehicles: List[Vehicle]
+    pool: Dict[int, List[dict]]
+
+    def copy(self) -> "_State":
+        return _State(
+            routes=[
+                [StopAssignment(station=s.station, cargos=list(s.cargos), weight_kg=s.weight_kg) for s in r]
+                for r in self.routes
+            ],
+            vehicles=list(self.vehicles),
+            pool={k: list(v) for k, v in self.pool.items() if v},
+        )
+
+
+def _cargo_w(c: dict) -> float:
+    return float(c.get("weight_kg", 0) or 0)
+
+
+class ALNS:
+    """Destroy/repair search over one VRPOptimizer instance."""
+
+    def __init__(
+        self,
+        opt: VRPOptimizer,
+        time_budget_s: Optional[float] = None,
+        max_iterations: Optional[int] = None,
+    ):
+        self.opt = opt
+        self.d = opt._dist
+        self.hub = opt.hub.idx
+        self.points = opt.points
+        self.cost_per_km = float(opt.params.cost_per_km)
+        self.unlimited = opt.input.problem_type == "unlimited_vehicles"
+        self.objective = None if self.unlimited else opt._get_limited_objective()
+        self.time_budget_s = max(0.0, float(time_budget_s if time_budget_s is not None else default_time_budget_s()))
+        self.max_iterations = max_iterations
+        self.rng = random.Random(zlib.crc32(f"{opt.input.plan_date}|alns".encode("utf-8")))
+
+        self.owned = sorted((v for v in opt.vehicles if not v.is_rented), key=lambda v: v.capacity_kg)
+        self.d_max = float(opt.dist_km.max()) or 1.0
+        self.w_max = max((float(s.weight_kg or 0) for s in opt.stations), default=1.0) or 1.0
+
+        self.weights = {op: 1.0 for op in DESTROY_OPERATORS + REPAIR_OPERATORS}
+        self.scores = {op: 0.0 for op in self.weights}
+        self.uses = {op: 0 for op in self.weights}
+        self.wins = {op: 0 for op in self.weights}
+        self.two_opt_iterations = 0
+
+    # ---------- evaluation ----------
+
+    def _route_cost(self, route: List[StopAssignment], vehicle: Vehicle) -> float:
+        return self.opt.calculate_route_cost(route, vehicle)
+
+    def _penalty(self, state: _State) -> float:
+        if self.objective == "max_count":
+            return UNASSIGNED_PENALTY * sum(len(cs) for cs in state.pool.values())
+        return UNASSIGNED_PENALTY * sum(_cargo_w(c) for cs in state.pool.values() for c in cs)
+
+    def routing_cost(self, state: _State) -> float:
+        return sum(self._route_cost(r, v) for r, v in zip(state.routes, state.vehicles))
+
+    def evaluate(self, state: _State) -> float:
+        return self.routing_cost(state) + self._penalty(state)
+
+    # ---------- vehicles ----------
+
+    def _spare_vehicle(self, state: _State, weight: float, min_weight: float) -> Optional[Vehicle]:
+        """
+        Vehicle a new route would use: the smallest unused owned vehicle
+        that takes all of `weight`, else the largest unused one; rentals
+        only for unlimited problems.
+        """
+        used = {v.id for v in state.vehicles}
+        free = [v for v in self.owned if v.id not in used and v.capacity_kg + 1e-6 >= min_weight]
+        if free:
+            fits = [v for v in free if v.capacity_kg + 1e-6 >= weight]
+            return fits[0] if fits else free[-1]
+        if self.unlimited and self.opt.params.rental_capacity_kg + 1e-6 >= min_weight:
+            return self.opt._rental_slot(0)
+        return None
+
+    # ---------- initial solution ----------
+
+    def initial_state(self) -> _State:
+        opt = self.opt
+        base = opt._clone_stations()
+        for st in base:
+            opt._refresh_station_totals(st)
+
+        if self.unlimited:
+            owned = list(self.owned)
+            shortfall = max(0.0, opt._total_remaining_weight(base) - opt._total_capacity(owned))
+            rentals = int(math.ceil(shortfall / float(opt.params.rental_capacity_kg))) if shortfall > 0 else 0
+            pool = owned + [opt._rental_slot(i) for i in range(rentals)]
+            cand = opt._build_candidate_unlimited(
+                vehicles_pool=pool, base_stations=base, rng=random.Random(self.rng.random())
+            )
+        else:
+            # Limited constructions pick a random strategy; payload differs a
+            # lot between them, so start from the best of a few.
+            cand = None
+            for _ in range(INITIAL_LIMITED_ATTEMPTS):
+                c = opt._build_candidate_limited(
+                    vehicles_pool=list(self.owned),
+                    base_stations=base,
+                    rng=random.Random(self.rng.random()),
+                    objective=self.objective,
+                )
+                if c is not None and (cand is None or self._payload_key(c) > self._payload_key(cand)):
+                    cand = c
+
+        state = _State(routes=[], vehicles=[], pool={})
+        if cand is None:
+            state.pool = {st.idx: list(st.cargos) for st in opt.stations if st.cargos}
+        else:
+            for route, vehicle in zip(cand.routes, cand.vehicles):
+                if route:
+                    state.routes.append([
+                        StopAssignment(station=self.points[s.station.idx], cargos=list(s.cargos), weight_kg=s.weight_kg)
+                        for s in route
+                    ])
+                    state.vehicles.append(vehicle)
+            state.pool = {st.idx: list(st.cargos) for st in cand.unassigned if st.cargos}
+        self.repair(state, "greedy")
+        return state
+
+    def _payload_key(self, cand: CandidateSolution) -> Tuple[float, float]:
+        if self.objective == "max_weight":
+            return (cand.assigned_weight_kg, -cand.total_cost)
+        return (float(cand.assigned_cargo_count), -cand.total_cost)
+
+    # ---------- destroy ----------
+
+    def _removal_saving(self, route: List[StopAssignment], p: int, vehicle: Vehicle) -> float:
+        d = self.d
+        s = route[p].station.idx
+        prev = route[p - 1].station.idx if p > 0 else None
+        nxt = route[p + 1].station.idx if p + 1 < len(route) else self.hub
+        saving = d[s][nxt] + ((d[prev][s] - d[prev][nxt]) if prev is not None else 0.0)
+        saving *= self.cost_per_km
+        if len(route) == 1 and vehicle.is_rented:
+            saving += vehicle.rental_cost
+        return saving
+
+    def _pick_skewed(self, ranked: List[Any], count: int, power: float) -> List[Any]:
+        """Take `count` items, biased towards the front of `ranked`."""
+        ranked = list(ranked)
+        out = []
+        while ranked and len(out) < count:
+            out.append(ranked.pop(int(self.rng.random() ** power * len(ranked))))
+        return out
+
+    def _remove(self, state: _State, picks: List[Tuple[int, int]]) -> Set[int]:
+        """Remove stops (route, position); returns ids of the routes touched."""
+        by_route: Dict[int, List[int]] = {}
+        for ri, p in picks:
+            by_route.setdefault(ri, []).append(p)
+        touched: Set[int] = set()
+        for ri, positions in by_route.items():
+            route = state.routes[ri]
+            for p in sorted(set(positions), reverse=True):
+                stop = route.pop(p)
+                state.pool.setdefault(stop.station.idx, []).extend(stop.cargos)
+            touched.add(id(route))
+
+        kept = [(r, v) for r, v in zip(state.routes, state.vehicles) if r]
+        state.routes = [r for r, _ in kept]
+        state.vehicles = [v for _, v in kept]
+        return touched
+
+    def destroy(self, state: _State, op: str) -> Set[int]:
+        stops = [(ri, p) for ri, r in enumerate(state.routes) for p in range(len(r))]
+        if not stops:
+            return set()
+        q_max = max(REMOVE_MIN, min(REMOVE_MAX, int(len(stops) * REMOVE_FRACTION)))
+        q = min(len(stops), self.rng.randint(REMOVE_MIN, q_max))
+
+        if op == "random":
+            picks = self.rng.sample(stops, q)
+        elif op == "worst":
+            ranked = sorted(
+                stops,
+                key=lambda rp: self._removal_saving(state.routes[rp[0]], rp[1], state.vehicles[rp[0]]),
+                reverse=True,
+            )
+            picks = self._pick_skewed(ranked, q, WORST_RANDOMNESS)
+        elif op == "shaw":
+            seed_ri, seed_p = self.rng.choice(stops)
+            seed = state.routes[seed_ri][seed_p]
+            a, wa = seed.station.idx, seed.weight_kg
+
+            def relatedness(rp: Tuple[int, int]) -> float:
+                stop = state.routes[rp[0]][rp[1]]
+                return self.d[a][stop.station.idx] / self.d_max + abs(wa - stop.weight_kg) / self.w_max
+
+            ranked = sorted((rp for rp in stops if rp != (seed_ri, seed_p)), key=relatedness)
+            picks = [(seed_ri, seed_p)] + self._pick_skewed(ranked, q - 1, SHAW_RANDOMNESS)
+        else:
+            # Emptiest routes first: freeing a vehicle is where big savings are.
+            order = sorted(range(len(state.routes)), key=lambda ri: sum(s.weight_kg for s in state.routes[ri]))
+            ri = self._pick_skewed(order, 1, WORST_RANDOMNESS)[0]
+            picks = [(ri, p) for p in range(len(state.routes[ri]))]
+        return self._remove(state, picks)
+
+    # ---------- repair ----------
+
+    def _take(self, cargos: List[dict], spare: float) -> Tuple[List[dict], List[dict], float]:
+        """Split a station's open cargos into (fits in `spare`, rest, taken weight)."""
+        if self.objective == "max_count":
+            order = sorted(cargos, key=_cargo_w)
+        else:
+            order = sorted(cargos, key=_cargo_w, reverse=True)
+        taken, rest = [], []
+        taken_w = 0.0
+        for c in order:
+            w = _cargo_w(c)
+            if w <= spare - taken_w + 1e-6:
+                taken.append(c)
+                taken_w += w
+            else:
+                rest.append(c)
+        return taken, rest, taken_w
+
+    def repair(self, state: _State, op: str) -> Set[int]:
+        """Insert open cargos; returns ids of the routes touched."""
+        k = 1 if op == "greedy" else int(op[len("regret"):])
+        loads = [sum(s.weight_kg for s in r) for r in state.routes]
+        versions = [0] * len(state.routes)
+        cache: Dict[Tuple[int, int], Tuple[int, float, int, bool]] = {}
+        pending = [idx for idx, cs in state.pool.items() if cs]
+        touched: Set[int] = set()
+
+        def options(idx: int) -> List[Tuple[float, int, int, bool]]:
+            cargos = state.pool[idx]
+            w_min = min(_cargo_w(c) for c in cargos)
+            out: List[Tuple[float, int, int, bool]] = []
+            for ri, route in enumerate(state.routes):
+                if state.vehicles[ri].capacity_kg - loads[ri] + 1e-6 < w_min:
+                    continue
+                hit = cache.get((idx, ri))
+                if hit is None or hit[0] != versions[ri]:
+                    cost, pos, merge = cheapest_insertion(self.d, self.hub, route, idx)
+                    hit = (versions[ri], cost * self.cost_per_km, pos, merge)
+                    cache[(idx, ri)] = hit
+                out.append((hit[1], ri, hit[2], hit[3]))
+            spare = self._spare_vehicle(state, sum(_cargo_w(c) for c in cargos), w_min)
+            if spare is not None:
+                new_cost = self.d[idx][self.hub] * self.cost_per_km + (spare.rental_cost if spare.is_rented else 0.0)
+                out.append((new_cost, -1, 0, False))
+            out.sort(key=lambda o: (o[0], o[1]))
+            return out
+
+        def priority(idx: int) -> float:
+            # Limited problems: payload first (lightest cargos first for
+            # max_count, heaviest first for max_weight); cost decides where.
+            if self.objective == "max_count":
+                return -min(_cargo_w(c) for c in state.pool[idx])
+            if self.objective == "max_weight":
+                return max(_cargo_w(c) for c in state.pool[idx])
+            return 0.0
+
+        while pending:
+            choice: Optional[Tuple[Tuple[float, float, float], int, Tuple[float, int, int, bool]]] = None
+            for idx in pending:
+                opts = options(idx)
+                if not opts:
+                    continue
+                if k == 1:
+                    key = (priority(idx), -opts[0][0], 0.0)
+                else:
+                    regret = 0.0
+                    for h in range(1, k):
+                        regret += (opts[h][0] - opts[0][0]) if h < len(opts) else UNASSIGNED_PENALTY
+                    key = (priority(idx), regret, -opts[0][0])
+                if choice is None or key > choice[0]:
+                    choice = (key, idx, opts[0])
+            if choice is None:
+                break
+
+            _, idx, (_, ri, pos, merge) = choice
+            if ri == -1:
+                cargos = state.pool[idx]
+                spare = self._spare_vehicle(
+                    state, sum(_cargo_w(c) for c in cargos), min(_cargo_w(c) for c in cargos)
+                )
+                state.routes.append([])
+                state.vehicles.append(spare)
+                loads.append(0.0)
+                versions.append(0)
+                ri = len(state.routes) - 1
+
+            route = state.routes[ri]
+            taken, rest, taken_w = self._take(state.pool[idx], state.vehicles[ri].capacity_kg - loads[ri])
+            if not taken:
+                pending.remove(idx)
+                continue
+            place_stop(route, StopAssignment(station=self.points[idx], cargos=taken, weight_kg=round(taken_w, 2)), pos, merge)
+            loads[ri] += taken_w
+            versions[ri] += 1
+            touched.add(id(route))
+            if rest:
+                state.pool[idx] = rest
+            else:
+                del state.pool[idx]
+                pending.remove(idx)
+        return touched
+
+    # ---------- main loop ----------
+
+    def _roulette(self, ops: Tuple[str, ...]) -> str:
+        total = sum(self.weights[o] for o in ops)
+        r = self.rng.random() * total
+        for o in ops:
+            r -= self.weights[o]
+            if r <= 0:
+                return o
+        return ops[-1]
+
+    def _credit(self, ops: Tuple[str, ...], score: float) -> None:
+        for o in ops:
+            self.uses[o] += 1
+            self.scores[o] += score
+            if score > 0:
+                self.wins[o] += 1
+
+    def _end_of_segment(self) -> None:
+        for o in self.weights:
+            if self.uses[o]:
+                self.weights[o] = (1 - REACTION) * self.weights[o] + REACTION * self.scores[o] / self.uses[o]
+                self.weights[o] = max(self.weights[o], 0.05)
+            self.scores[o] = 0.0
+            self.uses[o] = 0
+
+    def _polish(self, state: _State, touched: Set[int]) -> None:
+        for ri, route in enumerate(state.routes):
+            if id(route) in touched and len(route) > 2:
+                state.routes[ri], it = self.opt._two_opt(route)
+                self.two_opt_iterations += it
+
+    def start_temperature(self, state: _State) -> float:
+        """
+        Scaled by routing cost only: with the unassigned penalty in it the
+        start temperature is ~1e6 and moves that drop whole cargos get
+        accepted.
+        """
+        return max(START_WORSE * self.routing_cost(state) / math.log(2), EPS)
+
+    def run(self) -> Optional[CandidateSolution]:
+        start = time.perf_counter()
+        budget = self.time_budget_s
+        token = self.opt.cancel_token
+        if token is not None and token.deadline is not None:
+            budget = min(budget, max(0.0, token.deadline - time.time() - DEADLINE_MARGIN_S))
+
+        current = self.initial_state()
+        self._polish(current, {id(r) for r in current.routes})
+        cur_cost = self.evaluate(current)
+        best, best_cost = current, cur_cost
+        initial_cost = cur_cost
+        t0 = self.start_temperature(current)
+
+        iterations = 0
+        improvements = 0
+        while True:
+            elapsed = time.perf_counter() - start
+            if elapsed >= budget:
+                break
+            if self.max_iterations is not None and iterations >= self.max_iterations:
+                break
+            self.opt._check_cancelled()
+
+            d_op = self._roulette(DESTROY_OPERATORS)
+            r_op = self._roulette(REPAIR_OPERATORS)
+            cand = current.copy()
+            touched = self.destroy(cand, d_op)
+            touched |= self.repair(cand, r_op)
+            self._polish(cand, touched)
+            cost = self.evaluate(cand)
+
+            temperature = t0 * END_TEMPERATURE_RATIO ** (elapsed / budget if budget > 0 else 1.0)
+            score = 0.0
+            if cost < best_cost - EPS:
+                best, best_cost = cand, cost
+                current, cur_cost = cand, cost
+                score = SCORE_BEST
+                improvements += 1
+            elif cost < cur_cost - EPS:
+                current, cur_cost = cand, cost
+                score = SCORE_BETTER
+            elif cost > cur_cost + EPS and self.rng.random() < math.exp(-(cost - cur_cost) / temperature):
+                current, cur_cost = cand, cost
+                score = SCORE_ACCEPTED
+            self._credit((d_op, r_op), score)
+
+            iterations += 1
+            if iterations % SEGMENT_ITERATIONS == 0:
+                self._end_of_segment()
+
+        if self.unlimited and best.pool:
+            return None
+        return self._to_candidate(best, {
+            "iterations": iterations,
+            "improvements": improvements,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            "initial_cost": round(initial_cost, 2) if initial_cost < UNASSIGNED_PENALTY else None,
+            "best_cost": round(best_cost, 2) if best_cost < UNASSIGNED_PENALTY else None,
+            "operators": {
+                o: {"weight": round(self.weights[o], 3), "wins": self.wins[o]} for o in self.weights
+            },
+        })
+
+    def _to_candidate(self, state: _State, info: Dict[str, Any]) -> CandidateSolution:
+        opt = self.opt
+        stations = opt._clone_stations()
+        by_idx = {st.idx: st for st in stations}
+        for st in stations:
+            st.cargos = list(state.pool.get(st.idx, []))
+            opt._refresh_station_totals(st)
+
+        routes = [
+            [StopAssignment(station=by_idx[s.station.idx], cargos=s.cargos, weight_kg=s.weight_kg) for s in r]
+            for r in state.routes
+        ]
+        return opt._candidate_from_routes(
+            routes=routes,
+            vehicles=list(state.vehicles),
+            stations=stations,
+            two_opt_iters=self.two_opt_iterations,
+            meta={
+                "strategy": "alns",
+                "objective": self.objective,
+                "owned_used": sum(1 for v in state.vehicles if not v.is_rented),
+                "rented_used": sum(1 for v in state.vehicles if v.is_rented),
+                "fleet_size": len(state.vehicles),
+                "alns": info,
+            },
+        )
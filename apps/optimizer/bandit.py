@@ -0,0 +1,200 @@
+"""
+Adaptive strategy choice for the limited-vehicle constructions.
+
+_build_candidate_limited used to draw its strategy from a fixed mix
+(pack 45%, cluster 30%, binpack 15%, sequential 10%) whatever actually won
+on the instance. StrategyBandit does Thompson sampling over one Beta
+posterior per strategy instead:
+
+- reward 0 when the attempt did not improve the incumbent, otherwise
+  0.5 .. 1 growing with the relative improvement (GAIN_SCALE -> 1);
+- the fixed mix is the prior, so the first attempts behave as before;
+- deterministic strategies already built for the current fleet are not
+  offered again (the construction memo would skip them anyway).
+
+Optionally (STRATEGY_PRIORS_PATH) posteriors are kept per instance-size
+bucket in a small JSON file and used as priors by later requests. Off by
+default so identical requests give identical plans. Pool workers are
+separate processes: writers serialize on an flock'd `<path>.lock` (where
+fcntl exists) and replace the file atomically, so readers never lock.
+
+STRATEGY_BANDIT=fixed restores the legacy fixed mix.
+"""
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import json
+import logging
+import math
+import os
+import random
+import threading
+
+try:  # POSIX only
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+logger = logging.getLogger("optimizer")
+
+STRATEGIES = ("pack", "cluster", "binpack", "sequential")
+LEGACY_MIX = {"pack": 0.45, "cluster": 0.30, "binpack": 0.15, "sequential": 0.10}
+
+# Pseudo-observations behind the legacy-mix prior.
+PRIOR_STRENGTH = 4.0
+# Relative improvement that earns the full reward.
+GAIN_SCALE = 0.05
+# Persisted posteriors are scaled down to at most this many observations
+# per strategy so old requests cannot freeze the allocation.
+PERSISTED_MAX_WEIGHT = 20.0
+
+_priors_lock = threading.Lock()
+
+
+def bandit_mode() -> str:
+    mode = str(os.getenv("STRATEGY_BANDIT", "thompson") or "thompson").strip().lower()
+    return mode if mode in ("thompson", "fixed") else "thompson"
+
+
+def legacy_choice(rng: random.Random) -> str:
+    r = rng.random()
+    if r < 0.45:
+        return "pack"
+    if r < 0.75:
+        return "cluster"
+    if r < 0.9:
+        return "binpack"
+    return "sequential"
+
+
+def improvement_reward(gain: Optional[float]) -> float:
+    """gain: None = no improvement, else relative improvement (>= 0)."""
+    if gain is None:
+        return 0.0
+    return 0.5 + 0.5 * min(1.0, max(0.0, gain) / GAIN_SCALE)
+
+
+def size_bucket(problem_type: str, objective: str, stations: int) -> str:
+    """Instances within a factor of two in size share priors."""
+    size = 1 << max(0, math.ceil(math.log2(max(1, stations))))
+    return f"{problem_type}:{objective}:{size}"
+
+
+class StrategyBandit:
+    """Thompson sampling over Beta(alpha, beta) per strategy."""
+
+    def __init__(self, priors: Optional[Dict[str, Tuple[float, float]]] = None, bucket: Optional[str] = None):
+        self.bucket = bucket
+        self.alpha: Dict[str, float] = {}
+        self.beta: Dict[str, float] = {}
+        for s in STRATEGIES:
+            if priors and s in priors:
+                a, b = priors[s]
+            else:
+                share = LEGACY_MIX[s]
+                a, b = 1.0 + PRIOR_STRENGTH * share, 1.0 + PRIOR_STRENGTH * (1.0 - share)
+            self.alpha[s], self.beta[s] = float(a), float(b)
+        self.attempts = {s: 0 for s in STRATEGIES}
+        self.improvements = {s: 0 for s in STRATEGIES}
+        self.gain = {s: 0.0 for s in STRATEGIES}
+
+    def choose(self, rng: random.Random, available: Sequence[str]) -> str:
+        arms = [s for s in STRATEGIES if s in available] or ["cluster"]
+        return max(arms, key=lambda s: rng.betavariate(self.alpha[s], self.beta[s]))
+
+    def update(self, strategy: str, gain: Optional[float]) -> None:
+        reward = improvement_reward(gain)
+        self.alpha[strategy] += reward
+        self.beta[strategy] += 1.0 - reward
+        self.attempts[strategy] += 1
+        if gain is not None:
+            self.improvements[strategy] += 1
+            self.gain[strategy] += gain
+
+    def posterior(self) -> Dict[str, Tuple[float, float]]:
+        out = {}
+        for s in STRATEGIES:
+            a, b = self.alpha[s], self.beta[s]
+            scale = min(1.0, PERSISTED_MAX_WEIGHT / (a + b))
+            out[s] = (round(a * scale, 4), round(b * scale, 4))
+        return out
+
+    def report(self) -> Dict[str, object]:
+        total = sum(self.attempts.values())
+        return {
+            "mode": "thompson",
+            "bucket": self.bucket,
+            "attempts": total,
+            "allocation": {
+                s: {
+                    "attempts": self.attempts[s],
+                    "share": round(self.attempts[s] / total, 4) if total else 0.0,
+                    "improvements": self.improvements[s],
+                    "gain": round(self.gain[s], 6),
+                    "mean": round(self.alpha[s] / (self.alpha[s] + self.beta[s]), 4),
+                }
+                for s in STRATEGIES
+            },
+        }
+
+
+def _priors_path() -> str:
+    return str(os.getenv("STRATEGY_PRIORS_PATH", "") or "").strip()
+
+
+def _read_all(path: str) -> Dict[str, Dict[str, List[float]]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("strategy priors unreadable (%s): %s", path, e)
+        return {}
+
+
+@contextmanager
+def _write_lock(path: str) -> Iterator[None]:
+    """Serializes read-modify-write of `path` across threads and processes."""
+    with _priors_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def load_priors(bucket: str) -> Optional[Dict[str, Tuple[float, float]]]:
+    path = _priors_path()
+    if not path:
+        return None
+    # Written with os.replace: a reader sees the old or the new file.
+    entry = _read_all(path).get(bucket)
+    if not isinstance(entry, dict):
+        return None
+    try:
+        return {s: (float(v[0]), float(v[1])) for s, v in entry.items() if s in STRATEGIES}
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def save_priors(bandit: StrategyBandit) -> None:
+    path = _priors_path()
+    if not path or bandit.bucket is None:
+        return
+    try:
+        with _write_lock(path):
+            data = _read_all(path)
+            data[bandit.bucket] = {s: list(ab) for s, ab in bandit.posterior().items()}
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, sort_keys=True)
+            os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("strategy priors not saved (%s): %s", path, e)
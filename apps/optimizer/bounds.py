@@ -0,0 +1,210 @@
+"""
+Lower bounds on plan cost, payload upper bounds, optimality gap.
+
+Routes are open paths that end at the hub: every served station has one
+outgoing leg and following the legs always reaches the hub. Taking, per
+station, the visit closest to the hub, those legs form a spanning
+in-arborescence rooted at the hub. Hence
+
+- distance >= minimum in-arborescence over the stations (Chu-Liu/Edmonds,
+  value only, dense NumPy contraction) for up to ARBORESCENCE_MAX_NODES
+  stations;
+- distance >= sum of each station's cheapest outgoing leg (the first
+  Edmonds round) for larger sets.
+
+Unlimited fleets: weight beyond the owned capacity needs at least
+ceil(excess / rental_capacity_kg) rentals at rental_cost each.
+
+Limited fleets serve a subset, so the payload is bounded too: the K
+lightest cargos that fit the total capacity (max_count), or
+min(total weight, total capacity) (max_weight). The cost bound is taken
+over the stations the plan actually serves; it is a bound on the whole
+problem only when the payload bound means every cargo must be carried.
+
+gap_percent = (cost - lower_bound) / cost * 100. The fleet search stops
+once a plan carrying every cargo is within BOUND_GAP_STOP_PERCENT of its
+bound (Parameters.gap_stop_percent per request; 0 disables early stopping).
+"""
+
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+import math
+import os
+
+import numpy as np
+
+
+# Edmonds contraction is O(n^2) per round: above this the cheapest-leg bound is used.
+ARBORESCENCE_MAX_NODES = 800
+ARBORESCENCE_MAX_ROUNDS = 200
+# Distinct station sets whose bound is kept (limited fleets re-check per attempt).
+DISTANCE_CACHE_ENTRIES = 64
+# Rows per chunk when scanning the distance matrix for cheapest legs.
+ROW_CHUNK = 512
+
+
+def default_gap_stop_percent() -> float:
+    try:
+        return max(0.0, float(os.getenv("BOUND_GAP_STOP_PERCENT", "1.0") or 1.0))
+    except ValueError:
+        return 1.0
+
+
+def gap_percent(cost: float, lower_bound: float) -> float:
+    if cost <= 1e-9:
+        return 0.0
+    return round(max(0.0, (cost - lower_bound) / cost * 100.0), 4)
+
+
+def cheapest_out(dist: Any, nodes: np.ndarray, hub: int) -> np.ndarray:
+    """Per node: cheapest leg to another node or to the hub."""
+    targets = np.append(nodes, hub)
+    out = np.empty(nodes.size, dtype=np.float64)
+    for lo in range(0, nodes.size, ROW_CHUNK):
+        rows = nodes[lo:lo + ROW_CHUNK]
+        block = np.asarray(dist[np.ix_(rows, targets)], dtype=np.float64)
+        block[np.arange(rows.size), np.arange(lo, lo + rows.size)] = np.inf
+        out[lo:lo + rows.size] = block.min(axis=1)
+    return out
+
+
+def arborescence_bound(dist: Any, nodes: np.ndarray, hub: int, max_rounds: int = ARBORESCENCE_MAX_ROUNDS) -> float:
+    """
+    Minimum spanning in-arborescence rooted at the hub (arc i -> j costs
+    dist[i][j]). Chu-Liu/Edmonds on the reversed graph; after every round
+    the accumulated value is itself a valid lower bound, so hitting
+    max_rounds just returns a weaker bound.
+    """
+    pts = np.append(nodes, hub)
+    # w[u, v]: arc u -> v of the reversed graph = leg v -> u
+    w = np.asarray(dist[np.ix_(pts, pts)], dtype=np.float64).T.copy()
+    root = pts.size - 1
+    total = 0.0
+    for _ in range(max_rounds):
+        n = w.shape[0]
+        np.fill_diagonal(w, np.inf)
+        w[:, root] = np.inf
+        pre = w.argmin(axis=0)
+        cheapest = w[pre, np.arange(n)]
+        cheapest[root] = 0.0
+        if not np.all(np.isfinite(cheapest)):
+            break
+        total += float(cheapest.sum())
+
+        # Cycles of the chosen in-arcs (each node follows pre back to root or a cycle)
+        comp = np.full(n, -1, dtype=np.int64)
+        state = np.zeros(n, dtype=np.int8)  # 0 new, 1 on current path, 2 done
+        n_comp = 0
+        for start in range(n):
+            path = []
+            v = start
+            while state[v] == 0 and v != root:
+                state[v] = 1
+                path.append(v)
+                v = int(pre[v])
+            if v != root and state[v] == 1:
+                # New cycle through v
+                u = v
+                while True:
+                    comp[u] = n_comp
+                    u = int(pre[u])
+                    if u == v:
+                        break
+                n_comp += 1
+            for u in path:
+                state[u] = 2
+        if n_comp == 0:
+            break
+        for v in range(n):
+            if comp[v] < 0:
+                comp[v] = n_comp
+                n_comp += 1
+
+        # Contract: arcs entering v lose the in-arc already paid for v
+        w = w - cheapest[None, :]
+        order = np.argsort(comp, kind="stable")
+        starts = np.searchsorted(comp[order], np.arange(n_comp))
+        w = np.minimum.reduceat(w[order], starts, axis=0)
+        w = np.minimum.reduceat(w[:, order], starts, axis=1)
+        root = int(comp[root])
+    return total
+
+
+class PlanBounds:
+    """Bounds for one instance (station indices into the optimizer matrix)."""
+
+    def __init__(
+        self,
+        dist: Any,
+        hub: int,
+        station_idx: Sequence[int],
+        cargo_weights: Sequence[float],
+        cost_per_km: float,
+        rental_cost: float,
+        rental_capacity_kg: float,
+    ):
+        self._dist = dist
+        self._hub = hub
+        self._nodes = tuple(sorted(set(int(i) for i in station_idx)))
+        self._weights = np.sort(np.asarray(list(cargo_weights), dtype=np.float64))
+        self.cost_per_km = float(cost_per_km)
+        self.rental_cost = float(rental_cost)
+        self.rental_capacity_kg = float(rental_capacity_kg)
+        self.total_weight = float(self._weights.sum())
+        # station set -> (distance bound, method)
+        self._distance: Dict[Tuple[int, ...], Tuple[float, str]] = {}
+        self.method = ""
+
+    def distance_bound(self, served_idx: Optional[Iterable[int]] = None) -> float:
+        """Distance any plan serving these stations (default: all) must drive."""
+        key = self._nodes if served_idx is None else tuple(sorted(set(int(i) for i in served_idx)))
+        hit = self._distance.get(key)
+        if hit is None:
+            nodes = np.asarray(key, dtype=np.int64)
+            if nodes.size == 0:
+                hit = (0.0, "empty")
+            elif nodes.size <= ARBORESCENCE_MAX_NODES:
+                hit = (arborescence_bound(self._dist, nodes, self._hub), "arborescence")
+            else:
+                hit = (float(cheapest_out(self._dist, nodes, self._hub).sum()), "cheapest_out")
+            if len(self._distance) >= DISTANCE_CACHE_ENTRIES:
+                self._distance.clear()
+            self._distance[key] = hit
+        self.method = hit[1]
+        return hit[0]
+
+    def min_rentals(self, owned_capacity: float) -> int:
+        excess = self.total_weight - float(owned_capacity)
+        if excess <= 1e-6 or self.rental_capacity_kg <= 0:
+            return 0
+        return int(math.ceil(excess / self.rental_capacity_kg - 1e-9))
+
+    def unlimited_cost_bound(self, owned_capacity: float) -> float:
+        return (
+            self.cost_per_km * self.distance_bound()
+            + self.min_rentals(owned_capacity) * self.rental_cost
+        )
+
+    def served_cost_bound(self, served_idx: Iterable[int]) -> float:
+        """Cost bound for a plan that serves exactly these stations (limited fleets)."""
+        return self.cost_per_km * self.distance_bound(served_idx)
+
+    def payload_bound(self, objective: str, capacity: float) -> float:
+        if objective == "max_weight":
+            return min(self.total_weight, float(capacity))
+        return float(np.searchsorted(np.cumsum(self._weights), float(capacity) + 1e-6, side="right"))
+
+    def report(
+        self,
+        cost: float,
+        lower_bound: float,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "lower_bound": round(lower_bound, 4),
+            "gap_percent": gap_percent(cost, lower_bound),
+            "method": self.method,
+        }
+        if extra:
+            out.update(extra)
+        return out
+
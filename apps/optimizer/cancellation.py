@@ -0,0 +1,89 @@
+"""
+Cooperative cancellation for long-running solves.
+
+The request handler (event loop process) and the solver (pool worker
+process) share a small array of flags; the handler raises a flag when the
+client disconnects or the request deadline passes, and the solver polls
+its token at safe points (scenario loops, local search passes) and unwinds
+with SolveCancelled.
+"""
+
+from typing import Any, Optional
+import time
+
+
+# Flag values stored in the shared array (0 = keep going)
+REASON_NONE = 0
+REASON_CLIENT_DISCONNECTED = 1
+REASON_DEADLINE = 2
+
+REASON_NAMES = {
+    REASON_CLIENT_DISCONNECTED: "client_disconnected",
+    REASON_DEADLINE: "deadline_exceeded",
+}
+
+
+class SolveCancelled(Exception):
+    """Raised inside the solver when its cancellation token fires."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+    def __reduce__(self):
+        # Keep `reason` when the exception is pickled back from a worker.
+        return (SolveCancelled, (self.reason,))
+
+
+class CancellationToken:
+    """
+    Polled by VRPOptimizer. Cancels when either:
+    - the wall-clock `deadline` (epoch seconds) has passed, or
+    - `flags[slot]` was set by the request handler.
+    """
+
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        flags: Optional[Any] = None,
+        slot: Optional[int] = None,
+    ):
+        self.deadline = deadline
+        self.flags = flags
+        self.slot = slot
+
+    def reason(self) -> Optional[str]:
+        if self.flags is not None and self.slot is not None:
+            code = self.flags[self.slot]
+            if code:
+                return REASON_NAMES.get(code, "cancelled")
+        if self.deadline is not None and time.time() >= self.deadline:
+            return REASON_NAMES[REASON_DEADLINE]
+        return None
+
+    def check(self) -> None:
+        reason = self.reason()
+        if reason is not None:
+            raise SolveCancelled(reason)
+
+
+def parse_deadline_header(value: Optional[str]) -> Optional[float]:
+    """
+    X-Request-Deadline -> epoch seconds.
+
+    The API sends an absolute epoch timestamp in milliseconds
+    (Date.now() + timeout); plain epoch seconds are accepted as well.
+    """
+    if value is None:
+        return None
+    raw = str(value).strip()
+    if not raw:
+        return None
+    try:
+        ts = float(raw)
+    except ValueError:
+        raise ValueError(f"Geçersiz X-Request-Deadline: {raw}")
+    # Anything this large cannot be seconds (year > 5000) -> milliseconds.
+    if ts > 1e11:
+        ts = ts / 1000.0
+    return ts
@@ -0,0 +1,712 @@
+"""
+Geographic decomposition for region-wide plans.
+
+Large instances are split into sectors, each sector is solved as an
+independent sub-problem (its own OptimizerInput + a slice of the instance
+distance arrays) in parallel worker processes, and the sector solutions
+are stitched back together:
+
+1. Partition: angular sweep around the hub (default) or k-means on
+   projected coordinates. Sectors are balanced on weight and station count.
+2. Fleet: owned vehicles are handed out in proportion to sector weight
+   (limited problems get at least one vehicle per sector; unlimited sectors
+   rent whatever they are short of).
+3. Sub-solve: VRPOptimizer.search() per sector (no nested decomposition).
+4. Boundary repair: stops are relocated to routes of *other* sectors that
+   visit one of their k nearest neighbors when that is cheaper, leftover
+   cargos are inserted where capacity allows, then touched routes get 2-opt.
+
+Switched on automatically above DECOMPOSE_MIN_STATIONS stations or
+DECOMPOSE_MIN_CARGOS cargos (DECOMPOSE_METHOD=off disables it).
+
+Sectors run in the solver process itself unless DECOMPOSE_WORKERS > 1.
+The default ("auto") keeps them in-process whenever the service already
+runs several solver workers (OPTIMIZER_WORKERS > 1), so a request never
+uses more than its own admitted slot; with a single solver worker the
+sectors go to a persistent pool of cpu_count processes, created once per
+solver process and reused by every decomposed request. Their memory is
+part of the admission estimate (memory.sector_bytes).
+"""
+
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+import math
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from env import env_int
+from cancellation import REASON_DEADLINE, REASON_NAMES, REASON_NONE, CancellationToken
+from executor import WATCH_INTERVAL_S, solver_mp_context
+from matrix_registry import PreparedMatrix
+from tracing import NULL_TRACER, Tracer
+
+if TYPE_CHECKING:
+    from models import OptimizerOutput
+    from optimizer import CandidateSolution, StopAssignment, Vehicle, VRPOptimizer
+
+
+METHODS = ("sweep", "kmeans")
+
+KMEANS_ITERATIONS = 30
+REPAIR_EPS = 1e-6
+
+REASON_CODES = {name: code for code, name in REASON_NAMES.items()}
+
+# Concurrent decomposed solves one sector pool serves (thread-mode solver
+# workers); each gets its own cancellation flag. Beyond that: in-process.
+SECTOR_POOL_RUNS = 8
+
+# Shared cancellation flags of the sector pool (set in each sector worker).
+_SECTOR_FLAGS: Optional[Any] = None
+
+# Persistent sector pool of this solver process (created on first use).
+_SECTOR_POOL: Optional["SectorPool"] = None
+_SECTOR_POOL_LOCK = threading.Lock()
+
+
+def default_sector_workers() -> int:
+    """DECOMPOSE_WORKERS, or auto: in-process when several solver workers run."""
+    raw = str(os.getenv("DECOMPOSE_WORKERS", "auto") or "auto").strip().lower()
+    if raw != "auto":
+        return max(1, env_int("DECOMPOSE_WORKERS", 1))
+    cpus = os.cpu_count() or 1
+    return 1 if env_int("OPTIMIZER_WORKERS", cpus) > 1 else cpus
+
+
+@dataclass
+class DecompositionConfig:
+    method: str
+    min_stations: int
+    min_cargos: int
+    sector_stations: int
+    workers: int
+    repair_passes: int
+
+    @classmethod
+    def from_env(cls) -> "DecompositionConfig":
+        method = str(os.getenv("DECOMPOSE_METHOD", "sweep") or "sweep").strip().lower()
+        return cls(
+            method=method if method in METHODS else "off",
+            min_stations=max(2, env_int("DECOMPOSE_MIN_STATIONS", 250)),
+            min_cargos=max(2, env_int("DECOMPOSE_MIN_CARGOS", 5000)),
+            sector_stations=max(2, env_int("DECOMPOSE_SECTOR_STATIONS", 100)),
+            workers=default_sector_workers(),
+            repair_passes=max(0, env_int("DECOMPOSE_REPAIR_PASSES", 4)),
+        )
+
+
+def _is_unlimited(opt: "VRPOptimizer") -> bool:
+    return opt.input.problem_type == "unlimited_vehicles"
+
+
+def sector_count(opt: "VRPOptimizer", cfg: DecompositionConfig) -> int:
+    count = int(math.ceil(len(opt.stations) / float(cfg.sector_stations)))
+    if not _is_unlimited(opt):
+        # Every limited sector needs at least one owned vehicle.
+        count = min(count, sum(1 for v in opt.vehicles if not v.is_rented))
+    return count
+
+
+def should_decompose(opt: "VRPOptimizer", cfg: Optional[DecompositionConfig] = None) -> bool:
+    cfg = cfg or DecompositionConfig.from_env()
+    if cfg.method == "off":
+        return False
+    cargos = sum(int(s.cargo_count or 0) for s in opt.stations)
+    if len(opt.stations) < cfg.min_stations and cargos < cfg.min_cargos:
+        return False
+    return sector_count(opt, cfg) >= 2
+
+
+# ---------- partitioning ----------
+
+def _projected_xy(opt: "VRPOptimizer") -> Tuple[np.ndarray, np.ndarray]:
+    """Station coordinates relative to the hub (degrees, lon scaled by cos(lat))."""
+    lat = np.array([s.lat for s in opt.stations], dtype=np.float64)
+    lon = np.array([s.lon for s in opt.stations], dtype=np.float64)
+    dx = (lon - opt.hub.lon) * math.cos(math.radians(opt.hub.lat))
+    dy = lat - opt.hub.lat
+    return dx, dy
+
+
+def _balance_weights(opt: "VRPOptimizer") -> np.ndarray:
+    """Per-station share used for balancing: half weight, half station count."""
+    w = np.array([float(s.weight_kg or 0) for s in opt.stations], dtype=np.float64)
+    n = float(len(w))
+    total = float(w.sum())
+    share = w / total if total > 0 else np.zeros_like(w)
+    return 0.5 * share + 0.5 / n
+
+
+def sweep_sectors(opt: "VRPOptimizer", count: int) -> List[List[int]]:
+    """Contiguous angular slices around the hub, cut at the widest gap first."""
+    dx, dy = _projected_xy(opt)
+    theta = np.arctan2(dy, dx)
+    order = np.argsort(theta, kind="stable")
+    ordered = theta[order]
+    gaps = np.diff(np.concatenate([ordered, ordered[:1] + 2 * np.pi]))
+    order = np.roll(order, -((int(np.argmax(gaps)) + 1) % len(order)))
+
+    share = _balance_weights(opt)[order]
+    cum = np.cumsum(share)
+    labels = np.minimum(((cum - share / 2) / cum[-1] * count).astype(np.int64), count - 1)
+    groups = [order[labels == k].tolist() for k in range(count)]
+    return [g for g in groups if g]
+
+
+def kmeans_sectors(opt: "VRPOptimizer", count: int) -> List[List[int]]:
+    """Lloyd's k-means (k-means++ seeding, seeded by plan date)."""
+    dx, dy = _projected_xy(opt)
+    pts = np.column_stack([dx, dy])
+    n = pts.shape[0]
+    rng = np.random.default_rng(zlib.crc32(str(opt.input.plan_date).encode("utf-8")))
+
+    centers = [pts[int(rng.integers(n))]]
+    d2 = ((pts - centers[0]) ** 2).sum(axis=1)
+    while len(centers) < count:
+        total = float(d2.sum())
+        nxt = int(rng.choice(n, p=d2 / total)) if total > 0 else int(rng.integers(n))
+        centers.append(pts[nxt])
+        d2 = np.minimum(d2, ((pts - pts[nxt]) ** 2).sum(axis=1))
+    c = np.array(centers)
+
+    labels = np.zeros(n, dtype=np.int64)
+    for _ in range(KMEANS_ITERATIONS):
+        dist = ((pts[:, None, :] - c[None, :, :]) ** 2).sum(axis=2)
+        new_labels = np.argmin(dist, axis=1)
+        for k in range(count):
+            members = new_labels == k
+            if members.any():
+                c[k] = pts[members].mean(axis=0)
+            else:
+                # Empty cluster: restart it at the worst-served point.
+                far = int(np.argmax(dist[np.arange(n), new_labels]))
+                c[k] = pts[far]
+                new_labels[far] = k
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    groups = [np.nonzero(labels == k)[0].tolist() for k in range(count)]
+    return [g for g in groups if g]
+
+
+def allocate_fleet(opt: "VRPOptimizer", groups: List[List[int]]) -> List[List["Vehicle"]]:
+    """Owned vehicles per sector, capacity proportional to sector weight."""
+    owned = sorted((v for v in opt.vehicles if not v.is_rented), key=lambda v: v.capacity_kg, reverse=True)
+    weights = [sum(float(opt.stations[i].weight_kg or 0) for i in g) for g in groups]
+    total_w = sum(weights) or 1.0
+    total_cap = sum(v.capacity_kg for v in owned)
+    targets = [w / total_w * total_cap for w in weights]
+
+    fleets: List[List["Vehicle"]] = [[] for _ in groups]
+    allocated = [0.0] * len(groups)
+    queue = list(owned)
+    if not _is_unlimited(opt):
+        for k in sorted(range(len(groups)), key=lambda k: weights[k], reverse=True):
+            if not queue:
+                break
+            v = queue.pop(0)
+            fleets[k].append(v)
+            allocated[k] += v.capacity_kg
+    for v in queue:
+        k = max(range(len(groups)), key=lambda k: targets[k] - allocated[k])
+        fleets[k].append(v)
+        allocated[k] += v.capacity_kg
+    return fleets
+
+
+# ---------- sector sub-solves ----------
+
+def _sector_matrix(opt: "VRPOptimizer", rows: List[int]) -> PreparedMatrix:
+    """
+    Slice of the (already fully resolved) instance arrays; hub first. Pairs
+    the parent estimated stay known=False so the sector's candidate lists
+    still prefer given pairs (sparse inputs).
+    """
+    sel = np.ix_(rows, rows)
+    ids = [opt.points[i].id for i in rows]
+    dist = opt.dist_km[sel]
+    return PreparedMatrix(
+        ids=ids,
+        index={sid: i for i, sid in enumerate(ids)},
+        distance_km=dist,
+        duration_minutes=opt.duration_min[sel],
+        known=opt._given[sel] if opt._given is not None else np.ones(dist.shape, dtype=bool),
+        # Polylines are joined by the parent when it builds the output.
+        polylines={},
+        digest=f"sector:{opt.matrix.digest}",
+    )
+
+
+def _solve_sector(
+    index: int,
+    sub_input: Any,
+    matrix: PreparedMatrix,
+    token: Optional[CancellationToken],
+    tracer: Any = NULL_TRACER,
+) -> Tuple[int, Optional["CandidateSolution"], float]:
+    from optimizer import VRPOptimizer
+
+    start = time.perf_counter()
+    with tracer.span("sector", cat="decomposition", index=index, stations=len(sub_input.stations)):
+        best = VRPOptimizer(
+            sub_input,
+            cancel_token=token,
+            matrix=matrix,
+            allow_decomposition=False,
+            tracer=tracer,
+        ).search()
+    return index, best, (time.perf_counter() - start) * 1000
+
+
+def _init_sector_worker(flags: Any) -> None:
+    global _SECTOR_FLAGS
+    _SECTOR_FLAGS = flags
+
+
+def _sector_worker(
+    index: int,
+    sub_input: Any,
+    matrix: PreparedMatrix,
+    deadline: Optional[float],
+    slot: int,
+    trace_id: Optional[str] = None,
+) -> Tuple[int, Optional["CandidateSolution"], float, List[Dict[str, Any]]]:
+    token = CancellationToken(deadline=deadline, flags=_SECTOR_FLAGS, slot=slot)
+    # Traced requests: spans of this process travel back with the result.
+    tracer = Tracer(trace_id, f"sector {index}") if trace_id is not None else NULL_TRACER
+    result = _solve_sector(index, sub_input, matrix, token, tracer)
+    return (*result, tracer.export() if trace_id is not None else [])
+
+
+class SectorPool:
+    """Process pool for sector sub-solves, kept for the life of the solver process."""
+
+    def __init__(self, workers: int):
+        ctx = solver_mp_context()
+        self.workers = workers
+        # One flag per concurrent run (single writer: the run's parent thread)
+        self.flags = ctx.RawArray("b", SECTOR_POOL_RUNS)
+        self._free = list(range(SECTOR_POOL_RUNS))
+        self._lock = threading.Lock()
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_sector_worker,
+            initargs=(self.flags,),
+        )
+
+    def acquire(self) -> Optional[int]:
+        with self._lock:
+            return self._free.pop() if self._free else None
+
+    def release(self, slot: int) -> None:
+        with self._lock:
+            self._free.append(slot)
+
+
+def _sector_pool(workers: int) -> SectorPool:
+    global _SECTOR_POOL
+    with _SECTOR_POOL_LOCK:
+        if _SECTOR_POOL is None or _SECTOR_POOL.workers != workers:
+            if _SECTOR_POOL is not None:
+                _SECTOR_POOL.executor.shutdown(wait=False, cancel_futures=True)
+            _SECTOR_POOL = SectorPool(workers)
+        return _SECTOR_POOL
+
+
+def _drop_sector_pool(pool: SectorPool) -> None:
+    """Forget a broken pool; the next decomposed solve starts a new one."""
+    global _SECTOR_POOL
+    with _SECTOR_POOL_LOCK:
+        if _SECTOR_POOL is pool:
+            _SECTOR_POOL = None
+    pool.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_sectors(
+    opt: "VRPOptimizer",
+    jobs: List[Tuple[int, Any, PreparedMatrix]],
+    workers: int,
+) -> List[Tuple[int, Optional["CandidateSolution"], float]]:
+    token = opt.cancel_token
+    pool = _sector_pool(workers) if workers > 1 else None
+    slot = pool.acquire() if pool is not None else None
+    if pool is None or slot is None:
+        return [_solve_sector(i, sub, m, token, opt.tracer) for i, sub, m in jobs]
+
+    flags = pool.flags
+    flags[slot] = REASON_NONE
+    deadline = token.deadline if token is not None else None
+    trace_id = opt.tracer.request_id if opt.tracer.enabled else None
+    try:
+        futures = [
+            pool.executor.submit(_sector_worker, i, sub, m, deadline, slot, trace_id) for i, sub, m in jobs
+        ]
+        error: Optional[BaseException] = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=WATCH_INTERVAL_S, return_when=FIRST_EXCEPTION)
+            failed = next((f for f in done if not f.cancelled() and f.exception() is not None), None)
+            if failed is not None and error is None:
+                # Stop the other sectors early; the slot is only reused once
+                # they have all unwound.
+                error = failed.exception()
+                flags[slot] = flags[slot] or REASON_DEADLINE
+                for f in pending:
+                    f.cancel()
+            # Forward the parent's cancellation (client gone / deadline) to
+            # the sector processes, which poll the shared flag.
+            if token is not None and not flags[slot]:
+                reason = token.reason()
+                if reason is not None:
+                    flags[slot] = REASON_CODES.get(reason, REASON_DEADLINE)
+        if isinstance(error, BrokenProcessPool):
+            _drop_sector_pool(pool)
+        if token is not None:
+            token.check()
+        if error is not None:
+            raise error
+    finally:
+        pool.release(slot)
+
+    results = []
+    for f in futures:
+        *result, events = f.result()
+        opt.tracer.add_events(events)
+        results.append(tuple(result))
+    return results
+
+
+# ---------- boundary repair ----------
+
+def cheapest_insertion(d: Any, hub: int, route: List["StopAssignment"], s: int) -> Tuple[float, int, bool]:
+    """Cheapest (added distance, position, merge-into-existing-stop) for point s."""
+    for p, stop in enumerate(route):
+        if stop.station.idx == s:
+            return 0.0, p, True
+    best_cost, best_pos = float("inf"), 0
+    prev: Optional[int] = None
+    for p in range(len(route) + 1):
+        nxt = route[p].station.idx if p < len(route) else hub
+        cost = d[s][nxt] + ((d[prev][s] - d[prev][nxt]) if prev is not None else 0.0)
+        if cost < best_cost:
+            best_cost, best_pos = cost, p
+        prev = nxt
+    return best_cost, best_pos, False
+
+
+def place_stop(route: List["StopAssignment"], stop: "StopAssignment", pos: int, merge: bool) -> None:
+    if merge:
+        target = route[pos]
+        target.cargos.extend(stop.cargos)
+        target.weight_kg = round(target.weight_kg + stop.weight_kg, 2)
+    else:
+        route.insert(pos, stop)
+
+
+class _BoundaryRepair:
+    """Cross-sector relocate / insert moves on the stitched solution."""
+
+    def __init__(
+        self,
+        opt: "VRPOptimizer",
+        routes: List[List["StopAssignment"]],
+        vehicles: List["Vehicle"],
+        sector_of: Dict[int, int],
+    ):
+        self.opt = opt
+        self.routes = routes
+        self.vehicles = vehicles
+        self.sector_of = sector_of
+        self.d = opt._dist
+        self.hub = opt.hub.idx
+        self.cost_per_km = float(opt.params.cost_per_km)
+        self.neighbors = opt.neighbor_lists
+        # Load (and distance) per route, updated incrementally by the moves
+        self.metrics = [opt.route_metrics.metrics(r) for r in routes]
+        self.visits: Dict[int, Set[int]] = {}
+        for ri, r in enumerate(routes):
+            for stop in r:
+                self.visits.setdefault(stop.station.idx, set()).add(ri)
+        self.touched: Set[int] = set()
+        self.relocations = 0
+        self.merges = 0
+        self.inserted_cargos = 0
+
+    def add_route(self, route: List["StopAssignment"], vehicle: "Vehicle") -> None:
+        ri = len(self.routes)
+        self.routes.append(route)
+        self.vehicles.append(vehicle)
+        self.metrics.append(self.opt.route_metrics.metrics(route))
+        for stop in route:
+            self.visits.setdefault(stop.station.idx, set()).add(ri)
+        self.touched.add(ri)
+
+    def _place(self, qi: int, stop: "StopAssignment", pos: int, merge: bool) -> None:
+        place_stop(self.routes[qi], stop, pos, merge)
+        if merge:
+            self.metrics[qi].add_weight(stop.weight_kg)
+        else:
+            self.metrics[qi].insert(pos, stop.station.idx, stop.weight_kg)
+
+    @property
+    def distance_km(self) -> float:
+        return sum(m.distance_km for m in self.metrics)
+
+    def _near_routes(self, s: int, other_sectors_only: bool) -> Set[int]:
+        sec = self.sector_of.get(s)
+        out: Set[int] = set(self.visits.get(s, ()))
+        for j in self.neighbors[s]:
+            if j == self.hub:
+                continue
+            if other_sectors_only and self.sector_of.get(j) == sec:
+                continue
+            out |= self.visits.get(j, set())
+        return out
+
+    def relocate_pass(self) -> int:
+        d, hub = self.d, self.hub
+        moves = 0
+        for ri in range(len(self.routes)):
+            self.opt._check_cancelled()
+            route = self.routes[ri]
+            p = 0
+            while p < len(route):
+                stop = route[p]
+                s = stop.station.idx
+                targets = self._near_routes(s, other_sectors_only=True)
+                targets.discard(ri)
+                if not targets:
+                    p += 1
+                    continue
+
+                prev = route[p - 1].station.idx if p > 0 else None
+                nxt = route[p + 1].station.idx if p + 1 < len(route) else hub
+                gain = d[s][nxt] + ((d[prev][s] - d[prev][nxt]) if prev is not None else 0.0)
+                gain *= self.cost_per_km
+                vehicle = self.vehicles[ri]
+                if len(route) == 1 and vehicle.is_rented:
+                    gain += vehicle.rental_cost
+
+                best: Optional[Tuple[float, int, int, bool]] = None
+                for qi in sorted(targets):
+                    if self.metrics[qi].weight_kg + stop.weight_kg > self.vehicles[qi].capacity_kg + 1e-6:
+                        continue
+                    cost, pos, merge = cheapest_insertion(d, hub, self.routes[qi], s)
+                    delta = gain - cost * self.cost_per_km
+                    if delta > REPAIR_EPS and (best is None or delta > best[0]):
+                        best = (delta, qi, pos, merge)
+                if best is None:
+                    p += 1
+                    continue
+
+                _, qi, pos, merge = best
+                route.pop(p)
+                self.metrics[ri].remove(p, stop.weight_kg)
+                self._place(qi, stop, pos, merge)
+                if not any(x.station.idx == s for x in route):
+                    self.visits[s].discard(ri)
+                self.visits.setdefault(s, set()).add(qi)
+                self.touched.update((ri, qi))
+                self.relocations += 1
+                self.merges += int(merge)
+                moves += 1
+        return moves
+
+    def insert_leftovers(self, stations: List[Any], objective: Optional[str]) -> None:
+        """Fill spare capacity with cargos no sector could take."""
+        from optimizer import StopAssignment
+
+        d, hub = self.d, self.hub
+        for st in stations:
+            if not st.cargos:
+                continue
+            targets = self._near_routes(st.idx, other_sectors_only=False) or set(range(len(self.routes)))
+            ranked = sorted(targets, key=lambda qi: (cheapest_insertion(d, hub, self.routes[qi], st.idx)[0], qi))
+            for qi in ranked:
+                if not st.cargos:
+                    break
+                spare = self.vehicles[qi].capacity_kg - self.metrics[qi].weight_kg
+                cargos = sorted(
+                    st.cargos,
+                    key=lambda c: float(c.get("weight_kg", 0) or 0),
+                    reverse=(objective == "max_weight"),
+                )
+                taken: List[dict] = []
+                taken_w = 0.0
+                for c in cargos:
+                    w = float(c.get("weight_kg", 0) or 0)
+                    if w <= spare - taken_w + 1e-6:
+                        taken.append(c)
+                        taken_w += w
+                if not taken:
+                    continue
+                taken_ids = {id(c) for c in taken}
+                st.cargos = [c for c in st.cargos if id(c) not in taken_ids]
+                self.opt._refresh_station_totals(st)
+                _, pos, merge = cheapest_insertion(d, hub, self.routes[qi], st.idx)
+                self._place(qi, StopAssignment(station=st, cargos=taken, weight_kg=round(taken_w, 2)), pos, merge)
+                self.visits.setdefault(st.idx, set()).add(qi)
+                self.touched.add(qi)
+                self.inserted_cargos += len(taken)
+
+
+# ---------- driver ----------
+
+def solve_decomposed(opt: "VRPOptimizer", cfg: Optional[DecompositionConfig] = None) -> "OptimizerOutput":
+    from models import ErrorInfo, OptimizerOutput
+    from optimizer import StopAssignment
+
+    cfg = cfg or DecompositionConfig.from_env()
+    unlimited = _is_unlimited(opt)
+    objective = None if unlimited else opt._get_limited_objective()
+    t0 = time.perf_counter()
+
+    count = sector_count(opt, cfg)
+    with opt.tracer.span("partition", cat="decomposition", sectors=count, method=cfg.method):
+        groups = kmeans_sectors(opt, count) if cfg.method == "kmeans" else sweep_sectors(opt, count)
+        fleets = allocate_fleet(opt, groups)
+    input_vehicles = {v.id: v for v in opt.input.vehicles}
+    input_stations = {s.id: s for s in opt.input.stations}
+
+    jobs: List[Tuple[int, Any, PreparedMatrix]] = []
+    sector_of: Dict[int, int] = {}
+    for k, (group, fleet) in enumerate(zip(groups, fleets)):
+        members = [opt.stations[i] for i in group]
+        for st in members:
+            sector_of[st.idx] = k
+        sub_input = opt.input.model_copy(update={
+            "stations": [input_stations[st.id] for st in members],
+            "vehicles": [input_vehicles[v.id] for v in fleet],
+            "distance_matrix": {},
+            "matrix_digest": None,
+            "sparse_matrix": None,
+        })
+        jobs.append((k, sub_input, _sector_matrix(opt, [opt.hub.idx] + [st.idx for st in members])))
+    t_partition = time.perf_counter()
+
+    # The persistent pool keeps its configured size; one sector runs in-process.
+    workers = cfg.workers if len(jobs) > 1 else 1
+    parallel = min(workers, len(jobs))
+    with opt.tracer.span("sectors", cat="decomposition", sectors=len(jobs), workers=parallel):
+        results = _run_sectors(opt, jobs, workers)
+    t_solve = time.perf_counter()
+
+    # Stitch: re-point stops at the parent's stations (parent indices).
+    stations = opt._clone_stations()
+    by_id = {st.id: st for st in stations}
+    routes: List[List[StopAssignment]] = []
+    vehicles: List[Any] = []
+    sector_reports: List[Dict[str, Any]] = []
+    iterations = 0
+    for k, best, elapsed_ms in sorted(results, key=lambda r: r[0]):
+        members = [opt.stations[i] for i in groups[k]]
+        report: Dict[str, Any] = {
+            "index": k,
+            "stations": len(members),
+            "cargos": sum(int(s.cargo_count or 0) for s in members),
+            "weight_kg": round(sum(float(s.weight_kg or 0) for s in members), 2),
+            "owned_vehicles": len(fleets[k]),
+            "solve_ms": round(elapsed_ms, 1),
+            "solved": best is not None,
+        }
+        if best is not None:
+            iterations += best.two_opt_iterations
+            report["routes"] = sum(1 for r in best.routes if r)
+            report["cost"] = round(best.total_cost, 2)
+            report["unassigned_cargos"] = sum(len(s.cargos) for s in best.unassigned)
+            for route, vehicle in zip(best.routes, best.vehicles):
+                if route:
+                    routes.append([
+                        StopAssignment(station=by_id[s.station.id], cargos=s.cargos, weight_kg=s.weight_kg)
+                        for s in route
+                    ])
+                    vehicles.append(vehicle)
+        sector_reports.append(report)
+
+    assigned_ids = {str(c.get("id")) for r in routes for s in r for c in s.cargos}
+    for st in stations:
+        st.cargos = [c for c in st.cargos if str(c.get("id")) not in assigned_ids]
+        opt._refresh_station_totals(st)
+
+    # Boundary repair
+    repair = _BoundaryRepair(opt, routes, vehicles, sector_of)
+    repair.insert_leftovers(stations, objective)
+    leftover_routes = 0
+    if unlimited:
+        remaining = [s for s in stations if s.cargos]
+        while remaining:
+            v = opt._rental_slot(0)
+            route = opt._greedy_route_for_vehicle(remaining, v.capacity_kg)
+            if not route:
+                break
+            repair.add_route(route, v)
+            leftover_routes += 1
+            remaining = [s for s in remaining if s.cargos]
+        if remaining:
+            return OptimizerOutput(
+                success=False,
+                problem_type=opt.input.problem_type,
+                error=ErrorInfo(
+                    code="INFEASIBLE_SOLUTION",
+                    message="Uygun çözüm bulunamadı (kapasite yetersiz veya kargo bölünemiyor)",
+                ),
+            )
+
+    passes = 0
+    before_relocate_km = repair.distance_km
+    with opt.tracer.span("repair", cat="decomposition") as span:
+        for _ in range(cfg.repair_passes):
+            passes += 1
+            if not repair.relocate_pass():
+                break
+        relocate_saved_km = before_relocate_km - repair.distance_km
+        for ri in sorted(repair.touched):
+            if routes[ri]:
+                routes[ri], it = opt._two_opt(routes[ri])
+                iterations += it
+        span.set(passes=passes, relocations=repair.relocations)
+
+    kept = [(r, v) for r, v in zip(routes, vehicles) if r]
+    routes = [r for r, _ in kept]
+    vehicles = [v for _, v in kept]
+    t_end = time.perf_counter()
+
+    opt.unassigned = [s for s in stations if s.cargos]
+    opt.iterations = iterations
+    return opt._build_output(
+        routes,
+        vehicles,
+        algorithm_info={
+            "name": (
+                f"Decomposition ({cfg.method} x {len(groups)}) + "
+                f"{'ALNS' if opt._use_alns() else 'Fleet Search'} per sector + boundary repair + 2-opt"
+            ),
+            "iterations": iterations,
+            "execution_time_ms": 0,
+            "improvement_percentage": 0,
+            "decomposition": {
+                "method": cfg.method,
+                "sectors": sector_reports,
+                "workers": parallel,
+                "partition_ms": round((t_partition - t0) * 1000, 1),
+                "solve_ms": round((t_solve - t_partition) * 1000, 1),
+                "repair_ms": round((t_end - t_solve) * 1000, 1),
+                "repair": {
+                    "passes": passes,
+                    "relocations": repair.relocations,
+                    "merges": repair.merges,
+                    "relocate_saved_km": round(relocate_saved_km, 3),
+                    "inserted_cargos": repair.inserted_cargos,
+                    "leftover_routes": leftover_routes,
+                },
+            },
+        },
+    )
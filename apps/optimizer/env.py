@@ -0,0 +1,20 @@
+"""
+Environment knobs: integer / float settings with a default when the
+variable is unset, empty or not a number.
+"""
+
+import os
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(str(os.getenv(name, "")).strip() or default)
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(str(os.getenv(name, "")).strip() or default)
+    except ValueError:
+        return default
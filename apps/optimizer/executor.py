@@ -0,0 +1,390 @@
+"""
+Solver process pool + admission control.
+
+CPU-bound VRP solves are GIL-bound, so running them in FastAPI's default
+thread pool makes concurrent requests slow each other down. Instead the
+solves are dispatched to a dedicated process pool whose workers preload the
+solver modules, and a bounded admission queue sheds load (429/503 with
+Retry-After) instead of letting latency grow without limit.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import importlib
+import math
+import multiprocessing
+import os
+import threading
+import time
+
+from cancellation import (
+    REASON_NAMES,
+    REASON_NONE,
+    CancellationToken,
+    SolveCancelled,
+)
+
+
+# Worker processes import these once at start-up (forkserver preload on Linux,
+# initializer import otherwise) so the first solve does not pay for imports.
+PRELOAD_MODULES = ["numpy", "models", "kernels", "memory", "optimizer", "response"]
+
+# How often the handler re-checks disconnect / deadline while a job waits.
+WATCH_INTERVAL_S = 0.25
+
+# Shared cancellation flags, one per running job slot (set in each worker).
+_CANCEL_FLAGS: Optional[Any] = None
+
+# Outcome of this worker's start-up warm-up solve (warmup.warm_solve).
+_WARMUP: Optional[Dict[str, Any]] = None
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a solve cannot be admitted right now."""
+
+    def __init__(self, status_code: int, message: str, retry_after_s: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.retry_after_s = retry_after_s
+
+
+def solver_mp_context() -> Any:
+    """forkserver (with solver modules preloaded) where available, else spawn."""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(PRELOAD_MODULES)
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def _init_worker(cancel_flags: Any, warm_up: bool = False) -> None:
+    global _CANCEL_FLAGS, _WARMUP
+    _CANCEL_FLAGS = cancel_flags
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+
+    import kernels
+    from matrix_store import get_network_store
+
+    # Compiled kernels (loaded from the on-disk cache: image build or first worker).
+    kernels.warm_up()
+
+    # Map the network matrix now so the first request does not pay for it.
+    get_network_store()
+
+    if warm_up:
+        # Every worker (also one restarted after a crash) solves the built-in
+        # instances once before it takes its first job.
+        from warmup import warm_solve
+
+        _WARMUP = warm_solve()
+
+
+def worker_warmup() -> Dict[str, Any]:
+    """Job reporting which worker ran it and how its warm-up went."""
+    return dict(_WARMUP or {}, worker=f"{os.getpid()}:{threading.get_ident()}")
+
+
+def run_optimize(
+    input_data: Any,
+    matrix: Optional[Any] = None,
+    trace_id: Optional[str] = None,
+    deadline: Optional[float] = None,
+    cancel_slot: Optional[int] = None,
+) -> Any:
+    """
+    Worker entry point: solve one OptimizerInput and time it. `matrix` is a
+    PreparedMatrix or a MatrixRef to a spilled registry matrix. With a
+    `trace_id` the solve is traced and its spans ride back in
+    algorithm_info[TRACE_EVENTS_KEY] (popped by the server).
+    """
+    from matrix_registry import resolve_matrix
+    from matrix_store import get_network_store
+    from memory import SolveMeter
+    from optimizer import VRPOptimizer
+    from response import compact_output, response_format
+    from tracing import NULL_TRACER, TRACE_EVENTS_KEY, Tracer
+
+    token = CancellationToken(deadline=deadline, flags=_CANCEL_FLAGS, slot=cancel_slot)
+    tracer = Tracer(trace_id, "solver worker") if trace_id is not None else NULL_TRACER
+    start = time.time()
+    with tracer.span("worker", cat="request"):
+        # Peak RSS per solve in process workers (one solve per process at a time)
+        with SolveMeter() as meter:
+            result = VRPOptimizer(
+                input_data,
+                cancel_token=token,
+                matrix=resolve_matrix(matrix),
+                matrix_store=get_network_store(),
+                tracer=tracer,
+            ).solve()
+        if response_format(input_data) == "compact":
+            # Converted here so the smaller form is what gets pickled back.
+            with tracer.span("compact_output", cat="output"):
+                result = compact_output(result, input_data)
+    result.algorithm_info["execution_time_ms"] = (time.time() - start) * 1000
+    result.algorithm_info["memory"] = meter.info
+    if trace_id is not None:
+        result.algorithm_info[TRACE_EVENTS_KEY] = tracer.export()
+    return result
+
+
+class SolverPool:
+    """
+    Bounded executor for solver jobs.
+
+    - `workers` solves run concurrently (one per process).
+    - Up to `max_queue` further solves wait for a free worker.
+    - Anything beyond that is rejected immediately with 429 + Retry-After;
+      503 is used while the pool is starting, restarting or shutting down.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        mode: str = "process",
+        min_retry_after_s: int = 1,
+        warm_up: bool = False,
+    ):
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self.mode = "thread" if str(mode).strip().lower() == "thread" else "process"
+        self.min_retry_after_s = max(1, int(min_retry_after_s))
+        self.warm_up = bool(warm_up)
+
+        self._executor: Optional[Any] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._free_slots: List[int] = list(range(self.workers))
+        self._cancel_flags: Optional[Any] = None
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self._accepting = False
+
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._cancelled: Dict[str, int] = {}
+        # Exponential moving average of solve duration, used for Retry-After.
+        self._avg_solve_s = 1.0
+
+    # ---------- lifecycle ----------
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        self._executor = self._create_executor()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._accepting = True
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._accepting = False
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    async def wait_warm(self, poll_s: float = 0.05) -> List[Dict[str, Any]]:
+        """
+        Start every worker and wait until each one has finished its
+        initializer (imports, kernels, warm-up solve); returns their reports.
+        The first worker starts alone so that only it compiles kernels into
+        an empty cache. Runs outside admission and the stats.
+        """
+        executor = self._executor
+        first = await asyncio.wrap_future(executor.submit(worker_warmup))
+        seen = {first["worker"]: first}
+        # Workers are spawned on demand and a job only runs on an initialized
+        # one: keep probing until every worker has answered.
+        while len(seen) < self.workers:
+            reports = await asyncio.gather(
+                *(asyncio.wrap_future(executor.submit(worker_warmup)) for _ in range(self.workers))
+            )
+            for report in reports:
+                seen.setdefault(report["worker"], report)
+            if len(seen) < self.workers:
+                await asyncio.sleep(poll_s)
+        return list(seen.values())
+
+    def _create_executor(self) -> Any:
+        if self.mode == "thread":
+            self._cancel_flags = [REASON_NONE] * self.workers
+            return ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="solver",
+                initializer=_init_worker,
+                initargs=(self._cancel_flags, self.warm_up),
+            )
+
+        ctx = solver_mp_context()
+        # Lock-free shared memory: each slot has a single writer (the handler).
+        self._cancel_flags = ctx.RawArray("b", self.workers)
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self._cancel_flags, self.warm_up),
+        )
+
+    def _restart_executor(self, broken: Any) -> None:
+        with self._lock:
+            # Several in-flight jobs can observe the same broken pool; only
+            # the first one replaces it.
+            if not self._accepting or self._executor is not broken:
+                return
+            old, self._executor = self._executor, self._create_executor()
+        if old is not None:
+            old.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- admission ----------
+
+    def retry_after_s(self) -> int:
+        backlog = self._running + self._queued
+        waves = max(1.0, backlog / float(self.workers))
+        return max(self.min_retry_after_s, int(math.ceil(waves * self._avg_solve_s)))
+
+    def _admit(self) -> None:
+        with self._lock:
+            if not self._accepting or self._executor is None:
+                self._rejected += 1
+                raise PoolSaturatedError(503, "Optimizer havuzu hazır değil", self.retry_after_s())
+            if self._queued >= self.max_queue and self._running >= self.workers:
+                self._rejected += 1
+                raise PoolSaturatedError(429, "Optimizer kapasitesi dolu", self.retry_after_s())
+            self._queued += 1
+
+    def _release(self, slot: int, started_at: float, outcome: str) -> None:
+        elapsed = time.monotonic() - started_at
+        with self._lock:
+            self._running -= 1
+            self._free_slots.append(slot)
+            if outcome == "ok":
+                self._completed += 1
+                self._avg_solve_s = 0.8 * self._avg_solve_s + 0.2 * elapsed
+            elif outcome == "failed":
+                self._failed += 1
+            else:
+                self._cancelled[outcome] = self._cancelled.get(outcome, 0) + 1
+        self._slots.release()
+
+    async def _wait_watching(
+        self,
+        awaitable: Awaitable[Any],
+        watch: Optional[Callable[[], Awaitable[Optional[int]]]],
+        on_cancel: Callable[[int], None],
+    ) -> Any:
+        """Await `awaitable`, polling `watch()` for a cancellation reason."""
+        task = asyncio.ensure_future(awaitable)
+        if watch is None:
+            return await task
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=WATCH_INTERVAL_S)
+            if done:
+                return task.result()
+            code = await watch()
+            if code:
+                on_cancel(code)
+                # Keep waiting: a running job unwinds on its own shortly and
+                # reports SolveCancelled; a queued one is dropped right away.
+
+    async def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        deadline: Optional[float] = None,
+        watch: Optional[Callable[[], Awaitable[Optional[int]]]] = None,
+    ) -> Any:
+        """
+        Run `fn(*args, deadline=..., cancel_slot=...)` on the pool.
+
+        Raises PoolSaturatedError when full, SolveCancelled when `watch()`
+        returns a reason code (or the deadline passes) before completion.
+        """
+        self._admit()
+
+        def _cancel_queued(code: int) -> None:
+            raise SolveCancelled(REASON_NAMES.get(code, "cancelled"))
+
+        # Only `workers` jobs are handed to the executor at a time, so the
+        # executor's own queue stays empty and queue depth is exact here.
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        try:
+            await self._wait_watching(acquire, watch, _cancel_queued)
+        except BaseException as e:
+            if acquire.done() and not acquire.cancelled() and acquire.exception() is None:
+                self._slots.release()
+            else:
+                acquire.cancel()
+            with self._lock:
+                self._queued -= 1
+                if isinstance(e, SolveCancelled):
+                    self._cancelled[e.reason] = self._cancelled.get(e.reason, 0) + 1
+            raise
+
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            slot = self._free_slots.pop()
+        started_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        flags = self._cancel_flags
+        flags[slot] = REASON_NONE
+
+        try:
+            cfut = executor.submit(fn, *args, deadline=deadline, cancel_slot=slot)
+        except (BrokenProcessPool, RuntimeError, AttributeError):
+            self._release(slot, started_at, "failed")
+            self._restart_executor(executor)
+            raise PoolSaturatedError(503, "Optimizer havuzu yeniden başlatılıyor", self.retry_after_s())
+
+        # The slot is released when the job really finishes, even if the
+        # awaiting request is cancelled earlier (the process keeps running).
+        def _done(f: Any) -> None:
+            if f.cancelled():
+                outcome = "failed"
+            else:
+                exc = f.exception()
+                if exc is None:
+                    outcome = "ok"
+                elif isinstance(exc, SolveCancelled):
+                    outcome = exc.reason
+                else:
+                    outcome = "failed"
+            loop.call_soon_threadsafe(self._release, slot, started_at, outcome)
+
+        cfut.add_done_callback(_done)
+
+        def _cancel_running(code: int) -> None:
+            flags[slot] = code
+
+        try:
+            return await self._wait_watching(asyncio.wrap_future(cfut), watch, _cancel_running)
+        except BrokenProcessPool:
+            self._restart_executor(executor)
+            raise PoolSaturatedError(503, "Optimizer işçi süreci çöktü", self.retry_after_s())
+
+    # ---------- reporting ----------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = self._running
+            queued = self._queued
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "busy_workers": running,
+                "utilization": round(running / float(self.workers), 3),
+                "queue_depth": queued,
+                "queue_capacity": self.max_queue,
+                "saturated": running + queued >= self.workers + self.max_queue,
+                "accepting": self._accepting,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "cancelled": dict(self._cancelled),
+                "avg_solve_ms": round(self._avg_solve_s * 1000, 1),
+            }
@@ -0,0 +1,210 @@
+"""
+Fleet-composition selection for depots with many owned vehicles.
+
+Vehicles with the same (capacity, rented, rental cost) are interchangeable,
+so fleets are handled as *type-count vectors*: "2 x 750 kg + 1 x 1000 kg"
+instead of every subset of vehicle ids. A fleet of 10 identical vans has
+10 compositions, not 1023 subsets.
+
+Enumerating every composition is still exponential in the number of
+distinct types; that is fine for the 3-vehicle demo but not for a depot
+with a 40-vehicle mixed fleet. Above EXHAUSTIVE_MAX_FLEETS compositions
+the solver instead:
+
+1. picks a few promising fleets with a 0/1 knapsack DP over capacity:
+   for each fleet size k, the owned subset with the *smallest* capacity
+   that still covers the load (fewer / tighter vehicles -> fewer routes),
+   plus the k largest vehicles (most slack for splitting stations);
+2. refines the best fleet found with add / drop / swap vehicle moves.
+
+Both steps are polynomial in the fleet size.
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+import itertools
+
+import numpy as np
+
+
+# Up to this many fleet compositions every one is still tried (demo fleets:
+# 4 distinct vehicles -> 15 compositions).
+EXHAUSTIVE_MAX_FLEETS = 16
+
+# DP resolution: total capacity is bucketed into at most this many cells.
+DP_MAX_CELLS = 20000
+
+# Fleet sizes tried above the smallest one that covers the load.
+EXTRA_FLEET_SIZES = 2
+
+# Add/drop/swap refinement rounds and construction attempts per neighbor.
+REFINE_ROUNDS = 3
+REFINE_ATTEMPTS = 2
+
+
+VehicleType = Tuple[float, bool, float]
+
+
+def vehicle_type(v: Any) -> VehicleType:
+    return (float(v.capacity_kg), bool(v.is_rented), float(v.rental_cost or 0))
+
+
+def _key(fleet: Sequence[Any]) -> Tuple[VehicleType, ...]:
+    """Fleet composition: equal for fleets that differ only in vehicle ids."""
+    return tuple(sorted(vehicle_type(v) for v in fleet))
+
+
+def group_types(vehicles: Sequence[Any]) -> List[List[Any]]:
+    """
+    Vehicles grouped by type, groups in order of first appearance and
+    vehicles within a group by id (so a composition always maps to the
+    same representatives).
+    """
+    groups: Dict[VehicleType, List[Any]] = {}
+    for v in vehicles:
+        groups.setdefault(vehicle_type(v), []).append(v)
+    return [sorted(g, key=lambda v: v.id) for g in groups.values()]
+
+
+def composition_count(groups: Sequence[Sequence[Any]]) -> int:
+    """Number of non-empty compositions (type-count vectors)."""
+    total = 1
+    for g in groups:
+        total *= len(g) + 1
+    return total - 1
+
+
+def compositions(groups: Sequence[Sequence[Any]]) -> List[List[Any]]:
+    """
+    Every non-empty fleet composition, materialized as the first `count`
+    vehicles of each type. Ordered by fleet size, then by earlier types
+    first; for all-distinct vehicles this is itertools.combinations order.
+    """
+    vectors = [
+        counts
+        for counts in itertools.product(*(range(len(g) + 1) for g in groups))
+        if any(counts)
+    ]
+    vectors.sort(key=lambda counts: (sum(counts), tuple(-c for c in counts)))
+    return [materialize(groups, counts) for counts in vectors]
+
+
+def materialize(groups: Sequence[Sequence[Any]], counts: Sequence[int]) -> List[Any]:
+    return [v for g, c in zip(groups, counts) for v in g[:c]]
+
+
+def canonical(fleet: Sequence[Any], groups: Sequence[Sequence[Any]]) -> List[Any]:
+    """The representative fleet with the same composition as `fleet`."""
+    per_type: Dict[VehicleType, int] = {}
+    for v in fleet:
+        t = vehicle_type(v)
+        per_type[t] = per_type.get(t, 0) + 1
+    return materialize(groups, [per_type.get(vehicle_type(g[0]), 0) for g in groups])
+
+
+def cover_fleets(vehicles: Sequence[Any], target_kg: float, extra_sizes: int = EXTRA_FLEET_SIZES) -> List[List[Any]]:
+    """
+    Promising owned subsets for carrying `target_kg`.
+
+    dp[k][c]: some k vehicles have (bucketed) capacity c. `who[k][c]` is the
+    vehicle that first reached the cell, which is enough to rebuild the
+    subset because cells are only ever set once (0/1 knapsack order).
+    """
+    vs = sorted(vehicles, key=lambda v: (-v.capacity_kg, v.id))
+    n = len(vs)
+    if n == 0:
+        return []
+    total = float(sum(v.capacity_kg for v in vs))
+    if total < target_kg - 1e-6:
+        # Even the whole fleet is short: use all of it (rentals cover the rest).
+        return [list(vs)]
+
+    unit = max(1.0, total / DP_MAX_CELLS)
+    # Round capacities down so a reconstructed subset really covers the target.
+    caps = [int(v.capacity_kg // unit) for v in vs]
+    target = int(np.ceil(max(0.0, target_kg) / unit))
+    cells = sum(caps) + 1
+
+    reach = np.zeros((n + 1, cells), dtype=bool)
+    who = np.full((n + 1, cells), -1, dtype=np.int32)
+    reach[0, 0] = True
+    for i, cap in enumerate(caps):
+        # Larger k first so vehicle i is used at most once.
+        for k in range(i + 1, 0, -1):
+            src = reach[k - 1, : cells - cap]
+            new = src & ~reach[k, cap:]
+            if new.any():
+                idx = np.nonzero(new)[0] + cap
+                reach[k, idx] = True
+                who[k, idx] = i
+
+    def rebuild(k: int, c: int) -> List[Any]:
+        out = []
+        while k > 0:
+            i = int(who[k, c])
+            out.append(vs[i])
+            c -= caps[i]
+            k -= 1
+        return out
+
+    groups = group_types(vs)
+    fleets: List[List[Any]] = []
+    seen = set()
+
+    def add(fleet: List[Any]) -> None:
+        key = _key(fleet)
+        if fleet and key not in seen:
+            seen.add(key)
+            fleets.append(canonical(fleet, groups))
+
+    k_min = None
+    for k in range(1, n + 1):
+        hits = np.nonzero(reach[k, target:])[0]
+        if hits.size == 0:
+            continue
+        if k_min is None:
+            k_min = k
+            add(vs[:k])  # k largest vehicles
+        if k > k_min + extra_sizes:
+            break
+        add(rebuild(k, target + int(hits[0])))
+    if k_min is None:
+        add(list(vs))
+    return fleets
+
+
+def fleet_neighbors(fleet: Sequence[Any], owned: Sequence[Any]) -> List[List[Any]]:
+    """
+    Add / drop / swap moves over vehicle *capacities* (vehicles of equal
+    capacity are interchangeable), so the neighborhood is O(#capacities).
+    Swaps only go to the next larger / smaller unused capacity.
+    """
+    in_fleet = {v.id for v in fleet}
+    unused_by_cap: Dict[float, Any] = {}
+    for v in sorted(owned, key=lambda v: v.id):
+        if v.id not in in_fleet:
+            unused_by_cap.setdefault(float(v.capacity_kg), v)
+    used_by_cap: Dict[float, Any] = {}
+    for v in sorted(fleet, key=lambda v: v.id):
+        used_by_cap.setdefault(float(v.capacity_kg), v)
+
+    unused_caps = sorted(unused_by_cap)
+    groups = group_types(owned)
+    out: List[List[Any]] = []
+    seen = {_key(fleet)}
+
+    def add(candidate: List[Any]) -> None:
+        key = _key(candidate)
+        if candidate and key not in seen:
+            seen.add(key)
+            out.append(canonical(candidate, groups))
+
+    for cap, v in used_by_cap.items():
+        add([x for x in fleet if x.id != v.id])
+    for cap, v in unused_by_cap.items():
+        add(list(fleet) + [v])
+    for cap, v in used_by_cap.items():
+        lower = [c for c in unused_caps if c < cap]
+        higher = [c for c in unused_caps if c > cap]
+        for c in ([lower[-1]] if lower else []) + ([higher[0]] if higher else []):
+            add([x for x in fleet if x.id != v.id] + [unused_by_cap[c]])
+    return out
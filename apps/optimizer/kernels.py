@@ -0,0 +1,319 @@
+"""
+Hot inner loops with an optional compiled (Numba) backend.
+
+- two_opt_pass: one first-improvement sweep of full 2-opt over a route
+  (prefix sums forward/backward, asymmetric matrices);
+- nearest_feasible: nearest station in a pool that still has a cargo
+  fitting the remaining capacity (greedy route construction);
+- best_fit: best-fit assignment of items to bins (whole-station binpack).
+
+Each kernel has a pure-Python version working on plain lists (the path
+used when Numba is not installed) and a Numba version of the same loop on
+NumPy arrays; both visit candidates in the same order and do the same
+float operations, so they return identical results.
+
+OPTIMIZER_KERNELS:
+  auto   (default) numba when importable, else python
+  numba  numba, falls back to python with a warning when missing
+  python always the pure-Python loops
+
+Compiled functions are cached on disk (numba's NUMBA_CACHE_DIR, a process
+environment variable) and warm_up() compiles / loads them at start-up so
+the first request does not pay for it.
+"""
+
+from typing import Any, List, Sequence, Tuple
+import logging
+import os
+import time
+
+import numpy as np
+
+try:  # optional dependency
+    import numba
+except ImportError:  # pragma: no cover - depends on the image
+    numba = None
+
+
+logger = logging.getLogger("optimizer")
+
+BACKENDS = ("auto", "numba", "python")
+
+# Tie tolerance of the nearest-station scan (same as the greedy builder).
+NEAREST_EPS = 1e-9
+# Capacity slack when checking that a cargo fits.
+FIT_EPS = 1e-6
+
+
+# ---------------------------------------------------------------------------
+# Pure-Python versions (lists in, lists out)
+# ---------------------------------------------------------------------------
+
+def two_opt_pass_py(d: Any, seq: List[int], order: List[int], eps: float) -> int:
+    """
+    seq: station indices of the route followed by the hub (len n + 1);
+    order: route positions, permuted alongside seq. Both are reversed in
+    place for every applied move. Returns the number of moves.
+    """
+    n = len(seq) - 1
+
+    def prefix_sums() -> Tuple[List[float], List[float]]:
+        fw = [0.0] * (n + 1)
+        bw = [0.0] * (n + 1)
+        for t in range(n):
+            a, b = seq[t], seq[t + 1]
+            fw[t + 1] = fw[t] + d[a][b]
+            bw[t + 1] = bw[t] + d[b][a]
+        return fw, bw
+
+    fw, bw = prefix_sums()
+    moves = 0
+    for i in range(n - 1):
+        for j in range(i + 2, n):
+            a_i, a_i1, a_j, a_j1 = seq[i], seq[i + 1], seq[j], seq[j + 1]
+            # Reversed inner segment: backward cost replaces forward cost.
+            delta = (
+                d[a_i][a_j] + d[a_i1][a_j1] - d[a_i][a_i1] - d[a_j][a_j1]
+                + (bw[j] - bw[i + 1]) - (fw[j] - fw[i + 1])
+            )
+            if delta < -eps:
+                seq[i + 1:j + 1] = seq[i + 1:j + 1][::-1]
+                order[i + 1:j + 1] = order[i + 1:j + 1][::-1]
+                fw, bw = prefix_sums()
+                moves += 1
+    return moves
+
+
+def nearest_feasible_py(drow: Sequence[float], pool: Sequence[int], min_w: Sequence[float], cap: float) -> Tuple[int, bool]:
+    """
+    Position in `pool` of the first strictly nearest station whose lightest
+    allowed cargo fits `cap` (-1 if none), and whether another feasible
+    station came within NEAREST_EPS of the incumbent during the scan
+    (the caller breaks such ties by load benefit).
+    """
+    best = -1
+    best_dist = float("inf")
+    tie = False
+    limit = cap + FIT_EPS
+    for k in range(len(pool)):
+        i = pool[k]
+        if min_w[i] > limit:
+            continue
+        dist = drow[i]
+        if dist < best_dist - NEAREST_EPS:
+            best = k
+            best_dist = dist
+        elif abs(dist - best_dist) <= NEAREST_EPS:
+            tie = True
+    return best, tie
+
+
+def best_fit_py(weights: Sequence[float], caps: List[float]) -> List[int]:
+    """
+    Bin per item (items in the given order): the bin left with the least
+    room after the fit, else the bin with the most room. `caps` is reduced
+    in place (never below zero).
+    """
+    k = len(caps)
+    out = [0] * len(weights)
+    for t in range(len(weights)):
+        w = weights[t]
+        best_i = -1
+        best_rem = 0.0
+        for i in range(k):
+            if w <= caps[i] + FIT_EPS:
+                rem_after = caps[i] - w
+                if best_i < 0 or rem_after < best_rem:
+                    best_rem = rem_after
+                    best_i = i
+        if best_i < 0:
+            best_i = 0
+            for i in range(1, k):
+                if caps[i] > caps[best_i]:
+                    best_i = i
+        out[t] = best_i
+        caps[best_i] = max(0.0, caps[best_i] - w)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Numba versions (NumPy arrays; same loops)
+# ---------------------------------------------------------------------------
+
+def _prefix_nb(d, seq, fw, bw, start):  # pragma: no cover - compiled
+    n = seq.shape[0] - 1
+    for t in range(start, n):
+        a = seq[t]
+        b = seq[t + 1]
+        fw[t + 1] = fw[t] + d[a, b]
+        bw[t + 1] = bw[t] + d[b, a]
+
+
+def _two_opt_pass_nb(d, seq, order, eps):  # pragma: no cover - compiled
+    n = seq.shape[0] - 1
+    fw = np.zeros(n + 1)
+    bw = np.zeros(n + 1)
+    _prefix(d, seq, fw, bw, 0)
+    moves = 0
+    for i in range(n - 1):
+        for j in range(i + 2, n):
+            a_i = seq[i]
+            a_i1 = seq[i + 1]
+            a_j = seq[j]
+            a_j1 = seq[j + 1]
+            delta = (
+                d[a_i, a_j] + d[a_i1, a_j1] - d[a_i, a_i1] - d[a_j, a_j1]
+                + (bw[j] - bw[i + 1]) - (fw[j] - fw[i + 1])
+            )
+            if delta < -eps:
+                lo = i + 1
+                hi = j
+                while lo < hi:
+                    seq[lo], seq[hi] = seq[hi], seq[lo]
+                    order[lo], order[hi] = order[hi], order[lo]
+                    lo += 1
+                    hi -= 1
+                # Sums over legs before position i are unchanged.
+                _prefix(d, seq, fw, bw, i)
+                moves += 1
+    return moves
+
+
+def _nearest_feasible_nb(drow, pool, min_w, cap):  # pragma: no cover - compiled
+    best = -1
+    best_dist = np.inf
+    tie = False
+    limit = cap + FIT_EPS
+    for k in range(pool.shape[0]):
+        i = pool[k]
+        if min_w[i] > limit:
+            continue
+        dist = drow[i]
+        if dist < best_dist - NEAREST_EPS:
+            best = k
+            best_dist = dist
+        elif abs(dist - best_dist) <= NEAREST_EPS:
+            tie = True
+    return best, tie
+
+
+def _best_fit_nb(weights, caps):  # pragma: no cover - compiled
+    k = caps.shape[0]
+    out = np.zeros(weights.shape[0], dtype=np.int64)
+    for t in range(weights.shape[0]):
+        w = weights[t]
+        best_i = -1
+        best_rem = 0.0
+        for i in range(k):
+            if w <= caps[i] + FIT_EPS:
+                rem_after = caps[i] - w
+                if best_i < 0 or rem_after < best_rem:
+                    best_rem = rem_after
+                    best_i = i
+        if best_i < 0:
+            best_i = 0
+            for i in range(1, k):
+                if caps[i] > caps[best_i]:
+                    best_i = i
+        out[t] = best_i
+        caps[best_i] = max(0.0, caps[best_i] - w)
+    return out
+
+
+_compiled = None
+
+
+def _compile() -> Any:
+    """njit the array versions once (lazily; compilation happens on first call)."""
+    global _compiled, _prefix
+    if _compiled is None:
+        jit = numba.njit(cache=True, nogil=True)
+        _prefix = jit(_prefix_nb)
+        _compiled = {
+            "two_opt_pass": jit(_two_opt_pass_nb),
+            "nearest_feasible": jit(_nearest_feasible_nb),
+            "best_fit": jit(_best_fit_nb),
+        }
+    return _compiled
+
+
+_prefix = _prefix_nb
+
+
+# ---------------------------------------------------------------------------
+# Backend selection
+# ---------------------------------------------------------------------------
+
+_backend = "python"
+two_opt_pass = two_opt_pass_py
+nearest_feasible = nearest_feasible_py
+best_fit = best_fit_py
+
+
+def available() -> bool:
+    return numba is not None
+
+
+def set_backend(name: str) -> str:
+    """Bind the kernels to `name` (auto / numba / python); returns the backend used."""
+    global _backend, two_opt_pass, nearest_feasible, best_fit
+    mode = str(name or "auto").strip().lower()
+    if mode not in BACKENDS:
+        logger.warning("OPTIMIZER_KERNELS=%s unknown, using auto", name)
+        mode = "auto"
+    if mode == "numba" and numba is None:
+        logger.warning("OPTIMIZER_KERNELS=numba but numba is not installed; using python kernels")
+    if mode != "python" and numba is not None:
+        fns = _compile()
+        _backend = "numba"
+        two_opt_pass = fns["two_opt_pass"]
+        nearest_feasible = fns["nearest_feasible"]
+        best_fit = fns["best_fit"]
+    else:
+        _backend = "python"
+        two_opt_pass = two_opt_pass_py
+        nearest_feasible = nearest_feasible_py
+        best_fit = best_fit_py
+    return _backend
+
+
+def backend() -> str:
+    return _backend
+
+
+def compiled() -> bool:
+    return _backend == "numba"
+
+
+def ints(values: Sequence[int]) -> Any:
+    """Index vector in the representation the active backend expects."""
+    if compiled():
+        return np.asarray(values, dtype=np.int64)
+    return list(values)
+
+
+def floats(values: Sequence[float]) -> Any:
+    if compiled():
+        return np.asarray(values, dtype=np.float64)
+    return [float(v) for v in values]
+
+
+def warm_up() -> float:
+    """
+    Re-read OPTIMIZER_KERNELS (.env is loaded after this module is imported)
+    and compile / load from the disk cache every kernel; returns seconds spent.
+    """
+    set_backend(os.getenv("OPTIMIZER_KERNELS", "auto"))
+    if not compiled():
+        return 0.0
+    t0 = time.perf_counter()
+    d = np.array([[0.0, 2.0, 1.0], [2.0, 0.0, 1.5], [1.0, 1.5, 0.0]])
+    two_opt_pass(d, np.array([1, 2, 1, 0], dtype=np.int64), np.arange(3, dtype=np.int64), 1e-9)
+    nearest_feasible(d[0], np.array([1, 2], dtype=np.int64), np.array([np.inf, 1.0, 2.0]), 1.5)
+    best_fit(np.array([2.0, 1.0]), np.array([2.5, 1.0]))
+    elapsed = time.perf_counter() - t0
+    logger.info("optimizer kernels ready backend=%s warmup=%.2fs", _backend, elapsed)
+    return elapsed
+
+
+set_backend(os.getenv("OPTIMIZER_KERNELS", "auto"))
@@ -0,0 +1,262 @@
+"""
+Cargo selection for the limited-vehicle "pack" strategy (multiple knapsack).
+
+The old best-fit pass (light-first / heavy-first) left capacity unused,
+which the solver compensated for with more random attempts. Here:
+
+- one vehicle: 0/1 subset-sum DP over discretized weights, vectorized
+  with NumPy (one array op per cargo). `who[c]` records the cargo that
+  first reached cell c; cells are set only once, so walking back from
+  the best cell rebuilds a valid subset in O(items) memory;
+- several vehicles: depth-first branch-and-bound over which vehicle
+  (capacity) to fill next, each fill being the exact single-vehicle DP
+  on the remaining cargos. Bound: payload so far + min(remaining capacity,
+  remaining cargo weight); at most NODE_BUDGET DP fills;
+- small inputs (up to EXACT_MAX_ITEMS cargos) that the fills above leave
+  short of the trivial bound: item-level branch-and-bound (each cargo to
+  a vehicle with room, or left out), exact within EXACT_NODE_BUDGET nodes.
+  The DP fills only branch on vehicle order, not on which of several
+  equal-weight subsets a fill takes, so they can miss the optimum.
+
+max_weight maximizes the loaded weight. max_count first fixes the largest
+K such that the K lightest cargos can be packed, then fills what is left
+by weight.
+
+Payload is all the DP looks at: among equal-payload sets it does not
+prefer the one that routes cheaper. best_fit keeps the old pass so the
+caller can route both sets and let cost decide.
+
+Weights are rounded *up* to the grid and capacities down, so a selected
+set always fits.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+import math
+
+import numpy as np
+
+
+# Cells per vehicle capacity in the DP (resolution >= capacity / cells).
+DP_MAX_CELLS = 65536
+# Candidate grid steps (kg): the coarsest one all weights sit on is exact.
+GRID_STEPS_KG = (1.0, 0.5, 0.1, 0.05, 0.01)
+# Single-vehicle DP fills per selection (branch-and-bound nodes).
+NODE_BUDGET = 32
+# Item-level exact search: cargo count limit and node budget per call.
+EXACT_MAX_ITEMS = 20
+EXACT_NODE_BUDGET = 20000
+
+
+def _fill(wu: np.ndarray, items: np.ndarray, cap: int) -> np.ndarray:
+    """Subset of `items` (indices into wu) with the largest total <= cap."""
+    if cap <= 0 or items.size == 0:
+        return items[:0]
+    reach = np.zeros(cap + 1, dtype=bool)
+    who = np.full(cap + 1, -1, dtype=np.int64)
+    reach[0] = True
+    for i in items.tolist():
+        w = int(wu[i])
+        if w > cap:
+            continue
+        new = reach[: cap + 1 - w] & ~reach[w:]
+        if new.any():
+            idx = np.nonzero(new)[0] + w
+            reach[idx] = True
+            who[idx] = i
+            if reach[cap]:
+                break
+    c = int(np.nonzero(reach)[0][-1])
+    out: List[int] = []
+    while c > 0:
+        i = int(who[c])
+        out.append(i)
+        c -= int(wu[i])
+    return np.asarray(out, dtype=np.int64)
+
+
+class _Search:
+    def __init__(self, wu: np.ndarray, caps: List[int], node_budget: int):
+        self.wu = wu
+        self.caps = caps
+        self.nodes = node_budget
+        self.best_total = -1
+        self.best: List[np.ndarray] = []
+
+    def run(self, items: np.ndarray) -> List[np.ndarray]:
+        self._dfs(items, list(range(len(self.caps))), [np.zeros(0, dtype=np.int64)] * len(self.caps), 0)
+        return self.best
+
+    def _dfs(self, items: np.ndarray, left: List[int], fills: List[np.ndarray], total: int) -> None:
+        if total > self.best_total:
+            self.best_total, self.best = total, list(fills)
+        if not left or items.size == 0 or self.nodes <= 0:
+            return
+        bound = total + min(sum(self.caps[v] for v in left), int(self.wu[items].sum()))
+        if bound <= self.best_total:
+            return
+        # Branch on distinct capacities, largest first (the greedy order).
+        tried = set()
+        for v in sorted(left, key=lambda v: (-self.caps[v], v)):
+            if self.caps[v] in tried or self.nodes <= 0:
+                continue
+            tried.add(self.caps[v])
+            self.nodes -= 1
+            chosen = _fill(self.wu, items, self.caps[v])
+            rest = np.setdiff1d(items, chosen, assume_unique=True)
+            sub = list(fills)
+            sub[v] = chosen
+            self._dfs(rest, [u for u in left if u != v], sub, total + int(self.wu[chosen].sum()))
+            if self.best_total >= bound:
+                return
+
+
+class _Exact:
+    """Item-level branch-and-bound; improves on `best_total` or leaves best None."""
+
+    def __init__(self, wu: np.ndarray, caps: List[int], best_total: int, node_budget: int = EXACT_NODE_BUDGET):
+        self.wu = wu
+        self.caps = caps
+        self.nodes = node_budget
+        self.best_total = best_total
+        self.best: Optional[List[int]] = None
+
+    def run(self, items: np.ndarray) -> Optional[List[np.ndarray]]:
+        """Fills per vehicle if a better packing was found, else None."""
+        order = items.tolist()
+        weights = [int(self.wu[i]) for i in order]
+        suffix = [0] * (len(order) + 1)
+        for k in range(len(order) - 1, -1, -1):
+            suffix[k] = suffix[k + 1] + weights[k]
+        room = list(self.caps)
+        assign = [-1] * len(order)
+        target = min(suffix[0], sum(room))
+
+        def dfs(k: int, total: int) -> None:
+            if self.nodes <= 0:
+                return
+            self.nodes -= 1
+            if total > self.best_total:
+                self.best_total, self.best = total, list(assign)
+            if k == len(order) or self.best_total >= target:
+                return
+            if total + min(suffix[k], sum(room)) <= self.best_total:
+                return
+            w = weights[k]
+            tried = set()
+            for v in range(len(room)):
+                # Vehicles with the same room left are interchangeable
+                if room[v] < w or room[v] in tried:
+                    continue
+                tried.add(room[v])
+                room[v] -= w
+                assign[k] = v
+                dfs(k + 1, total + w)
+                room[v] += w
+                assign[k] = -1
+                if self.best_total >= target:
+                    return
+            dfs(k + 1, total)
+
+        dfs(0, 0)
+        if self.best is None:
+            return None
+        return [
+            np.asarray([order[k] for k, a in enumerate(self.best) if a == v], dtype=np.int64)
+            for v in range(len(self.caps))
+        ]
+
+
+def _improve(wu: np.ndarray, caps: List[int], items: np.ndarray, fills: List[np.ndarray]) -> List[np.ndarray]:
+    """Exact search on small inputs the DP fills left below the trivial bound."""
+    total = sum(int(wu[f].sum()) for f in fills)
+    if items.size > EXACT_MAX_ITEMS or total >= min(int(wu[items].sum()), sum(caps)):
+        return fills
+    better = _Exact(wu, caps, total).run(items)
+    return better if better is not None else fills
+
+
+def _grid(weights: Sequence[float], capacities: Sequence[float]) -> Tuple[np.ndarray, List[int]]:
+    w = np.asarray(weights, dtype=np.float64)
+    step = GRID_STEPS_KG[-1]
+    for g in GRID_STEPS_KG:
+        if np.all(np.abs(w / g - np.round(w / g)) < 1e-6):
+            step = g
+            break
+    unit = max(step, max(capacities) / DP_MAX_CELLS)
+    wu = np.ceil(w / unit - 1e-9).astype(np.int64)
+    caps = [int(math.floor(float(c) / unit + 1e-9)) for c in capacities]
+    return wu, caps
+
+
+def select_cargos(
+    weights: Sequence[float],
+    capacities: Sequence[float],
+    objective: str,
+    node_budget: int = NODE_BUDGET,
+) -> List[List[int]]:
+    """Cargo indices per vehicle (aligned with `capacities`)."""
+    n_veh = len(capacities)
+    if n_veh == 0 or not weights:
+        return [[] for _ in range(n_veh)]
+    wu, caps = _grid(weights, capacities)
+    # Heavier first: cells get reached by fewer, larger cargos (fewer stops)
+    all_items = np.argsort(-wu, kind="stable")
+    all_items = all_items[wu[all_items] > 0]
+
+    if objective != "max_count":
+        fills = _Search(wu, caps, node_budget).run(all_items)
+        fills = _improve(wu, caps, all_items, fills)
+        return [sorted(f.tolist()) for f in fills]
+
+    # max_count: the K lightest cargos, largest K that still packs
+    light = np.argsort(wu, kind="stable")
+    light = light[wu[light] > 0]
+    prefix = np.cumsum(wu[light])
+    k = int(np.searchsorted(prefix, sum(caps), side="right"))
+    fills: List[np.ndarray] = [np.zeros(0, dtype=np.int64)] * n_veh
+    budget = node_budget
+    while k > 0 and budget > 0:
+        search = _Search(wu, caps, min(budget, n_veh))
+        fills = search.run(light[:k][::-1])
+        budget -= min(budget, n_veh) - search.nodes
+        packed = sum(f.size for f in fills)
+        if packed < k:
+            # Only a packing of all k counts (the exact search maximizes weight)
+            exact = _improve(wu, caps, light[:k][::-1], fills)
+            if sum(f.size for f in exact) == k:
+                fills, packed = exact, k
+        if packed == k:
+            break
+        k = packed
+    # Spare room after the count-optimal set: add what still fits
+    used = np.concatenate(fills) if fills else np.zeros(0, dtype=np.int64)
+    rest = np.setdiff1d(all_items, used, assume_unique=True)
+    rest = all_items[np.isin(all_items, rest)]
+    out: List[List[int]] = []
+    for v in range(n_veh):
+        spare = caps[v] - int(wu[fills[v]].sum())
+        extra = _fill(wu, rest, spare)
+        rest = rest[~np.isin(rest, extra)]
+        out.append(sorted(fills[v].tolist() + extra.tolist()))
+    return out
+
+
+def best_fit(weights: Sequence[float], capacities: Sequence[float], objective: str) -> List[List[int]]:
+    """
+    The old pass: each cargo (light-first for max_count, heavy-first for
+    max_weight) into the vehicle it leaves the least room in.
+    """
+    remaining = [float(c) for c in capacities]
+    out: List[List[int]] = [[] for _ in remaining]
+    order = sorted(range(len(weights)), key=lambda i: weights[i], reverse=(objective == "max_weight"))
+    for i in order:
+        w = float(weights[i])
+        best: Optional[int] = None
+        for v, room in enumerate(remaining):
+            if w <= room + 1e-6 and (best is None or room < remaining[best]):
+                best = v
+        if best is None:
+            continue
+        out[best].append(i)
+        remaining[best] = max(0.0, remaining[best] - w)
+    return [sorted(sel) for sel in out]
@@ -0,0 +1,445 @@
+"""
+Open-loop HTTP load generator for the optimizer service.
+
+    # start a local uvicorn (this checkout), 60 s at 0.5, 1 and 2 req/s
+    python loadtest.py --rate 0.5,1,2 --duration 60
+
+    # mixed sizes and endpoints, results as JSON
+    python loadtest.py --sizes 10:5,50:3,150:1 --endpoints optimize:8,validate:2 \
+        --rate 2 --duration 120 --json load.json
+
+    # an already running service (CPU per request is not measured then)
+    python loadtest.py --url http://127.0.0.1:5000 --rate 1
+
+Target: by default a uvicorn subprocess is started on a free local port
+(env from --env KEY=VALUE on top of ours; PYTHONHASHSEED pinned to 0 unless
+set). --in-process runs uvicorn on a thread of this process instead (no
+subprocess, but client CPU is then counted as server CPU).
+
+Requests arrive open-loop: arrival times are drawn up front (Poisson or
+evenly spaced) and every request is sent at its time whether or not
+earlier ones have finished, so a saturated service shows up as growing
+latency / 429s rather than as a slower client. Latency is measured from
+the scheduled arrival (client lag included, no coordinated omission).
+Each request carries X-Request-Deadline = arrival + --timeout, like the
+API does.
+
+Per rate: sent, ok (2xx), throughput (ok / wall time incl. drain),
+p50/p95/p99 latency of ok requests, error rate (non-2xx + transport
+errors; status breakdown listed), timeout rate, and CPU seconds per
+request for the server process tree (read from /proc, Linux only).
+Payloads and arrivals come from --seed, so reruns send identical traffic.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+
+from synthetic import PROBLEM_TYPES, instance_pool, parse_mix
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# name -> (method, path, sends a payload)
+ENDPOINTS: Dict[str, Tuple[str, str, bool]] = {
+    "optimize": ("POST", "/optimize", True),
+    "validate": ("POST", "/validate", True),
+    "health": ("GET", "/health", False),
+}
+
+READY_TIMEOUT_S = 60.0
+
+
+def _endpoint(name: str) -> Tuple[str, str, bool]:
+    if name in ENDPOINTS:
+        return ENDPOINTS[name]
+    if name.startswith("/"):
+        return ("GET", name, False)
+    raise ValueError(f"unknown endpoint {name!r} (known: {', '.join(ENDPOINTS)}, or a /path for GET)")
+
+
+# ---------- CPU accounting ----------
+
+def _proc_stat(pid: int) -> Optional[Tuple[int, int]]:
+    """(ppid, utime+stime+cutime+cstime ticks) from /proc/<pid>/stat."""
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    # comm may contain spaces; fields after the closing parenthesis are fixed
+    fields = raw[raw.rfind(")") + 2:].split()
+    return int(fields[1]), sum(int(x) for x in fields[11:15])
+
+
+def tree_cpu_seconds(root: int) -> Optional[float]:
+    """
+    CPU time of `root` and its live descendants. Reaped children are in
+    their parent's cutime/cstime, so every process is counted once.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    stats: Dict[int, Tuple[int, int]] = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            st = _proc_stat(int(entry))
+            if st is not None:
+                stats[int(entry)] = st
+    if root not in stats:
+        return None
+    children: Dict[int, List[int]] = {}
+    for pid, (ppid, _) in stats.items():
+        children.setdefault(ppid, []).append(pid)
+    ticks, stack = 0, [root]
+    while stack:
+        pid = stack.pop()
+        ticks += stats[pid][1]
+        stack.extend(children.get(pid, ()))
+    return ticks / float(os.sysconf("SC_CLK_TCK"))
+
+
+def _client_cpu_seconds() -> float:
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime
+
+
+# ---------- targets ----------
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base_url: str, proc: Optional[subprocess.Popen] = None) -> None:
+    deadline = time.monotonic() + READY_TIMEOUT_S
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{base_url} not ready after {READY_TIMEOUT_S:.0f}s")
+
+
+class Target:
+    """Service under test: base URL, pid for CPU accounting, shutdown."""
+
+    def __init__(self, base_url: str, pid: Optional[int] = None, label: str = "external"):
+        self.base_url = base_url.rstrip("/")
+        self.pid = pid
+        self.label = label
+        self._proc: Optional[subprocess.Popen] = None
+        self._server: Any = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def spawn(cls, env_overrides: Dict[str, str], log_path: Optional[str] = None) -> "Target":
+        port = _free_port()
+        env = dict(os.environ)
+        env.setdefault("PYTHONHASHSEED", "0")
+        env.setdefault("LOG_LEVEL", "WARNING")
+        env.update(env_overrides)
+        log = open(log_path, "ab") if log_path else subprocess.DEVNULL
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning"],
+            cwd=HERE,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        target = cls(f"http://127.0.0.1:{port}", pid=proc.pid, label="subprocess")
+        target._proc = proc
+        try:
+            _wait_ready(target.base_url, proc)
+        except Exception:
+            target.close()
+            raise
+        return target
+
+    @classmethod
+    def in_process(cls, env_overrides: Dict[str, str]) -> "Target":
+        import uvicorn
+
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        os.environ.update(env_overrides)
+        sys.path.insert(0, HERE)
+        port = _free_port()
+        server = uvicorn.Server(
+            uvicorn.Config("main:app", host="127.0.0.1", port=port, log_level="warning")
+        )
+        thread = threading.Thread(target=server.run, name="loadtest-uvicorn", daemon=True)
+        thread.start()
+        target = cls(f"http://127.0.0.1:{port}", pid=os.getpid(), label="in-process")
+        target._server, target._thread = server, thread
+        _wait_ready(target.base_url)
+        return target
+
+    def close(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=30)
+
+
+# ---------- load ----------
+
+def arrival_times(rate: float, duration_s: float, rng: random.Random, process: str = "poisson") -> List[float]:
+    """Offsets (s) of the requests of one stage."""
+    if rate <= 0 or duration_s <= 0:
+        return []
+    if process == "uniform":
+        return [i / rate for i in range(int(math.floor(rate * duration_s)))]
+    out, t = [], rng.expovariate(rate)
+    while t < duration_s:
+        out.append(t)
+        t += rng.expovariate(rate)
+    return out
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(math.ceil(q / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+async def _one(
+    client: httpx.AsyncClient,
+    name: str,
+    body: Optional[bytes],
+    scheduled: float,
+    timeout_s: float,
+    rows: List[Dict[str, Any]],
+) -> None:
+    method, path, _ = _endpoint(name)
+    row: Dict[str, Any] = {"endpoint": name, "lag_ms": (time.perf_counter() - scheduled) * 1000.0}
+    headers = {"X-Request-Deadline": str(int((time.time() + timeout_s - row["lag_ms"] / 1000.0) * 1000))}
+    if body is not None:
+        headers["Content-Type"] = "application/json"
+    try:
+        resp = await client.request(method, path, content=body, headers=headers, timeout=timeout_s)
+        await resp.aread()
+        row["status"] = resp.status_code
+    except httpx.TimeoutException:
+        row["status"] = "timeout"
+    except httpx.HTTPError as e:
+        row["status"] = f"error:{type(e).__name__}"
+    row["latency_ms"] = (time.perf_counter() - scheduled) * 1000.0
+    rows.append(row)
+
+
+async def run_stage(
+    target: Target,
+    rate: float,
+    duration_s: float,
+    requests: List[Tuple[str, Optional[bytes]]],
+    rng: random.Random,
+    timeout_s: float,
+    max_connections: int,
+    process: str,
+) -> Dict[str, Any]:
+    offsets = arrival_times(rate, duration_s, rng, process)
+    rows: List[Dict[str, Any]] = []
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    async with httpx.AsyncClient(base_url=target.base_url, limits=limits) as client:
+        cpu0 = tree_cpu_seconds(target.pid) if target.pid else None
+        client_cpu0 = _client_cpu_seconds()
+        start = time.perf_counter()
+        tasks = []
+        for offset in offsets:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name, body = requests[len(tasks) % len(requests)]
+            tasks.append(asyncio.ensure_future(_one(client, name, body, start + offset, timeout_s, rows)))
+        if tasks:
+            await asyncio.gather(*tasks)
+        wall = time.perf_counter() - start
+        cpu1 = tree_cpu_seconds(target.pid) if target.pid else None
+        client_cpu = _client_cpu_seconds() - client_cpu0
+    return summarize(rows, rate, duration_s, wall, None if cpu0 is None or cpu1 is None else cpu1 - cpu0, client_cpu)
+
+
+def _latency_stats(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    lat = sorted(r["latency_ms"] for r in rows if isinstance(r["status"], int) and 200 <= r["status"] < 300)
+    return {
+        "ok": len(lat),
+        "p50_ms": percentile(lat, 50),
+        "p95_ms": percentile(lat, 95),
+        "p99_ms": percentile(lat, 99),
+        "max_ms": lat[-1] if lat else None,
+    }
+
+
+def summarize(
+    rows: List[Dict[str, Any]],
+    rate: float,
+    duration_s: float,
+    wall_s: float,
+    server_cpu_s: Optional[float],
+    client_cpu_s: float,
+) -> Dict[str, Any]:
+    sent = len(rows)
+    statuses: Dict[str, int] = {}
+    for r in rows:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+    timeouts = statuses.get("timeout", 0)
+    out = {
+        "rate": rate,
+        "duration_s": duration_s,
+        "wall_s": round(wall_s, 3),
+        "sent": sent,
+        "offered_rps": round(sent / duration_s, 4) if duration_s > 0 else 0.0,
+        **_latency_stats(rows),
+        "statuses": statuses,
+        "timeout_rate": round(timeouts / sent, 4) if sent else 0.0,
+        "max_lag_ms": round(max((r["lag_ms"] for r in rows), default=0.0), 2),
+        "server_cpu_s": None if server_cpu_s is None else round(server_cpu_s, 3),
+        "client_cpu_s": round(client_cpu_s, 3),
+        "endpoints": {},
+    }
+    out["error_rate"] = round((sent - out["ok"] - timeouts) / sent, 4) if sent else 0.0
+    out["throughput_rps"] = round(out["ok"] / wall_s, 4) if wall_s > 0 else 0.0
+    out["cpu_per_request_s"] = (
+        round(server_cpu_s / sent, 4) if server_cpu_s is not None and sent else None
+    )
+    for name in sorted({r["endpoint"] for r in rows}):
+        sub = [r for r in rows if r["endpoint"] == name]
+        out["endpoints"][name] = {"sent": len(sub), **_latency_stats(sub)}
+    return out
+
+
+def build_requests(args: argparse.Namespace, rng: random.Random) -> List[Tuple[str, Optional[bytes]]]:
+    """
+    Pre-serialized request sequence (payload JSON is encoded once, so client
+    CPU stays out of the measurement). Stages cycle through it.
+    """
+    sizes = [(int(s), w) for s, w in parse_mix(args.sizes)]
+    types = [t.strip() for t in args.problem_types.split(",") if t.strip()]
+    pool = instance_pool(sizes, per_size=args.per_size, seed=args.seed, problem_types=types,
+                         matrix=not args.no_matrix)
+    bodies = [json.dumps(p, separators=(",", ":")).encode("utf-8") for p, _ in pool]
+    weights = [w for _, w in pool]
+    endpoints = parse_mix(args.endpoints)
+    for name, _ in endpoints:
+        _endpoint(name)
+
+    out: List[Tuple[str, Optional[bytes]]] = []
+    for _ in range(args.sequence):
+        name = rng.choices([n for n, _ in endpoints], weights=[w for _, w in endpoints])[0]
+        body = rng.choices(bodies, weights=weights)[0] if _endpoint(name)[2] else None
+        out.append((name, body))
+    return out
+
+
+def _fmt(v: Optional[float], spec: str = ".0f") -> str:
+    return "-" if v is None else format(v, spec)
+
+
+def print_stage(res: Dict[str, Any]) -> None:
+    print(
+        f"rate={res['rate']:<6g} sent={res['sent']:<5} ok={res['ok']:<5} "
+        f"thr={res['throughput_rps']:.3f}/s p50={_fmt(res['p50_ms'])}ms p95={_fmt(res['p95_ms'])}ms "
+        f"p99={_fmt(res['p99_ms'])}ms err={res['error_rate'] * 100:.1f}% timeout={res['timeout_rate'] * 100:.1f}% "
+        f"cpu/req={_fmt(res['cpu_per_request_s'], '.3f')}s lag_max={res['max_lag_ms']:.0f}ms",
+        flush=True,
+    )
+    others = {k: v for k, v in res["statuses"].items() if k != "200"}
+    if others:
+        print(f"    statuses: {others}")
+    for name, ep in res["endpoints"].items():
+        print(
+            f"    {name:<10} sent={ep['sent']:<5} ok={ep['ok']:<5} p50={_fmt(ep['p50_ms'])}ms "
+            f"p95={_fmt(ep['p95_ms'])}ms p99={_fmt(ep['p99_ms'])}ms"
+        )
+
+
+async def _warm(target: Target, requests: List[Tuple[str, Optional[bytes]]], count: int, timeout_s: float) -> None:
+    rows: List[Dict[str, Any]] = []
+    async with httpx.AsyncClient(base_url=target.base_url) as client:
+        for name, body in requests[:count]:
+            await _one(client, name, body, time.perf_counter(), timeout_s, rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Open-loop load test for the optimizer service")
+    parser.add_argument("--url", help="running service; default: start uvicorn locally")
+    parser.add_argument("--in-process", action="store_true", help="run uvicorn on a thread of this process")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra env for the started server (repeatable)")
+    parser.add_argument("--server-log", help="append the started server's output here")
+    parser.add_argument("--rate", default="1", help="arrival rate(s) in req/s, comma separated stages")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals per stage")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--endpoints", default="optimize", help="endpoint mix, e.g. optimize:8,validate:2")
+    parser.add_argument("--sizes", default="10:3,50:2,150:1", help="station-count mix, e.g. 10:3,50:2")
+    parser.add_argument("--problem-types", default=",".join(PROBLEM_TYPES))
+    parser.add_argument("--per-size", type=int, default=3, help="distinct instances per size")
+    parser.add_argument("--no-matrix", action="store_true", help="send empty distance matrices")
+    parser.add_argument("--sequence", type=int, default=512, help="length of the request sequence stages cycle through")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout / deadline (s)")
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--warmup", type=int, default=3, help="requests sent one by one before measuring")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write stage results here")
+    args = parser.parse_args(argv)
+
+    env = dict(kv.split("=", 1) for kv in args.env)
+    rates = [float(r) for r in args.rate.split(",") if r.strip()]
+    rng = random.Random(args.seed)
+    requests = build_requests(args, rng)
+
+    if args.url:
+        target = Target(args.url)
+    elif args.in_process:
+        target = Target.in_process(env)
+    else:
+        target = Target.spawn(env, args.server_log)
+
+    results: List[Dict[str, Any]] = []
+    try:
+        print(f"target={target.base_url} ({target.label}) requests={len(requests)} rates={rates}", flush=True)
+        if args.warmup > 0:
+            asyncio.run(_warm(target, requests, args.warmup, args.timeout))
+        for i, rate in enumerate(rates):
+            stage_rng = random.Random(args.seed * 7919 + i)
+            res = asyncio.run(run_stage(
+                target, rate, args.duration, requests, stage_rng,
+                args.timeout, args.max_connections, args.arrivals,
+            ))
+            results.append(res)
+            print_stage(res)
+    finally:
+        target.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"target": target.label, "args": vars(args), "stages": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,20 +8,49 @@ Heuristic tabanlı VRP (Vehicle Routing Problem) çözücü.
 - Sınırsız araç / Belirli araç problemleri
 """
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
 from typing import List, Dict, Optional, Any
+from contextlib import asynccontextmanager
+import asyncio
 import time
 import os
+import json
 import uuid
 import logging
 import contextvars
+import tempfile
 
 from dotenv import load_dotenv
 
-from optimizer import VRPOptimizer
+from env import env_int
 from models import OptimizerInput, OptimizerOutput
+from executor import PoolSaturatedError, SolverPool, run_optimize
+from matrix_registry import (
+    MatrixRegistry,
+    PreparedMatrix,
+    content_digest,
+    normalize_digest,
+    prepare_matrix,
+)
+from matrix_store import get_network_store
+from memory import MB, MemoryAdmissionMiddleware, MemoryGuard
+from recorder import RequestRecorder
+from response import render, response_format
+from transport import CompressionMiddleware, available_encodings, compress
+from tracing import NULL_TRACER, TRACE_EVENTS_KEY, Tracer, TraceSink
+from validation import ValidationInput, validate_input as check_input
+from warmup import Readiness, builtin_payloads, default_timeout_s, warmup_enabled
+from cancellation import (
+    REASON_CLIENT_DISCONNECTED,
+    REASON_DEADLINE,
+    REASON_NAMES,
+    SolveCancelled,
+    parse_deadline_header,
+)
 
 load_dotenv()
 
@@ -61,10 +90,138 @@ def configure_logging() -> logging.Logger:
 
 logger = configure_logging()
 
+
+def create_solver_pool() -> SolverPool:
+    """
+    CPU-bound çözümler için süreç havuzu.
+
+    OPTIMIZER_WORKERS: eşzamanlı çözüm sayısı (varsayılan: CPU sayısı)
+    OPTIMIZER_MAX_QUEUE: işçi bekleyen en fazla istek (varsayılan: 2 x workers)
+    OPTIMIZER_EXECUTOR: "process" (varsayılan) veya "thread"
+    """
+    workers = max(1, env_int("OPTIMIZER_WORKERS", os.cpu_count() or 1))
+    return SolverPool(
+        workers=workers,
+        max_queue=env_int("OPTIMIZER_MAX_QUEUE", workers * 2),
+        mode=os.getenv("OPTIMIZER_EXECUTOR", "process"),
+        warm_up=warmup_enabled(),
+    )
+
+
+solver_pool = create_solver_pool()
+
+def matrix_spill_dir() -> Optional[str]:
+    """
+    Process workers map registry matrices from files instead of receiving
+    a pickled copy per solve (MATRIX_REGISTRY_DIR; varsayılan /dev/shm).
+    """
+    if solver_pool.mode != "process":
+        return None
+    base = os.getenv("MATRIX_REGISTRY_DIR", "").strip()
+    if not base:
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, f"optimizer-matrices-{os.getpid()}")
+
+
+# Parsed distance matrices addressed by sha256 (MATRIX_REGISTRY_MAX_MB bellek sınırı)
+matrix_registry = MatrixRegistry(
+    max_bytes=env_int("MATRIX_REGISTRY_MAX_MB", 256) * 1024 * 1024,
+    spill_dir=matrix_spill_dir(),
+)
+
+# Estimated request footprint vs MEMORY_BUDGET_MB (checked before parsing)
+memory_guard = MemoryGuard.from_env(process_mode=solver_pool.mode == "process")
+
+# Sampled /optimize payloads for offline replay (RECORDER_DIR; off when empty)
+request_recorder = RequestRecorder.from_env()
+
+# Per-request Chrome traces (TRACE_DIR; X-Trace header or TRACE_SAMPLE_RATE)
+trace_sink = TraceSink.from_env()
+
+
+# Start-up state behind /ready (created after the imports above: times them)
+readiness = Readiness()
+
+
+async def _warm_up(app: FastAPI) -> None:
+    """Workers solve tiny instances, then the server-side request path runs once."""
+    readiness.mark_warming()
+    with readiness.phase("workers"):
+        reports = await solver_pool.wait_warm()
+    readiness.workers = [{k: v for k, v in r.items() if k != "result"} for r in reports]
+
+    with readiness.phase("server"):
+        for payload in builtin_payloads():
+            body = json.dumps(payload).encode("utf-8")
+            OptimizerInput.model_validate_json(body)
+            check_input(ValidationInput.model_validate_json(body), body_bytes=len(body))
+        rendered = render(reports[0]["result"])
+        for encoding in available_encodings():
+            compress(rendered, encoding, gzip_level=1, zstd_level=1)
+        app.openapi()
+
+
+async def _start_serving(app: FastAPI) -> None:
+    try:
+        if warmup_enabled():
+            await asyncio.wait_for(_warm_up(app), timeout=default_timeout_s())
+    except asyncio.TimeoutError:
+        logger.warning("warm-up did not finish within %ss; marking ready anyway", default_timeout_s())
+    except Exception as e:
+        logger.exception("warm-up failed; replica stays unready")
+        readiness.mark_failed(f"{type(e).__name__}: {e}")
+        return
+    readiness.mark_ready()
+    startup = readiness.startup()
+    logger.info(
+        "optimizer ready process_to_ready_s=%s imports_s=%s startup_to_ready_s=%s phases=%s",
+        startup.get("process_to_ready_s", "-"),
+        startup.get("imports_s", "-"),
+        startup.get("startup_to_ready_s"),
+        startup["phases_s"],
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    readiness.begin()
+    with readiness.phase("startup"):
+        # Open the memory-mapped network matrix (if configured) before serving.
+        get_network_store()
+        solver_pool.start()
+    logger.info(
+        "solver pool started mode=%s workers=%s max_queue=%s",
+        solver_pool.mode,
+        solver_pool.workers,
+        solver_pool.max_queue,
+    )
+    logger.info(
+        "memory guard budget_mb=%s wait_s=%s",
+        round(memory_guard.budget_bytes / MB) if memory_guard.enabled else "off",
+        memory_guard.wait_s,
+    )
+    if request_recorder is not None:
+        logger.info("request recorder on dir=%s sample_rate=%s", request_recorder.directory, request_recorder.sample_rate)
+    if trace_sink is not None:
+        logger.info("tracing on dir=%s sample_rate=%s", trace_sink.directory, trace_sink.sample_rate)
+    # Serve /health right away; /ready flips once warm-up is done.
+    warm = asyncio.ensure_future(_start_serving(app))
+    try:
+        yield
+    finally:
+        readiness.mark_stopping()
+        warm.cancel()
+        solver_pool.shutdown(wait=False)
+        matrix_registry.close()
+        if request_recorder is not None:
+            request_recorder.close()
+
+
 app = FastAPI(
     title="Kargo Optimizer Service",
     description="Heuristic tabanlı VRP çözücü - Greedy + 2-opt",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -75,6 +232,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MemoryAdmissionMiddleware, guard=memory_guard)
+# Outside the memory guard, so it sees (and counts) decoded request bodies.
+app.add_middleware(CompressionMiddleware)
+
 
 @app.middleware("http")
 async def request_id_middleware(request: Request, call_next):
@@ -91,12 +252,135 @@ async def request_id_middleware(request: Request, call_next):
 
 @app.get("/health")
 def health_check():
-    """Servis sağlık kontrolü"""
-    return {"status": "healthy", "service": "optimizer"}
+    """Servis sağlık kontrolü (+ havuz doluluğu, load balancer için)"""
+    pool = solver_pool.stats()
+    store = get_network_store()
+    return {
+        "status": "busy" if pool["saturated"] else "healthy",
+        "service": "optimizer",
+        "pool": pool,
+        "matrix_registry": matrix_registry.stats(),
+        "network_matrix": store.stats() if store is not None else None,
+        "recorder": request_recorder.stats() if request_recorder is not None else None,
+        "memory": memory_guard.stats(),
+        "readiness": readiness.stats(),
+        "tracing": trace_sink.stats() if trace_sink is not None else None,
+    }
+
+
+@app.get("/ready")
+def ready_check():
+    """Readiness: 200 once warm-up is done, 503 while starting / stopping"""
+    body = {"service": "optimizer", **readiness.stats()}
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+def _resolve_matrix(input_data: OptimizerInput) -> Optional[PreparedMatrix]:
+    """matrix_digest -> registry entry (412 if the caller must upload it first)."""
+    if not input_data.matrix_digest:
+        return None
+    matrix = matrix_registry.get(input_data.matrix_digest)
+    if matrix is None:
+        raise HTTPException(
+            status_code=412,
+            detail=f"Bilinmeyen matrix_digest: {input_data.matrix_digest} (önce PUT /matrices/{{digest}})",
+        )
+    return matrix
+
+
+@app.head("/matrices/{digest}")
+def matrix_exists(digest: str):
+    """Matris kayıtlı mı? (200 / 404)"""
+    return Response(status_code=200 if digest in matrix_registry else 404)
+
+
+@app.put("/matrices/{digest}")
+async def put_matrix(digest: str, request: Request):
+    """
+    Mesafe matrisini bir kez yükle.
+
+    Gövde, OptimizerInput.distance_matrix ile aynı JSON nesnesidir;
+    digest = gövde baytlarının sha256 (hex) değeri.
+    """
+    key = normalize_digest(digest)
+    if key in matrix_registry:
+        return {"digest": key, "stored": True, "created": False}
+
+    body = await request.body()
+    if content_digest(body) != key:
+        raise HTTPException(status_code=400, detail="Digest gövdenin sha256 değeri ile eşleşmiyor")
+
+    def _parse() -> PreparedMatrix:
+        entries = json.loads(body)
+        if not isinstance(entries, dict) or not all(isinstance(v, dict) for v in entries.values()):
+            raise ValueError("Matris bir {\"<from>_<to>\": {distance_km, ...}} nesnesi olmalı")
+        return prepare_matrix(entries, digest=key)
+
+    try:
+        # Parsing is CPU work; keep the event loop free.
+        matrix = await asyncio.to_thread(_parse)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Geçersiz matris: {e}")
+
+    if not matrix_registry.put(matrix):
+        raise HTTPException(status_code=413, detail="Matris kayıt belleği sınırını aşıyor")
+
+    logger.info(
+        "matrix stored digest=%s stations=%s pairs=%s bytes=%s",
+        key,
+        matrix.size,
+        matrix.pair_count,
+        matrix.nbytes,
+    )
+    return {
+        "digest": key,
+        "stored": True,
+        "created": True,
+        "stations": matrix.size,
+        "pairs": matrix.pair_count,
+        "bytes": matrix.nbytes,
+    }
+
+
+def _cancellation_watch(disconnected: "asyncio.Future[Any]", deadline: Optional[float]):
+    """Handler-side watcher: client disconnect or X-Request-Deadline passed."""
+
+    async def watch() -> Optional[int]:
+        if deadline is not None and time.time() >= deadline:
+            return REASON_DEADLINE
+        if disconnected.done():
+            return REASON_CLIENT_DISCONNECTED
+        return None
+
+    return watch
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The body is already consumed, so the next ASGI message can only be
+    # http.disconnect. (Request.is_disconnected() cannot see it through the
+    # BaseHTTPMiddleware above, hence the long-lived receive.)
+    while True:
+        message = await request.receive()
+        if message.get("type") == "http.disconnect":
+            return
+
+
+def _account_memory(request: Request, result: Any) -> None:
+    """Admission estimate next to the worker's measurement (algorithm_info.memory)."""
+    info = result.algorithm_info.setdefault("memory", {})
+    estimate = getattr(request.state, "memory_estimate", None)
+    if estimate is None:
+        return
+    info["estimated_mb"] = round(estimate["total"] / MB, 2)
+    info["estimated_solve_mb"] = round(estimate["solve"] / MB, 2)
+    info["estimated_sectors_mb"] = round(estimate.get("sectors", 0) / MB, 2)
+    memory_guard.observe(estimate["solve"], info)
 
 
 @app.post("/optimize", response_model=OptimizerOutput)
-def optimize(input_data: OptimizerInput):
+async def optimize(input_data: OptimizerInput, request: Request):
     """
     Rota optimizasyonu yap.
     
@@ -105,7 +389,35 @@ def optimize(input_data: OptimizerInput):
     - limited_vehicles: (legacy) Belirli araçlar, varsayılan: max adet + min maliyet
     - limited_vehicles_max_count: Belirli araçlar, max adet + min maliyet
     - limited_vehicles_max_weight: Belirli araçlar, max kg + min maliyet
+
+    parameters.response_format = "compact" istasyon tablosu + sütunlu
+    diziler döndürür (response.py); gzip/zstd Accept-Encoding ile.
+
+    Çok büyük ağlar için distance_matrix yerine sparse_matrix (istasyon başına
+    k en yakın komşu, CSR); listede olmayan çiftler koordinatlardan tahmin edilir.
+
+    X-Trace: 1 (veya TRACE_SAMPLE_RATE) isteğin span'lerini TRACE_DIR
+    altına Chrome trace JSON olarak yazar (tracing.py).
     """
+    rid = request_id_ctx.get() or "-"
+    traced = trace_sink is not None and trace_sink.should_trace(request.headers.get("x-trace"))
+    tracer = Tracer(rid, "optimizer server") if traced else NULL_TRACER
+    try:
+        with tracer.span("optimize", cat="request", stations=len(input_data.stations or [])):
+            return await _optimize(input_data, request, tracer)
+    finally:
+        if traced:
+            path = trace_sink.path_for(rid)
+            try:
+                await asyncio.to_thread(trace_sink.write, tracer, path)
+                logger.info("trace written file=%s spans=%s", path, len(tracer.events))
+            except OSError as e:
+                logger.warning("trace write failed file=%s: %s", path, e)
+
+
+async def _optimize(input_data: OptimizerInput, request: Request, tracer: Any):
+    record = request_recorder is not None and request_recorder.should_record()
+    matrix: Optional[PreparedMatrix] = None
     try:
         start_time = time.time()
 
@@ -116,16 +428,74 @@ def optimize(input_data: OptimizerInput):
             len(input_data.vehicles or []),
         )
         
-        optimizer = VRPOptimizer(input_data)
-        result = optimizer.solve()
-        
-        execution_time = (time.time() - start_time) * 1000
-        result.algorithm_info["execution_time_ms"] = execution_time
+        response_format(input_data)
+        deadline = parse_deadline_header(request.headers.get("x-request-deadline"))
+        if deadline is not None and time.time() >= deadline:
+            raise SolveCancelled(REASON_NAMES[REASON_DEADLINE])
 
-        logger.info("optimize done execution_time_ms=%.2f success=%s", execution_time, result.success)
-        
-        return result
-        
+        with tracer.span("resolve_matrix", cat="request"):
+            matrix = _resolve_matrix(input_data)
+
+        # Process workers get a handle to the memory-mapped copy, not the arrays.
+        ref = matrix_registry.pin(matrix) if matrix is not None else None
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(request))
+        try:
+            with tracer.span("queue_and_solve", cat="request"):
+                result = await solver_pool.submit(
+                    run_optimize,
+                    input_data,
+                    ref or matrix,
+                    tracer.request_id if tracer.enabled else None,
+                    deadline=deadline,
+                    watch=_cancellation_watch(disconnected, deadline),
+                )
+        finally:
+            disconnected.cancel()
+            if ref is not None:
+                matrix_registry.unpin(ref)
+        tracer.add_events(result.algorithm_info.pop(TRACE_EVENTS_KEY, []))
+
+        execution_time = result.algorithm_info.get("execution_time_ms", 0)
+        total_time = (time.time() - start_time) * 1000
+        result.algorithm_info["queue_wait_ms"] = round(max(0.0, total_time - execution_time), 2)
+        _account_memory(request, result)
+
+        logger.info(
+            "optimize done execution_time_ms=%.2f total_ms=%.2f success=%s",
+            execution_time,
+            total_time,
+            result.success,
+        )
+        if record:
+            request_recorder.record(input_data, result, request_id_ctx.get(), matrix, total_time)
+
+        # Serialized directly: FastAPI would re-validate the whole plan first.
+        with tracer.span("render", cat="output"):
+            content = render(result)
+        return Response(content=content, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except SolveCancelled as e:
+        elapsed_ms = (time.time() - start_time) * 1000
+        logger.warning(
+            "optimize cancelled reason=%s after_ms=%.2f",
+            e.reason,
+            elapsed_ms,
+        )
+        # Deadline hits are the hardest instances: keep them (no result).
+        if record:
+            request_recorder.record(input_data, None, request_id_ctx.get(), matrix, elapsed_ms)
+        # 499: istemci bağlantıyı kapattı (cevabı okuyan yok); 504: deadline.
+        status = 499 if e.reason == REASON_NAMES[REASON_CLIENT_DISCONNECTED] else 504
+        raise HTTPException(status_code=status, detail=f"Optimizasyon iptal edildi: {e.reason}")
+    except PoolSaturatedError as e:
+        logger.warning("optimize rejected status=%s: %s", e.status_code, e.message)
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.message,
+            headers={"Retry-After": str(e.retry_after_s)},
+        )
     except ValueError as e:
         logger.warning("optimize bad_request: %s", str(e))
         raise HTTPException(status_code=400, detail=str(e))
@@ -134,18 +504,43 @@ def optimize(input_data: OptimizerInput):
         raise HTTPException(status_code=500, detail=f"Optimizer error: {str(e)}")
 
 
-@app.post("/validate")
-def validate_input(input_data: OptimizerInput):
-    """Input validasyonu yap (optimizasyon yapmadan)"""
-    try:
-        optimizer = VRPOptimizer(input_data)
-        return {
-            "valid": True,
-            "station_count": len(input_data.stations),
-            "vehicle_count": len(input_data.vehicles),
-            "total_cargo_weight": sum(s.total_weight_kg for s in input_data.stations),
-            "total_vehicle_capacity": sum(v.capacity_kg for v in input_data.vehicles),
+@app.post(
+    "/validate",
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/json": {"schema": {"$ref": "#/components/schemas/OptimizerInput"}}},
+            "required": True,
         }
+    },
+)
+async def validate_input(request: Request):
+    """
+    Input validasyonu yap (optimizasyon yapmadan).
+
+    VRPOptimizer kurulmaz: gövde doğrudan modele ayrıştırılır ve tek geçişte
+    matris kapsamı, hiçbir araca sığmayan kargolar, tutarsız istasyon
+    toplamları, tahmini çözüm süresi / bellek ve sync / async önerisi
+    döndürülür (validation.py).
+    """
+    body = await request.body()
+    try:
+        # Parsing a large payload takes a while: keep it off the event loop too.
+        input_data = await asyncio.to_thread(ValidationInput.model_validate_json, body)
+    except ValidationError as e:
+        errors = [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        raise RequestValidationError(errors, body=body)
+    try:
+        matrix = _resolve_matrix(input_data)
+        return await asyncio.to_thread(
+            check_input,
+            input_data,
+            matrix=matrix,
+            matrix_store=get_network_store(),
+            body_bytes=len(body),
+            process_mode=solver_pool.mode == "process",
+        )
+    except HTTPException as e:
+        return {"valid": False, "error": str(e.detail)}
     except Exception as e:
         return {"valid": False, "error": str(e)}
 
@@ -153,4 +548,10 @@ def validate_input(input_data: OptimizerInput):
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", "5000"))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Her uvicorn worker kendi çözüm havuzunu açar; genelde 1 worker +
+    # OPTIMIZER_WORKERS süreç yeterlidir.
+    workers = max(1, env_int("UVICORN_WORKERS", 1))
+    if workers > 1:
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,476 @@
+"""
+Distance-matrix preprocessing + content-addressed registry.
+
+The station network rarely changes from one plan to the next, so callers
+can upload a matrix once (PUT /matrices/{digest}) and then reference it by
+digest from OptimizerInput.matrix_digest. The registry keeps the *parsed*
+form (dense arrays) in an LRU bounded by memory, so repeat plans skip both
+the transfer and the parsing.
+
+With process workers the registry spills each matrix to .npy files once
+(spill_dir, /dev/shm by default) and keeps them memory-mapped; a solve then
+ships only a MatrixRef (digest + directory) and the worker maps the same
+pages, cached per process by digest (resolve_matrix), instead of
+unpickling its own copy of the arrays on every request.
+
+Networks too large for all pairs arrive as k-nearest lists in CSR form
+(OptimizerInput.sparse_matrix) and stay sparse (SparseMatrix, O(n * k)).
+Both forms hand the solver dense blocks over its own points (submatrix).
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+
+# Spilled matrices a solver process keeps mapped (resolve_matrix).
+WORKER_CACHE_ENTRIES = 4
+
+_SPILLED_ARRAYS = ("distance_km", "duration_minutes", "known")
+
+_worker_matrices: "OrderedDict[str, PreparedMatrix]" = OrderedDict()
+_worker_lock = threading.Lock()
+
+
+@dataclass
+class PreparedMatrix:
+    """
+    Dense, index-addressed form of a "<from>_<to>" distance map.
+
+    distance_km / duration_minutes are NaN where the pair was not given;
+    `known` marks the given pairs (sector slices also carry the parent's
+    estimates, with known=False). Polylines stay sparse (keyed by index pair).
+    """
+    ids: List[str]
+    index: Dict[str, int]
+    distance_km: np.ndarray
+    duration_minutes: np.ndarray
+    known: np.ndarray
+    polylines: Dict[Tuple[int, int], str]
+    digest: str = ""
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @property
+    def pair_count(self) -> int:
+        return int(self.known.sum())
+
+    def submatrix(self, m_idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (distance, duration, known) blocks over matrix rows `m_idx` (-1 = id
+        not in the matrix: NaN / False). Values are NaN where not resolved.
+        """
+        m = int(m_idx.size)
+        dist = np.full((m, m), np.nan, dtype=np.float64)
+        dur = np.full((m, m), np.nan, dtype=np.float64)
+        known = np.zeros((m, m), dtype=bool)
+        present = np.nonzero(m_idx >= 0)[0]
+        if present.size:
+            sel = np.ix_(m_idx[present], m_idx[present])
+            dst = np.ix_(present, present)
+            dist[dst] = self.distance_km[sel]
+            dur[dst] = self.duration_minutes[sel]
+            known[dst] = self.known[sel]
+        return dist, dur, known
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size (arrays + polyline strings + ids)."""
+        total = self.distance_km.nbytes + self.duration_minutes.nbytes + self.known.nbytes
+        total += sum(len(p) + 64 for p in self.polylines.values())
+        total += sum(len(i) + 96 for i in self.ids)
+        return int(total)
+
+
+@dataclass
+class SparseMatrix:
+    """
+    k-nearest distances in CSR form: row i's given destinations are
+    indices[indptr[i]:indptr[i + 1]] with the same slice of distance_km /
+    duration_minutes (NaN = no duration given). Memory is O(n * k).
+    """
+    ids: List[str]
+    index: Dict[str, int]
+    indptr: np.ndarray
+    indices: np.ndarray
+    distance_km: np.ndarray
+    duration_minutes: np.ndarray
+    polylines: Dict[Tuple[int, int], str]
+    digest: str = ""
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @property
+    def pair_count(self) -> int:
+        return int(self.indices.size)
+
+    @property
+    def nbytes(self) -> int:
+        total = self.indptr.nbytes + self.indices.nbytes + self.distance_km.nbytes + self.duration_minutes.nbytes
+        total += sum(len(p) + 64 for p in self.polylines.values())
+        total += sum(len(i) + 96 for i in self.ids)
+        return int(total)
+
+    def row_of_entry(self) -> np.ndarray:
+        """Source row of every stored pair (expanded indptr)."""
+        return np.repeat(np.arange(self.size, dtype=np.int64), np.diff(self.indptr))
+
+    def submatrix(self, m_idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Same contract as PreparedMatrix.submatrix; only listed pairs are known."""
+        m = int(m_idx.size)
+        dist = np.full((m, m), np.nan, dtype=np.float64)
+        dur = np.full((m, m), np.nan, dtype=np.float64)
+        known = np.zeros((m, m), dtype=bool)
+        # Matrix row -> position in m_idx
+        pos = np.full(self.size, -1, dtype=np.int64)
+        present = np.nonzero(m_idx >= 0)[0]
+        pos[m_idx[present]] = present
+        rows = pos[self.row_of_entry()]
+        cols = pos[self.indices]
+        keep = (rows >= 0) & (cols >= 0) & (rows != cols)
+        rows, cols = rows[keep], cols[keep]
+        dist[rows, cols] = self.distance_km[keep]
+        dur[rows, cols] = self.duration_minutes[keep]
+        known[rows, cols] = True
+        dist[present, present] = 0.0
+        dur[present, present] = 0.0
+        return dist, dur, known
+
+
+# Matrix forms the solver accepts
+DistanceSource = Union[PreparedMatrix, SparseMatrix]
+
+
+def _field(info: Any, name: str, default: Any = None) -> Any:
+    if isinstance(info, Mapping):
+        return info.get(name, default)
+    return getattr(info, name, default)
+
+
+def split_pair_key(key: str, known_ids: Optional[Set[str]] = None) -> Optional[Tuple[str, str]]:
+    """
+    "<from>_<to>" -> (from, to).
+
+    UUID ids never contain "_", so a single underscore is unambiguous. For
+    ids that do, every split point is tried against `known_ids`.
+    """
+    if key.count("_") == 1:
+        a, b = key.split("_")
+        return (a, b) if a and b else None
+    if not known_ids:
+        return None
+    pos = key.find("_")
+    while pos != -1:
+        a, b = key[:pos], key[pos + 1:]
+        if a in known_ids and b in known_ids:
+            return a, b
+        pos = key.find("_", pos + 1)
+    return None
+
+
+def prepare_matrix(
+    entries: Mapping[str, Any],
+    known_ids: Optional[Iterable[str]] = None,
+    digest: str = "",
+) -> PreparedMatrix:
+    """
+    Parse a "<from>_<to>" -> DistanceInfo map (pydantic models or dicts)
+    into a PreparedMatrix.
+    """
+    known: Set[str] = set(known_ids or [])
+
+    # Pass 1: split keys. Ambiguous ones are retried against every id seen.
+    pairs: List[Tuple[str, str, Any]] = []
+    ambiguous: List[Tuple[str, Any]] = []
+    for key, info in entries.items():
+        ab = split_pair_key(key, known)
+        if ab is None:
+            ambiguous.append((key, info))
+            continue
+        pairs.append((ab[0], ab[1], info))
+        known.add(ab[0])
+        known.add(ab[1])
+    for key, info in ambiguous:
+        ab = split_pair_key(key, known)
+        if ab is not None:
+            pairs.append((ab[0], ab[1], info))
+
+    ids: List[str] = []
+    index: Dict[str, int] = {}
+    for a, b, _ in pairs:
+        for sid in (a, b):
+            if sid not in index:
+                index[sid] = len(ids)
+                ids.append(sid)
+
+    n = len(ids)
+    dist = np.full((n, n), np.nan, dtype=np.float64)
+    dur = np.full((n, n), np.nan, dtype=np.float64)
+    polylines: Dict[Tuple[int, int], str] = {}
+
+    if pairs:
+        rows = np.fromiter((index[a] for a, _, _ in pairs), dtype=np.int64, count=len(pairs))
+        cols = np.fromiter((index[b] for _, b, _ in pairs), dtype=np.int64, count=len(pairs))
+        dist[rows, cols] = np.fromiter(
+            (float(_field(info, "distance_km", 0) or 0) for _, _, info in pairs),
+            dtype=np.float64,
+            count=len(pairs),
+        )
+        dur[rows, cols] = np.fromiter(
+            (float(_field(info, "duration_minutes", 0) or 0) for _, _, info in pairs),
+            dtype=np.float64,
+            count=len(pairs),
+        )
+        for (a, b, info), i, j in zip(pairs, rows.tolist(), cols.tolist()):
+            pl = _field(info, "polyline", "") or ""
+            if pl:
+                polylines[(i, j)] = pl
+
+    np.fill_diagonal(dist, 0.0)
+    np.fill_diagonal(dur, 0.0)
+    return PreparedMatrix(
+        ids=ids,
+        index=index,
+        distance_km=dist,
+        duration_minutes=dur,
+        known=~np.isnan(dist),
+        polylines=polylines,
+        digest=digest,
+    )
+
+
+def prepare_sparse(sparse: Any, digest: str = "") -> SparseMatrix:
+    """OptimizerInput.sparse_matrix (model or dict; layout already validated) -> SparseMatrix."""
+    ids = [str(x) for x in _field(sparse, "ids", [])]
+    indptr = np.asarray(_field(sparse, "indptr", [0]), dtype=np.int64)
+    indices = np.asarray(_field(sparse, "indices", []), dtype=np.int64)
+    dist = np.asarray(_field(sparse, "distance_km", []), dtype=np.float64)
+    durations = _field(sparse, "duration_minutes")
+    dur = np.asarray(durations, dtype=np.float64) if durations is not None else np.full(dist.shape, np.nan)
+    matrix = SparseMatrix(
+        ids=ids,
+        index={sid: i for i, sid in enumerate(ids)},
+        indptr=indptr,
+        indices=indices,
+        distance_km=dist,
+        duration_minutes=dur,
+        polylines={},
+        digest=digest,
+    )
+    lines = _field(sparse, "polylines")
+    if lines:
+        rows = matrix.row_of_entry().tolist()
+        cols = indices.tolist()
+        matrix.polylines = {(rows[e], cols[e]): pl for e, pl in enumerate(lines) if pl}
+    return matrix
+
+
+@dataclass(frozen=True)
+class MatrixRef:
+    """A spilled registry matrix, as handed to process workers."""
+    digest: str
+    directory: str
+
+    def path(self, part: str) -> str:
+        return os.path.join(self.directory, f"{self.digest}.{part}")
+
+
+def spill_matrix(matrix: PreparedMatrix, directory: str) -> PreparedMatrix:
+    """
+    Write `matrix` under `directory` (arrays as .npy, ids + polylines as
+    JSON) and return the same matrix backed by read-only memory maps.
+    """
+    ref = MatrixRef(matrix.digest, directory)
+    for name in _SPILLED_ARRAYS:
+        tmp = ref.path(f"{name}.{os.getpid()}.tmp.npy")
+        np.save(tmp, getattr(matrix, name))
+        os.replace(tmp, ref.path(f"{name}.npy"))
+    tmp = ref.path(f"meta.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"ids": matrix.ids, "polylines": [[i, j, p] for (i, j), p in matrix.polylines.items()]}, f)
+    os.replace(tmp, ref.path("meta.json"))
+    return PreparedMatrix(
+        ids=matrix.ids,
+        index=matrix.index,
+        polylines=matrix.polylines,
+        digest=matrix.digest,
+        **{name: np.load(ref.path(f"{name}.npy"), mmap_mode="r") for name in _SPILLED_ARRAYS},
+    )
+
+
+def load_spilled(ref: MatrixRef) -> PreparedMatrix:
+    """Inverse of spill_matrix (arrays memory-mapped read-only)."""
+    with open(ref.path("meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    ids = [str(i) for i in meta["ids"]]
+    return PreparedMatrix(
+        ids=ids,
+        index={sid: i for i, sid in enumerate(ids)},
+        polylines={(int(i), int(j)): str(p) for i, j, p in meta["polylines"]},
+        digest=ref.digest,
+        **{name: np.load(ref.path(f"{name}.npy"), mmap_mode="r") for name in _SPILLED_ARRAYS},
+    )
+
+
+def remove_spilled(ref: MatrixRef) -> None:
+    for part in [f"{name}.npy" for name in _SPILLED_ARRAYS] + ["meta.json"]:
+        try:
+            os.remove(ref.path(part))
+        except FileNotFoundError:
+            pass
+
+
+def resolve_matrix(matrix: Any) -> Optional[PreparedMatrix]:
+    """Worker side: MatrixRef -> PreparedMatrix, mapped once per process; anything else as is."""
+    if not isinstance(matrix, MatrixRef):
+        return matrix
+    with _worker_lock:
+        cached = _worker_matrices.get(matrix.digest)
+        if cached is not None:
+            _worker_matrices.move_to_end(matrix.digest)
+            return cached
+    loaded = load_spilled(matrix)
+    with _worker_lock:
+        _worker_matrices[matrix.digest] = loaded
+        while len(_worker_matrices) > WORKER_CACHE_ENTRIES:
+            _worker_matrices.popitem(last=False)
+    return loaded
+
+
+def content_digest(body: bytes) -> str:
+    """Digest callers use to address a matrix: sha256 of the uploaded bytes."""
+    return hashlib.sha256(body).hexdigest()
+
+
+def normalize_digest(digest: str) -> str:
+    d = str(digest or "").strip().lower()
+    if d.startswith("sha256:"):
+        d = d[len("sha256:"):]
+    return d
+
+
+class MatrixRegistry:
+    """
+    Thread-safe LRU of PreparedMatrix objects bounded by total bytes.
+
+    With `spill_dir` matrices are memory-mapped from files there and pin()
+    hands out MatrixRefs; files of an evicted matrix stay until its last
+    pin is released, so queued solves can still map them.
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None):
+        self.max_bytes = max(0, int(max_bytes))
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._pins: Dict[str, int] = {}
+        self._evicted: Set[str] = set()
+        self._items: "OrderedDict[str, PreparedMatrix]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            return normalize_digest(digest) in self._items
+
+    def get(self, digest: str) -> Optional[PreparedMatrix]:
+        key = normalize_digest(digest)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self._misses += 1
+                return None
+            self._items.move_to_end(key)
+            self._hits += 1
+            return item
+
+    def put(self, matrix: PreparedMatrix) -> bool:
+        """Store `matrix`; returns False if it alone exceeds the memory cap."""
+        key = normalize_digest(matrix.digest)
+        size = matrix.nbytes
+        if size > self.max_bytes:
+            return False
+        if self.spill_dir:
+            matrix = spill_matrix(matrix, self.spill_dir)
+        removable: List[str] = []
+        with self._lock:
+            if self._items.pop(key, None) is not None:
+                self._bytes -= self._sizes.pop(key)
+            self._evicted.discard(key)
+            self._items[key] = matrix
+            self._sizes[key] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._items:
+                evicted, _ = self._items.popitem(last=False)
+                self._bytes -= self._sizes.pop(evicted)
+                self._evictions += 1
+                if self._pins.get(evicted):
+                    self._evicted.add(evicted)
+                else:
+                    removable.append(evicted)
+        self._remove(removable)
+        return True
+
+    def pin(self, matrix: PreparedMatrix) -> Optional[MatrixRef]:
+        """MatrixRef of a spilled, still registered matrix (None otherwise); unpin() when done."""
+        key = normalize_digest(matrix.digest)
+        if not self.spill_dir:
+            return None
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._pins[key] = self._pins.get(key, 0) + 1
+        return MatrixRef(key, self.spill_dir)
+
+    def unpin(self, ref: MatrixRef) -> None:
+        removable: List[str] = []
+        with self._lock:
+            left = self._pins.get(ref.digest, 0) - 1
+            if left > 0:
+                self._pins[ref.digest] = left
+                return
+            self._pins.pop(ref.digest, None)
+            if ref.digest in self._evicted:
+                self._evicted.discard(ref.digest)
+                removable.append(ref.digest)
+        self._remove(removable)
+
+    def _remove(self, digests: List[str]) -> None:
+        if self.spill_dir:
+            for digest in digests:
+                remove_spilled(MatrixRef(digest, self.spill_dir))
+
+    def close(self) -> None:
+        """Drop every entry and the spill directory."""
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self._bytes = 0
+        if self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
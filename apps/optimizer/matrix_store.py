@@ -0,0 +1,216 @@
+"""
+Memory-mapped network distance matrix store.
+
+The full station network's all-pairs OSRM distances are precomputed once a
+day and dropped next to the service as .npy files plus a small JSON
+manifest:
+
+    {
+      "station_ids": ["<hub-id>", "<station-id>", ...],
+      "distance_km": "network-2026-10-19.distance.npy",
+      "duration_minutes": "network-2026-10-19.duration.npy"   (optional)
+    }
+
+Matrix files are N x N float arrays (NaN = unknown pair) in station_ids
+order. They are opened with numpy's memmap, so every worker process maps
+the same pages from the OS page cache instead of holding its own copy.
+
+Reloading is atomic: publish new .npy files under new names, then replace
+the manifest with a rename. Readers pick up the new manifest on the next
+lookup and keep using the old mapping until then; a broken manifest is
+logged and ignored.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from matrix_registry import PreparedMatrix
+
+
+logger = logging.getLogger("optimizer")
+
+
+@dataclass
+class _Snapshot:
+    """One loaded manifest; replaced as a whole on reload."""
+    version: str
+    ids: List[str]
+    index: Dict[str, int]
+    distance_km: np.ndarray
+    duration_minutes: Optional[np.ndarray]
+    loaded_at: float
+
+
+class NetworkMatrixStore:
+    """Resolves station ids to submatrices of a memory-mapped network matrix."""
+
+    def __init__(self, manifest_path: str, check_interval_s: float = 5.0):
+        self.manifest_path = os.path.abspath(manifest_path)
+        self.check_interval_s = max(0.0, float(check_interval_s))
+        self._snapshot: Optional[_Snapshot] = None
+        self._stat_key: Optional[tuple] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._reloads = 0
+        self._reload_errors = 0
+
+    # ---------- loading ----------
+
+    def _manifest_stat(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.manifest_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _open_matrix(self, base_dir: str, name: str, n: int) -> np.ndarray:
+        path = name if os.path.isabs(name) else os.path.join(base_dir, name)
+        arr = np.load(path, mmap_mode="r", allow_pickle=False)
+        if arr.ndim != 2 or arr.shape != (n, n):
+            raise ValueError(f"{path}: beklenen boyut ({n}, {n}), bulunan {arr.shape}")
+        return arr
+
+    def _load(self, stat_key: tuple) -> _Snapshot:
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        ids = [str(x) for x in manifest["station_ids"]]
+        index = {sid: i for i, sid in enumerate(ids)}
+        if len(index) != len(ids):
+            raise ValueError("station_ids tekrarlı kayıt içeriyor")
+
+        base_dir = os.path.dirname(self.manifest_path)
+        distance = self._open_matrix(base_dir, manifest["distance_km"], len(ids))
+        duration = None
+        if manifest.get("duration_minutes"):
+            duration = self._open_matrix(base_dir, manifest["duration_minutes"], len(ids))
+
+        return _Snapshot(
+            version=str(manifest.get("version") or f"{stat_key[0]}:{stat_key[1]}"),
+            ids=ids,
+            index=index,
+            distance_km=distance,
+            duration_minutes=duration,
+            loaded_at=time.time(),
+        )
+
+    def maybe_reload(self, force: bool = False) -> bool:
+        """Swap in a new snapshot if the manifest changed. Returns True on swap."""
+        now = time.monotonic()
+        if not force and self._snapshot is not None and now - self._last_check < self.check_interval_s:
+            return False
+
+        with self._lock:
+            self._last_check = now
+            stat_key = self._manifest_stat()
+            if stat_key is None or (stat_key == self._stat_key and not force):
+                return False
+            try:
+                snapshot = self._load(stat_key)
+            except Exception:
+                self._reload_errors += 1
+                self._stat_key = stat_key  # don't retry the same broken file
+                logger.exception("network matrix reload failed path=%s", self.manifest_path)
+                return False
+            # Single reference assignment: readers see either old or new.
+            self._snapshot = snapshot
+            self._stat_key = stat_key
+            self._reloads += 1
+
+        logger.info(
+            "network matrix loaded version=%s stations=%s path=%s",
+            snapshot.version,
+            len(snapshot.ids),
+            self.manifest_path,
+        )
+        return True
+
+    # ---------- lookups ----------
+
+    def resolve(self, station_ids: Sequence[str]) -> Optional[PreparedMatrix]:
+        """
+        Submatrix for the requested stations (unknown ids are skipped and
+        later handled like missing pairs). Only the m x m slice is copied out
+        of the mapping; the N x N matrix stays in the page cache.
+        """
+        self.maybe_reload()
+        snap = self._snapshot
+        if snap is None:
+            return None
+
+        ids: List[str] = []
+        rows: List[int] = []
+        seen = set()
+        for sid in station_ids:
+            i = snap.index.get(sid)
+            if i is None or sid in seen:
+                continue
+            seen.add(sid)
+            ids.append(sid)
+            rows.append(i)
+        if not rows:
+            return None
+
+        sel = np.ix_(rows, rows)
+        dist = np.asarray(snap.distance_km[sel], dtype=np.float64)
+        if snap.duration_minutes is not None:
+            dur = np.asarray(snap.duration_minutes[sel], dtype=np.float64)
+        else:
+            dur = np.full_like(dist, np.nan)
+        known = ~np.isnan(dist)
+        # Duration is only trusted where the distance is.
+        dur = np.where(known, dur, np.nan)
+
+        return PreparedMatrix(
+            ids=ids,
+            index={sid: i for i, sid in enumerate(ids)},
+            distance_km=dist,
+            duration_minutes=dur,
+            known=known,
+            polylines={},
+            digest=f"store:{snap.version}",
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        return {
+            "path": self.manifest_path,
+            "loaded": snap is not None,
+            "version": snap.version if snap else None,
+            "stations": len(snap.ids) if snap else 0,
+            "loaded_at": snap.loaded_at if snap else None,
+            "reloads": self._reloads,
+            "reload_errors": self._reload_errors,
+        }
+
+
+_store: Optional[NetworkMatrixStore] = None
+_store_lock = threading.Lock()
+
+
+def get_network_store() -> Optional[NetworkMatrixStore]:
+    """
+    Process-wide store configured by NETWORK_MATRIX_MANIFEST (None if unset).
+    Each worker process opens its own mapping of the same files.
+    """
+    global _store
+    path = str(os.getenv("NETWORK_MATRIX_MANIFEST", "")).strip()
+    if not path:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = NetworkMatrixStore(
+                    path,
+                    check_interval_s=float(os.getenv("NETWORK_MATRIX_CHECK_SECONDS", "5") or 5),
+                )
+                store.maybe_reload(force=True)
+                _store = store
+    return _store
@@ -0,0 +1,504 @@
+"""
+Memory accounting per solve + memory-based admission.
+
+Footprint model (bytes), calibrated with tracemalloc on synthetic inputs
+(25-400 stations, polylines 0-200 chars):
+
+    model  = 560 x matrix entries + 96 x sparse entries
+             + 1 KiB x (stations + cargos) + body bytes
+             (parsed OptimizerInput; polylines are roughly their body size;
+             sparse entries are the CSR lists of sparse_matrix plus their arrays)
+    parse  = body bytes + 1.35 x model    (raw body, json dict and model alive together)
+    solve  = 250 x (stations + 1)^2 + 4 KiB x cargos + 1 MiB
+             (dense matrices, neighbor lists, candidate routes)
+    sectors = parallel sectors x (solve of one sector + model of its items)
+             (only when the plan is decomposed: DECOMPOSE_MIN_STATIONS /
+             DECOMPOSE_MIN_CARGOS; parallel = min(DECOMPOSE_WORKERS, sectors),
+             1 for in-process sectors)
+    total  = parse + solve + sectors (+ model again in process mode: the worker's copy)
+
+MemoryAdmissionMiddleware counts stations / cargos / matrix entries on the
+raw /optimize and /validate bodies while they stream in (byte search for
+the JSON keys, no parsing; sparse entries are the values of the "indices"
+array, counted by its commas), so an oversized request is refused before
+FastAPI parses it:
+
+- estimate > MEMORY_BUDGET_MB                      -> 413 (can never fit);
+- reserved + estimate > budget                     -> wait up to
+  MEMORY_ADMISSION_WAIT_S for running requests to finish, then 429 + Retry-After.
+
+MEMORY_BUDGET_MB=auto (default) is MEMORY_BUDGET_FRACTION of the cgroup
+memory limit (or of MemTotal without one); 0 turns the guard off.
+
+Measured per solve (algorithm_info["memory"]): in a process worker the
+peak RSS of the solve (VmHWM reset through /proc/self/clear_refs before it
+starts, Linux); with MEMORY_TRACEMALLOC=1 the Python heap peak instead
+(also works for thread workers, but then includes concurrent solves).
+Sector processes of decomposed solves are not measured, only estimated.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+import tracemalloc
+
+from env import env_float
+
+
+logger = logging.getLogger("optimizer")
+
+MODEL_BYTES_PER_ENTRY = 560
+MODEL_BYTES_PER_ITEM = 1024
+MODEL_BYTES_PER_SPARSE_ENTRY = 96
+PARSE_OVERHEAD = 1.35
+SOLVE_BYTES_PER_CELL = 250
+SOLVE_BYTES_PER_CARGO = 4096
+SOLVE_BASE_BYTES = 1024 * 1024
+
+MB = 1024.0 * 1024.0
+
+# JSON keys counted on the raw body (each occurs once per item)
+STATION_KEY = b'"cargos"'
+CARGO_KEY = b'"weight_kg"'
+ENTRY_KEY = b'"distance_km"'
+SPARSE_KEY = b'"indices"'
+
+# Rolling average weight of observed / estimated solve memory
+RATIO_ALPHA = 0.2
+
+
+def container_memory_bytes() -> Optional[int]:
+    """cgroup v2 / v1 memory limit, else MemTotal; None if unknown."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path, "r") as f:
+                raw = f.read().strip()
+        except OSError:
+            continue
+        # "max" (v2) or a page-rounded 2^63 (v1) mean no limit
+        if raw.isdigit() and int(raw) < (1 << 60):
+            return int(raw)
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def default_budget_bytes() -> int:
+    raw = str(os.getenv("MEMORY_BUDGET_MB", "auto") or "auto").strip().lower()
+    if raw != "auto":
+        try:
+            return max(0, int(float(raw) * MB))
+        except ValueError:
+            logger.warning("invalid MEMORY_BUDGET_MB=%s, using auto", raw)
+    limit = container_memory_bytes()
+    if limit is None:
+        return 0
+    fraction = min(1.0, max(0.0, env_float("MEMORY_BUDGET_FRACTION", 0.6)))
+    return int(limit * fraction)
+
+
+def estimate_bytes(
+    stations: int,
+    cargos: int,
+    entries: int,
+    body_bytes: int,
+    process_mode: bool = True,
+    sparse_entries: int = 0,
+) -> Dict[str, int]:
+    """Footprint of one request from its dimensions (see module docstring)."""
+    model = (
+        MODEL_BYTES_PER_ENTRY * entries
+        + MODEL_BYTES_PER_SPARSE_ENTRY * sparse_entries
+        + MODEL_BYTES_PER_ITEM * (stations + cargos)
+        + body_bytes
+    )
+    parse = int(body_bytes + PARSE_OVERHEAD * model)
+    solve = SOLVE_BYTES_PER_CELL * (stations + 1) ** 2 + SOLVE_BYTES_PER_CARGO * cargos + SOLVE_BASE_BYTES
+    sectors = sector_bytes(stations, cargos)
+    total = parse + solve + sectors + (model if process_mode else 0)
+    return {"parse": parse, "solve": int(solve), "sectors": sectors, "total": int(total)}
+
+
+def sector_bytes(stations: int, cargos: int) -> int:
+    """Sub-solves of a decomposed plan running at the same time (0 if not decomposed)."""
+    from decomposition import DecompositionConfig
+
+    cfg = DecompositionConfig.from_env()
+    if cfg.method == "off" or (stations < cfg.min_stations and cargos < cfg.min_cargos):
+        return 0
+    count = int(math.ceil(stations / float(cfg.sector_stations)))
+    if count < 2:
+        return 0
+    per_stations = int(math.ceil(stations / float(count)))
+    per_cargos = int(math.ceil(cargos / float(count)))
+    one = (
+        SOLVE_BYTES_PER_CELL * (per_stations + 1) ** 2
+        + SOLVE_BYTES_PER_CARGO * per_cargos
+        + SOLVE_BASE_BYTES
+        + MODEL_BYTES_PER_ITEM * (per_stations + per_cargos)
+    )
+    return int(min(cfg.workers, count) * one)
+
+
+class PayloadCounter:
+    """
+    Streaming key counts over a JSON body (keys may straddle chunks).
+
+    A sparse_matrix has one "distance_km" key for all its entries, so its
+    entries are the values of the "indices" array: commas + 1, counted
+    while the array streams in.
+    """
+
+    KEYS = (STATION_KEY, CARGO_KEY, ENTRY_KEY)
+
+    def __init__(self) -> None:
+        self.body_bytes = 0
+        self.counts = [0, 0, 0]
+        self.sparse_entries = 0
+        self._tail = b""
+        self._keep = max(len(k) for k in self.KEYS + (SPARSE_KEY,)) - 1
+        # None, "key" (after "indices", before "[") or "open" (inside the array)
+        self._array: Optional[str] = None
+        self._array_values = False
+
+    def feed(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        self.body_bytes += len(chunk)
+        window = self._tail + chunk
+        for i, key in enumerate(self.KEYS):
+            # Matches entirely inside the old tail were counted already
+            self.counts[i] += window.count(key) - self._tail.count(key)
+
+        pos = self._scan(chunk, 0) if self._array is not None else 0
+        # "indices" keys ending in this chunk (window offset -> chunk offset)
+        shift = len(self._tail)
+        hit = window.find(SPARSE_KEY, max(0, shift - len(SPARSE_KEY) + 1))
+        while hit >= 0:
+            end = hit + len(SPARSE_KEY) - shift
+            if end >= pos:
+                self._array = "key"
+                pos = self._scan(chunk, end)
+            hit = window.find(SPARSE_KEY, hit + 1)
+        self._tail = window[-self._keep:]
+
+    def _scan(self, data: bytes, i: int) -> int:
+        """Advance the "indices" array state over data[i:]; returns where it stopped."""
+        if self._array == "key":
+            while i < len(data) and data[i] in b" \t\r\n:":
+                i += 1
+            if i == len(data):
+                return i
+            if data[i] != ord("["):
+                # A string value "indices", not the key of an array
+                self._array = None
+                return i
+            self._array = "open"
+            self._array_values = False
+            i += 1
+        close = data.find(b"]", i)
+        stop = len(data) if close < 0 else close
+        self.sparse_entries += data.count(b",", i, stop)
+        if not self._array_values and data[i:stop].strip():
+            self._array_values = True
+        if close < 0:
+            return stop
+        if self._array_values:
+            self.sparse_entries += 1
+        self._array = None
+        return close + 1
+
+    @property
+    def stations(self) -> int:
+        return self.counts[0]
+
+    @property
+    def cargos(self) -> int:
+        return self.counts[1]
+
+    @property
+    def entries(self) -> int:
+        return self.counts[2]
+
+    def estimate(self, process_mode: bool = True) -> Dict[str, int]:
+        return estimate_bytes(
+            self.stations, self.cargos, self.entries, self.body_bytes, process_mode, self.sparse_entries
+        )
+
+
+class MemoryRejected(Exception):
+    def __init__(self, status_code: int, message: str, retry_after_s: int = 0):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.retry_after_s = retry_after_s
+
+
+class MemoryGuard:
+    """Reserves estimated bytes per in-flight request against a budget."""
+
+    def __init__(self, budget_bytes: int, wait_s: float = 5.0, process_mode: bool = True):
+        self.budget_bytes = max(0, int(budget_bytes))
+        self.wait_s = max(0.0, float(wait_s))
+        self.process_mode = process_mode
+        self.reserved_bytes = 0
+        self.in_flight = 0
+        self._cond: Optional[asyncio.Condition] = None
+
+        self.admitted = 0
+        self.waited = 0
+        self.rejected_too_large = 0
+        self.rejected_busy = 0
+        self.observed = 0
+        self.max_solve_peak_bytes = 0
+        self.solve_ratio: Optional[float] = None
+
+    @classmethod
+    def from_env(cls, process_mode: bool = True) -> "MemoryGuard":
+        return cls(
+            default_budget_bytes(),
+            wait_s=env_float("MEMORY_ADMISSION_WAIT_S", 5.0),
+            process_mode=process_mode,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    def check_size(self, estimate: int) -> None:
+        if self.enabled and estimate > self.budget_bytes:
+            self.rejected_too_large += 1
+            raise MemoryRejected(
+                413,
+                f"İstek tahmini {estimate / MB:.0f} MB bellek gerektiriyor "
+                f"(bütçe {self.budget_bytes / MB:.0f} MB)",
+            )
+
+    def _fits(self, estimate: int) -> bool:
+        return self.in_flight == 0 or self.reserved_bytes + estimate <= self.budget_bytes
+
+    async def acquire(self, estimate: int) -> None:
+        """Reserve `estimate` bytes, waiting up to wait_s for room."""
+        if not self.enabled:
+            return
+        self.check_size(estimate)
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            if not self._fits(estimate):
+                self.waited += 1
+                try:
+                    await asyncio.wait_for(self._cond.wait_for(lambda: self._fits(estimate)), self.wait_s)
+                except asyncio.TimeoutError:
+                    self.rejected_busy += 1
+                    raise MemoryRejected(429, "Optimizer bellek bütçesi dolu", max(1, int(math.ceil(self.wait_s))))
+            self.reserved_bytes += estimate
+            self.in_flight += 1
+            self.admitted += 1
+
+    async def release(self, estimate: int) -> None:
+        if not self.enabled or self._cond is None:
+            return
+        async with self._cond:
+            self.reserved_bytes = max(0, self.reserved_bytes - estimate)
+            self.in_flight = max(0, self.in_flight - 1)
+            self._cond.notify_all()
+
+    def observe(self, estimated_solve: int, memory_info: Dict[str, Any]) -> None:
+        """Feed a finished solve's measurement back into the stats."""
+        peak_mb = memory_info.get("solve_peak_mb")
+        if peak_mb is None:
+            return
+        peak = int(peak_mb * MB)
+        self.observed += 1
+        self.max_solve_peak_bytes = max(self.max_solve_peak_bytes, peak)
+        if estimated_solve > 0:
+            ratio = peak / float(estimated_solve)
+            self.solve_ratio = ratio if self.solve_ratio is None else (
+                (1 - RATIO_ALPHA) * self.solve_ratio + RATIO_ALPHA * ratio
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "budget_mb": round(self.budget_bytes / MB, 1),
+            "reserved_mb": round(self.reserved_bytes / MB, 1),
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "waited": self.waited,
+            "rejected_too_large": self.rejected_too_large,
+            "rejected_busy": self.rejected_busy,
+            "observed_solves": self.observed,
+            "max_solve_peak_mb": round(self.max_solve_peak_bytes / MB, 1),
+            "solve_peak_to_estimate": None if self.solve_ratio is None else round(self.solve_ratio, 3),
+        }
+
+
+def _json_response(status: int, detail: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    raw = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    for k, v in (headers or {}).items():
+        raw.append((k.lower().encode(), v.encode()))
+    return {"start": {"type": "http.response.start", "status": status, "headers": raw},
+            "body": {"type": "http.response.body", "body": body}}
+
+
+class MemoryAdmissionMiddleware:
+    """
+    ASGI middleware: buffer the body of guarded POSTs while counting items,
+    refuse (413) as soon as the partial count alone exceeds the budget,
+    otherwise reserve the estimate for the lifetime of the request. The
+    estimate is left in request.state.memory_estimate for the handler.
+    """
+
+    def __init__(self, app: Any, guard: MemoryGuard, paths: Iterable[str] = ("/optimize", "/validate")):
+        self.app = app
+        self.guard = guard
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[[], Awaitable[Any]], send: Any) -> None:
+        guard = self.guard
+        if (
+            scope["type"] != "http"
+            or not guard.enabled
+            or scope.get("method") != "POST"
+            or scope.get("path") not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        counter = PayloadCounter()
+        chunks = []
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                chunk = message.get("body", b"")
+                if chunk:
+                    counter.feed(chunk)
+                    chunks.append(chunk)
+                    guard.check_size(counter.estimate(guard.process_mode)["total"])
+                if not message.get("more_body", False):
+                    break
+            estimate = counter.estimate(guard.process_mode)
+            await guard.acquire(estimate["total"])
+        except MemoryRejected as e:
+            logger.warning(
+                "memory admission status=%s stations=%s cargos=%s entries=%s sparse_entries=%s body_bytes=%s: %s",
+                e.status_code, counter.stations, counter.cargos, counter.entries, counter.sparse_entries,
+                counter.body_bytes, e.message,
+            )
+            resp = _json_response(
+                e.status_code, e.message, {"Retry-After": str(e.retry_after_s)} if e.retry_after_s else None
+            )
+            await send(resp["start"])
+            await send(resp["body"])
+            return
+
+        scope.setdefault("state", {})["memory_estimate"] = {
+            "stations": counter.stations,
+            "cargos": counter.cargos,
+            "entries": counter.entries,
+            "sparse_entries": counter.sparse_entries,
+            "body_bytes": counter.body_bytes,
+            **estimate,
+        }
+        body = b"".join(chunks)
+        chunks.clear()
+        delivered = False
+
+        async def replay() -> Any:
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Later receives (disconnect watch) go to the server
+            return await receive()
+
+        try:
+            await self.app(scope, replay, send)
+        finally:
+            await guard.release(estimate["total"])
+
+
+# ---------- per-solve measurement ----------
+
+def _status_kb(field: str) -> Optional[int]:
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class SolveMeter:
+    """
+    with SolveMeter() as meter: ...solve...
+    meter.info -> {"method", "solve_peak_mb", "peak_rss_mb"}.
+
+    rss_hwm only when the solve has the process to itself (process worker,
+    main thread); tracemalloc when MEMORY_TRACEMALLOC=1; otherwise nothing.
+    """
+
+    def __init__(self, exclusive: Optional[bool] = None):
+        if exclusive is None:
+            exclusive = threading.current_thread() is threading.main_thread()
+        self.exclusive = exclusive
+        self.method = "none"
+        self.info: Dict[str, Any] = {}
+        self._rss_before_kb: Optional[int] = None
+        self._own_trace = False
+
+    def __enter__(self) -> "SolveMeter":
+        if str(os.getenv("MEMORY_TRACEMALLOC", "0")).strip().lower() in ("1", "true", "yes", "on"):
+            self.method = "tracemalloc"
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._own_trace = True
+            tracemalloc.reset_peak()
+            self._traced_before = tracemalloc.get_traced_memory()[0]
+        elif self.exclusive and _reset_peak_rss():
+            self.method = "rss_hwm"
+            self._rss_before_kb = _status_kb("VmRSS:")
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self.method == "tracemalloc":
+            _, peak = tracemalloc.get_traced_memory()
+            if self._own_trace:
+                tracemalloc.stop()
+            self.info = {"method": "tracemalloc", "solve_peak_mb": round(max(0, peak - self._traced_before) / MB, 2)}
+        elif self.method == "rss_hwm":
+            hwm = _status_kb("VmHWM:")
+            if hwm is not None and self._rss_before_kb is not None:
+                self.info = {
+                    "method": "rss_hwm",
+                    "peak_rss_mb": round(hwm / 1024.0, 1),
+                    "solve_peak_mb": round(max(0, hwm - self._rss_before_kb) / 1024.0, 2),
+                }
+        if not self.info:
+            self.info = {"method": "none"}
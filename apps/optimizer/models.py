@@ -2,8 +2,8 @@
 Pydantic modelleri - Optimizer Input/Output
 """
 
-from pydantic import BaseModel
-from typing import List, Dict, Optional, Any
+from pydantic import BaseModel, model_validator
+from typing import List, Dict, Literal, Optional, Any
 
 
 class HubInfo(BaseModel):
@@ -43,6 +43,18 @@ class Parameters(BaseModel):
     cost_per_km: float = 1.0
     rental_cost: float = 200.0
     rental_capacity_kg: float = 500.0
+    # "fleet_search" (default) or "alns" (time-budgeted destroy/repair search);
+    # anything else is a 422
+    algorithm: Literal["fleet_search", "alns"] = "fleet_search"
+    # ALNS time budget in seconds (ALNS_TIME_BUDGET_SECONDS when not set)
+    time_budget_s: Optional[float] = None
+    # Fleet search stops once the plan is within this % of the lower bound
+    # (BOUND_GAP_STOP_PERCENT when not set; 0 disables)
+    gap_stop_percent: Optional[float] = None
+    # "full" (default) or "compact": station table + columnar arrays (response.py)
+    response_format: str = "full"
+    # Joined per-route polylines; off skips building them ("" / null)
+    include_polylines: bool = True
 
 
 class DistanceInfo(BaseModel):
@@ -51,6 +63,40 @@ class DistanceInfo(BaseModel):
     polyline: Optional[str] = ""
 
 
+class SparseDistanceMatrix(BaseModel):
+    """
+    Her noktanın en yakın k komşusu (yol mesafesi), CSR düzeninde:
+    ids[i] satırının komşuları ids[indices[indptr[i]:indptr[i + 1]]],
+    değerleri aynı aralıktaki distance_km / duration_minutes.
+
+    Listede olmayan çiftler koordinatlardan tahmin edilir (haversine x
+    kalibre edilmiş yol katsayısı); boyut O(n * k), tam matris O(n^2).
+    """
+    ids: List[str]
+    indptr: List[int]
+    indices: List[int]
+    distance_km: List[float]
+    duration_minutes: Optional[List[float]] = None
+    polylines: Optional[List[Optional[str]]] = None
+
+    @model_validator(mode="after")
+    def _check_layout(self) -> "SparseDistanceMatrix":
+        n, nnz = len(self.ids), len(self.indices)
+        if len(set(self.ids)) != n:
+            raise ValueError("ids tekrarlı kayıt içeriyor")
+        if len(self.indptr) != n + 1 or (self.indptr and (self.indptr[0] != 0 or self.indptr[-1] != nnz)):
+            raise ValueError("indptr uzunluğu len(ids) + 1 olmalı, 0 ile başlayıp len(indices) ile bitmeli")
+        if any(a > b for a, b in zip(self.indptr, self.indptr[1:])):
+            raise ValueError("indptr azalmayan olmalı")
+        if nnz and not 0 <= min(self.indices) <= max(self.indices) < n:
+            raise ValueError("indices değerleri 0 <= j < len(ids) olmalı")
+        for name in ("distance_km", "duration_minutes", "polylines"):
+            values = getattr(self, name)
+            if values is not None and len(values) != nnz:
+                raise ValueError(f"{name} uzunluğu len(indices) ile aynı olmalı")
+        return self
+
+
 class OptimizerInput(BaseModel):
     plan_date: str
     # Supported:
@@ -63,7 +109,18 @@ class OptimizerInput(BaseModel):
     stations: List[StationInfo]
     vehicles: List[VehicleInfo]
     parameters: Parameters
-    distance_matrix: Dict[str, DistanceInfo]
+    # Either embed the matrix, or upload it once via PUT /matrices/{digest}
+    # and reference it here (repeat plans then skip transfer + parsing).
+    distance_matrix: Dict[str, DistanceInfo] = {}
+    matrix_digest: Optional[str] = None
+    # Very large networks: k nearest neighbors per station instead of all pairs
+    sparse_matrix: Optional[SparseDistanceMatrix] = None
+
+    @model_validator(mode="after")
+    def _one_inline_matrix(self) -> "OptimizerInput":
+        if self.distance_matrix and self.sparse_matrix is not None:
+            raise ValueError("distance_matrix ve sparse_matrix birlikte gönderilemez")
+        return self
 
 
 # Output modelleri
@@ -152,3 +209,74 @@ class OptimizerOutput(BaseModel):
     unassigned: List[UnassignedCargo] = []
     algorithm_info: Dict[str, Any] = {}
     error: Optional[ErrorInfo] = None
+
+
+# Compact output (parameters.response_format = "compact")
+#
+# Stations are emitted once in `stations` (index 0 = hub); stops, cargos and
+# unassigned cargos reference them by index. Per-item lists become columns.
+
+class StationTable(BaseModel):
+    id: List[str] = []
+    name: List[str] = []
+    code: List[str] = []
+    latitude: List[float] = []
+    longitude: List[float] = []
+
+
+class CompactStops(BaseModel):
+    station: List[int] = []
+    action: List[str] = []
+    cargo_count: List[int] = []
+    weight_kg: List[float] = []
+
+
+class CompactCargos(BaseModel):
+    cargo_id: List[str] = []
+    user_id: List[str] = []
+    station: List[int] = []
+    weight_kg: List[float] = []
+    pickup_order: List[int] = []
+
+
+class CompactUsers(BaseModel):
+    user_id: List[str] = []
+    cargo_count: List[int] = []
+
+
+class CompactRoute(BaseModel):
+    vehicle_id: str
+    vehicle_name: str
+    is_rented: bool
+    route_order: int
+    total_distance_km: float
+    total_duration_minutes: float
+    distance_cost: float
+    rental_cost: float
+    total_cost: float
+    total_weight_kg: float
+    cargo_count: int
+    capacity_utilization: float
+    stops: CompactStops
+    polyline: Optional[str] = None
+    cargos: CompactCargos
+    users: CompactUsers
+
+
+class CompactUnassigned(BaseModel):
+    cargo_id: List[str] = []
+    station: List[int] = []
+    weight_kg: List[float] = []
+    reason: List[str] = []
+
+
+class CompactOptimizerOutput(BaseModel):
+    success: bool
+    problem_type: str
+    format: str = "compact"
+    summary: Optional[Summary] = None
+    stations: StationTable = StationTable()
+    routes: List[CompactRoute] = []
+    unassigned: CompactUnassigned = CompactUnassigned()
+    algorithm_info: Dict[str, Any] = {}
+    error: Optional[ErrorInfo] = None
@@ -11,9 +11,7 @@ Brute-force KULLANILMIYOR - Sezgisel yaklaşım.
 """
 
 from typing import List, Dict, Tuple, Optional, Any
-from dataclasses import dataclass
-import copy
-import itertools
+from dataclasses import dataclass, replace
 import math
 from models import (
     OptimizerInput, OptimizerOutput, Summary, RouteResult, RouteStop,
@@ -22,6 +20,57 @@ from models import (
 import random
 import uuid
 
+import numpy as np
+
+from cancellation import CancellationToken
+import bandit
+import decomposition
+from bounds import PlanBounds, default_gap_stop_percent, gap_percent
+import kernels
+from knapsack import best_fit, select_cargos
+from matrix_registry import DistanceSource, prepare_matrix, prepare_sparse
+from matrix_store import NetworkMatrixStore
+from fleet import (
+    EXHAUSTIVE_MAX_FLEETS,
+    REFINE_ATTEMPTS,
+    REFINE_ROUNDS,
+    composition_count,
+    compositions,
+    cover_fleets,
+    fleet_neighbors,
+    group_types,
+    vehicle_type,
+)
+from route_metrics import RouteMetricsCache
+from savings import DENSE_MAX_NODES, assign_vehicles, savings_routes
+from spatial import (
+    DEFAULT_ROAD_FACTOR,
+    ROAD_FACTOR_SAMPLE,
+    calibrate_road_factor,
+    configured_road_factor,
+    knn_lists,
+)
+from tracing import NULL_TRACER, traced
+
+
+EARTH_RADIUS_KM = 6371.0
+ROAD_FACTOR = DEFAULT_ROAD_FACTOR  # Kuş uçuşu -> yol mesafesi (kalibre edilemezse)
+FALLBACK_SPEED_KMH = 50.0
+LIST_LOOKUP_MAX_POINTS = 2000
+# Rows per haversine block when estimating missing pairs (bounds temporaries)
+FALLBACK_BLOCK_ROWS = 256
+
+# Candidate (k-nearest) lists used by construction and local search
+NEIGHBOR_K = 24
+TWO_OPT_NEIGHBOR_MIN_LEN = 32
+TWO_OPT_EPS = 1e-9
+
+
+def haversine_km(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Vektörel haversine (radyan girdiler)"""
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
 
 @dataclass
 class Station:
@@ -35,6 +84,8 @@ class Station:
     weight_kg: float
     cargos: List[dict]
     is_hub: bool = False
+    # Row/column in the instance distance arrays (hub = 0)
+    idx: int = -1
 
 
 @dataclass
@@ -75,13 +126,59 @@ class VRPOptimizer:
     Heuristic tabanlı çözüm (Greedy + 2-opt)
     """
     
-    def __init__(self, input_data: OptimizerInput):
+    def __init__(
+        self,
+        input_data: OptimizerInput,
+        cancel_token: Optional[CancellationToken] = None,
+        matrix: Optional[DistanceSource] = None,
+        matrix_store: Optional[NetworkMatrixStore] = None,
+        allow_decomposition: bool = True,
+        tracer: Optional[Any] = None,
+    ):
         self.input = input_data
+        # Span tracing (tracing.py); NULL_TRACER when the request is not traced.
+        self.tracer = tracer if tracer is not None else NULL_TRACER
+        # Sector sub-solves pass False so they never split again.
+        self.allow_decomposition = allow_decomposition
+        # Polled at safe points; raises SolveCancelled (caller gone / deadline).
+        self.cancel_token = cancel_token
+        # Used when the input carries no inline matrix (memory-mapped network).
+        self.matrix_store = matrix_store
         self.hub = self._create_hub_station()
         self.stations = self._create_stations()
         self.vehicles = self._create_vehicles()
-        self.distances = self._parse_distances()
+        # Interchangeable rental placeholders, shared by every fleet scenario;
+        # real rental ids are only assigned in _build_output.
+        self._rental_slots: List[Vehicle] = []
+        # Registry matrices (matrix_digest) arrive already parsed.
+        if matrix is None:
+            sparse = input_data.sparse_matrix
+            entries = len(sparse.indices) if sparse is not None else len(input_data.distance_matrix)
+            with self.tracer.span("parse_matrix", cat="prepare", entries=entries):
+                matrix = self._parse_distances()
+        self.matrix = matrix
         self.params = input_data.parameters
+
+        # O(1) id -> index; every pair is resolved once here (matrix, reverse
+        # direction or haversine) so solver loops only do array lookups.
+        self.points: List[Station] = [self.hub] + self.stations
+        self.station_index: Dict[str, int] = {}
+        for i, st in enumerate(self.points):
+            st.idx = i
+            self.station_index[st.id] = i
+        self.fallback_pairs = 0
+        # Pairs the matrix gave (either direction); None when all were given
+        self._given: Optional[np.ndarray] = None
+        self.road_factor: Dict[str, Any] = {"value": ROAD_FACTOR, "source": "default"}
+        with self.tracer.span("instance_arrays", cat="prepare", points=len(self.points)):
+            self.dist_km, self.duration_min = self._build_instance_arrays()
+        self._neighbor_lists: Optional[List[List[int]]] = None
+        self._neighbor_array: Optional[np.ndarray] = None
+        # Python lists are ~3x faster than ndarray for scalar lookups; keep
+        # them only while their memory is reasonable.
+        self._dist = self.dist_km.tolist() if len(self.points) <= LIST_LOOKUP_MAX_POINTS else self.dist_km
+        # Distance/duration per stop sequence, shared by scoring and output
+        self.route_metrics = RouteMetricsCache(self._dist, self.duration_min, self.hub.idx)
         
         # Sonuçlar
         self.routes: List[List[StopAssignment]] = []
@@ -89,6 +186,17 @@ class VRPOptimizer:
         self.unassigned: List[Station] = []
         # "iterations" artık sadece seçilen (best) çözüm için raporlanır.
         self.iterations = 0
+        # Per-solve dedup of candidate constructions (see _skip_construction)
+        self._construction_keys: set = set()
+        self._solution_fingerprints: set = set()
+        self.dedup_stats: Dict[str, int] = {"candidates": 0, "memo_hits": 0, "duplicate_solutions": 0}
+        # Limited strategy scheduler (created by _search_limited)
+        self.strategy_bandit: Optional[bandit.StrategyBandit] = None
+        # Lower bounds (built on first use) and gap-based early stop
+        self._plan_bounds: Optional[PlanBounds] = None
+        gap_stop = self.params.gap_stop_percent
+        self.gap_stop_percent = max(0.0, float(gap_stop)) if gap_stop is not None else default_gap_stop_percent()
+        self.early_stop: Optional[Dict[str, Any]] = None
         
     def _create_hub_station(self) -> Station:
         """Hub'u Station objesine çevir"""
@@ -135,79 +243,138 @@ class VRPOptimizer:
             for v in self.input.vehicles
         ]
     
-    def _parse_distances(self) -> Dict[str, dict]:
-        """Mesafe matrisini parse et"""
-        distances = {}
-        for key, info in self.input.distance_matrix.items():
-            distances[key] = {
-                "distance_km": info.distance_km,
-                "duration_minutes": info.duration_minutes,
-                "polyline": info.polyline or ""
-            }
-        return distances
+    def _parse_distances(self) -> DistanceSource:
+        """Mesafe matrisini parse et (inline matris yoksa ağ matrisinden)"""
+        if self.input.sparse_matrix is not None:
+            return prepare_sparse(self.input.sparse_matrix)
+        known_ids = [self.hub.id] + [s.id for s in self.stations]
+        if not self.input.distance_matrix and self.matrix_store is not None:
+            resolved = self.matrix_store.resolve(known_ids)
+            if resolved is not None:
+                return resolved
+        return prepare_matrix(self.input.distance_matrix, known_ids=known_ids)
+
+    def _build_instance_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Dense distance/duration arrays over self.points.
+
+        Resolution order per pair (same as the old per-lookup fallback):
+        matrix (from->to), matrix reverse (to->from), haversine x road factor.
+        The road factor is calibrated on the given pairs (ROAD_FACTOR=auto).
+        Durations without a matrix value assume 50 km/h.
+        """
+        # Instance index -> matrix index
+        m_idx = np.array([self.matrix.index.get(p.id, -1) for p in self.points], dtype=np.int64)
+        dist, dur, known = self.matrix.submatrix(m_idx)
+
+        # Reverse direction where only to->from is known (in place: the
+        # cells read are never written)
+        fwd_known = ~np.isnan(dist)
+        use_rev = ~fwd_known & fwd_known.T
+        np.copyto(dist, dist.T, where=use_rev)
+        np.copyto(dur, dur.T, where=use_rev)
+        known |= known.T
+        np.fill_diagonal(known, True)
+        if not known.all():
+            self._given = known
+
+        n = len(self.points)
+        missing = np.isnan(dist)
+        np.fill_diagonal(missing, False)
+        self.fallback_pairs = int(missing.sum())
+        if self.fallback_pairs:
+            lat = np.radians(np.array([p.lat for p in self.points], dtype=np.float64))
+            lon = np.radians(np.array([p.lon for p in self.points], dtype=np.float64))
+            factor = self._road_factor(dist, lat, lon)
+            # Row blocks: sparse inputs leave almost every pair to the estimate
+            for r0 in range(0, n, FALLBACK_BLOCK_ROWS):
+                r1 = min(n, r0 + FALLBACK_BLOCK_ROWS)
+                if missing[r0:r1].any():
+                    est = haversine_km(lat[r0:r1, None], lon[r0:r1, None], lat[None, :], lon[None, :]) * factor
+                    np.copyto(dist[r0:r1], est, where=missing[r0:r1])
+
+        np.fill_diagonal(dist, 0.0)
+        no_dur = np.isnan(dur)
+        np.divide(dist, FALLBACK_SPEED_KMH, out=dur, where=no_dur)
+        np.multiply(dur, 60, out=dur, where=no_dur)
+        np.fill_diagonal(dur, 0.0)
+        return dist, dur
+
+    def _road_factor(self, dist: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> float:
+        """Haversine multiplier for missing pairs: ROAD_FACTOR, else fitted on given pairs."""
+        fixed = configured_road_factor()
+        if fixed is not None:
+            self.road_factor = {"value": fixed, "source": "env"}
+            return fixed
+        rows, cols = np.nonzero(~np.isnan(dist))
+        off = rows != cols
+        rows, cols = rows[off], cols[off]
+        step = max(1, rows.size // ROAD_FACTOR_SAMPLE)
+        rows, cols = rows[::step], cols[::step]
+        straight = haversine_km(lat[rows], lon[rows], lat[cols], lon[cols])
+        factor = calibrate_road_factor(dist[rows, cols], straight)
+        if factor is None:
+            return ROAD_FACTOR
+        self.road_factor = {"value": round(factor, 4), "source": "calibrated", "pairs": int(rows.size)}
+        return factor
+
+    @property
+    def neighbor_lists(self) -> List[List[int]]:
+        """
+        k nearest points (by matrix distance) per point index, built lazily.
+        Pairs the matrix gave come before estimated ones, so with a sparse
+        k-nearest input construction and local search move along its edges.
+        """
+        if self._neighbor_lists is None:
+            lat = np.array([p.lat for p in self.points], dtype=np.float64)
+            lon = np.array([p.lon for p in self.points], dtype=np.float64)
+            self._neighbor_lists = knn_lists(self.dist_km, lat, lon, NEIGHBOR_K, given=self._given).tolist()
+        return self._neighbor_lists
+
+    @property
+    def _kernel_dist(self) -> Any:
+        """Distance matrix in the form the active kernel backend indexes."""
+        return self.dist_km if kernels.compiled() else self._dist
+
+    @property
+    def _neighbor_rows(self) -> Any:
+        """neighbor_lists as an int64 array for compiled kernels, else the lists."""
+        if not kernels.compiled():
+            return self.neighbor_lists
+        if self._neighbor_array is None:
+            self._neighbor_array = np.asarray(self.neighbor_lists, dtype=np.int64)
+        return self._neighbor_array
+
+    def _index_of(self, station_id: str) -> int:
+        try:
+            return self.station_index[station_id]
+        except KeyError:
+            raise ValueError(f"Bilinmeyen istasyon id: {station_id}") from None
     
     def get_distance(self, from_id: str, to_id: str) -> float:
         """İki nokta arası mesafe (km)"""
-        if from_id == to_id:
-            return 0
-        key = f"{from_id}_{to_id}"
-        if key in self.distances:
-            return self.distances[key]["distance_km"]
-        # Ters yön dene
-        key_rev = f"{to_id}_{from_id}"
-        if key_rev in self.distances:
-            return self.distances[key_rev]["distance_km"]
-        # Fallback: Haversine
-        return self._haversine_fallback(from_id, to_id)
+        return self._dist[self._index_of(from_id)][self._index_of(to_id)]
     
     def get_duration(self, from_id: str, to_id: str) -> float:
         """İki nokta arası süre (dakika)"""
-        key = f"{from_id}_{to_id}"
-        if key in self.distances:
-            return self.distances[key]["duration_minutes"]
-        key_rev = f"{to_id}_{from_id}"
-        if key_rev in self.distances:
-            return self.distances[key_rev]["duration_minutes"]
-        return self.get_distance(from_id, to_id) / 50 * 60  # 50 km/h
+        return float(self.duration_min[self._index_of(from_id), self._index_of(to_id)])
     
     def get_polyline(self, from_id: str, to_id: str) -> str:
         """İki nokta arası polyline"""
-        key = f"{from_id}_{to_id}"
-        if key in self.distances:
-            return self.distances[key].get("polyline", "")
-        return ""
-    
-    def _haversine_fallback(self, from_id: str, to_id: str) -> float:
-        """Haversine mesafe hesabı (fallback)"""
-        import math
-        
-        # ID'den koordinat bul
-        from_station = self._find_station(from_id)
-        to_station = self._find_station(to_id)
-        
-        if not from_station or not to_station:
-            return 100  # Default değer
-        
-        R = 6371  # km
-        lat1, lon1 = math.radians(from_station.lat), math.radians(from_station.lon)
-        lat2, lon2 = math.radians(to_station.lat), math.radians(to_station.lon)
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        return R * c * 1.3  # Yol faktörü
+        i = self.matrix.index.get(from_id)
+        j = self.matrix.index.get(to_id)
+        if i is None or j is None:
+            return ""
+        return self.matrix.polylines.get((i, j), "")
     
+    def _check_cancelled(self) -> None:
+        if self.cancel_token is not None:
+            self.cancel_token.check()
+
     def _find_station(self, station_id: str) -> Optional[Station]:
         """ID ile istasyon bul"""
-        if station_id == self.hub.id:
-            return self.hub
-        for s in self.stations:
-            if s.id == station_id:
-                return s
-        return None
+        i = self.station_index.get(station_id)
+        return self.points[i] if i is not None else None
     
     def calculate_route_distance(self, route: List[StopAssignment]) -> float:
         """Rota toplam mesafesi (istasyonlar -> Hub).
@@ -218,13 +385,7 @@ class VRPOptimizer:
         """
         if not route:
             return 0
-
-        total = 0
-        for i in range(len(route) - 1):
-            total += self.get_distance(route[i].station.id, route[i + 1].station.id)
-        total += self.get_distance(route[-1].station.id, self.hub.id)
-        
-        return total
+        return self.route_metrics.distance(route)
     
     def calculate_route_weight(self, route: List[StopAssignment]) -> float:
         """Rota toplam ağırlığı"""
@@ -232,14 +393,24 @@ class VRPOptimizer:
     
     def calculate_route_cost(self, route: List[StopAssignment], vehicle: Vehicle) -> float:
         """Rota maliyeti (mesafe + kiralama)"""
-        distance = self.calculate_route_distance(route)
+        return self._route_cost_from_distance(self.calculate_route_distance(route), vehicle)
+
+    def _route_cost_from_distance(self, distance: float, vehicle: Vehicle) -> float:
         distance_cost = distance * self.params.cost_per_km
         rental_cost = vehicle.rental_cost if vehicle.is_rented else 0
         return distance_cost + rental_cost
 
     def _clone_stations(self) -> List[Station]:
-        """Deep copy stations because solving mutates cargo lists in-place."""
-        return copy.deepcopy(self.stations)
+        """
+        Copy stations because solving mutates cargo lists in-place. Cargo dicts
+        themselves are never modified, so they are shared (a deepcopy per
+        attempt used to dominate peak memory on large inputs).
+        """
+        return self._copy_stations(self.stations)
+
+    @staticmethod
+    def _copy_stations(stations: List[Station]) -> List[Station]:
+        return [replace(st, cargos=list(st.cargos)) for st in stations]
 
     def _refresh_station_totals(self, st: Station) -> None:
         st.cargo_count = len(st.cargos)
@@ -268,13 +439,28 @@ class VRPOptimizer:
             return "max_weight"
         return "max_count"
 
-    def _build_rental_vehicle(self, idx: int) -> Vehicle:
+    def _rental_slot(self, idx: int) -> Vehicle:
+        """
+        Rental placeholder #idx. Rentals are fungible, so scenarios share
+        these instead of creating a new vehicle per fleet size.
+        """
+        while len(self._rental_slots) <= idx:
+            self._rental_slots.append(Vehicle(
+                id=f"rental_slot_{len(self._rental_slots)}",
+                name="Kiralık Araç",
+                capacity_kg=self.params.rental_capacity_kg,
+                is_rented=True,
+                rental_cost=self.params.rental_cost,
+            ))
+        return self._rental_slots[idx]
+
+    def _materialize_rental(self, vehicle: Vehicle, number: int) -> Vehicle:
         return Vehicle(
             id=f"rental_{uuid.uuid4().hex}",
-            name=f"Kiralık Araç {idx}",
-            capacity_kg=self.params.rental_capacity_kg,
+            name=f"Kiralık Araç {number}",
+            capacity_kg=vehicle.capacity_kg,
             is_rented=True,
-            rental_cost=self.params.rental_cost,
+            rental_cost=vehicle.rental_cost,
         )
 
     def _pick_farthest_seeds(
@@ -289,30 +475,33 @@ class VRPOptimizer:
         if k >= len(stations):
             return stations[:]
 
+        d = self._dist
+        hub_idx = self.hub.idx
+
         # First seed: among top-3 farthest from hub (random tie-break)
         scored = sorted(
             stations,
-            key=lambda s: self.get_distance(s.id, self.hub.id),
+            key=lambda s: d[s.idx][hub_idx],
             reverse=True,
         )
         top = scored[: min(3, len(scored))]
         seeds = [rng.choice(top)]
 
-        remaining = [s for s in stations if s.id != seeds[0].id]
-        while len(seeds) < k and remaining:
+        # Distance of every station to its nearest seed, updated per new
+        # seed in one vectorized step (O(n) per seed instead of O(n * k)).
+        rows = np.array([s.idx for s in stations], dtype=np.int64)
+        nearest = self.dist_km[rows, seeds[0].idx].copy()
+        nearest[[i for i, s in enumerate(stations) if s.id == seeds[0].id]] = -np.inf
+        while len(seeds) < k:
             # Pick station maximizing distance to nearest seed
-            best_score = -1.0
-            best: List[Station] = []
-            for st in remaining:
-                d = min(self.get_distance(st.id, sd.id) for sd in seeds)
-                if d > best_score + 1e-9:
-                    best_score = d
-                    best = [st]
-                elif abs(d - best_score) <= 1e-9:
-                    best.append(st)
-            chosen = rng.choice(best) if best else remaining[0]
+            best_score = float(nearest.max())
+            if best_score == -np.inf:
+                break
+            tied = np.nonzero(nearest >= best_score - 1e-9)[0]
+            chosen = stations[int(rng.choice(tied.tolist()))]
             seeds.append(chosen)
-            remaining = [s for s in remaining if s.id != chosen.id]
+            nearest = np.minimum(nearest, self.dist_km[rows, chosen.idx])
+            nearest[[i for i in tied.tolist() if stations[i].id == chosen.id]] = -np.inf
         return seeds
 
     def _clusters_by_seeds(
@@ -325,19 +514,18 @@ class VRPOptimizer:
         if not seeds:
             return []
         clusters: Dict[str, List[Station]] = {s.id: [] for s in seeds}
+        if not stations:
+            return [clusters[s.id] for s in seeds]
 
-        for st in stations:
+        rows = np.array([s.idx for s in stations], dtype=np.int64)
+        cols = np.array([s.idx for s in seeds], dtype=np.int64)
+        to_seed = self.dist_km[np.ix_(rows, cols)]
+        tie_mask = to_seed <= to_seed.min(axis=1, keepdims=True) + 1e-9
+        seed_ids = [s.id for s in seeds]
+
+        for i, st in enumerate(stations):
             # Assign to nearest seed (tie-break random)
-            best_seed_id: Optional[str] = None
-            best_dist = float("inf")
-            tied: List[str] = []
-            for sd in seeds:
-                d = self.get_distance(st.id, sd.id)
-                if d < best_dist - 1e-9:
-                    best_dist = d
-                    tied = [sd.id]
-                elif abs(d - best_dist) <= 1e-9:
-                    tied.append(sd.id)
+            tied = [seed_ids[j] for j in np.nonzero(tie_mask[i])[0].tolist()]
             best_seed_id = rng.choice(tied) if tied else seeds[0].id
             clusters[best_seed_id].append(st)
 
@@ -358,11 +546,174 @@ class VRPOptimizer:
                 )
             )
         
+        with self.tracer.span("solve", problem_type=self.input.problem_type, stations=len(self.stations)):
+            if self.allow_decomposition and decomposition.should_decompose(self):
+                result = decomposition.solve_decomposed(self)
+            elif self._use_alns():
+                result = self._solve_alns()
+            elif self.input.problem_type == "unlimited_vehicles":
+                result = self._solve_unlimited()
+            else:
+                result = self._solve_limited()
+
+        # Pairs missing from the matrix in both directions (haversine estimate)
+        result.algorithm_info["distance_fallback_pairs"] = self.fallback_pairs
+        if self.fallback_pairs:
+            result.algorithm_info["road_factor"] = self.road_factor
+        if self.dedup_stats["candidates"]:
+            result.algorithm_info["candidate_dedup"] = self._dedup_info()
+        result.algorithm_info["route_metrics_cache"] = self.route_metrics.stats()
+        if self.strategy_bandit is not None:
+            result.algorithm_info["strategy_allocation"] = self.strategy_bandit.report()
+        if result.success and result.summary is not None:
+            with self.tracer.span("bounds"):
+                result.algorithm_info.update(self._bound_info(result))
+        return result
+
+    @property
+    def plan_bounds(self) -> PlanBounds:
+        if self._plan_bounds is None:
+            active = [st for st in self.stations if st.cargos]
+            self._plan_bounds = PlanBounds(
+                self.dist_km,
+                self.hub.idx,
+                [st.idx for st in active],
+                [float(c.get("weight_kg", 0) or 0) for st in active for c in st.cargos],
+                cost_per_km=self.params.cost_per_km,
+                rental_cost=self.params.rental_cost,
+                rental_capacity_kg=self.params.rental_capacity_kg,
+            )
+        return self._plan_bounds
+
+    def _lower_bound(self, served_idx: Optional[List[int]] = None) -> float:
+        """Cost lower bound: every station (unlimited) or the served ones (limited)."""
+        pb = self.plan_bounds
         if self.input.problem_type == "unlimited_vehicles":
-            return self._solve_unlimited()
+            owned = self._total_capacity([v for v in self.vehicles if not v.is_rented])
+            return pb.unlimited_cost_bound(owned)
+        return pb.served_cost_bound(served_idx or [])
+
+    def _payload_bound(self, objective: str) -> float:
+        owned = self._total_capacity([v for v in self.vehicles if not v.is_rented])
+        return self.plan_bounds.payload_bound(objective, owned)
+
+    def _gap_reached(self, best: Optional[CandidateSolution], objective: Optional[str] = None) -> bool:
+        """
+        True once `best` is provably within gap_stop_percent of optimal. Only
+        plans carrying every cargo qualify: then the payload is optimal and
+        the routing bound covers every station (limited plans that leave
+        cargos behind could still improve by serving a different subset).
+        """
+        if best is None or self.gap_stop_percent <= 0 or best.unassigned:
+            return False
+        if objective is None:
+            lower_bound = self._lower_bound()
         else:
-            return self._solve_limited()
+            lower_bound = self._lower_bound([s.station.idx for route in best.routes for s in route])
+        gap = gap_percent(best.total_cost, lower_bound)
+        if gap > self.gap_stop_percent:
+            return False
+        self.early_stop = {
+            "cost": round(best.total_cost, 4),
+            "gap_percent": gap,
+            "threshold_percent": self.gap_stop_percent,
+            "candidates_built": self.dedup_stats["candidates"],
+        }
+        return True
+
+    def _bound_info(self, result: OptimizerOutput) -> Dict[str, Any]:
+        """lower_bound / gap_percent of the returned plan (+ payload bound for limited)."""
+        cost = float(result.summary.total_cost)
+        extra: Dict[str, Any] = {}
+        if self.input.problem_type == "unlimited_vehicles":
+            lower_bound = self._lower_bound()
+            owned = self._total_capacity([v for v in self.vehicles if not v.is_rented])
+            extra["min_rentals"] = self.plan_bounds.min_rentals(owned)
+        else:
+            objective = self._get_limited_objective()
+            served = [
+                self.station_index[s.station_id]
+                for r in result.routes
+                for s in r.route_sequence
+                if not s.is_hub and s.station_id in self.station_index
+            ]
+            lower_bound = self._lower_bound(served)
+            payload_ub = self._payload_bound(objective)
+            achieved = (
+                float(result.summary.total_weight_kg) if objective == "max_weight"
+                else float(result.summary.total_cargos)
+            )
+            extra["payload_upper_bound"] = round(payload_ub, 4)
+            extra["payload_gap_percent"] = round(max(0.0, (payload_ub - achieved) / payload_ub * 100.0), 4) if payload_ub > 0 else 0.0
+        if self.early_stop is not None:
+            extra["early_stop"] = self.early_stop
+        report = self.plan_bounds.report(cost, lower_bound, extra)
+        return {
+            "lower_bound": report.pop("lower_bound"),
+            "gap_percent": report.pop("gap_percent"),
+            "bounds": report,
+        }
     
+    def search(self) -> Optional[CandidateSolution]:
+        """
+        Best internal candidate for the problem type, without building the
+        output (used by sector sub-solves in decomposition mode).
+        """
+        if not self.stations:
+            return None
+        if self._use_alns():
+            return self._search_alns()
+        if self.input.problem_type == "unlimited_vehicles":
+            return self._search_unlimited()
+        return self._search_limited(self._get_limited_objective())
+
+    def _use_alns(self) -> bool:
+        return self.params.algorithm == "alns"
+
+    def _search_alns(self) -> Optional[CandidateSolution]:
+        from alns import ALNS
+
+        with self.tracer.span("alns", time_budget_s=self.params.time_budget_s) as span:
+            best = ALNS(self, time_budget_s=self.params.time_budget_s).run()
+            if best is not None:
+                span.set(iterations=best.meta["alns"]["iterations"], cost=round(best.total_cost, 2))
+        return best
+
+    def _solve_alns(self) -> OptimizerOutput:
+        """Zaman bütçeli ALNS (destroy/repair + simulated annealing)"""
+        unlimited = self.input.problem_type == "unlimited_vehicles"
+        if not unlimited and not any(not v.is_rented for v in self.vehicles):
+            return OptimizerOutput(
+                success=False,
+                problem_type=self.input.problem_type,
+                error=ErrorInfo(code="NO_VEHICLES", message="Araç bulunamadı"),
+            )
+
+        best = self._search_alns()
+        if best is None:
+            return OptimizerOutput(
+                success=False,
+                problem_type=self.input.problem_type,
+                error=ErrorInfo(
+                    code="INFEASIBLE_SOLUTION",
+                    message="Uygun çözüm bulunamadı (kapasite yetersiz veya kargo bölünemiyor)",
+                ),
+            )
+
+        self.unassigned = best.unassigned
+        self.iterations = best.meta["alns"]["iterations"]
+        return self._build_output(
+            best.routes,
+            best.vehicles,
+            algorithm_info={
+                "name": "ALNS (random/worst/shaw/route destroy + greedy/regret repair) + SA + 2-opt",
+                "iterations": self.iterations,
+                "execution_time_ms": 0,
+                "improvement_percentage": 0,
+                "selected": best.meta,
+            },
+        )
+
     def _solve_unlimited(self) -> OptimizerOutput:
         """
         Sınırsız araç problemi:
@@ -370,6 +721,33 @@ class VRPOptimizer:
         - Gerekirse araç kirala
         - Minimum maliyet
         """
+        best = self._search_unlimited()
+        if best is None:
+            return OptimizerOutput(
+                success=False,
+                problem_type=self.input.problem_type,
+                error=ErrorInfo(
+                    code="INFEASIBLE_SOLUTION",
+                    message="Uygun çözüm bulunamadı (kapasite yetersiz veya kargo bölünemiyor)",
+                ),
+            )
+
+        # Build final output from best candidate
+        self.unassigned = best.unassigned
+        self.iterations = best.two_opt_iterations
+        return self._build_output(
+            best.routes,
+            best.vehicles,
+            algorithm_info={
+                "name": "Fleet Search (owned+rental) + clustering/binpack + 2-opt",
+                "iterations": best.two_opt_iterations,
+                "execution_time_ms": 0,
+                "improvement_percentage": 0,
+                "selected": best.meta,
+            },
+        )
+
+    def _search_unlimited(self) -> Optional[CandidateSolution]:
         # Fleet search: owned subset + optional extra rentals (cost comparison)
         base_stations = self._clone_stations()
         for st in base_stations:
@@ -378,97 +756,164 @@ class VRPOptimizer:
         total_weight = self._total_remaining_weight(base_stations)
 
         owned_vehicles = [v for v in self.vehicles if not v.is_rented]
+        # Identical vehicles are interchangeable: enumerate type counts
+        groups = group_types(owned_vehicles)
+        large_fleet = composition_count(groups) > EXHAUSTIVE_MAX_FLEETS
         if not owned_vehicles:
             # No owned vehicles - rely on rentals only
-            owned_subsets = [()]
+            owned_subsets = [[]]
+        elif not large_fleet:
+            # Small fleets (demo: 3 vehicles): every composition
+            owned_subsets = compositions(groups)
         else:
-            # Consider all non-empty subsets (small N in project: 3 vehicles)
-            owned_subsets = []
-            for r in range(1, len(owned_vehicles) + 1):
-                owned_subsets.extend(itertools.combinations(owned_vehicles, r))
+            # Large depots: a few knapsack-selected fleets, refined below
+            owned_subsets = cover_fleets(owned_vehicles, total_weight)
 
         # Heuristic limits (keep runtime bounded)
         max_extra_rentals = 100  # Sınırsız araç problemi için yüksek limit
-        attempts_per_scenario = 8
+        attempts_per_scenario = 4
 
         best: Optional[CandidateSolution] = None
+        best_fleet: Optional[List[Vehicle]] = None
 
         for owned_subset in owned_subsets:
-            owned_subset_list = list(owned_subset)
-            owned_capacity = self._total_capacity(owned_subset_list)
-            shortfall = max(0.0, total_weight - owned_capacity)
-            min_needed_rentals = int(math.ceil(shortfall / float(self.params.rental_capacity_kg))) if shortfall > 0 else 0
-
-            for extra_rentals in range(0, max_extra_rentals + 1):
-                rental_count = min_needed_rentals + extra_rentals
-                vehicles_pool: List[Vehicle] = owned_subset_list[:] + [
-                    self._build_rental_vehicle(i + 1) for i in range(rental_count)
-                ]
+            if self._gap_reached(best):
+                break
+            best, best_fleet = self._search_unlimited_fleet(
+                owned_subset, base_stations, total_weight,
+                attempts_per_scenario, max_extra_rentals, best, best_fleet,
+            )
 
-                # Run multiple randomized candidates for this fleet size
-                for attempt in range(attempts_per_scenario):
-                    rng = random.Random(
-                        hash((self.input.plan_date, "unlimited", len(owned_subset_list), rental_count, attempt))
+        if large_fleet and best_fleet is not None:
+            for _ in range(REFINE_ROUNDS):
+                improved = False
+                for fleet in fleet_neighbors(best_fleet, owned_vehicles):
+                    if self._gap_reached(best):
+                        break
+                    cand, cand_fleet = self._search_unlimited_fleet(
+                        fleet, base_stations, total_weight, REFINE_ATTEMPTS, 0, best, best_fleet,
                     )
+                    if cand is not best:
+                        best, best_fleet, improved = cand, cand_fleet, True
+                if not improved:
+                    break
 
-                    candidate = self._build_candidate_unlimited(
-                        vehicles_pool=vehicles_pool,
-                        base_stations=base_stations,
-                        rng=rng,
+        return best
+
+    def _better_unlimited(self, candidate: CandidateSolution, best: Optional[CandidateSolution]) -> bool:
+        """Minimize total cost; tie-break: fewer rented, fewer vehicles used"""
+        if best is None:
+            return True
+        if candidate.total_cost < best.total_cost - 1e-6:
+            return True
+        if abs(candidate.total_cost - best.total_cost) <= 1e-6:
+            cand_rented = sum(1 for v in candidate.vehicles if v.is_rented)
+            best_rented = sum(1 for v in best.vehicles if v.is_rented)
+            if cand_rented < best_rented:
+                return True
+            if cand_rented == best_rented and len(candidate.vehicles) < len(best.vehicles):
+                return True
+        return False
+
+    def _search_unlimited_fleet(
+        self,
+        owned_subset_list: List[Vehicle],
+        base_stations: List[Station],
+        total_weight: float,
+        attempts: int,
+        max_extra_rentals: int,
+        best: Optional[CandidateSolution],
+        best_fleet: Optional[List[Vehicle]],
+    ) -> Tuple[Optional[CandidateSolution], Optional[List[Vehicle]]]:
+        """Try one owned fleet with increasing rental counts; returns the new best."""
+        owned_capacity = self._total_capacity(owned_subset_list)
+        shortfall = max(0.0, total_weight - owned_capacity)
+        min_needed_rentals = int(math.ceil(shortfall / float(self.params.rental_capacity_kg))) if shortfall > 0 else 0
+
+        for extra_rentals in range(0, max_extra_rentals + 1):
+            rental_count = min_needed_rentals + extra_rentals
+            # Rental fees alone already exceed the best plan: more rentals
+            # (or this fleet at all) cannot win.
+            if best is not None and rental_count > 0 and rental_count * self.params.rental_cost >= best.total_cost - 1e-6:
+                break
+            if self._gap_reached(best):
+                break
+            vehicles_pool: List[Vehicle] = owned_subset_list[:] + [
+                self._rental_slot(i) for i in range(rental_count)
+            ]
+
+            with self.tracer.span("fleet_scenario", owned=len(owned_subset_list), rentals=rental_count):
+                # Savings construction once per fleet, then randomized candidates
+                candidate = self._build_candidate_savings(vehicles_pool, base_stations)
+                if candidate is not None and not candidate.unassigned and self._better_unlimited(candidate, best):
+                    best = candidate
+                    best_fleet = owned_subset_list
+
+                for attempt in range(attempts):
+                    self._check_cancelled()
+                    if self._gap_reached(best):
+                        break
+                    rng = random.Random(
+                        hash((self.input.plan_date, "unlimited", len(owned_subset_list), rental_count, attempt))
                     )
 
-                    if candidate is None:
-                        continue
+                    with self.tracer.span("attempt", attempt=attempt) as span:
+                        candidate = self._build_candidate_unlimited(
+                            vehicles_pool=vehicles_pool,
+                            base_stations=base_stations,
+                            rng=rng,
+                        )
+                        improved = candidate is not None and self._better_unlimited(candidate, best)
+                        span.set(improved=improved)
 
-                    if best is None:
+                    if improved:
                         best = candidate
-                        continue
+                        best_fleet = owned_subset_list
 
-                    # Minimize total cost; tie-break: fewer rented, fewer vehicles used
-                    if candidate.total_cost < best.total_cost - 1e-6:
-                        best = candidate
-                    elif abs(candidate.total_cost - best.total_cost) <= 1e-6:
-                        cand_rented = sum(1 for v in candidate.vehicles if v.is_rented)
-                        best_rented = sum(1 for v in best.vehicles if v.is_rented)
-                        if cand_rented < best_rented:
-                            best = candidate
-                        elif cand_rented == best_rented and len(candidate.vehicles) < len(best.vehicles):
-                            best = candidate
+        return best, best_fleet
+    
+    def _solve_limited(self) -> OptimizerOutput:
+        """
+        Belirli araç problemi:
+        - Mevcut araçlarla çalış
+        - Minimum maliyet + maksimum kargo
+        - Sığmayan kargolar unassigned
+        """
+        objective = self._get_limited_objective()
+
+        if not any(not v.is_rented for v in self.vehicles):
+            return OptimizerOutput(
+                success=False,
+                problem_type=self.input.problem_type,
+                error=ErrorInfo(code="NO_VEHICLES", message="Araç bulunamadı"),
+            )
 
+        best = self._search_limited(objective)
         if best is None:
             return OptimizerOutput(
                 success=False,
                 problem_type=self.input.problem_type,
                 error=ErrorInfo(
                     code="INFEASIBLE_SOLUTION",
-                    message="Uygun çözüm bulunamadı (kapasite yetersiz veya kargo bölünemiyor)",
+                    message="Uygun çözüm bulunamadı",
                 ),
             )
 
-        # Build final output from best candidate
         self.unassigned = best.unassigned
         self.iterations = best.two_opt_iterations
         return self._build_output(
             best.routes,
             best.vehicles,
             algorithm_info={
-                "name": "Fleet Search (owned+rental) + clustering/binpack + 2-opt",
+                "name": f"Fleet Search (subset:{objective}) + clustering/binpack/pack + 2-opt",
                 "iterations": best.two_opt_iterations,
                 "execution_time_ms": 0,
                 "improvement_percentage": 0,
                 "selected": best.meta,
             },
         )
-    
-    def _solve_limited(self) -> OptimizerOutput:
-        """
-        Belirli araç problemi:
-        - Mevcut araçlarla çalış
-        - Minimum maliyet + maksimum kargo
-        - Sığmayan kargolar unassigned
-        """
-        objective = self._get_limited_objective()
 
+    def _search_limited(self, objective: str) -> Optional[CandidateSolution]:
         # Limited vehicles: choose subset of owned vehicles (1/2/3) by
         # primary objective: maximize assigned cargos/weight, secondary: minimize cost.
         base_stations = self._clone_stations()
@@ -477,90 +922,168 @@ class VRPOptimizer:
 
         owned_vehicles = sorted([v for v in self.vehicles if not v.is_rented], key=lambda v: v.capacity_kg, reverse=True)
         if not owned_vehicles:
-            return OptimizerOutput(
-                success=False,
-                problem_type=self.input.problem_type,
-                error=ErrorInfo(code="NO_VEHICLES", message="Araç bulunamadı"),
-            )
+            return None
 
-        attempts_per_scenario = 6
+        groups = group_types(owned_vehicles)
+        large_fleet = composition_count(groups) > EXHAUSTIVE_MAX_FLEETS
+        if not large_fleet:
+            fleets = compositions(groups)
+        else:
+            # Smallest fleets that cover the load, plus the whole fleet
+            # (maximum payload when the load does not fit).
+            total_weight = self._total_remaining_weight(base_stations)
+            fleets = cover_fleets(owned_vehicles, total_weight)
+            if not any(len(f) == len(owned_vehicles) for f in fleets):
+                fleets.append(list(owned_vehicles))
+
+        attempts_per_scenario = 3
         best: Optional[CandidateSolution] = None
+        best_fleet: Optional[List[Vehicle]] = None
+
+        if bandit.bandit_mode() == "thompson":
+            bucket = bandit.size_bucket(
+                str(self.input.problem_type), objective, sum(1 for st in base_stations if st.cargos)
+            )
+            self.strategy_bandit = bandit.StrategyBandit(bandit.load_priors(bucket), bucket=bucket)
+
+        for vehicles_pool in fleets:
+            if self._gap_reached(best, objective):
+                break
+            best, best_fleet = self._search_limited_fleet(
+                vehicles_pool, base_stations, objective, attempts_per_scenario, best, best_fleet,
+            )
+
+        if large_fleet and best_fleet is not None:
+            for _ in range(REFINE_ROUNDS):
+                improved = False
+                for fleet in fleet_neighbors(best_fleet, owned_vehicles):
+                    if self._gap_reached(best, objective):
+                        break
+                    cand, cand_fleet = self._search_limited_fleet(
+                        fleet, base_stations, objective, REFINE_ATTEMPTS, best, best_fleet,
+                    )
+                    if cand is not best:
+                        best, best_fleet, improved = cand, cand_fleet, True
+                if not improved:
+                    break
+
+        if self.strategy_bandit is not None:
+            bandit.save_priors(self.strategy_bandit)
+        return best
 
-        for r in range(1, len(owned_vehicles) + 1):
-            for subset in itertools.combinations(owned_vehicles, r):
-                vehicles_pool = list(subset)
-                for attempt in range(attempts_per_scenario):
-                    rng = random.Random(hash((self.input.plan_date, "limited", objective, r, attempt)))
+    def _search_limited_fleet(
+        self,
+        vehicles_pool: List[Vehicle],
+        base_stations: List[Station],
+        objective: str,
+        attempts: int,
+        best: Optional[CandidateSolution],
+        best_fleet: Optional[List[Vehicle]],
+    ) -> Tuple[Optional[CandidateSolution], Optional[List[Vehicle]]]:
+        """Try one owned fleet; returns the new best."""
+        with self.tracer.span("fleet_scenario", owned=len(vehicles_pool), objective=objective):
+            candidate = self._build_candidate_savings(vehicles_pool, base_stations, objective)
+            if candidate is not None and self._better_limited(candidate, best, objective):
+                best = candidate
+                best_fleet = vehicles_pool
+
+            r = len(vehicles_pool)
+            for attempt in range(attempts):
+                self._check_cancelled()
+                if self._gap_reached(best, objective):
+                    break
+                rng = random.Random(hash((self.input.plan_date, "limited", objective, r, attempt)))
+                strategy = self._choose_limited_strategy(rng, vehicles_pool, objective)
+                with self.tracer.span("attempt", attempt=attempt, strategy=strategy) as span:
                     candidate = self._build_candidate_limited(
                         vehicles_pool=vehicles_pool,
                         base_stations=base_stations,
                         rng=rng,
                         objective=objective,
+                        strategy=strategy,
                     )
-                    if candidate is None:
-                        continue
-
-                    if best is None:
-                        best = candidate
-                        continue
-
-                    # Objective-specific lexicographic compare:
-                    # 1) Maximize payload (count or weight)
-                    # 2) Minimize cost
-                    # 3) Tie-breakers: other payload metric, fewer vehicles
-                    if objective == "max_weight":
-                        if candidate.assigned_weight_kg > best.assigned_weight_kg + 1e-6:
-                            best = candidate
-                        elif abs(candidate.assigned_weight_kg - best.assigned_weight_kg) <= 1e-6:
-                            if candidate.total_cost < best.total_cost - 1e-6:
-                                best = candidate
-                            elif abs(candidate.total_cost - best.total_cost) <= 1e-6:
-                                if candidate.assigned_cargo_count > best.assigned_cargo_count:
-                                    best = candidate
-                                elif (
-                                    candidate.assigned_cargo_count == best.assigned_cargo_count
-                                    and len(candidate.vehicles) < len(best.vehicles)
-                                ):
-                                    best = candidate
-                    else:
-                        if candidate.assigned_cargo_count > best.assigned_cargo_count:
-                            best = candidate
-                        elif candidate.assigned_cargo_count == best.assigned_cargo_count:
-                            if candidate.total_cost < best.total_cost - 1e-6:
-                                best = candidate
-                            elif abs(candidate.total_cost - best.total_cost) <= 1e-6:
-                                if candidate.assigned_weight_kg > best.assigned_weight_kg + 1e-6:
-                                    best = candidate
-                                elif (
-                                    abs(candidate.assigned_weight_kg - best.assigned_weight_kg) <= 1e-6
-                                    and len(candidate.vehicles) < len(best.vehicles)
-                                ):
-                                    best = candidate
+                    improved = candidate is not None and self._better_limited(candidate, best, objective)
+                    span.set(improved=improved)
+                if self.strategy_bandit is not None:
+                    self.strategy_bandit.update(strategy, self._limited_gain(candidate, best, objective) if improved else None)
+                if improved:
+                    best = candidate
+                    best_fleet = vehicles_pool
+        return best, best_fleet
+
+    def _choose_limited_strategy(self, rng: random.Random, vehicles_pool: List[Vehicle], objective: str) -> str:
+        """
+        Strategy for one limited attempt: legacy fixed mix, or the bandit
+        over strategies not yet built for this fleet (cluster is rng-seeded
+        and always available).
+        """
+        if self.strategy_bandit is None:
+            return bandit.legacy_choice(rng)
+        objective_norm = objective if objective in ("max_count", "max_weight") else "max_count"
+        fleet_key = tuple(vehicle_type(v) for v in sorted(vehicles_pool, key=lambda v: v.capacity_kg, reverse=True))
+        available = [
+            s for s in bandit.STRATEGIES
+            if s == "cluster" or (s, objective_norm, fleet_key) not in self._construction_keys
+        ]
+        return self.strategy_bandit.choose(rng, available)
 
+    def _limited_gain(
+        self, candidate: CandidateSolution, best: Optional[CandidateSolution], objective: str
+    ) -> float:
+        """Relative improvement over the incumbent: payload first, then cost."""
         if best is None:
-            return OptimizerOutput(
-                success=False,
-                problem_type=self.input.problem_type,
-                error=ErrorInfo(
-                    code="INFEASIBLE_SOLUTION",
-                    message="Uygun çözüm bulunamadı",
-                ),
-            )
-
-        self.unassigned = best.unassigned
-        self.iterations = best.two_opt_iterations
-        return self._build_output(
-            best.routes,
-            best.vehicles,
-            algorithm_info={
-                "name": f"Fleet Search (subset:{objective}) + clustering/binpack/pack + 2-opt",
-                "iterations": best.two_opt_iterations,
-                "execution_time_ms": 0,
-                "improvement_percentage": 0,
-                "selected": best.meta,
-            },
-        )
+            return 0.0
+        if objective == "max_weight":
+            new, old = candidate.assigned_weight_kg, best.assigned_weight_kg
+        else:
+            new, old = float(candidate.assigned_cargo_count), float(best.assigned_cargo_count)
+        if new > old + 1e-6:
+            return (new - old) / max(old, 1e-9)
+        return max(0.0, (best.total_cost - candidate.total_cost) / max(best.total_cost, 1e-9))
+
+    def _better_limited(
+        self, candidate: CandidateSolution, best: Optional[CandidateSolution], objective: str
+    ) -> bool:
+        """
+        Objective-specific lexicographic compare:
+        1) Maximize payload (count or weight)
+        2) Minimize cost
+        3) Tie-breakers: other payload metric, fewer vehicles
+        """
+        if best is None:
+            return True
+        if objective == "max_weight":
+            if candidate.assigned_weight_kg > best.assigned_weight_kg + 1e-6:
+                return True
+            if abs(candidate.assigned_weight_kg - best.assigned_weight_kg) <= 1e-6:
+                if candidate.total_cost < best.total_cost - 1e-6:
+                    return True
+                if abs(candidate.total_cost - best.total_cost) <= 1e-6:
+                    if candidate.assigned_cargo_count > best.assigned_cargo_count:
+                        return True
+                    if (
+                        candidate.assigned_cargo_count == best.assigned_cargo_count
+                        and len(candidate.vehicles) < len(best.vehicles)
+                    ):
+                        return True
+            return False
+
+        if candidate.assigned_cargo_count > best.assigned_cargo_count:
+            return True
+        if candidate.assigned_cargo_count == best.assigned_cargo_count:
+            if candidate.total_cost < best.total_cost - 1e-6:
+                return True
+            if abs(candidate.total_cost - best.total_cost) <= 1e-6:
+                if candidate.assigned_weight_kg > best.assigned_weight_kg + 1e-6:
+                    return True
+                if (
+                    abs(candidate.assigned_weight_kg - best.assigned_weight_kg) <= 1e-6
+                    and len(candidate.vehicles) < len(best.vehicles)
+                ):
+                    return True
+        return False
     
+    @traced("greedy_route", cat="build")
     def _greedy_route_for_vehicle(
         self, 
         available: List[Station], 
@@ -582,9 +1105,12 @@ class VRPOptimizer:
         # route_rev: Hub'a doğru giden sırada (last -> ... -> first)
         route_rev: List[StopAssignment] = []
         current_weight = 0
-        current_pos = self.hub.id
+        current_pos = self.hub.idx
+        kd = self._kernel_dist
         
         candidates = available.copy()
+        by_idx: Dict[int, Station] = {st.idx: st for st in candidates}
+        neighbors = self._neighbor_rows
 
         # Ensure totals are consistent (especially after previous routes).
         for st in candidates:
@@ -605,18 +1131,34 @@ class VRPOptimizer:
                 return list(st.cargos or [])
             return [c for c in (st.cargos or []) if cargo_id(c) in allowed_cargo_ids]
 
-        while candidates:
-            remaining_cap = capacity - current_weight
-            if remaining_cap <= 1e-6:
-                break
+        # Lightest allowed cargo per point index (inf: not a candidate / nothing
+        # left); a station is feasible iff that cargo fits the remaining room.
+        min_w = [math.inf] * len(self.points)
+
+        def refresh_min_w(st: Station) -> None:
+            ws = [cargo_w(c) for c in station_allowed_cargos(st)]
+            min_w[st.idx] = min(ws) if ws else math.inf
 
-            # Hub'a (veya bir sonraki stop'a) en yakın ve kapasiteye sığan istasyonu bul
+        for st in candidates:
+            refresh_min_w(st)
+        min_w_k = kernels.floats(min_w) if kernels.compiled() else min_w
+        all_pool = kernels.ints([st.idx for st in candidates])
+
+        def set_min_w(st: Station, removed: bool = False) -> None:
+            if removed:
+                min_w[st.idx] = math.inf
+            else:
+                refresh_min_w(st)
+            if min_w_k is not min_w:
+                min_w_k[st.idx] = min_w[st.idx]
+
+        def benefit_scan(pool: List[Station], remaining_cap: float) -> Optional[Station]:
+            """Nearest feasible station; exact distance ties go to the larger load."""
             best: Optional[Station] = None
             best_dist = float("inf")
             best_benefit_primary = -1.0
             best_benefit_secondary = -1.0
-
-            for station in candidates:
+            for station in pool:
                 if not station.cargos:
                     continue
 
@@ -629,32 +1171,27 @@ class VRPOptimizer:
                 if not fit_ws:
                     continue
 
-                dist = self.get_distance(current_pos, station.id)
+                dist = kd[current_pos][station.idx]
 
                 # Benefit (tie-breaker): how much can we load from this station given remaining capacity?
                 benefit_count = 0.0
                 benefit_weight = 0.0
-                if objective_norm is not None:
-                    ws = sorted(fit_ws, reverse=(objective_norm == "max_weight"))
-                    cap_left = remaining_cap
-                    for w in ws:
-                        if w <= cap_left + 1e-6:
-                            benefit_count += 1.0
-                            benefit_weight += w
-                            cap_left -= w
-
+                ws = sorted(fit_ws, reverse=(objective_norm == "max_weight"))
+                cap_left = remaining_cap
+                for w in ws:
+                    if w <= cap_left + 1e-6:
+                        benefit_count += 1.0
+                        benefit_weight += w
+                        cap_left -= w
+
+                cand_primary = benefit_weight if objective_norm == "max_weight" else benefit_count
+                cand_secondary = benefit_count if objective_norm == "max_weight" else benefit_weight
                 if dist < best_dist - 1e-9:
                     best = station
                     best_dist = dist
-                    if objective_norm == "max_weight":
-                        best_benefit_primary = benefit_weight
-                        best_benefit_secondary = benefit_count
-                    else:
-                        best_benefit_primary = benefit_count
-                        best_benefit_secondary = benefit_weight
-                elif abs(dist - best_dist) <= 1e-9 and objective_norm is not None:
-                    cand_primary = benefit_weight if objective_norm == "max_weight" else benefit_count
-                    cand_secondary = benefit_count if objective_norm == "max_weight" else benefit_weight
+                    best_benefit_primary = cand_primary
+                    best_benefit_secondary = cand_secondary
+                elif abs(dist - best_dist) <= 1e-9:
                     if cand_primary > best_benefit_primary + 1e-9:
                         best = station
                         best_benefit_primary = cand_primary
@@ -663,6 +1200,26 @@ class VRPOptimizer:
                         best = station
                         best_benefit_primary = cand_primary
                         best_benefit_secondary = cand_secondary
+            return best
+
+        while by_idx:
+            remaining_cap = capacity - current_weight
+            if remaining_cap <= 1e-6:
+                break
+
+            # Hub'a (veya bir sonraki stop'a) en yakın ve kapasiteye sığan istasyonu bul.
+            # Candidate list first (k nearest of the current position); the
+            # full scan only runs when none of those neighbors is feasible.
+            best: Optional[Station] = None
+            for pool in (neighbors[current_pos], all_pool):
+                pos, tie = kernels.nearest_feasible(kd[current_pos], pool, min_w_k, remaining_cap)
+                if pos < 0:
+                    continue
+                if tie and objective_norm is not None:
+                    best = benefit_scan([by_idx[int(j)] for j in pool if int(j) in by_idx], remaining_cap)
+                else:
+                    best = by_idx[int(pool[pos])]
+                break
 
             if best is None:
                 break  # Kapasiteye sığan yok (veya allowed cargo yok)
@@ -698,18 +1255,19 @@ class VRPOptimizer:
             if not assigned:
                 # Defensive: remove the station and continue trying others.
                 # (This should be rare because we filter by "fit_ws" above.)
-                if best in candidates:
-                    candidates.remove(best)
+                by_idx.pop(best.idx, None)
+                set_min_w(best, removed=True)
                 continue
 
             self._refresh_station_totals(best)
+            set_min_w(best)
             route_rev.append(StopAssignment(station=best, cargos=assigned, weight_kg=round(assigned_w, 2)))
             current_weight += assigned_w
-            current_pos = best.id
+            current_pos = best.idx
 
             # If fully served, remove from candidates. Otherwise keep for future routes.
             if not best.cargos:
-                candidates.remove(best)
+                by_idx.pop(best.idx, None)
 
         # Gerçek rota sırası: serbest başlangıç -> ... -> Hub
         return list(reversed(route_rev))
@@ -718,28 +1276,88 @@ class VRPOptimizer:
         """
         2-opt local search ile rota iyileştirme.
         Kenar swap yaparak daha kısa rota arar.
+
+        Moves are scored in O(1) from prefix sums (forward and backward, so
+        asymmetric matrices are handled). Long routes first try only moves
+        whose new edge goes to one of the k nearest neighbors, and fall back
+        to the full scan when that finds nothing.
         """
         if len(route) < 2:
             return route, 0
-        
-        improved = True
+
         best = route.copy()
         iters = 0
-        
-        while improved:
-            improved = False
-            for i in range(len(best) - 1):
-                for j in range(i + 2, len(best)):
-                    # i ve j arasını ters çevir
-                    new_route = best[:i+1] + best[i+1:j+1][::-1] + best[j+1:]
-                    
-                    if self.calculate_route_distance(new_route) < self.calculate_route_distance(best):
-                        best = new_route
-                        improved = True
-                        iters += 1
-        
+        use_neighbors = len(best) > TWO_OPT_NEIGHBOR_MIN_LEN
+
+        while True:
+            self._check_cancelled()
+            improved = 0
+            if use_neighbors:
+                improved = self._two_opt_pass(best, neighbor_only=True)
+            if not improved:
+                improved = self._two_opt_pass(best, neighbor_only=False)
+            if not improved:
+                break
+            iters += improved
+
         return best, iters
 
+    def _two_opt_pass(self, route: List[StopAssignment], neighbor_only: bool) -> int:
+        """
+        One first-improvement sweep over (i, j) reversing route[i+1..j]
+        in place. Returns the number of applied moves.
+
+        The full scan runs in kernels.two_opt_pass (compiled when available).
+        """
+        n = len(route)
+        hub = self.hub.idx
+        if not neighbor_only:
+            seq = kernels.ints([s.station.idx for s in route] + [hub])
+            order = kernels.ints(range(n))
+            moves = kernels.two_opt_pass(self._kernel_dist, seq, order, TWO_OPT_EPS)
+            if moves:
+                route[:] = [route[int(k)] for k in order]
+            return int(moves)
+
+        d = self._dist
+        seq = [s.station.idx for s in route] + [hub]
+
+        def prefix_sums() -> Tuple[List[float], List[float]]:
+            fw = [0.0] * (n + 1)
+            bw = [0.0] * (n + 1)
+            for t in range(n):
+                a, b = seq[t], seq[t + 1]
+                fw[t + 1] = fw[t] + d[a][b]
+                bw[t + 1] = bw[t] + d[b][a]
+            return fw, bw
+
+        fw, bw = prefix_sums()
+        pos = {idx: p for p, idx in enumerate(seq[:n])}
+        neighbors = self.neighbor_lists
+        moves = 0
+
+        for i in range(n - 1):
+            js = sorted(
+                pos[b] for b in neighbors[seq[i]] if b in pos and pos[b] >= i + 2
+            )
+            for j in js:
+                a_i, a_i1, a_j, a_j1 = seq[i], seq[i + 1], seq[j], seq[j + 1]
+                # Reversed inner segment: backward cost replaces forward cost.
+                delta = (
+                    d[a_i][a_j] + d[a_i1][a_j1] - d[a_i][a_i1] - d[a_j][a_j1]
+                    + (bw[j] - bw[i + 1]) - (fw[j] - fw[i + 1])
+                )
+                if delta < -TWO_OPT_EPS:
+                    route[i + 1:j + 1] = route[i + 1:j + 1][::-1]
+                    seq[i + 1:j + 1] = seq[i + 1:j + 1][::-1]
+                    fw, bw = prefix_sums()
+                    for p in range(i + 1, j + 1):
+                        pos[seq[p]] = p
+                    moves += 1
+                    # Positions changed; rebuild j candidates for this i.
+                    break
+        return moves
+
     def _candidate_from_routes(
         self,
         routes: List[List[StopAssignment]],
@@ -756,8 +1374,9 @@ class VRPOptimizer:
         for route, v in zip(routes, vehicles):
             if not route:
                 continue
-            total_distance += self.calculate_route_distance(route)
-            total_cost += self.calculate_route_cost(route, v)
+            distance = self.calculate_route_distance(route)
+            total_distance += distance
+            total_cost += self._route_cost_from_distance(distance, v)
             assigned_cargo_count += sum(len(s.cargos) for s in route)
             assigned_weight += self.calculate_route_weight(route)
 
@@ -775,181 +1394,301 @@ class VRPOptimizer:
             meta=meta,
         )
 
-    def _build_candidate_unlimited(
+    def _skip_construction(self, key: Tuple[Any, ...]) -> bool:
+        """
+        True when an identical construction (same strategy, fleet order and
+        seed signature) already ran in this solve; its result was already
+        compared against the best, so building it again cannot change it.
+        """
+        self.dedup_stats["candidates"] += 1
+        if key in self._construction_keys:
+            self.dedup_stats["memo_hits"] += 1
+            return True
+        self._construction_keys.add(key)
+        return False
+
+    def _finish_candidate(
         self,
-        vehicles_pool: List[Vehicle],
-        base_stations: List[Station],
-        rng: random.Random,
+        routes: List[List[StopAssignment]],
+        vehicles: List[Vehicle],
+        stations: List[Station],
+        meta: Dict[str, Any],
     ) -> Optional[CandidateSolution]:
         """
-        Build one feasible candidate for unlimited problem with the given vehicle pool.
-        Uses two constructive heuristics and keeps the better one:
-        - geographic clustering (farthest-first) + route
-        - bin-pack-by-weight + route
+        2-opt + score a constructed solution, unless the same routes (same
+        stops, cargos and vehicle types) were already scored in this solve.
         """
-        # Work on fresh station copies per candidate
-        stations = copy.deepcopy(base_stations)
-        for st in stations:
-            self._refresh_station_totals(st)
-
-        # Only consider stations that have any cargo
-        active_stations = [s for s in stations if s.cargos]
-        if not active_stations:
+        fingerprint = tuple(
+            (
+                vehicle_type(v),
+                tuple((s.station.idx, tuple(str(c.get("id")) for c in s.cargos)) for s in route),
+            )
+            for route, v in zip(routes, vehicles)
+        )
+        if fingerprint in self._solution_fingerprints:
+            self.dedup_stats["duplicate_solutions"] += 1
             return None
+        self._solution_fingerprints.add(fingerprint)
 
-        vehicles_sorted = sorted(vehicles_pool, key=lambda v: v.capacity_kg, reverse=True)
-        k = min(len(vehicles_sorted), len(active_stations))
-        if k <= 0:
-            return None
+        two_opt_iters = 0
+        improved_routes: List[List[StopAssignment]] = []
+        with self.tracer.span("two_opt", cat="improve", routes=len(routes)) as span:
+            for route in routes:
+                improved, it = self._two_opt(route)
+                improved_routes.append(improved)
+                two_opt_iters += it
+            span.set(moves=two_opt_iters)
+        return self._candidate_from_routes(
+            routes=improved_routes,
+            vehicles=vehicles,
+            stations=stations,
+            two_opt_iters=two_opt_iters,
+            meta=meta,
+        )
 
-        best_candidate: Optional[CandidateSolution] = None
+    def _dedup_info(self) -> Dict[str, Any]:
+        stats = self.dedup_stats
+        skipped = stats["memo_hits"] + stats["duplicate_solutions"]
+        return {
+            **stats,
+            "hit_rate": round(skipped / stats["candidates"], 4) if stats["candidates"] else 0.0,
+        }
 
-        # ---------- Candidate A: clustering ----------
+    def _fresh_stations(self, base_stations: List[Station]) -> List[Station]:
+        stations = self._copy_stations(base_stations)
+        for st in stations:
+            self._refresh_station_totals(st)
+        return stations
+
+    def _seeded_clusters(
+        self, active_stations: List[Station], k: int, rng: random.Random
+    ) -> List[List[Station]]:
+        """Farthest-first seeds + nearest-seed clusters, heaviest cluster first."""
         seeds = self._pick_farthest_seeds(active_stations, k, rng)
         clusters = self._clusters_by_seeds(active_stations, seeds, rng)
-
-        # Pair bigger vehicles with heavier clusters
         cluster_infos = []
         for idx, cl in enumerate(clusters):
             w = sum(float(s.weight_kg or 0) for s in cl)
             cluster_infos.append((w, idx, cl))
         cluster_infos.sort(key=lambda x: x[0], reverse=True)
+        return [cl for _, _, cl in cluster_infos]
 
-        routes_a: List[List[StopAssignment]] = []
-        vehicles_a: List[Vehicle] = []
-        two_opt_iters_a = 0
+    def _binpack_buckets(self, active_stations: List[Station], vehicles_sorted: List[Vehicle], k: int) -> List[List[Station]]:
+        """Greedy assignment of whole stations to vehicles by remaining capacity"""
+        buckets: List[List[Station]] = [[] for _ in range(k)]
+        if k <= 0:
+            return buckets
+        sts_sorted = sorted(active_stations, key=lambda s: float(s.weight_kg or 0), reverse=True)
+        # Tightest bucket that still fits; else the one with most room left
+        where = kernels.best_fit(
+            kernels.floats([float(st.weight_kg or 0) for st in sts_sorted]),
+            kernels.floats([float(v.capacity_kg) for v in vehicles_sorted[:k]]),
+        )
+        for st, i in zip(sts_sorted, where):
+            buckets[int(i)].append(st)
+        return buckets
 
-        for vi, (_, _, cl) in enumerate(cluster_infos):
-            if vi >= len(vehicles_sorted):
-                break
-            v = vehicles_sorted[vi]
-            route = self._greedy_route_for_vehicle(cl, v.capacity_kg)
-            if route:
-                improved, it = self._two_opt(route)
-                routes_a.append(improved)
-                vehicles_a.append(v)
-                two_opt_iters_a += it
+    @traced("savings", cat="strategy")
+    def _build_candidate_savings(
+        self,
+        vehicles_pool: List[Vehicle],
+        base_stations: List[Station],
+        objective: Optional[str] = None,
+    ) -> Optional[CandidateSolution]:
+        """
+        Clarke-Wright savings construction (savings.py). Deterministic, so it
+        runs once per fleet order. Stations heavier than the largest vehicle
+        are split into vehicle-sized stops (first-fit decreasing by cargo).
+        With more routes than vehicles, limited problems keep the routes with
+        the most payload for the objective; the rest stays unassigned.
+        """
+        vehicles_sorted = sorted(vehicles_pool, key=lambda v: v.capacity_kg, reverse=True)
+        if not vehicles_sorted:
+            return None
+        if self._skip_construction(("savings", objective, tuple(vehicle_type(v) for v in vehicles_sorted))):
+            return None
 
-        cand_a = self._candidate_from_routes(
-            routes=routes_a,
-            vehicles=vehicles_a,
-            stations=stations,
-            two_opt_iters=two_opt_iters_a,
-            meta={
-                "strategy": "cluster",
-                "owned_used": sum(1 for v in vehicles_a if not v.is_rented),
-                "rented_used": sum(1 for v in vehicles_a if v.is_rented),
-                "fleet_size": len(vehicles_pool),
-            },
-        )
+        stations = self._fresh_stations(base_stations)
+        c_max = float(vehicles_sorted[0].capacity_kg)
 
-        # Feasibility: all cargos must be assigned
-        if not cand_a.unassigned:
-            best_candidate = cand_a
+        def cargo_w(c: dict) -> float:
+            return float(c.get("weight_kg", 0) or 0)
 
-        # ---------- Candidate B: bin-pack by weight ----------
-        # Re-clone because previous candidate mutated station cargos
-        stations_b = copy.deepcopy(base_stations)
-        for st in stations_b:
+        # (station, cargos, weight) per stop node
+        nodes: List[Tuple[Station, List[dict], float]] = []
+        for st in stations:
+            if not st.cargos:
+                continue
+            if float(st.weight_kg or 0) <= c_max + 1e-6:
+                nodes.append((st, list(st.cargos), sum(cargo_w(c) for c in st.cargos)))
+                continue
+            chunks: List[List[dict]] = []
+            chunk_w: List[float] = []
+            for c in sorted(st.cargos, key=cargo_w, reverse=True):
+                w = cargo_w(c)
+                if w > c_max + 1e-6:
+                    continue  # fits no vehicle; stays unassigned
+                for ci in range(len(chunks)):
+                    if chunk_w[ci] + w <= c_max + 1e-6:
+                        chunks[ci].append(c)
+                        chunk_w[ci] += w
+                        break
+                else:
+                    chunks.append([c])
+                    chunk_w.append(w)
+            nodes.extend((st, cs, w) for cs, w in zip(chunks, chunk_w))
+        if not nodes:
+            return None
+
+        capacities = [float(v.capacity_kg) for v in vehicles_sorted]
+        routes_idx = savings_routes(
+            self.dist_km,
+            self.hub.idx,
+            [st.idx for st, _, _ in nodes],
+            [w for _, _, w in nodes],
+            capacities,
+            neighbors=self.neighbor_lists if len(nodes) > DENSE_MAX_NODES else None,
+        )
+        route_loads = [sum(nodes[k][2] for k in r) for r in routes_idx]
+        if objective == "max_count":
+            route_value = [float(sum(len(nodes[k][1]) for k in r)) for r in routes_idx]
+        else:
+            route_value = route_loads
+
+        routes: List[List[StopAssignment]] = []
+        vehicles_used: List[Vehicle] = []
+        for ri, vi in assign_vehicles(route_loads, route_value, capacities):
+            route: List[StopAssignment] = []
+            for k in routes_idx[ri]:
+                st, cargos, w = nodes[k]
+                taken = {id(c) for c in cargos}
+                st.cargos = [c for c in st.cargos if id(c) not in taken]
+                route.append(StopAssignment(station=st, cargos=cargos, weight_kg=round(w, 2)))
+            routes.append(route)
+            vehicles_used.append(vehicles_sorted[vi])
+        for st in stations:
             self._refresh_station_totals(st)
-        active_stations_b = [s for s in stations_b if s.cargos]
 
-        # Greedy assignment of whole-stations to vehicles by remaining capacity
-        remaining_caps = [float(v.capacity_kg) for v in vehicles_sorted[:k]]
-        buckets: List[List[Station]] = [[] for _ in range(k)]
+        meta: Dict[str, Any] = {
+            "strategy": "savings",
+            "owned_used": sum(1 for v in vehicles_used if not v.is_rented),
+            "rented_used": sum(1 for v in vehicles_used if v.is_rented),
+            "fleet_size": len(vehicles_pool),
+        }
+        if objective is not None:
+            meta["objective"] = objective
+        return self._finish_candidate(routes, vehicles_used, stations, meta)
 
-        sts_sorted = sorted(active_stations_b, key=lambda s: float(s.weight_kg or 0), reverse=True)
-        for st in sts_sorted:
-            w = float(st.weight_kg or 0)
-            # Find bucket where it fits best (most remaining after fit)
-            best_i = None
-            best_rem_after = None
-            for i in range(k):
-                if w <= remaining_caps[i] + 1e-6:
-                    rem_after = remaining_caps[i] - w
-                    if best_rem_after is None or rem_after < best_rem_after:
-                        best_rem_after = rem_after
-                        best_i = i
-            if best_i is None:
-                # Doesn't fit anywhere as a whole; put into the bucket with max remaining
-                best_i = max(range(k), key=lambda i: remaining_caps[i])
-            buckets[best_i].append(st)
-            remaining_caps[best_i] = max(0.0, remaining_caps[best_i] - w)
-
-        routes_b: List[List[StopAssignment]] = []
-        vehicles_b: List[Vehicle] = []
-        two_opt_iters_b = 0
-
-        for i in range(k):
-            v = vehicles_sorted[i]
-            route = self._greedy_route_for_vehicle(buckets[i], v.capacity_kg)
-            if route:
-                improved, it = self._two_opt(route)
-                routes_b.append(improved)
-                vehicles_b.append(v)
-                two_opt_iters_b += it
-
-        cand_b = self._candidate_from_routes(
-            routes=routes_b,
-            vehicles=vehicles_b,
-            stations=stations_b,
-            two_opt_iters=two_opt_iters_b,
-            meta={
-                "strategy": "binpack",
-                "owned_used": sum(1 for v in vehicles_b if not v.is_rented),
-                "rented_used": sum(1 for v in vehicles_b if v.is_rented),
+    def _build_candidate_unlimited(
+        self,
+        vehicles_pool: List[Vehicle],
+        base_stations: List[Station],
+        rng: random.Random,
+    ) -> Optional[CandidateSolution]:
+        """
+        Build one feasible candidate for unlimited problem with the given vehicle pool.
+        Uses three constructive heuristics and keeps the best one:
+        - geographic clustering (farthest-first) + route
+        - bin-pack-by-weight + route
+        - sequential greedy
+
+        Constructions already seen in this solve are skipped (None when all
+        three are repeats): bin-pack and sequential do not use `rng`, so they
+        only run once per fleet order.
+        """
+        # Only consider stations that have any cargo
+        active_base = [s for s in base_stations if s.cargos]
+        if not active_base:
+            return None
+
+        vehicles_sorted = sorted(vehicles_pool, key=lambda v: v.capacity_kg, reverse=True)
+        k = min(len(vehicles_sorted), len(active_base))
+        if k <= 0:
+            return None
+        fleet_key = tuple(vehicle_type(v) for v in vehicles_sorted)
+
+        def meta(strategy: str, used: List[Vehicle]) -> Dict[str, Any]:
+            return {
+                "strategy": strategy,
+                "owned_used": sum(1 for v in used if not v.is_rented),
+                "rented_used": sum(1 for v in used if v.is_rented),
                 "fleet_size": len(vehicles_pool),
-            },
-        )
+            }
 
-        if not cand_b.unassigned:
-            if best_candidate is None or cand_b.total_cost < best_candidate.total_cost - 1e-6:
-                best_candidate = cand_b
-            elif best_candidate is not None and abs(cand_b.total_cost - best_candidate.total_cost) <= 1e-6:
-                # tie-break: fewer rented
-                if cand_b.meta.get("rented_used", 0) < best_candidate.meta.get("rented_used", 0):
-                    best_candidate = cand_b
+        def better(cand: Optional[CandidateSolution], best: Optional[CandidateSolution]) -> bool:
+            # Feasibility: all cargos must be assigned
+            if cand is None or cand.unassigned:
+                return False
+            if best is None or cand.total_cost < best.total_cost - 1e-6:
+                return True
+            # tie-break: fewer rented
+            return (
+                abs(cand.total_cost - best.total_cost) <= 1e-6
+                and cand.meta.get("rented_used", 0) < best.meta.get("rented_used", 0)
+            )
 
-        # ---------- Candidate C: sequential greedy (allows splitting a station across vehicles) ----------
-        stations_c = copy.deepcopy(base_stations)
-        for st in stations_c:
-            self._refresh_station_totals(st)
-        remaining_c = [s for s in stations_c if s.cargos]
+        best_candidate: Optional[CandidateSolution] = None
 
-        routes_c: List[List[StopAssignment]] = []
-        vehicles_c: List[Vehicle] = []
-        two_opt_iters_c = 0
+        # ---------- Candidate A: clustering ----------
+        # Seeds/clusters are picked on the shared base stations (read-only);
+        # the cluster membership is the seed signature of this construction.
+        clusters = self._seeded_clusters(active_base, k, rng)
+        signature = tuple(tuple(s.id for s in cl) for cl in clusters)
+        if not self._skip_construction(("cluster", fleet_key, signature)):
+            with self.tracer.span("cluster", cat="strategy"):
+                # Work on fresh station copies per candidate
+                stations = self._fresh_stations(base_stations)
+                by_id = {s.id: s for s in stations}
+                routes_a: List[List[StopAssignment]] = []
+                vehicles_a: List[Vehicle] = []
+                # Pair bigger vehicles with heavier clusters
+                for vi, cl in enumerate(clusters):
+                    if vi >= len(vehicles_sorted):
+                        break
+                    v = vehicles_sorted[vi]
+                    route = self._greedy_route_for_vehicle([by_id[s.id] for s in cl], v.capacity_kg)
+                    if route:
+                        routes_a.append(route)
+                        vehicles_a.append(v)
+                cand_a = self._finish_candidate(routes_a, vehicles_a, stations, meta("cluster", vehicles_a))
+            if better(cand_a, best_candidate):
+                best_candidate = cand_a
 
-        for v in vehicles_sorted:
-            if not remaining_c:
-                break
-            route = self._greedy_route_for_vehicle(remaining_c, v.capacity_kg)
-            if route:
-                improved, it = self._two_opt(route)
-                routes_c.append(improved)
-                vehicles_c.append(v)
-                two_opt_iters_c += it
-                remaining_c = [s for s in remaining_c if s.cargos]
-
-        cand_c = self._candidate_from_routes(
-            routes=routes_c,
-            vehicles=vehicles_c,
-            stations=stations_c,
-            two_opt_iters=two_opt_iters_c,
-            meta={
-                "strategy": "sequential",
-                "owned_used": sum(1 for v in vehicles_c if not v.is_rented),
-                "rented_used": sum(1 for v in vehicles_c if v.is_rented),
-                "fleet_size": len(vehicles_pool),
-            },
-        )
+        # ---------- Candidate B: bin-pack by weight ----------
+        if not self._skip_construction(("binpack", fleet_key)):
+            with self.tracer.span("binpack", cat="strategy"):
+                stations_b = self._fresh_stations(base_stations)
+                buckets = self._binpack_buckets([s for s in stations_b if s.cargos], vehicles_sorted, k)
+                routes_b: List[List[StopAssignment]] = []
+                vehicles_b: List[Vehicle] = []
+                for i in range(k):
+                    v = vehicles_sorted[i]
+                    route = self._greedy_route_for_vehicle(buckets[i], v.capacity_kg)
+                    if route:
+                        routes_b.append(route)
+                        vehicles_b.append(v)
+                cand_b = self._finish_candidate(routes_b, vehicles_b, stations_b, meta("binpack", vehicles_b))
+            if better(cand_b, best_candidate):
+                best_candidate = cand_b
 
-        if not cand_c.unassigned:
-            if best_candidate is None or cand_c.total_cost < best_candidate.total_cost - 1e-6:
+        # ---------- Candidate C: sequential greedy (allows splitting a station across vehicles) ----------
+        if not self._skip_construction(("sequential", fleet_key)):
+            with self.tracer.span("sequential", cat="strategy"):
+                stations_c = self._fresh_stations(base_stations)
+                remaining_c = [s for s in stations_c if s.cargos]
+                routes_c: List[List[StopAssignment]] = []
+                vehicles_c: List[Vehicle] = []
+                for v in vehicles_sorted:
+                    if not remaining_c:
+                        break
+                    route = self._greedy_route_for_vehicle(remaining_c, v.capacity_kg)
+                    if route:
+                        routes_c.append(route)
+                        vehicles_c.append(v)
+                        remaining_c = [s for s in remaining_c if s.cargos]
+                cand_c = self._finish_candidate(routes_c, vehicles_c, stations_c, meta("sequential", vehicles_c))
+            if better(cand_c, best_candidate):
                 best_candidate = cand_c
-            elif best_candidate is not None and abs(cand_c.total_cost - best_candidate.total_cost) <= 1e-6:
-                if cand_c.meta.get("rented_used", 0) < best_candidate.meta.get("rented_used", 0):
-                    best_candidate = cand_c
 
         return best_candidate
 
@@ -959,24 +1698,23 @@ class VRPOptimizer:
         base_stations: List[Station],
         rng: random.Random,
         objective: str,
+        strategy: Optional[str] = None,
     ) -> Optional[CandidateSolution]:
         """
         Limited candidate builder (no rentals added here). Can leave unassigned.
+        Returns None when the same construction was already scored in this solve.
+        `strategy` defaults to a draw from the legacy mix.
         """
         objective_norm = str(objective or "").strip().lower() or "max_count"
         if objective_norm not in ("max_count", "max_weight"):
             objective_norm = "max_count"
 
-        stations = copy.deepcopy(base_stations)
-        for st in stations:
-            self._refresh_station_totals(st)
-
-        active_stations = [s for s in stations if s.cargos]
-        if not active_stations:
+        active_base = [s for s in base_stations if s.cargos]
+        if not active_base:
             return None
 
         vehicles_sorted = sorted(vehicles_pool, key=lambda v: v.capacity_kg, reverse=True)
-        k = min(len(vehicles_sorted), len(active_stations))
+        k = min(len(vehicles_sorted), len(active_base))
         if k <= 0:
             return None
 
@@ -984,125 +1722,60 @@ class VRPOptimizer:
         # - pack: global cargo packing (max_count -> light-first, max_weight -> heavy-first)
         # - cluster/binpack: geography/weight based grouping
         # - sequential: simple greedy over all stations
-        r = rng.random()
-        if r < 0.45:
-            strategy = "pack"
-        elif r < 0.75:
-            strategy = "cluster"
-        elif r < 0.9:
-            strategy = "binpack"
-        else:
-            strategy = "sequential"
+        if strategy not in bandit.STRATEGIES:
+            strategy = bandit.legacy_choice(rng)
+
+        # Only clustering uses rng beyond the strategy pick
+        key: Tuple[Any, ...] = (strategy, objective_norm, tuple(vehicle_type(v) for v in vehicles_sorted))
+        clusters: Optional[List[List[Station]]] = None
+        if strategy == "cluster":
+            clusters = self._seeded_clusters(active_base, k, rng)
+            key += (tuple(tuple(s.id for s in cl) for cl in clusters),)
+        if self._skip_construction(key):
+            return None
 
-        routes: List[List[StopAssignment]] = []
-        vehicles_used: List[Vehicle] = []
-        two_opt_iters = 0
+        with self.tracer.span(strategy, cat="strategy"):
+            return self._construct_limited(
+                vehicles_pool, base_stations, vehicles_sorted, k, objective_norm, strategy, clusters
+            )
 
+    def _construct_limited(
+        self,
+        vehicles_pool: List[Vehicle],
+        base_stations: List[Station],
+        vehicles_sorted: List[Vehicle],
+        k: int,
+        objective_norm: str,
+        strategy: str,
+        clusters: Optional[List[List[Station]]],
+    ) -> Optional[CandidateSolution]:
+        """One limited construction with the chosen strategy (then 2-opt + scoring)."""
         if strategy == "pack":
-            # Global cargo packing with per-cargo acceptance (allows leaving some cargos unassigned)
-            cargo_items: List[Tuple[str, float]] = []
-            for st in stations:
-                for c in (st.cargos or []):
-                    cid = str(c.get("id"))
-                    w = float(c.get("weight_kg", 0) or 0)
-                    if w <= 0:
-                        continue
-                    cargo_items.append((cid, w))
-
-            if not cargo_items:
-                return None
-
-            cargo_items.sort(key=lambda x: x[1], reverse=(objective_norm == "max_weight"))
-
-            remaining_caps = [float(v.capacity_kg) for v in vehicles_sorted[:k]]
-            allowed_sets: List[set[str]] = [set() for _ in range(k)]
-
-            # Best-fit packing: place each cargo into the tightest vehicle that can still fit it
-            for cid, w in cargo_items:
-                best_i = None
-                best_rem_after = None
-                for i in range(k):
-                    if w <= remaining_caps[i] + 1e-6:
-                        rem_after = remaining_caps[i] - w
-                        if best_rem_after is None or rem_after < best_rem_after:
-                            best_rem_after = rem_after
-                            best_i = i
-                if best_i is None:
-                    continue
-                allowed_sets[best_i].add(cid)
-                remaining_caps[best_i] = max(0.0, remaining_caps[best_i] - w)
-
-            for i in range(k):
-                allowed = allowed_sets[i]
-                if not allowed:
-                    continue
-                v = vehicles_sorted[i]
-                avail = [
-                    st
-                    for st in stations
-                    if any(str(c.get("id")) in allowed for c in (st.cargos or []))
-                ]
-                if not avail:
-                    continue
-
-                route = self._greedy_route_for_vehicle(
-                    avail, v.capacity_kg, objective=objective_norm, allowed_cargo_ids=allowed
-                )
-                if route:
-                    improved, it = self._two_opt(route)
-                    routes.append(improved)
-                    vehicles_used.append(v)
-                    two_opt_iters += it
-
-        elif strategy == "cluster":
-            seeds = self._pick_farthest_seeds(active_stations, k, rng)
-            clusters = self._clusters_by_seeds(active_stations, seeds, rng)
+            return self._construct_pack(vehicles_pool, base_stations, vehicles_sorted, k, objective_norm)
 
-            cluster_infos = []
-            for idx, cl in enumerate(clusters):
-                w = sum(float(s.weight_kg or 0) for s in cl)
-                cluster_infos.append((w, idx, cl))
-            cluster_infos.sort(key=lambda x: x[0], reverse=True)
+        stations = self._fresh_stations(base_stations)
+        routes: List[List[StopAssignment]] = []
+        vehicles_used: List[Vehicle] = []
 
-            for i, (_, _, cl) in enumerate(cluster_infos):
+        if strategy == "cluster":
+            by_id = {s.id: s for s in stations}
+            for i, cl in enumerate(clusters):
                 if i >= len(vehicles_sorted):
                     break
                 v = vehicles_sorted[i]
-                route = self._greedy_route_for_vehicle(cl, v.capacity_kg, objective=objective_norm)
+                route = self._greedy_route_for_vehicle([by_id[s.id] for s in cl], v.capacity_kg, objective=objective_norm)
                 if route:
-                    improved, it = self._two_opt(route)
-                    routes.append(improved)
+                    routes.append(route)
                     vehicles_used.append(v)
-                    two_opt_iters += it
 
         elif strategy == "binpack":
-            # Binpack assignment
-            remaining_caps = [float(v.capacity_kg) for v in vehicles_sorted[:k]]
-            buckets: List[List[Station]] = [[] for _ in range(k)]
-            sts_sorted = sorted(active_stations, key=lambda s: float(s.weight_kg or 0), reverse=True)
-            for st in sts_sorted:
-                w = float(st.weight_kg or 0)
-                best_i = None
-                best_rem_after = None
-                for i in range(k):
-                    if w <= remaining_caps[i] + 1e-6:
-                        rem_after = remaining_caps[i] - w
-                        if best_rem_after is None or rem_after < best_rem_after:
-                            best_rem_after = rem_after
-                            best_i = i
-                if best_i is None:
-                    best_i = max(range(k), key=lambda i: remaining_caps[i])
-                buckets[best_i].append(st)
-                remaining_caps[best_i] = max(0.0, remaining_caps[best_i] - w)
-
+            buckets = self._binpack_buckets([s for s in stations if s.cargos], vehicles_sorted, k)
             for i in range(k):
                 v = vehicles_sorted[i]
                 route = self._greedy_route_for_vehicle(buckets[i], v.capacity_kg, objective=objective_norm)
                 if route:
-                    improved, it = self._two_opt(route)
-                    routes.append(improved)
+                    routes.append(route)
                     vehicles_used.append(v)
-                    two_opt_iters += it
 
         else:
             # Sequential greedy over all stations (allows splitting stations across vehicles)
@@ -1112,17 +1785,14 @@ class VRPOptimizer:
                     break
                 route = self._greedy_route_for_vehicle(remaining, v.capacity_kg, objective=objective_norm)
                 if route:
-                    improved, it = self._two_opt(route)
-                    routes.append(improved)
+                    routes.append(route)
                     vehicles_used.append(v)
-                    two_opt_iters += it
                     remaining = [s for s in remaining if s.cargos]
 
-        cand = self._candidate_from_routes(
-            routes=routes,
-            vehicles=vehicles_used,
-            stations=stations,
-            two_opt_iters=two_opt_iters,
+        return self._finish_candidate(
+            routes,
+            vehicles_used,
+            stations,
             meta={
                 "strategy": strategy,
                 "objective": objective_norm,
@@ -1131,8 +1801,86 @@ class VRPOptimizer:
                 "fleet_size": len(vehicles_pool),
             },
         )
-        return cand
     
+    def _construct_pack(
+        self,
+        vehicles_pool: List[Vehicle],
+        base_stations: List[Station],
+        vehicles_sorted: List[Vehicle],
+        k: int,
+        objective_norm: str,
+    ) -> Optional[CandidateSolution]:
+        """
+        Global cargo packing with per-cargo acceptance (allows leaving some
+        cargos unassigned). The payload-optimal selection (knapsack DP) is
+        routed, and so is the old best-fit set when it carries as much:
+        the DP does not look at routing cost, so the cheaper plan wins.
+        """
+        cargo_items: List[Tuple[str, float]] = []
+        for st in base_stations:
+            for c in (st.cargos or []):
+                w = float(c.get("weight_kg", 0) or 0)
+                if w > 0:
+                    cargo_items.append((str(c.get("id")), w))
+        if not cargo_items:
+            return None
+
+        weights = [w for _, w in cargo_items]
+        capacities = [float(v.capacity_kg) for v in vehicles_sorted[:k]]
+
+        def payload(selection: List[List[int]]) -> float:
+            if objective_norm == "max_count":
+                return float(sum(len(sel) for sel in selection))
+            return sum(weights[i] for sel in selection for i in sel)
+
+        selections = [("knapsack", select_cargos(weights, capacities, objective_norm))]
+        fallback = best_fit(weights, capacities, objective_norm)
+        if fallback != selections[0][1] and payload(fallback) >= payload(selections[0][1]) - 1e-6:
+            selections.append(("best_fit", fallback))
+
+        best: Optional[CandidateSolution] = None
+        for name, selection in selections:
+            stations = self._fresh_stations(base_stations)
+            routes: List[List[StopAssignment]] = []
+            vehicles_used: List[Vehicle] = []
+            for i, items in enumerate(selection):
+                allowed = {cargo_items[j][0] for j in items}
+                if not allowed:
+                    continue
+                v = vehicles_sorted[i]
+                avail = [
+                    st
+                    for st in stations
+                    if any(str(c.get("id")) in allowed for c in (st.cargos or []))
+                ]
+                if not avail:
+                    continue
+
+                route = self._greedy_route_for_vehicle(
+                    avail, v.capacity_kg, objective=objective_norm, allowed_cargo_ids=allowed
+                )
+                if route:
+                    routes.append(route)
+                    vehicles_used.append(v)
+
+            candidate = self._finish_candidate(
+                routes,
+                vehicles_used,
+                stations,
+                meta={
+                    "strategy": "pack",
+                    "selection": name,
+                    "objective": objective_norm,
+                    "owned_used": len(vehicles_used),
+                    "rented_used": 0,
+                    "fleet_size": len(vehicles_pool),
+                },
+            )
+            if candidate is not None and self._better_limited(candidate, best, objective_norm):
+                best = candidate
+        return best
+
+    @traced("build_output", cat="output")
     def _build_output(
         self, 
         routes: List[List[StopAssignment]], 
@@ -1151,9 +1899,14 @@ class VRPOptimizer:
         for idx, (route, vehicle) in enumerate(zip(routes, vehicles)):
             if not route:
                 continue
+            if vehicle.is_rented:
+                # Search-time rentals are shared placeholders; give each
+                # used one its own id and name only now.
+                vehicle = self._materialize_rental(vehicle, rented_count + 1)
             
-            distance = self.calculate_route_distance(route)
-            weight = self.calculate_route_weight(route)
+            metrics = self.route_metrics.metrics(route)
+            distance = metrics.distance_km
+            weight = metrics.weight_kg
             cargo_count = sum(len(s.cargos) for s in route)
             distance_cost = distance * self.params.cost_per_km
             rental_cost = vehicle.rental_cost if vehicle.is_rented else 0
@@ -1210,23 +1963,19 @@ class VRPOptimizer:
             
             # Polyline birleştir (başlangıç istasyonu -> ... -> Hub)
             polylines = []
-            prev_id = route[0].station.id
-            for stop in route[1:]:
-                pl = self.get_polyline(prev_id, stop.station.id)
+            if self.params.include_polylines:
+                prev_id = route[0].station.id
+                for stop in route[1:]:
+                    pl = self.get_polyline(prev_id, stop.station.id)
+                    if pl:
+                        polylines.append(pl)
+                    prev_id = stop.station.id
+                pl = self.get_polyline(prev_id, self.hub.id)
                 if pl:
                     polylines.append(pl)
-                prev_id = stop.station.id
-            pl = self.get_polyline(prev_id, self.hub.id)
-            if pl:
-                polylines.append(pl)
             
-            # Duration hesapla (başlangıç istasyonu -> ... -> Hub)
-            duration = 0
-            prev_id = route[0].station.id
-            for stop in route[1:]:
-                duration += self.get_duration(prev_id, stop.station.id)
-                prev_id = stop.station.id
-            duration += self.get_duration(prev_id, self.hub.id)
+            # Duration (başlangıç istasyonu -> ... -> Hub), cached with the distance
+            duration = metrics.duration_min
             
             users = [
                 UserInfo(user_id=uid, cargo_count=count)
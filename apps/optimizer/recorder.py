@@ -0,0 +1,309 @@
+"""
+Opt-in recorder of production /optimize payloads (for replay.py).
+
+Off unless RECORDER_DIR is set. Then:
+
+- a RECORDER_SAMPLE_RATE share of requests is kept, at most
+  RECORDER_MAX_PER_MINUTE (token bucket) so bursts cannot flood the disk;
+- user ids are replaced by a salted hash (RECORDER_USER_IDS=hash, salt from
+  RECORDER_HASH_SALT or random per process) or dropped (strip);
+- records are gzip JSONL lines {recorded_at, request_id, input, result}
+  in requests-<utc time>-<pid>.jsonl.gz, rotated at RECORDER_FILE_MAX_MB
+  (compressed) and pruned to the RECORDER_MAX_FILES newest files;
+- inputs that reference a registry matrix (matrix_digest) get the parsed
+  matrix saved once as matrices/<digest>.npz so they replay offline.
+
+Serialization, compression and disk I/O run on one background thread; the
+request path only enqueues (and drops the record when the queue is full).
+"""
+
+from typing import Any, Dict, List, Optional
+import glob
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+
+import numpy as np
+
+from env import env_float
+
+
+logger = logging.getLogger("optimizer")
+
+QUEUE_MAX = 64
+FILE_PREFIX = "requests-"
+FILE_SUFFIX = ".jsonl.gz"
+
+
+def user_hasher(mode: str, salt: bytes) -> Any:
+    """Callable user_id -> recorded value (salted HMAC prefix, or "" for strip)."""
+    if mode == "strip":
+        return lambda _uid: ""
+
+    def _hash(uid: str) -> str:
+        return "u_" + hmac.new(salt, str(uid).encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+    return _hash
+
+
+def anonymize_input(payload: Dict[str, Any], hash_user: Any) -> Dict[str, Any]:
+    """OptimizerInput dict with cargo user_ids hashed / stripped (in place)."""
+    for st in payload.get("stations") or []:
+        for cargo in st.get("cargos") or []:
+            if "user_id" in cargo:
+                cargo["user_id"] = hash_user(cargo["user_id"])
+    return payload
+
+
+def save_matrix(path: str, matrix: Any) -> None:
+    """PreparedMatrix -> .npz (distances, durations, known mask, polylines)."""
+    keys = np.array(list(matrix.polylines.keys()), dtype=np.int32).reshape(-1, 2)
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(
+        tmp,
+        ids=np.array(matrix.ids, dtype=str),
+        distance_km=matrix.distance_km,
+        duration_minutes=matrix.duration_minutes,
+        known=matrix.known,
+        polyline_keys=keys,
+        polyline_values=np.array(list(matrix.polylines.values()), dtype=str),
+    )
+    os.replace(tmp, path)
+
+
+def load_matrix(path: str, digest: str = "") -> Any:
+    """Inverse of save_matrix (used by replay.py)."""
+    from matrix_registry import PreparedMatrix
+
+    with np.load(path, allow_pickle=False) as data:
+        ids = [str(i) for i in data["ids"].tolist()]
+        return PreparedMatrix(
+            ids=ids,
+            index={sid: i for i, sid in enumerate(ids)},
+            distance_km=data["distance_km"],
+            duration_minutes=data["duration_minutes"],
+            known=data["known"],
+            polylines={
+                (int(a), int(b)): str(p)
+                for (a, b), p in zip(data["polyline_keys"].tolist(), data["polyline_values"].tolist())
+            },
+            digest=digest,
+        )
+
+
+class RequestRecorder:
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 0.01,
+        max_per_minute: float = 6.0,
+        file_max_bytes: int = 64 * 1024 * 1024,
+        max_files: int = 20,
+        user_ids: str = "hash",
+        salt: Optional[str] = None,
+    ):
+        self.directory = directory
+        self.sample_rate = min(1.0, max(0.0, sample_rate))
+        self.max_per_minute = max(0.0, max_per_minute)
+        self.file_max_bytes = max(1024, int(file_max_bytes))
+        self.max_files = max(1, int(max_files))
+        self.user_ids = "strip" if str(user_ids).strip().lower() == "strip" else "hash"
+        self._hash_user = user_hasher(
+            self.user_ids, (salt.encode("utf-8") if salt else secrets.token_bytes(16))
+        )
+
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+        self._tokens = self.max_per_minute
+        self._refilled_at = time.monotonic()
+
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=QUEUE_MAX)
+        self._thread: Optional[threading.Thread] = None
+        self._file: Optional[Any] = None
+        self._raw: Optional[Any] = None
+        self._saved_matrices: set = set()
+
+        self.sampled = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestRecorder"]:
+        directory = str(os.getenv("RECORDER_DIR", "") or "").strip()
+        if not directory:
+            return None
+        return cls(
+            directory,
+            sample_rate=env_float("RECORDER_SAMPLE_RATE", 0.01),
+            max_per_minute=env_float("RECORDER_MAX_PER_MINUTE", 6.0),
+            file_max_bytes=int(env_float("RECORDER_FILE_MAX_MB", 64) * 1024 * 1024),
+            max_files=int(env_float("RECORDER_MAX_FILES", 20)),
+            user_ids=os.getenv("RECORDER_USER_IDS", "hash") or "hash",
+            salt=os.getenv("RECORDER_HASH_SALT") or None,
+        )
+
+    # ---------- request path ----------
+
+    def should_record(self) -> bool:
+        """Sampling + per-minute token bucket (cheap; call before solving)."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.max_per_minute,
+                self._tokens + (now - self._refilled_at) * self.max_per_minute / 60.0,
+            )
+            self._refilled_at = now
+            if self._tokens < 1.0 or self._rng.random() >= self.sample_rate:
+                return False
+            self._tokens -= 1.0
+            self.sampled += 1
+            return True
+
+    def record(
+        self,
+        input_data: Any,
+        result: Any = None,
+        request_id: Optional[str] = None,
+        matrix: Any = None,
+        elapsed_ms: Optional[float] = None,
+    ) -> None:
+        """Queue one sampled request; serialization happens on the writer thread."""
+        item = {
+            "recorded_at": time.time(),
+            "request_id": request_id,
+            "input": input_data,
+            "result": result,
+            "matrix": matrix,
+            "elapsed_ms": elapsed_ms,
+        }
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    # ---------- writer thread ----------
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="request-recorder", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._write(item)
+                self.written += 1
+            except Exception as e:  # never let recording take the service down
+                self.errors += 1
+                logger.warning("request recorder write failed: %s", e)
+        self._close_file()
+
+    def _write(self, item: Dict[str, Any]) -> None:
+        payload = item["input"].model_dump()
+        anonymize_input(payload, self._hash_user)
+        digest = payload.get("matrix_digest")
+        if digest and item["matrix"] is not None and digest not in self._saved_matrices:
+            os.makedirs(os.path.join(self.directory, "matrices"), exist_ok=True)
+            path = os.path.join(self.directory, "matrices", f"{digest}.npz")
+            if not os.path.exists(path):
+                save_matrix(path, item["matrix"])
+            self._saved_matrices.add(digest)
+
+        result = item["result"]
+        summary = getattr(result, "summary", None)
+        line = {
+            "recorded_at": item["recorded_at"],
+            "request_id": item["request_id"],
+            "input": payload,
+            "result": None if result is None else {
+                "success": bool(result.success),
+                "total_cost": summary.total_cost if summary is not None else None,
+                "total_distance_km": summary.total_distance_km if summary is not None else None,
+                "unassigned_cargos": summary.unassigned_cargos if summary is not None else None,
+                "execution_time_ms": result.algorithm_info.get("execution_time_ms"),
+                "elapsed_ms": item["elapsed_ms"],
+            },
+        }
+        f = self._open_file()
+        f.write((json.dumps(line, separators=(",", ":")) + "\n").encode("utf-8"))
+        # Sync flush: completed lines stay readable even if the process dies.
+        f.flush()
+        if self._raw.tell() >= self.file_max_bytes:
+            self._close_file()
+
+    def _open_file(self) -> Any:
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+            path = os.path.join(self.directory, f"{FILE_PREFIX}{stamp}-{os.getpid()}{FILE_SUFFIX}")
+            self._raw = open(path, "ab")
+            self._file = gzip.GzipFile(fileobj=self._raw, mode="ab")
+            self._prune()
+        return self._file
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._raw.close()
+            self._file = self._raw = None
+
+    def _prune(self) -> None:
+        files = sorted(
+            glob.glob(os.path.join(self.directory, f"{FILE_PREFIX}*{FILE_SUFFIX}")),
+            key=os.path.getmtime,
+        )
+        for path in files[: max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "sample_rate": self.sample_rate,
+            "max_per_minute": self.max_per_minute,
+            "user_ids": self.user_ids,
+            "sampled": self.sampled,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+def read_records(path: str) -> List[Dict[str, Any]]:
+    """Records of one file; a truncated tail (file still being written) is ignored."""
+    out: List[Dict[str, Any]] = []
+    with gzip.open(path, "rb") as f:
+        try:
+            for raw in f:
+                try:
+                    out.append(json.loads(raw))
+                except ValueError:
+                    break
+        except EOFError:
+            pass
+    return out
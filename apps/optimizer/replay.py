@@ -0,0 +1,236 @@
+"""
+Offline replay of recorded /optimize payloads (see recorder.py).
+
+    # run recordings through the current code, one JSONL result line per instance
+    python replay.py run recordings/requests-*.jsonl.gz --out head.jsonl --workers 2
+
+    # same recordings on another checkout, then compare
+    python replay.py run ... --out base.jsonl
+    python replay.py compare base.jsonl head.jsonl --fail-on-cost-pct 0.5
+
+Every instance is solved in a fresh worker process (max_tasks_per_child=1)
+so peak RSS is per instance; --workers sets how many run at once (1 =
+serial, steadier latency). PYTHONHASHSEED is pinned for the workers
+(solver rng seeds use hash()), so two runs of the same code give the same
+plans. Recorded production cost/latency are kept as `recorded_*` fields;
+they come from a different hash seed, so compare runs against runs.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+
+
+MATRIX_DIR = "matrices"
+
+
+def _rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def iter_instances(paths: List[str], limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    from recorder import read_records
+
+    count = 0
+    seen: Dict[str, int] = {}
+    for path in paths:
+        for line_no, rec in enumerate(read_records(path)):
+            if limit is not None and count >= limit:
+                return
+            payload = rec.get("input") or {}
+            instance_id = rec.get("request_id") or hashlib.sha256(
+                json.dumps(payload, sort_keys=True).encode("utf-8")
+            ).hexdigest()[:16]
+            # Client-supplied request ids can repeat
+            seen[instance_id] = seen.get(instance_id, 0) + 1
+            if seen[instance_id] > 1:
+                instance_id = f"{instance_id}#{seen[instance_id]}"
+            yield {
+                "id": instance_id,
+                "file": os.path.basename(path),
+                "line": line_no,
+                "matrix_dir": os.path.join(os.path.dirname(os.path.abspath(path)), MATRIX_DIR),
+                "input": payload,
+                "recorded": rec.get("result"),
+            }
+            count += 1
+
+
+def solve_instance(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker: one instance -> latency / memory / cost."""
+    from matrix_store import get_network_store
+    from models import OptimizerInput
+    from optimizer import VRPOptimizer
+    from recorder import load_matrix
+
+    payload = task["input"]
+    out: Dict[str, Any] = {
+        "id": task["id"],
+        "file": task["file"],
+        "line": task["line"],
+        "problem_type": payload.get("problem_type"),
+        "stations": len(payload.get("stations") or []),
+        "cargos": sum(len(s.get("cargos") or []) for s in payload.get("stations") or []),
+    }
+    recorded = task.get("recorded") or {}
+    out["recorded_cost"] = recorded.get("total_cost")
+    out["recorded_ms"] = recorded.get("execution_time_ms")
+
+    try:
+        input_data = OptimizerInput(**payload)
+        matrix = None
+        digest = input_data.matrix_digest
+        if digest:
+            path = os.path.join(task["matrix_dir"], f"{digest}.npz")
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"matrix {digest} not recorded")
+            matrix = load_matrix(path, digest)
+        rss_before = _rss_mb()
+        t0 = time.perf_counter()
+        result = VRPOptimizer(input_data, matrix=matrix, matrix_store=get_network_store()).solve()
+        out["time_ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+        out["peak_rss_mb"] = round(_rss_mb(), 1)
+        out["rss_delta_mb"] = round(max(0.0, _rss_mb() - rss_before), 1)
+        out["success"] = bool(result.success)
+        if result.summary is not None:
+            out["cost"] = round(result.summary.total_cost, 4)
+            out["distance_km"] = round(result.summary.total_distance_km, 4)
+            out["unassigned_cargos"] = result.summary.unassigned_cargos
+        out["gap_percent"] = result.algorithm_info.get("gap_percent")
+    except Exception as e:  # report and keep going
+        out["success"] = False
+        out["error"] = f"{type(e).__name__}: {e}"
+    return out
+
+
+def run(args: argparse.Namespace) -> int:
+    # Workers are spawned, so this pins their hash seed (and thus the plans).
+    os.environ.setdefault("PYTHONHASHSEED", str(args.hash_seed))
+    tasks = list(iter_instances(args.files, args.limit))
+    if not tasks:
+        print("no recorded instances", file=sys.stderr)
+        return 1
+
+    ctx = multiprocessing.get_context("spawn")
+    results: List[Dict[str, Any]] = []
+    out_f = open(args.out, "w", encoding="utf-8") if args.out else None
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers), mp_context=ctx, max_tasks_per_child=1) as pool:
+            futures = [pool.submit(solve_instance, t) for t in tasks]
+            for fut in as_completed(futures):
+                res = fut.result()
+                results.append(res)
+                if out_f is not None:
+                    out_f.write(json.dumps(res, sort_keys=True) + "\n")
+                    out_f.flush()
+                print(
+                    f"{res['id']:<18} {str(res.get('problem_type')):<28} st={res['stations']:<5} "
+                    f"t={res.get('time_ms', float('nan')):>9.1f}ms rss={res.get('peak_rss_mb', float('nan')):>7.1f}MB "
+                    f"cost={res.get('cost', float('nan')):>12.2f} {res.get('error', '')}",
+                    flush=True,
+                )
+    finally:
+        if out_f is not None:
+            out_f.close()
+
+    ok = [r for r in results if r.get("success")]
+    times = sorted(r["time_ms"] for r in ok if "time_ms" in r)
+    if times:
+        print(
+            f"instances={len(results)} ok={len(ok)} "
+            f"p50={statistics.median(times):.1f}ms p95={times[int(0.95 * (len(times) - 1))]:.1f}ms "
+            f"total={sum(times) / 1000.0:.1f}s"
+        )
+    return 0 if len(ok) == len(results) else 2
+
+
+def _load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return {r["id"]: r for r in rows}
+
+
+def _pct(new: Optional[float], old: Optional[float]) -> Optional[float]:
+    if new is None or old is None:
+        return None
+    if abs(old) < 1e-9:
+        return 0.0 if abs(new) < 1e-9 else float("inf")
+    return (new - old) / abs(old) * 100.0
+
+
+def compare(args: argparse.Namespace) -> int:
+    base = _load_results(args.base)
+    head = _load_results(args.head)
+    common = sorted(set(base) & set(head))
+    if not common:
+        print("no common instances", file=sys.stderr)
+        return 1
+
+    rows: List[Tuple[str, Optional[float], Optional[float], Optional[float]]] = []
+    print(f"{'id':<18} {'cost base':>12} {'cost head':>12} {'cost %':>8} {'time x':>7} {'rss MB':>8}")
+    for key in common:
+        b, h = base[key], head[key]
+        cost_pct = _pct(h.get("cost"), b.get("cost"))
+        ratio = (h["time_ms"] / b["time_ms"]) if b.get("time_ms") and h.get("time_ms") else None
+        rss = (h["peak_rss_mb"] - b["peak_rss_mb"]) if "peak_rss_mb" in b and "peak_rss_mb" in h else None
+        rows.append((key, cost_pct, ratio, rss))
+        print(
+            f"{key:<18} {b.get('cost', float('nan')):>12.2f} {h.get('cost', float('nan')):>12.2f} "
+            f"{(cost_pct if cost_pct is not None else float('nan')):>+8.2f} "
+            f"{(ratio if ratio is not None else float('nan')):>7.2f} "
+            f"{(rss if rss is not None else float('nan')):>+8.1f}"
+            + ("" if b.get("success") == h.get("success") else f"  success {b.get('success')} -> {h.get('success')}")
+        )
+
+    costs = [c for _, c, _, _ in rows if c is not None]
+    ratios = sorted(r for _, _, r, _ in rows if r is not None)
+    worse = [k for k, c, _, _ in rows if c is not None and c > args.fail_on_cost_pct]
+    better = [k for k, c, _, _ in rows if c is not None and c < -args.fail_on_cost_pct]
+    print(
+        f"instances={len(common)} only_base={len(set(base) - set(head))} only_head={len(set(head) - set(base))}\n"
+        f"cost: better={len(better)} worse={len(worse)} mean={statistics.fmean(costs) if costs else 0.0:+.3f}%\n"
+        f"time: median x{statistics.median(ratios) if ratios else float('nan'):.3f} "
+        f"geomean x{statistics.geometric_mean(ratios) if ratios else float('nan'):.3f}"
+    )
+    lost = [k for k in common if base[k].get("success") and not head[k].get("success")]
+    if lost:
+        print(f"now failing: {', '.join(lost)}")
+    return 3 if args.strict and (worse or lost) else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Replay recorded optimizer requests")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_run = sub.add_parser("run", help="solve recorded instances")
+    p_run.add_argument("files", nargs="+", help="requests-*.jsonl.gz files")
+    p_run.add_argument("--out", help="write one JSON result line per instance")
+    p_run.add_argument("--workers", type=int, default=1, help="instances solved at once (1 = serial)")
+    p_run.add_argument("--limit", type=int, default=None)
+    p_run.add_argument("--hash-seed", type=int, default=0, help="PYTHONHASHSEED for the workers")
+
+    p_cmp = sub.add_parser("compare", help="latency / memory / cost deltas between two runs")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("head")
+    p_cmp.add_argument("--fail-on-cost-pct", type=float, default=0.0,
+                       help="cost increase (%%) counted as a regression")
+    p_cmp.add_argument("--strict", action="store_true", help="exit 3 on regressions or new failures")
+
+    args = parser.parse_args(argv)
+    return run(args) if args.cmd == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
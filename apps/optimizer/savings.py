@@ -0,0 +1,172 @@
+"""
+Clarke-Wright savings construction for open-start routes ending at the hub.
+
+Routes have no hub -> first stop leg (vehicles may start anywhere), so a
+singleton route [i] costs d(i, hub) and appending route B (head j) after
+route A (tail i) saves
+
+    s(i, j) = d(i, hub) - d(i, j)
+
+(asymmetric, independent of B's distance to the hub). All savings are
+computed in one NumPy pass, sorted once, and scanned once; a union-find
+over nodes keeps routes acyclic and tracks head / tail / load.
+
+Heterogeneous fleets: a merge is accepted only while the routes heavier
+than the smallest vehicle can still be matched to distinct vehicles
+(largest load -> largest capacity). Once savings turn non-positive the
+scan keeps merging only while there are more routes than vehicles.
+
+Nodes are stops, not stations: the caller pre-splits a station heavier
+than the largest vehicle into several nodes (split-station behavior).
+"""
+
+from typing import List, Optional, Sequence, Tuple
+import bisect
+
+import numpy as np
+
+
+# Dense n x n savings up to this many nodes; above it only k-NN pairs.
+DENSE_MAX_NODES = 1500
+
+
+def _pairs(
+    dist: np.ndarray,
+    hub: int,
+    points: np.ndarray,
+    neighbors: Optional[Sequence[Sequence[int]]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(tail node, head node, saving) for every candidate pair, best first."""
+    n = int(points.size)
+    to_hub = dist[points, hub]
+    if n <= DENSE_MAX_NODES or neighbors is None:
+        sav = to_hub[:, None] - dist[np.ix_(points, points)]
+        same = points[:, None] == points[None, :]
+        sav[same] = -np.inf
+        order = np.argsort(-sav, axis=None, kind="stable")
+        tails, heads = np.divmod(order, n)
+        vals = sav.ravel()[order]
+        keep = np.isfinite(vals)
+        return tails[keep], heads[keep], vals[keep]
+
+    nodes_at: dict = {}
+    for pos, p in enumerate(points.tolist()):
+        nodes_at.setdefault(p, []).append(pos)
+    tails_l: List[int] = []
+    heads_l: List[int] = []
+    for a, p in enumerate(points.tolist()):
+        for q in neighbors[p]:
+            for b in nodes_at.get(q, ()):
+                tails_l.append(a)
+                heads_l.append(b)
+    tails = np.asarray(tails_l, dtype=np.int64)
+    heads = np.asarray(heads_l, dtype=np.int64)
+    sav = to_hub[tails] - dist[points[tails], points[heads]]
+    order = np.argsort(-sav, kind="stable")
+    return tails[order], heads[order], sav[order]
+
+
+def savings_routes(
+    dist: np.ndarray,
+    hub: int,
+    points: Sequence[int],
+    loads: Sequence[float],
+    capacities: Sequence[float],
+    neighbors: Optional[Sequence[Sequence[int]]] = None,
+) -> List[List[int]]:
+    """
+    Routes as lists of node positions (driving order, hub implied at the
+    end). `points[k]` is the matrix index of node k, `loads[k]` its weight.
+    Every node must fit the largest vehicle.
+    """
+    pts = np.asarray(points, dtype=np.int64)
+    n = int(pts.size)
+    if n == 0:
+        return []
+    caps = sorted((float(c) for c in capacities), reverse=True)
+    if not caps:
+        return [[k] for k in range(n)]
+    n_vehicles = len(caps)
+    c_min = caps[-1]
+
+    parent = list(range(n))
+    head = list(range(n))
+    tail = list(range(n))
+    load = [float(w) for w in loads]
+    nxt = [-1] * n
+    routes = n
+
+    # Loads of routes heavier than the smallest vehicle, ascending.
+    big = sorted(w for w in load if w > c_min + 1e-6)
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def fleet_fits(la: float, lb: float, merged: float) -> bool:
+        if merged > caps[0] + 1e-6:
+            return False
+        if merged <= c_min + 1e-6:
+            return True
+        trial = list(big)
+        for w in (la, lb):
+            if w > c_min + 1e-6:
+                trial.pop(bisect.bisect_left(trial, w))
+        bisect.insort(trial, merged)
+        if len(trial) > n_vehicles:
+            return False
+        return all(w <= cap + 1e-6 for w, cap in zip(reversed(trial), caps))
+
+    tails, heads, vals = _pairs(np.asarray(dist), hub, pts, neighbors)
+    for i, j, s in zip(tails.tolist(), heads.tolist(), vals.tolist()):
+        if s <= 0 and routes <= n_vehicles:
+            break
+        ri, rj = find(i), find(j)
+        if ri == rj or tail[ri] != i or head[rj] != j:
+            continue
+        la, lb = load[ri], load[rj]
+        merged = la + lb
+        if not fleet_fits(la, lb, merged):
+            continue
+        for w in (la, lb):
+            if w > c_min + 1e-6:
+                big.pop(bisect.bisect_left(big, w))
+        if merged > c_min + 1e-6:
+            bisect.insort(big, merged)
+        nxt[i] = j
+        parent[rj] = ri
+        tail[ri] = tail[rj]
+        load[ri] = merged
+        routes -= 1
+
+    out: List[List[int]] = []
+    for k in range(n):
+        if find(k) == k:
+            route = []
+            node = head[k]
+            while node != -1:
+                route.append(node)
+                node = nxt[node]
+            out.append(route)
+    return out
+
+
+def assign_vehicles(
+    route_loads: Sequence[float],
+    route_value: Sequence[float],
+    capacities: Sequence[float],
+) -> List[Tuple[int, int]]:
+    """
+    (route, vehicle) pairs. With more routes than vehicles the routes with
+    the highest `route_value` are kept; kept routes go heaviest -> largest.
+    """
+    keep = sorted(range(len(route_loads)), key=lambda r: (-route_value[r], r))[: len(capacities)]
+    keep.sort(key=lambda r: (-route_loads[r], r))
+    vehicles = sorted(range(len(capacities)), key=lambda v: (-capacities[v], v))
+    return [
+        (r, v)
+        for r, v in zip(keep, vehicles)
+        if route_loads[r] <= capacities[v] + 1e-6
+    ]
@@ -0,0 +1,188 @@
+"""
+Spatial preprocessing for large instances.
+
+- GridIndex: uniform lat/lon bucket grid (geohash-like) for "which stations
+  are physically close to this one" queries without scanning everything.
+- knn_lists: per-station k-nearest neighbor lists by *matrix* distance.
+  Candidates come from the grid (a few rings around the station's cell),
+  so building the lists is ~O(n * k) instead of sorting every matrix row.
+
+The solver consults these candidate lists first and only falls back to a
+full scan when none of the listed neighbors is feasible.
+
+- calibrate_road_factor: road / straight-line ratio fitted on the pairs the
+  matrix does give, used to estimate the pairs it does not (sparse k-nearest
+  inputs leave most long-range pairs to this estimate).
+"""
+
+from typing import Dict, List, Optional, Tuple
+import logging
+import math
+import os
+
+import numpy as np
+
+
+# Below this size a full row partition is cheaper than grid bookkeeping.
+FULL_SCAN_MAX_POINTS = 400
+
+# Grid candidates gathered per point, relative to k, before ranking by
+# matrix distance (road distance tracks straight-line distance loosely).
+CANDIDATE_FACTOR = 4
+
+# Ranks estimated pairs behind every given one in knn_lists (km)
+NOT_GIVEN_PENALTY_KM = 1e6
+
+# Road factor: default when it cannot be calibrated (ROAD_FACTOR=<number> fixes it)
+DEFAULT_ROAD_FACTOR = 1.3
+ROAD_FACTOR_MIN_PAIRS = 20
+# Shorter pairs: rounding and access roads dominate the ratio
+ROAD_FACTOR_MIN_KM = 0.2
+ROAD_FACTOR_BOUNDS = (1.0, 3.0)
+# Pairs used for the fit at most (evenly strided over the given pairs)
+ROAD_FACTOR_SAMPLE = 50000
+
+logger = logging.getLogger("optimizer")
+
+
+class GridIndex:
+    """Uniform grid over (lat, lon) with ~`target_per_cell` points per cell."""
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, target_per_cell: int = 4):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        n = int(self.lat.size)
+
+        self.lat0 = float(self.lat.min()) if n else 0.0
+        self.lon0 = float(self.lon.min()) if n else 0.0
+        lat_span = (float(self.lat.max()) - self.lat0) if n else 0.0
+        # Longitude degrees shrink with latitude; keep cells roughly square.
+        mean_lat = float(self.lat.mean()) if n else 0.0
+        lon_scale = max(0.1, math.cos(math.radians(mean_lat)))
+        lon_span = ((float(self.lon.max()) - self.lon0) * lon_scale) if n else 0.0
+
+        area = max(lat_span * lon_span, 1e-12)
+        cells = max(1.0, n / float(max(1, target_per_cell)))
+        self.cell_deg = max(math.sqrt(area / cells), 1e-6)
+        self.cell_lon_deg = self.cell_deg / lon_scale
+
+        self.cx = np.floor((self.lon - self.lon0) / self.cell_lon_deg).astype(np.int64)
+        self.cy = np.floor((self.lat - self.lat0) / self.cell_deg).astype(np.int64)
+        self.max_ring = int(max(self.cx.max(initial=0), self.cy.max(initial=0))) + 1
+
+        buckets: Dict[Tuple[int, int], List[int]] = {}
+        for i, key in enumerate(zip(self.cx.tolist(), self.cy.tolist())):
+            buckets.setdefault(key, []).append(i)
+        self.buckets = buckets
+
+    def _ring(self, cx: int, cy: int, r: int) -> List[int]:
+        out: List[int] = []
+        if r == 0:
+            return list(self.buckets.get((cx, cy), ()))
+        for x in range(cx - r, cx + r + 1):
+            out.extend(self.buckets.get((x, cy - r), ()))
+            out.extend(self.buckets.get((x, cy + r), ()))
+        for y in range(cy - r + 1, cy + r):
+            out.extend(self.buckets.get((cx - r, y), ()))
+            out.extend(self.buckets.get((cx + r, y), ()))
+        return out
+
+    def near(self, i: int, min_count: int) -> np.ndarray:
+        """
+        Indices of points in the rings around point i until at least
+        `min_count` (excluding i) are collected, plus one extra ring so that
+        points just across a cell border are not missed.
+        """
+        cx, cy = int(self.cx[i]), int(self.cy[i])
+        found: List[int] = []
+        r = 0
+        extra = None
+        while r <= self.max_ring:
+            found.extend(self._ring(cx, cy, r))
+            if extra is None and len(found) - 1 >= min_count:
+                extra = r + 1
+            if extra is not None and r >= extra:
+                break
+            r += 1
+        arr = np.asarray(found, dtype=np.int64)
+        return arr[arr != i]
+
+
+def knn_lists(
+    dist: np.ndarray,
+    lat: np.ndarray,
+    lon: np.ndarray,
+    k: int,
+    given: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    (n, k') int32 array, k' = min(k, n - 1): row i lists the k' closest
+    points to i by dist[i, :], nearest first.
+
+    With a `given` mask (pairs the matrix provided), given pairs come first
+    and estimated ones only fill rows that have fewer than k' given pairs.
+    """
+    n = int(dist.shape[0])
+    kk = max(0, min(int(k), n - 1))
+    if kk == 0:
+        return np.zeros((n, 0), dtype=np.int32)
+
+    if n <= FULL_SCAN_MAX_POINTS:
+        d = np.array(dist, dtype=np.float64, copy=True)
+        if given is not None:
+            d[~given] += NOT_GIVEN_PENALTY_KM
+        np.fill_diagonal(d, np.inf)
+        part = np.argpartition(d, kk - 1, axis=1)[:, :kk]
+        order = np.argsort(np.take_along_axis(d, part, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(part, order, axis=1).astype(np.int32)
+
+    grid = GridIndex(lat, lon)
+    out = np.empty((n, kk), dtype=np.int32)
+    want = kk * CANDIDATE_FACTOR
+    for i in range(n):
+        cand = grid.near(i, want)
+        if given is not None:
+            # Given pairs are candidates even when outside the grid rings
+            cand = np.union1d(cand, np.flatnonzero(given[i]))
+            cand = cand[cand != i]
+        if cand.size < kk:
+            cand = np.delete(np.arange(n), i)
+        row = dist[i, cand]
+        if given is not None:
+            row = row + np.where(given[i, cand], 0.0, NOT_GIVEN_PENALTY_KM)
+        if cand.size > kk:
+            part = np.argpartition(row, kk - 1)[:kk]
+        else:
+            part = np.arange(cand.size)
+        order = part[np.argsort(row[part], kind="stable")]
+        out[i] = cand[order]
+    return out
+
+
+def configured_road_factor() -> Optional[float]:
+    """ROAD_FACTOR: "auto" (default) -> None (calibrate), else a fixed factor."""
+    raw = str(os.getenv("ROAD_FACTOR", "auto") or "auto").strip().lower()
+    if raw == "auto":
+        return None
+    try:
+        return max(1.0, float(raw))
+    except ValueError:
+        logger.warning("invalid ROAD_FACTOR=%s, using auto", raw)
+        return None
+
+
+def calibrate_road_factor(road_km: np.ndarray, straight_km: np.ndarray) -> Optional[float]:
+    """
+    sum(road) / sum(straight line) over pairs at least ROAD_FACTOR_MIN_KM
+    apart, clipped to ROAD_FACTOR_BOUNDS; None below ROAD_FACTOR_MIN_PAIRS.
+
+    A ratio of sums weighs long pairs more than a mean of ratios would;
+    the estimate is mostly used for long-range pairs, where detours are a
+    smaller share of the trip than on the short pairs a k-nearest list holds.
+    """
+    keep = (straight_km >= ROAD_FACTOR_MIN_KM) & np.isfinite(road_km) & (road_km > 0)
+    if int(keep.sum()) < ROAD_FACTOR_MIN_PAIRS:
+        return None
+    factor = float(road_km[keep].sum() / straight_km[keep].sum())
+    lo, hi = ROAD_FACTOR_BOUNDS
+    return min(hi, max(lo, factor))
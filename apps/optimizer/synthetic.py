@@ -0,0 +1,184 @@
+"""
+Synthetic /optimize payloads (Kocaeli-sized area around the hub).
+
+Used by loadtest.py; handy for local benchmarks too:
+
+    from synthetic import make_instance
+    payload = make_instance(stations=80, problem_type="limited_vehicles_max_count", seed=3)
+
+Everything is drawn from random.Random(seed), so the same arguments give
+the same payload (and the same JSON bytes).
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+import math
+import random
+
+import numpy as np
+
+
+HUB = {"id": "hub-0000", "name": "Hub", "latitude": 40.8224, "longitude": 29.9256}
+PROBLEM_TYPES = (
+    "unlimited_vehicles",
+    "limited_vehicles_max_count",
+    "limited_vehicles_max_weight",
+)
+DEFAULT_CAPACITIES = (500.0, 750.0, 1000.0)
+# Road distance / great-circle distance
+ROAD_FACTOR = (1.2, 1.5)
+AVG_SPEED_KMH = 45.0
+
+
+def _haversine_km(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    la1, lo1, la2, lo2 = map(math.radians, (a["latitude"], a["longitude"], b["latitude"], b["longitude"]))
+    h = math.sin((la2 - la1) / 2) ** 2 + math.cos(la1) * math.cos(la2) * math.sin((lo2 - lo1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def make_instance(
+    stations: int = 20,
+    problem_type: str = "unlimited_vehicles",
+    seed: int = 0,
+    capacities: Sequence[float] = DEFAULT_CAPACITIES,
+    cargos_per_station: Tuple[int, int] = (1, 6),
+    matrix: bool = True,
+    missing: float = 0.0,
+    neighbors: int = 0,
+) -> Dict[str, Any]:
+    """
+    OptimizerInput dict with `stations` stations.
+
+    matrix=True fills distance_matrix with road-like distances (haversine x
+    ROAD_FACTOR); `missing` drops that share of entries so the optimizer's
+    fallback path is exercised. matrix=False sends an empty matrix.
+    neighbors=k sends sparse_matrix (k nearest per point) instead.
+    """
+    rng = random.Random(seed)
+    sts: List[Dict[str, Any]] = []
+    for i in range(stations):
+        cargos = [
+            {"id": f"c{i}-{j}", "weight_kg": round(rng.uniform(1, 40), 1), "user_id": f"u{rng.randint(0, 50)}"}
+            for j in range(rng.randint(*cargos_per_station))
+        ]
+        sts.append({
+            "id": f"st{i:04d}",
+            "name": f"S{i}",
+            "code": f"S{i}",
+            "latitude": 40.75 + rng.random() * 0.15,
+            "longitude": 29.75 + rng.random() * 0.4,
+            "cargo_count": len(cargos),
+            "total_weight_kg": round(sum(c["weight_kg"] for c in cargos), 2),
+            "cargos": cargos,
+        })
+
+    distance_matrix: Dict[str, Any] = {}
+    sparse = None
+    if matrix and neighbors > 0:
+        sparse = sparse_matrix([HUB] + sts, neighbors, seed)
+    elif matrix:
+        points = [HUB] + sts
+        for a in points:
+            for b in points:
+                if a is b or (missing > 0 and rng.random() < missing):
+                    continue
+                km = _haversine_km(a, b) * rng.uniform(*ROAD_FACTOR)
+                distance_matrix[f"{a['id']}_{b['id']}"] = {
+                    "distance_km": round(km, 3),
+                    "duration_minutes": round(km / AVG_SPEED_KMH * 60.0, 2),
+                    "polyline": "",
+                }
+
+    vehicles = [
+        {
+            "id": f"v{i}",
+            "name": f"V{i}",
+            "plate_number": f"41 K {i:03d}",
+            "capacity_kg": float(cap),
+            "ownership": "owned",
+            "rental_cost": 0,
+        }
+        for i, cap in enumerate(capacities)
+    ]
+    payload = {
+        "plan_date": "2025-12-14",
+        "problem_type": problem_type,
+        "hub": dict(HUB),
+        "stations": sts,
+        "vehicles": vehicles,
+        "parameters": {"cost_per_km": 1.0, "rental_cost": 200.0, "rental_capacity_kg": 500.0},
+        "distance_matrix": distance_matrix,
+    }
+    if sparse is not None:
+        payload["sparse_matrix"] = sparse
+    return payload
+
+
+def sparse_matrix(points: Sequence[Dict[str, Any]], k: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    k nearest points per point by road-like distance, in sparse_matrix (CSR)
+    form. Built row by row, so memory stays O(n * k) for large networks.
+    """
+    rng = np.random.default_rng(seed)
+    lat = np.radians([p["latitude"] for p in points])
+    lon = np.radians([p["longitude"] for p in points])
+    n = len(points)
+    kk = max(0, min(int(k), n - 1))
+    indptr, indices, km_out = [0], [], []
+    for i in range(n):
+        h = np.sin((lat - lat[i]) / 2) ** 2 + np.cos(lat[i]) * np.cos(lat) * np.sin((lon - lon[i]) / 2) ** 2
+        km = 2 * 6371.0 * np.arcsin(np.sqrt(np.minimum(h, 1.0))) * rng.uniform(*ROAD_FACTOR, size=n)
+        km[i] = np.inf
+        nearest = np.argpartition(km, kk - 1)[:kk] if kk else np.zeros(0, dtype=np.int64)
+        nearest = nearest[np.argsort(km[nearest], kind="stable")]
+        indices.extend(nearest.tolist())
+        km_out.extend(np.round(km[nearest], 3).tolist())
+        indptr.append(len(indices))
+    return {
+        "ids": [p["id"] for p in points],
+        "indptr": indptr,
+        "indices": indices,
+        "distance_km": km_out,
+        "duration_minutes": [round(d / AVG_SPEED_KMH * 60.0, 2) for d in km_out],
+    }
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """Parse "a:3,b:1" into [("a", 3.0), ("b", 1.0)]; a missing weight is 1."""
+    out: List[Tuple[str, float]] = []
+    for part in str(spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        key, _, weight = part.partition(":")
+        w = float(weight) if weight.strip() else 1.0
+        if w < 0:
+            raise ValueError(f"negative weight in mix: {part}")
+        out.append((key.strip(), w))
+    if not out or sum(w for _, w in out) <= 0:
+        raise ValueError(f"empty mix: {spec!r}")
+    return out
+
+
+def instance_pool(
+    sizes: Sequence[Tuple[int, float]],
+    per_size: int = 4,
+    seed: int = 0,
+    problem_types: Sequence[str] = PROBLEM_TYPES,
+    matrix: bool = True,
+) -> List[Tuple[Dict[str, Any], float]]:
+    """
+    `per_size` instances per station count, problem types round-robin.
+    Returns (payload, weight) with each size's weight split over its instances.
+    """
+    pool: List[Tuple[Dict[str, Any], float]] = []
+    for s_idx, (size, weight) in enumerate(sizes):
+        for k in range(per_size):
+            payload = make_instance(
+                stations=int(size),
+                problem_type=problem_types[k % len(problem_types)],
+                seed=seed * 1_000_003 + s_idx * 1009 + k,
+                matrix=matrix,
+            )
+            pool.append((payload, weight / per_size))
+    return pool
+
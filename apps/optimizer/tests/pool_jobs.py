@@ -0,0 +1,16 @@
+"""
+Jobs for SolverPool tests (test_pool.py, test_cancellation.py).
+"""
+
+import threading
+
+import executor
+from cancellation import CancellationToken
+
+
+def wait_for_flag(release: threading.Event, deadline=None, cancel_slot=None):
+    """Pool job: blocks until released or its cancel flag is raised."""
+    token = CancellationToken(deadline=deadline, flags=executor._CANCEL_FLAGS, slot=cancel_slot)
+    while not release.wait(0.01):
+        token.check()
+    return "done"
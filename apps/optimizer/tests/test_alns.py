@@ -0,0 +1,134 @@
+"""
+ALNS engine (alns.py, parameters.algorithm = "alns"): plan feasibility,
+time budget and cancellation.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+from collections import Counter
+import math
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alns import ALNS, START_WORSE, UNASSIGNED_PENALTY  # noqa: E402
+from cancellation import REASON_CLIENT_DISCONNECTED, CancellationToken, SolveCancelled  # noqa: E402
+from models import OptimizerInput  # noqa: E402
+from optimizer import VRPOptimizer  # noqa: E402
+from synthetic import make_instance  # noqa: E402
+
+
+PROBLEM_TYPES = ("unlimited_vehicles", "limited_vehicles_max_count", "limited_vehicles_max_weight")
+
+
+def _payload(stations: int, problem_type: str, seed: int, budget_s: float = 0.3):
+    payload = make_instance(stations, problem_type, seed=seed)
+    payload["parameters"].update(algorithm="alns", time_budget_s=budget_s)
+    return payload
+
+
+class _RecordingALNS(ALNS):
+    """Keeps a copy of the starting state the search ran from."""
+
+    def initial_state(self):
+        state = super().initial_state()
+        self.initial = state.copy()
+        return state
+
+
+class PlanTests(unittest.TestCase):
+    def _check_plan(self, payload, result):
+        self.assertTrue(result.success, result.error)
+        cargos = {c["id"]: c["weight_kg"] for st in payload["stations"] for c in st["cargos"]}
+        capacity = {v["id"]: v["capacity_kg"] for v in payload["vehicles"]}
+        rental = payload["parameters"]["rental_capacity_kg"]
+        seen = Counter()
+        for route in result.routes:
+            for c in route.assigned_cargos:
+                seen[c.cargo_id] += 1
+                self.assertEqual(c.weight_kg, cargos[c.cargo_id])
+            load = sum(c.weight_kg for c in route.assigned_cargos)
+            limit = rental if route.is_rented else capacity[route.vehicle_id]
+            self.assertLessEqual(load, limit + 1e-6, route.vehicle_id)
+        for u in result.unassigned:
+            seen[u.cargo_id] += 1
+        # Every cargo exactly once: on one route or reported unassigned
+        self.assertEqual(dict(seen), {cid: 1 for cid in cargos})
+        if payload["problem_type"] == "unlimited_vehicles":
+            self.assertEqual(result.unassigned, [])
+        else:
+            self.assertFalse(any(r.is_rented for r in result.routes))
+
+    def test_plans_are_feasible(self):
+        for problem_type in PROBLEM_TYPES:
+            for stations, seed in ((8, 1), (30, 4)):
+                payload = _payload(stations, problem_type, seed)
+                result = VRPOptimizer(OptimizerInput(**payload)).solve()
+                self._check_plan(payload, result)
+                self.assertEqual(result.algorithm_info["selected"]["strategy"], "alns")
+
+    def test_search_does_not_lose_payload(self):
+        for problem_type in PROBLEM_TYPES[1:]:
+            opt = VRPOptimizer(OptimizerInput(**_payload(40, problem_type, 4)))
+            search = _RecordingALNS(opt, time_budget_s=60, max_iterations=60)
+            best = search.run()
+            initial = search.initial
+            if problem_type.endswith("max_count"):
+                self.assertGreaterEqual(
+                    best.assigned_cargo_count,
+                    sum(len(s.cargos) for r in initial.routes for s in r),
+                )
+            else:
+                self.assertGreaterEqual(
+                    best.assigned_weight_kg + 1e-6,
+                    sum(s.weight_kg for r in initial.routes for s in r),
+                )
+
+
+class TemperatureTests(unittest.TestCase):
+    def test_start_temperature_ignores_unassigned_penalty(self):
+        opt = VRPOptimizer(OptimizerInput(**_payload(40, "limited_vehicles_max_count", 4)))
+        search = ALNS(opt, time_budget_s=0)
+        state = search.initial_state()
+        self.assertTrue(state.pool, "instance should leave cargos unassigned")
+        self.assertGreaterEqual(search.evaluate(state), UNASSIGNED_PENALTY)
+        t0 = search.start_temperature(state)
+        self.assertAlmostEqual(t0, START_WORSE * search.routing_cost(state) / math.log(2))
+        self.assertLess(t0, UNASSIGNED_PENALTY / 1000)
+
+
+class BudgetTests(unittest.TestCase):
+    def test_time_budget_is_honoured(self):
+        for problem_type in PROBLEM_TYPES:
+            opt = VRPOptimizer(OptimizerInput(**_payload(30, problem_type, 7, budget_s=0.4)))
+            t = time.perf_counter()
+            best = ALNS(opt, time_budget_s=0.4).run()
+            elapsed = time.perf_counter() - t
+            self.assertGreater(best.meta["alns"]["iterations"], 0)
+            # Construction + one last iteration on top of the budget
+            self.assertLess(elapsed, 0.4 + 1.5)
+            self.assertLess(best.meta["alns"]["elapsed_ms"], (0.4 + 1.5) * 1000)
+
+    def test_deadline_shortens_the_budget(self):
+        payload = _payload(30, "unlimited_vehicles", 7, budget_s=30)
+        token = CancellationToken(deadline=time.time() + 1.0)
+        t = time.perf_counter()
+        result = VRPOptimizer(OptimizerInput(**payload), cancel_token=token).solve()
+        self.assertTrue(result.success)
+        # Stops DEADLINE_MARGIN_S before the deadline, not after 30 s
+        self.assertLess(time.perf_counter() - t, 1.0)
+
+    def test_cancel_flag_stops_the_search(self):
+        payload = _payload(30, "limited_vehicles_max_weight", 7, budget_s=30)
+        token = CancellationToken(flags=[REASON_CLIENT_DISCONNECTED], slot=0)
+        t = time.perf_counter()
+        with self.assertRaises(SolveCancelled):
+            VRPOptimizer(OptimizerInput(**payload), cancel_token=token).solve()
+        self.assertLess(time.perf_counter() - t, 5.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Strategy bandit (bandit.py): persisted priors shared by pool worker
+processes.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bandit import StrategyBandit, load_priors, save_priors  # noqa: E402
+
+
+def _save_buckets(worker: int, count: int) -> None:
+    for i in range(count):
+        bandit = StrategyBandit(bucket=f"w{worker}-{i}")
+        bandit.update("pack", 0.01 * (i + 1))
+        save_priors(bandit)
+
+
+class PriorsTests(unittest.TestCase):
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with mock.patch.dict(os.environ, {"STRATEGY_PRIORS_PATH": os.path.join(tmp, "priors.json")}):
+                bandit = StrategyBandit(bucket="limited:20")
+                bandit.update("cluster", 0.03)
+                save_priors(bandit)
+                self.assertEqual(load_priors("limited:20"), bandit.posterior())
+                self.assertIsNone(load_priors("limited:40"))
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "needs fork")
+    def test_concurrent_processes_keep_every_bucket(self):
+        workers, count = 4, 15
+        with tempfile.TemporaryDirectory() as tmp:
+            with mock.patch.dict(os.environ, {"STRATEGY_PRIORS_PATH": os.path.join(tmp, "priors.json")}):
+                ctx = multiprocessing.get_context("fork")
+                procs = [ctx.Process(target=_save_buckets, args=(w, count)) for w in range(workers)]
+                for p in procs:
+                    p.start()
+                for p in procs:
+                    p.join(60)
+                    self.assertEqual(p.exitcode, 0)
+                for w in range(workers):
+                    for i in range(count):
+                        self.assertIsNotNone(load_priors(f"w{w}-{i}"), f"w{w}-{i} lost")
+                # Only the data file and its lock file remain
+                self.assertEqual(sorted(os.listdir(tmp)), ["priors.json", "priors.json.lock"])
+
+
+if __name__ == "__main__":
+    unittest.main()
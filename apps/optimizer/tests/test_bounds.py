@@ -0,0 +1,156 @@
+"""
+Lower / payload bounds (bounds.py) against brute force on small random
+instances.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import itertools
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bounds import PlanBounds, arborescence_bound, cheapest_out, gap_percent  # noqa: E402
+from models import OptimizerInput  # noqa: E402
+from optimizer import VRPOptimizer  # noqa: E402
+from synthetic import make_instance  # noqa: E402
+
+
+def _random_dist(n: int, rng: random.Random, symmetric: bool = False) -> np.ndarray:
+    dist = np.array([[rng.uniform(1.0, 50.0) for _ in range(n)] for _ in range(n)])
+    if symmetric:
+        dist = (dist + dist.T) / 2.0
+    np.fill_diagonal(dist, 0.0)
+    return dist
+
+
+def _min_arborescence(dist: np.ndarray, nodes, hub: int) -> float:
+    """Every parent choice (node -> other node or hub) that reaches the hub."""
+    best = float("inf")
+    choices = [[p for p in list(nodes) + [hub] if p != v] for v in nodes]
+    for parents in itertools.product(*choices):
+        parent = dict(zip(nodes, parents))
+        ok = True
+        for v in nodes:
+            seen = set()
+            while v != hub and ok:
+                if v in seen:
+                    ok = False
+                seen.add(v)
+                v = parent[v]
+            if not ok:
+                break
+        if ok:
+            best = min(best, sum(dist[v, parent[v]] for v in nodes))
+    return best
+
+
+def _min_paths(dist: np.ndarray, nodes, hub: int) -> float:
+    """Cheapest set of open paths ending at the hub that visits every node once."""
+    best = float("inf")
+    for order in itertools.permutations(nodes):
+        for cuts in itertools.product((False, True), repeat=len(order) - 1):
+            cost = 0.0
+            for i, v in enumerate(order):
+                last = i == len(order) - 1 or cuts[i]
+                cost += dist[v, hub] if last else dist[v, order[i + 1]]
+            best = min(best, cost)
+    return best
+
+
+class DistanceBoundTests(unittest.TestCase):
+    def test_arborescence_is_exact_and_below_every_plan(self):
+        rng = random.Random(42)
+        for trial in range(40):
+            n = rng.randint(2, 7)
+            dist = _random_dist(n, rng, symmetric=trial % 2 == 0)
+            hub = rng.randrange(n)
+            nodes = [i for i in range(n) if i != hub]
+            bound = arborescence_bound(dist, np.asarray(nodes, dtype=np.int64), hub)
+            cheap = float(cheapest_out(dist, np.asarray(nodes, dtype=np.int64), hub).sum())
+            exact = _min_arborescence(dist, nodes, hub)
+            self.assertAlmostEqual(bound, exact, places=6)
+            self.assertLessEqual(cheap, bound + 1e-9)
+            self.assertLessEqual(bound, _min_paths(dist, nodes, hub) + 1e-9)
+
+    def test_cheapest_out_excludes_self(self):
+        dist = np.array([[0.0, 5.0, 9.0], [4.0, 0.0, 2.0], [7.0, 3.0, 0.0]])
+        out = cheapest_out(dist, np.array([1, 2], dtype=np.int64), 0)
+        np.testing.assert_allclose(out, [2.0, 3.0])
+
+    def test_round_limit_still_gives_a_bound(self):
+        rng = random.Random(7)
+        dist = _random_dist(7, rng)
+        nodes = np.arange(1, 7, dtype=np.int64)
+        full = arborescence_bound(dist, nodes, 0)
+        for rounds in range(1, 4):
+            self.assertLessEqual(arborescence_bound(dist, nodes, 0, max_rounds=rounds), full + 1e-9)
+
+
+class PlanBoundsTests(unittest.TestCase):
+    def _bounds(self, dist, weights, rental_capacity_kg=100.0):
+        n = dist.shape[0]
+        return PlanBounds(dist, 0, range(1, n), weights, 2.0, 200.0, rental_capacity_kg)
+
+    def test_payload_bounds_against_subsets(self):
+        rng = random.Random(3)
+        dist = _random_dist(4, rng)
+        for _ in range(30):
+            weights = [round(rng.uniform(1, 40), 1) for _ in range(rng.randint(1, 9))]
+            capacity = rng.uniform(10, 150)
+            feasible = [
+                combo
+                for r in range(len(weights) + 1)
+                for combo in itertools.combinations(weights, r)
+                if sum(combo) <= capacity + 1e-6
+            ]
+            pb = self._bounds(dist, weights)
+            self.assertEqual(pb.payload_bound("max_count", capacity), max(len(c) for c in feasible))
+            self.assertGreaterEqual(pb.payload_bound("max_weight", capacity) + 1e-9, max(sum(c) for c in feasible))
+
+    def test_unlimited_cost_bound_below_brute_force(self):
+        rng = random.Random(11)
+        for _ in range(10):
+            dist = _random_dist(6, rng)
+            weights = [rng.uniform(10, 80) for _ in range(8)]
+            owned = rng.uniform(50, 400)
+            pb = self._bounds(dist, weights)
+            rentals = pb.min_rentals(owned)
+            # Fewer rentals cannot carry the load
+            self.assertGreaterEqual(owned + rentals * 100.0 + 1e-6, sum(weights))
+            if rentals:
+                self.assertLess(owned + (rentals - 1) * 100.0, sum(weights))
+            best = 2.0 * _min_paths(dist, list(range(1, 6)), 0) + rentals * 200.0
+            self.assertLessEqual(pb.unlimited_cost_bound(owned), best + 1e-9)
+            self.assertEqual(pb.method, "arborescence")
+
+    def test_served_subset_and_gap(self):
+        rng = random.Random(5)
+        dist = _random_dist(6, rng)
+        pb = self._bounds(dist, [1.0])
+        served = [2, 4]
+        self.assertLessEqual(pb.served_cost_bound(served), 2.0 * _min_paths(dist, served, 0) + 1e-9)
+        self.assertEqual(pb.served_cost_bound([]), 0.0)
+        self.assertEqual(gap_percent(100.0, 90.0), 10.0)
+        self.assertEqual(gap_percent(100.0, 120.0), 0.0)
+        self.assertEqual(gap_percent(0.0, 0.0), 0.0)
+
+
+class SolverBoundTests(unittest.TestCase):
+    def test_reported_bound_below_plan_cost(self):
+        for problem_type in ("unlimited_vehicles", "limited_vehicles_max_count", "limited_vehicles_max_weight"):
+            result = VRPOptimizer(OptimizerInput(**make_instance(9, problem_type, seed=8))).solve()
+            info = result.algorithm_info
+            self.assertLessEqual(info["lower_bound"], result.summary.total_cost + 1e-6)
+            self.assertEqual(info["gap_percent"], gap_percent(result.summary.total_cost, info["lower_bound"]))
+            if problem_type != "unlimited_vehicles":
+                self.assertIn("payload_upper_bound", info["bounds"])
+
+
+if __name__ == "__main__":
+    unittest.main()
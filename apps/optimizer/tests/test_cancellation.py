@@ -0,0 +1,118 @@
+"""
+Cooperative cancellation (cancellation.py): pool watch / deadline
+forwarding, solver check points and X-Request-Deadline parsing.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cancellation import (  # noqa: E402
+    REASON_CLIENT_DISCONNECTED,
+    REASON_DEADLINE,
+    REASON_NONE,
+    CancellationToken,
+    SolveCancelled,
+    parse_deadline_header,
+)
+from executor import SolverPool  # noqa: E402
+from models import OptimizerInput  # noqa: E402
+from optimizer import VRPOptimizer  # noqa: E402
+from synthetic import make_instance  # noqa: E402
+from tests.pool_jobs import wait_for_flag  # noqa: E402
+
+
+class PoolCancellationTests(unittest.TestCase):
+    def test_watch_cancels_running_and_queued_jobs(self):
+        async def run():
+            pool = SolverPool(workers=1, max_queue=1, mode="thread")
+            pool.start()
+            release = threading.Event()
+
+            async def disconnected():
+                return REASON_CLIENT_DISCONNECTED
+
+            try:
+                running = asyncio.ensure_future(pool.submit(wait_for_flag, release, watch=disconnected))
+                await asyncio.sleep(0.05)
+                queued = asyncio.ensure_future(pool.submit(wait_for_flag, release, watch=disconnected))
+                outcomes = await asyncio.gather(running, queued, return_exceptions=True)
+                # The running job's slot comes back via call_soon_threadsafe
+                await asyncio.sleep(0.05)
+                return outcomes, pool.stats()
+            finally:
+                release.set()
+                pool.shutdown()
+
+        outcomes, stats = asyncio.run(run())
+        for outcome in outcomes:
+            self.assertIsInstance(outcome, SolveCancelled)
+            self.assertEqual(outcome.reason, "client_disconnected")
+        self.assertEqual(stats["cancelled"], {"client_disconnected": 2})
+        self.assertEqual((stats["busy_workers"], stats["queue_depth"]), (0, 0))
+
+    def test_deadline_reaches_the_job(self):
+        async def run():
+            pool = SolverPool(workers=1, max_queue=0, mode="thread")
+            pool.start()
+            release = threading.Event()
+            try:
+                return await pool.submit(wait_for_flag, release, deadline=time.time() + 0.05)
+            finally:
+                release.set()
+                pool.shutdown()
+
+        with self.assertRaises(SolveCancelled) as ctx:
+            asyncio.run(run())
+        self.assertEqual(ctx.exception.reason, "deadline_exceeded")
+
+
+class SolveCancellationTests(unittest.TestCase):
+    def _input(self):
+        return OptimizerInput(**make_instance(12, seed=3))
+
+    def test_raised_flag_stops_the_solve(self):
+        flags = [REASON_NONE, REASON_CLIENT_DISCONNECTED]
+        token = CancellationToken(flags=flags, slot=1)
+        with self.assertRaises(SolveCancelled) as ctx:
+            VRPOptimizer(self._input(), cancel_token=token).solve()
+        self.assertEqual(ctx.exception.reason, "client_disconnected")
+
+    def test_passed_deadline_stops_the_solve(self):
+        token = CancellationToken(deadline=time.time() - 1)
+        with self.assertRaises(SolveCancelled) as ctx:
+            VRPOptimizer(self._input(), cancel_token=token).solve()
+        self.assertEqual(ctx.exception.reason, "deadline_exceeded")
+
+    def test_clear_token_solves(self):
+        token = CancellationToken(deadline=time.time() + 600, flags=[0], slot=0)
+        self.assertIsNone(token.reason())
+        self.assertTrue(VRPOptimizer(self._input(), cancel_token=token).solve().success)
+
+    def test_flag_names(self):
+        self.assertEqual(CancellationToken(flags=[REASON_DEADLINE], slot=0).reason(), "deadline_exceeded")
+        self.assertEqual(CancellationToken(flags=[9], slot=0).reason(), "cancelled")
+
+
+class DeadlineHeaderTests(unittest.TestCase):
+    def test_seconds_and_milliseconds(self):
+        self.assertEqual(parse_deadline_header("1760000000"), 1760000000.0)
+        self.assertEqual(parse_deadline_header("1760000000.5"), 1760000000.5)
+        self.assertEqual(parse_deadline_header(" 1760000000123 "), 1760000000.123)
+
+    def test_missing_and_invalid(self):
+        self.assertIsNone(parse_deadline_header(None))
+        self.assertIsNone(parse_deadline_header("  "))
+        with self.assertRaises(ValueError):
+            parse_deadline_header("yarın")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+"""
+Geographic decomposition (decomposition.py): sector partitioning, fleet
+allocation, boundary repair and the stitched plan.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+from collections import Counter
+import os
+import random
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from decomposition import (  # noqa: E402
+    DecompositionConfig,
+    _BoundaryRepair,
+    allocate_fleet,
+    kmeans_sectors,
+    sector_count,
+    should_decompose,
+    sweep_sectors,
+)
+from models import OptimizerInput  # noqa: E402
+from optimizer import StopAssignment, Vehicle, VRPOptimizer  # noqa: E402
+from synthetic import make_instance  # noqa: E402
+
+
+PROBLEM_TYPES = ("unlimited_vehicles", "limited_vehicles_max_count", "limited_vehicles_max_weight")
+CAPACITIES = (500.0, 750.0, 1000.0, 750.0, 1000.0)
+
+
+def _env(method: str = "sweep") -> dict:
+    # Small thresholds so a 40-60 station instance is split in-process
+    return {
+        "DECOMPOSE_METHOD": method,
+        "DECOMPOSE_MIN_STATIONS": "20",
+        "DECOMPOSE_MIN_CARGOS": "100000",
+        "DECOMPOSE_SECTOR_STATIONS": "15",
+        "DECOMPOSE_WORKERS": "1",
+        "DECOMPOSE_REPAIR_PASSES": "4",
+    }
+
+
+def _optimizer(stations: int, problem_type: str, seed: int) -> VRPOptimizer:
+    return VRPOptimizer(OptimizerInput(**make_instance(stations, problem_type, seed=seed, capacities=CAPACITIES)))
+
+
+def _route_cargos(routes):
+    return Counter(str(c.get("id")) for r in routes for s in r for c in s.cargos)
+
+
+class PartitionTests(unittest.TestCase):
+    def test_sectors_partition_the_stations(self):
+        with mock.patch.dict(os.environ, _env()):
+            cfg = DecompositionConfig.from_env()
+        for seed in (1, 2, 3):
+            for problem_type in PROBLEM_TYPES:
+                opt = _optimizer(50, problem_type, seed)
+                count = sector_count(opt, cfg)
+                self.assertTrue(should_decompose(opt, cfg))
+                if problem_type != "unlimited_vehicles":
+                    # One owned vehicle per limited sector at least
+                    self.assertLessEqual(count, len(CAPACITIES))
+                for split in (sweep_sectors, kmeans_sectors):
+                    groups = split(opt, count)
+                    self.assertLessEqual(len(groups), count)
+                    self.assertTrue(all(groups))
+                    self.assertEqual(sorted(i for g in groups for i in g), list(range(len(opt.stations))))
+
+    def test_small_or_switched_off_instances_stay_whole(self):
+        opt = _optimizer(12, "unlimited_vehicles", 1)
+        with mock.patch.dict(os.environ, _env()):
+            self.assertFalse(should_decompose(opt))
+        opt = _optimizer(50, "unlimited_vehicles", 1)
+        with mock.patch.dict(os.environ, _env("off")):
+            self.assertFalse(should_decompose(opt))
+
+    def test_fleet_allocation_uses_each_vehicle_once(self):
+        for problem_type in PROBLEM_TYPES:
+            opt = _optimizer(50, problem_type, 4)
+            owned = [v for v in opt.vehicles if not v.is_rented]
+            groups = sweep_sectors(opt, 4)
+            fleets = allocate_fleet(opt, groups)
+            self.assertEqual(len(fleets), len(groups))
+            self.assertEqual(sorted(v.id for f in fleets for v in f), sorted(v.id for v in owned))
+            if problem_type != "unlimited_vehicles":
+                self.assertTrue(all(fleets))
+
+
+class BoundaryRepairTests(unittest.TestCase):
+    def _scrambled(self, opt, rng, sectors=3, capacity=3000.0):
+        """Routes over randomly assigned sectors (so relocations pay off)."""
+        stations = opt._clone_stations()
+        for st in stations:
+            opt._refresh_station_totals(st)
+        routes = [[] for _ in range(sectors)]
+        sector_of = {}
+        for st in stations:
+            k = rng.randrange(sectors)
+            sector_of[st.idx] = k
+            routes[k].append(StopAssignment(station=st, cargos=list(st.cargos), weight_kg=round(st.weight_kg, 2)))
+            st.cargos = []
+        vehicles = [Vehicle(id=f"t{k}", name=f"T{k}", capacity_kg=capacity, is_rented=False, rental_cost=0.0)
+                    for k in range(sectors)]
+        return stations, routes, vehicles, sector_of
+
+    def _check_metrics(self, opt, repair):
+        for route, vehicle, metrics in zip(repair.routes, repair.vehicles, repair.metrics):
+            load = sum(s.weight_kg for s in route)
+            self.assertAlmostEqual(metrics.weight_kg, load, places=6)
+            self.assertLessEqual(load, vehicle.capacity_kg + 1e-6)
+            self.assertAlmostEqual(metrics.distance_km, opt.calculate_route_distance(route), places=6)
+
+    def test_relocate_pass_keeps_cargos_and_capacity(self):
+        rng = random.Random(6)
+        for seed in range(4):
+            opt = _optimizer(30, "unlimited_vehicles", seed)
+            _, routes, vehicles, sector_of = self._scrambled(opt, rng)
+            before = _route_cargos(routes)
+            repair = _BoundaryRepair(opt, routes, vehicles, sector_of)
+            km = repair.distance_km
+            moves = repair.relocate_pass()
+            self.assertGreater(moves, 0)
+            self.assertEqual(repair.relocations, moves)
+            self.assertLess(repair.distance_km, km)
+            self.assertEqual(_route_cargos(repair.routes), before)
+            self._check_metrics(opt, repair)
+
+    def test_relocation_respects_capacity(self):
+        rng = random.Random(7)
+        opt = _optimizer(30, "unlimited_vehicles", 2)
+        _, routes, vehicles, sector_of = self._scrambled(opt, rng)
+        for v, r in zip(vehicles, routes):
+            # No spare room anywhere: nothing can move
+            v.capacity_kg = sum(s.weight_kg for s in r)
+        repair = _BoundaryRepair(opt, routes, vehicles, sector_of)
+        self.assertEqual(repair.relocate_pass(), 0)
+        self._check_metrics(opt, repair)
+
+    def test_insert_leftovers_fills_spare_capacity_only(self):
+        rng = random.Random(8)
+        for objective in ("max_count", "max_weight"):
+            opt = _optimizer(30, "limited_vehicles_" + objective, 3)
+            stations, routes, vehicles, sector_of = self._scrambled(opt, rng, capacity=0.0)
+            # Every other stop goes back to its station as a leftover
+            for r in routes:
+                for stop in r[1::2]:
+                    stop.station.cargos = list(stop.cargos)
+                    opt._refresh_station_totals(stop.station)
+                del r[1::2]
+            for v, r in zip(vehicles, routes):
+                v.capacity_kg = sum(s.weight_kg for s in r) + 150.0
+            all_ids = {str(c["id"]) for st in opt.stations for c in st.cargos}
+            repair = _BoundaryRepair(opt, routes, vehicles, sector_of)
+            repair.insert_leftovers(stations, objective)
+            placed = _route_cargos(repair.routes)
+            left = Counter(str(c["id"]) for st in stations for c in st.cargos)
+            self.assertGreater(repair.inserted_cargos, 0)
+            self.assertEqual(max((placed + left).values()), 1)
+            self.assertEqual(set(placed) | set(left), all_ids)
+            self._check_metrics(opt, repair)
+
+
+class StitchedPlanTests(unittest.TestCase):
+    def _check(self, payload, result):
+        self.assertTrue(result.success, result.error)
+        self.assertIn("decomposition", result.algorithm_info)
+        self.assertGreaterEqual(len(result.algorithm_info["decomposition"]["sectors"]), 2)
+        cargos = {c["id"] for st in payload["stations"] for c in st["cargos"]}
+        capacity = {v["id"]: v["capacity_kg"] for v in payload["vehicles"]}
+        rental = payload["parameters"]["rental_capacity_kg"]
+        served = Counter()
+        for route in result.routes:
+            served.update(c.cargo_id for c in route.assigned_cargos)
+            load = sum(c.weight_kg for c in route.assigned_cargos)
+            self.assertLessEqual(load, (rental if route.is_rented else capacity[route.vehicle_id]) + 1e-6)
+        used = [r.vehicle_id for r in result.routes if not r.is_rented]
+        self.assertEqual(len(used), len(set(used)), "owned vehicle used twice")
+        # Served at most once; the rest is reported unassigned
+        self.assertLessEqual(max(served.values()), 1)
+        unassigned = {u.cargo_id for u in result.unassigned}
+        self.assertEqual(set(served) | unassigned, cargos)
+        self.assertFalse(set(served) & unassigned)
+        if payload["problem_type"] == "unlimited_vehicles":
+            self.assertEqual(unassigned, set())
+
+    def test_stitched_plans_are_feasible(self):
+        for method in ("sweep", "kmeans"):
+            for problem_type in PROBLEM_TYPES:
+                payload = make_instance(45, problem_type, seed=5, capacities=CAPACITIES)
+                with mock.patch.dict(os.environ, _env(method)):
+                    result = VRPOptimizer(OptimizerInput(**payload)).solve()
+                self._check(payload, result)
+                self.assertEqual(result.algorithm_info["decomposition"]["method"], method)
+
+    def test_sector_pool_gives_the_in_process_plan(self):
+        payload = make_instance(45, "unlimited_vehicles", seed=6, capacities=CAPACITIES)
+        costs = []
+        for workers in ("1", "2"):
+            with mock.patch.dict(os.environ, dict(_env(), DECOMPOSE_WORKERS=workers)):
+                result = VRPOptimizer(OptimizerInput(**payload)).solve()
+            self._check(payload, result)
+            self.assertEqual(result.algorithm_info["decomposition"]["workers"], int(workers))
+            costs.append(result.summary.total_cost)
+        self.assertEqual(costs[0], costs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Fleet compositions and cover fleets (fleet.py) against brute force.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+from collections import Counter
+from types import SimpleNamespace
+import itertools
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fleet import (  # noqa: E402
+    canonical,
+    composition_count,
+    compositions,
+    cover_fleets,
+    fleet_neighbors,
+    group_types,
+    vehicle_type,
+)
+
+
+def _vehicle(i: int, capacity: float, rented: bool = False) -> SimpleNamespace:
+    return SimpleNamespace(id=f"v{i:02d}", capacity_kg=float(capacity), is_rented=rented, rental_cost=0.0)
+
+
+def _random_fleet(rng: random.Random, n: int):
+    return [_vehicle(i, rng.choice((500, 750, 1000, 1250, 1500))) for i in range(n)]
+
+
+def _ids(fleet):
+    return [v.id for v in fleet]
+
+
+class CompositionTests(unittest.TestCase):
+    def test_distinct_vehicles_keep_combinations_order(self):
+        vehicles = [_vehicle(i, 500 + 250 * i) for i in range(5)]
+        expected = [
+            _ids(combo) for r in range(1, len(vehicles) + 1) for combo in itertools.combinations(vehicles, r)
+        ]
+        self.assertEqual([_ids(f) for f in compositions(group_types(vehicles))], expected)
+
+    def test_identical_vehicles_collapse(self):
+        vehicles = [_vehicle(i, 750) for i in range(4)] + [_vehicle(9, 1000)]
+        groups = group_types(vehicles)
+        fleets = compositions(groups)
+        self.assertEqual(len(fleets), composition_count(groups))
+        self.assertEqual(len(fleets), 5 * 2 - 1)
+        self.assertEqual(len({tuple(sorted(vehicle_type(v) for v in f)) for f in fleets}), len(fleets))
+        for fleet in fleets:
+            self.assertEqual(_ids(fleet), _ids(canonical(fleet, groups)))
+
+
+class _FleetAsserts(unittest.TestCase):
+    def _assert_canonical(self, fleet, vehicles):
+        """No vehicle twice; per type the first `count` vehicles by id."""
+        self.assertEqual(len(set(_ids(fleet))), len(fleet), "vehicle used twice")
+        by_type = {}
+        for v in sorted(vehicles, key=lambda v: v.id):
+            by_type.setdefault(vehicle_type(v), []).append(v.id)
+        used = Counter(vehicle_type(v) for v in fleet)
+        for t, count in used.items():
+            self.assertEqual(sorted(v.id for v in fleet if vehicle_type(v) == t), by_type[t][:count])
+
+
+class CoverFleetTests(_FleetAsserts):
+    def test_rebuilt_subsets_cover_and_are_smallest(self):
+        rng = random.Random(21)
+        for _ in range(40):
+            vehicles = _random_fleet(rng, rng.randint(1, 9))
+            total = sum(v.capacity_kg for v in vehicles)
+            target = rng.uniform(0.1, 1.1) * total
+            fleets = cover_fleets(vehicles, target, extra_sizes=2)
+            self.assertTrue(fleets)
+            for fleet in fleets:
+                self._assert_canonical(fleet, vehicles)
+                if total >= target - 1e-6:
+                    self.assertGreaterEqual(sum(v.capacity_kg for v in fleet), target - 1e-6)
+            if total < target - 1e-6:
+                self.assertEqual(sorted(_ids(fleets[0])), sorted(_ids(vehicles)))
+                continue
+            # Per fleet size: the tightest covering k-subset is among them
+            caps = [v.capacity_kg for v in vehicles]
+            sizes = [
+                k for k in range(1, len(caps) + 1)
+                if any(sum(c) >= target - 1e-6 for c in itertools.combinations(caps, k))
+            ]
+            for k in sizes[:3]:
+                tightest = min(
+                    sum(c) for c in itertools.combinations(caps, k) if sum(c) >= target - 1e-6
+                )
+                got = [sum(v.capacity_kg for v in f) for f in fleets if len(f) == k]
+                self.assertIn(tightest, got)
+
+    def test_empty_fleet(self):
+        self.assertEqual(cover_fleets([], 100.0), [])
+
+
+class NeighborTests(_FleetAsserts):
+    def test_moves_stay_in_owned_fleet(self):
+        rng = random.Random(8)
+        for _ in range(30):
+            owned = _random_fleet(rng, rng.randint(2, 10))
+            fleet = rng.sample(owned, rng.randint(1, len(owned)))
+            base = Counter(vehicle_type(v) for v in fleet)
+            seen = set()
+            for nb in fleet_neighbors(fleet, owned):
+                self.assertTrue(nb)
+                self._assert_canonical(nb, owned)
+                self.assertTrue(set(_ids(nb)) <= set(_ids(owned)))
+                key = tuple(sorted(vehicle_type(v) for v in nb))
+                self.assertNotIn(key, seen)
+                seen.add(key)
+                # One add, drop or swap away from the fleet
+                diff = Counter(vehicle_type(v) for v in nb)
+                self.assertLessEqual(sum(((diff - base) + (base - diff)).values()), 2)
+                self.assertNotEqual(diff, base)
+
+
+if __name__ == "__main__":
+    unittest.main()
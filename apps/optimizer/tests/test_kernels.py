@@ -0,0 +1,172 @@
+"""
+Parity of the compiled kernels with the pure-Python path.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+The Numba cases are skipped when numba is not installed.
+"""
+
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kernels  # noqa: E402
+from models import OptimizerInput  # noqa: E402
+from optimizer import VRPOptimizer  # noqa: E402
+
+
+def _matrix(rng: random.Random, n: int, integral: bool = False) -> np.ndarray:
+    """Asymmetric distances; integral values produce exact ties."""
+    if integral:
+        d = np.array([[float(rng.randint(1, 6)) for _ in range(n)] for _ in range(n)])
+    else:
+        d = np.array([[rng.uniform(0.5, 30.0) for _ in range(n)] for _ in range(n)])
+    np.fill_diagonal(d, 0.0)
+    return d
+
+
+def _route_length(d: np.ndarray, seq) -> float:
+    return float(sum(d[a, b] for a, b in zip(seq, seq[1:])))
+
+
+def _instance(seed: int, n: int, problem_type: str) -> dict:
+    rng = random.Random(seed)
+    stations = []
+    for i in range(n):
+        cargos = [
+            {"id": f"c{i}-{j}", "weight_kg": round(rng.uniform(1, 40), 1), "user_id": "u1"}
+            for j in range(rng.randint(1, 5))
+        ]
+        stations.append({
+            "id": f"st{i:03d}",
+            "name": f"S{i}",
+            "code": f"S{i}",
+            "latitude": 40.75 + rng.random() * 0.15,
+            "longitude": 29.75 + rng.random() * 0.4,
+            "cargo_count": len(cargos),
+            "total_weight_kg": round(sum(c["weight_kg"] for c in cargos), 2),
+            "cargos": cargos,
+        })
+    vehicles = [
+        {"id": f"v{i}", "name": f"V{i}", "plate_number": f"41 K {i}", "capacity_kg": cap,
+         "ownership": "owned", "rental_cost": 0}
+        for i, cap in enumerate((500, 750, 1000))
+    ]
+    return {
+        "plan_date": "2025-12-14",
+        "problem_type": problem_type,
+        "hub": {"id": "hub", "name": "Hub", "latitude": 40.8224, "longitude": 29.9256},
+        "stations": stations,
+        "vehicles": vehicles,
+        "parameters": {"cost_per_km": 1.0, "rental_cost": 200.0, "rental_capacity_kg": 500.0},
+        "distance_matrix": {},
+    }
+
+
+def _plan(data: dict) -> list:
+    out = VRPOptimizer(OptimizerInput(**data)).solve()
+    return [
+        (r.vehicle_name, [s.station_id for s in r.route_sequence], round(r.total_distance_km, 6))
+        for r in out.routes
+    ] + [round(out.summary.total_cost, 6)]
+
+
+class PythonKernelTests(unittest.TestCase):
+    def test_two_opt_never_lengthens_and_permutes_order(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            n = rng.randint(3, 25)
+            d = _matrix(rng, n + 1)
+            seq = rng.sample(range(1, n + 1), n) + [0]
+            before = _route_length(d, seq)
+            order = list(range(n))
+            original = list(seq)
+            kernels.two_opt_pass_py(d.tolist(), seq, order, 1e-9)
+            self.assertLessEqual(_route_length(d, seq), before + 1e-9)
+            self.assertEqual([original[k] for k in order], seq[:n])
+
+    def test_nearest_feasible_matches_scan(self):
+        rng = random.Random(11)
+        for _ in range(200):
+            n = rng.randint(1, 30)
+            drow = [rng.uniform(0, 10) for _ in range(n)]
+            min_w = [rng.choice((float("inf"), rng.uniform(1, 50))) for _ in range(n)]
+            pool = rng.sample(range(n), rng.randint(0, n))
+            cap = rng.uniform(0, 60)
+            pos, _ = kernels.nearest_feasible_py(drow, pool, min_w, cap)
+            feasible = [k for k, i in enumerate(pool) if min_w[i] <= cap + kernels.FIT_EPS]
+            if not feasible:
+                self.assertEqual(pos, -1)
+            else:
+                self.assertEqual(pos, min(feasible, key=lambda k: (drow[pool[k]], k)))
+
+    def test_best_fit_respects_capacity_when_possible(self):
+        caps = [10.0, 5.0, 7.0]
+        where = kernels.best_fit_py([7.0, 5.0, 4.0, 1.0], list(caps))
+        self.assertEqual(where, [2, 1, 0, 0])
+
+
+@unittest.skipUnless(kernels.available(), "numba not installed")
+class CompiledParityTests(unittest.TestCase):
+    def setUp(self):
+        self._prev = kernels.backend()
+        kernels.set_backend("numba")
+
+    def tearDown(self):
+        kernels.set_backend(self._prev)
+
+    def test_two_opt_pass(self):
+        rng = random.Random(3)
+        for trial in range(100):
+            n = rng.randint(2, 40)
+            d = _matrix(rng, n + 1, integral=trial % 3 == 0)
+            seq = rng.sample(range(1, n + 1), n) + [0]
+            py_seq, py_order = list(seq), list(range(n))
+            py_moves = kernels.two_opt_pass_py(d.tolist(), py_seq, py_order, 1e-9)
+            nb_seq, nb_order = np.array(seq, dtype=np.int64), np.arange(n, dtype=np.int64)
+            nb_moves = kernels.two_opt_pass(d, nb_seq, nb_order, 1e-9)
+            self.assertEqual(py_moves, nb_moves)
+            self.assertEqual(py_seq, nb_seq.tolist())
+            self.assertEqual(py_order, nb_order.tolist())
+
+    def test_nearest_feasible(self):
+        rng = random.Random(5)
+        for trial in range(300):
+            n = rng.randint(1, 30)
+            drow = [float(rng.randint(0, 4)) if trial % 2 else rng.uniform(0, 10) for _ in range(n)]
+            min_w = [rng.choice((float("inf"), rng.uniform(1, 50))) for _ in range(n)]
+            pool = rng.sample(range(n), rng.randint(0, n))
+            cap = rng.uniform(0, 60)
+            expected = kernels.nearest_feasible_py(drow, pool, min_w, cap)
+            pos, tie = kernels.nearest_feasible(
+                np.array(drow), np.array(pool, dtype=np.int64), np.array(min_w), cap
+            )
+            self.assertEqual(expected, (int(pos), bool(tie)))
+
+    def test_best_fit(self):
+        rng = random.Random(9)
+        for _ in range(100):
+            weights = sorted((round(rng.uniform(1, 400), 1) for _ in range(rng.randint(0, 40))), reverse=True)
+            caps = [float(rng.choice((500, 750, 1000))) for _ in range(rng.randint(1, 6))]
+            py_caps = list(caps)
+            expected = kernels.best_fit_py(weights, py_caps)
+            nb_caps = np.array(caps)
+            got = kernels.best_fit(np.array(weights, dtype=np.float64), nb_caps)
+            self.assertEqual(expected, got.tolist())
+            self.assertEqual(py_caps, nb_caps.tolist())
+
+    def test_solve_identical_plans(self):
+        for seed, problem_type in ((1, "unlimited_vehicles"), (2, "limited_vehicles_max_count"), (3, "limited_vehicles_max_weight")):
+            data = _instance(seed, 40, problem_type)
+            kernels.set_backend("python")
+            expected = _plan(data)
+            kernels.set_backend("numba")
+            self.assertEqual(expected, _plan(data), problem_type)
+
+
+if __name__ == "__main__":
+    unittest.main()
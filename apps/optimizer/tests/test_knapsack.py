@@ -0,0 +1,153 @@
+"""
+Cargo selection (knapsack.py) against brute force on small inputs.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+from collections import Counter
+import itertools
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knapsack import _fill, _grid, _Search, best_fit, select_cargos  # noqa: E402
+from models import OptimizerInput  # noqa: E402
+from optimizer import VRPOptimizer  # noqa: E402
+from synthetic import make_instance  # noqa: E402
+
+
+def _assignments(weights, capacities):
+    """Every feasible cargo -> vehicle assignment (len(capacities) = not loaded)."""
+    n_veh = len(capacities)
+    for choice in itertools.product(range(n_veh + 1), repeat=len(weights)):
+        loads = [0.0] * n_veh
+        for w, v in zip(weights, choice):
+            if v < n_veh:
+                loads[v] += w
+        if all(load <= cap + 1e-9 for load, cap in zip(loads, capacities)):
+            yield choice
+
+
+def _random_case(rng: random.Random, max_items: int = 7):
+    weights = [float(rng.randint(1, 12)) for _ in range(rng.randint(1, max_items))]
+    capacities = [float(rng.randint(3, 20)) for _ in range(rng.randint(1, 3))]
+    return weights, capacities
+
+
+class SelectCargosTests(unittest.TestCase):
+    def _check_fits(self, weights, capacities, selection):
+        self.assertEqual(len(selection), len(capacities))
+        used = [i for sel in selection for i in sel]
+        self.assertEqual(len(used), len(set(used)), "cargo loaded twice")
+        for sel, cap in zip(selection, capacities):
+            self.assertLessEqual(sum(weights[i] for i in sel), cap + 1e-9)
+
+    def test_loads_fit_after_grid_rounding(self):
+        rng = random.Random(1)
+        for _ in range(60):
+            # Off-grid weights and capacities large enough for a coarse DP unit
+            weights = [round(rng.uniform(0.001, 400.0), rng.choice((0, 2, 3))) for _ in range(rng.randint(1, 40))]
+            capacities = [rng.choice((rng.uniform(1, 300), rng.uniform(1e5, 1e6))) for _ in range(rng.randint(1, 4))]
+            for objective in ("max_weight", "max_count"):
+                self._check_fits(weights, capacities, select_cargos(weights, capacities, objective))
+
+    def test_max_weight_matches_brute_force(self):
+        rng = random.Random(2)
+        for _ in range(80):
+            weights, capacities = _random_case(rng)
+            selection = select_cargos(weights, capacities, "max_weight")
+            self._check_fits(weights, capacities, selection)
+            best = max(
+                sum(w for w, v in zip(weights, choice) if v < len(capacities))
+                for choice in _assignments(weights, capacities)
+            )
+            self.assertAlmostEqual(sum(weights[i] for sel in selection for i in sel), best)
+
+    def test_max_count_packs_the_lightest(self):
+        rng = random.Random(3)
+        for _ in range(80):
+            weights, capacities = _random_case(rng)
+            selection = select_cargos(weights, capacities, "max_count")
+            self._check_fits(weights, capacities, selection)
+            best = max(sum(1 for v in choice if v < len(capacities)) for choice in _assignments(weights, capacities))
+            chosen = [weights[i] for sel in selection for i in sel]
+            self.assertEqual(len(chosen), best)
+            # The K lightest are in (any K-set that packs can be swapped for them)
+            lightest = Counter(sorted(weights)[:best])
+            self.assertEqual(lightest - Counter(chosen), Counter())
+
+    def test_best_fit_fits_and_never_beats_the_selection(self):
+        rng = random.Random(5)
+        for _ in range(80):
+            weights, capacities = _random_case(rng)
+            for objective in ("max_weight", "max_count"):
+                fallback = best_fit(weights, capacities, objective)
+                self._check_fits(weights, capacities, fallback)
+                chosen = select_cargos(weights, capacities, objective)
+                if objective == "max_count":
+                    self.assertLessEqual(sum(map(len, fallback)), sum(map(len, chosen)))
+                else:
+                    self.assertLessEqual(
+                        sum(weights[i] for sel in fallback for i in sel),
+                        sum(weights[i] for sel in chosen for i in sel) + 1e-9,
+                    )
+
+    def test_empty_inputs(self):
+        self.assertEqual(select_cargos([], [10.0, 5.0], "max_weight"), [[], []])
+        self.assertEqual(select_cargos([1.0], [], "max_count"), [])
+        self.assertEqual(select_cargos([50.0], [10.0], "max_count"), [[]])
+
+
+class FillTests(unittest.TestCase):
+    def test_fill_is_exact_subset_sum(self):
+        rng = random.Random(4)
+        for _ in range(100):
+            wu = np.array([rng.randint(1, 15) for _ in range(rng.randint(1, 9))], dtype=np.int64)
+            cap = rng.randint(0, 40)
+            items = np.arange(wu.size, dtype=np.int64)
+            chosen = _fill(wu, items, cap)
+            self.assertEqual(len(set(chosen.tolist())), chosen.size)
+            best = max(
+                sum(int(wu[i]) for i in combo)
+                for r in range(wu.size + 1)
+                for combo in itertools.combinations(range(wu.size), r)
+                if sum(int(wu[i]) for i in combo) <= cap
+            )
+            self.assertEqual(int(wu[chosen].sum()), best)
+
+    def test_grid_rounds_weights_up_and_capacities_down(self):
+        # Coarsest exact grid step: 0.05 kg
+        wu, caps = _grid([0.25, 1.5, 2.0], [3.9])
+        self.assertEqual(wu.tolist(), [5, 30, 40])
+        self.assertEqual(caps, [78])
+        # Large capacity: 2 kg cells, 3 kg rounds up to 2 cells
+        wu, caps = _grid([3.0, 10.0], [131072.0, 5.0])
+        self.assertEqual(wu.tolist(), [2, 5])
+        self.assertEqual(caps, [65536, 2])
+
+    def test_search_respects_node_budget(self):
+        wu = np.array([5, 4, 3, 3, 2, 1], dtype=np.int64)
+        search = _Search(wu, [6, 6, 5], node_budget=2)
+        fills = search.run(np.arange(wu.size, dtype=np.int64))
+        self.assertGreaterEqual(search.nodes, 0)
+        self.assertLessEqual(sum(f.size for f in fills), wu.size)
+        for f, cap in zip(fills, [6, 6, 5]):
+            self.assertLessEqual(int(wu[f].sum()), cap)
+
+
+class PackStrategyTests(unittest.TestCase):
+    def test_equal_count_selection_routes_no_worse_than_best_fit(self):
+        # The DP set alone carried the same 121 cargos for 445.91; the
+        # light-first best-fit set routes for 416.06.
+        result = VRPOptimizer(OptimizerInput(**make_instance(40, "limited_vehicles_max_count", seed=4))).solve()
+        self.assertEqual(result.summary.total_cargos, 121)
+        self.assertLessEqual(result.summary.total_cost, 416.06 + 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
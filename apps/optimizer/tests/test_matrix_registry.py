@@ -0,0 +1,89 @@
+"""
+Matrix registry spilling (matrix_registry.py): memory-mapped copies,
+MatrixRef pins and the per-process worker cache.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matrix_registry import MatrixRef, MatrixRegistry, prepare_matrix, resolve_matrix  # noqa: E402
+
+
+def _matrix(digest: str, n: int = 4) -> object:
+    entries = {
+        f"S{i}_S{j}": {"distance_km": float(i + j + 1), "duration_minutes": 2.0, "polyline": f"p{i}{j}"}
+        for i in range(n)
+        for j in range(n)
+        if i != j
+    }
+    return prepare_matrix(entries, digest=digest)
+
+
+class SpillTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spill = os.path.join(self.tmp.name, "spill")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ref_resolves_to_same_matrix(self):
+        registry = MatrixRegistry(max_bytes=1 << 20, spill_dir=self.spill)
+        original = _matrix("aa")
+        self.assertTrue(registry.put(original))
+        stored = registry.get("aa")
+        self.assertIsInstance(stored.distance_km, np.memmap)
+
+        ref = registry.pin(stored)
+        # The handle is what crosses the process boundary
+        self.assertLess(len(pickle.dumps(ref)), 200)
+        loaded = resolve_matrix(pickle.loads(pickle.dumps(ref)))
+        np.testing.assert_array_equal(loaded.distance_km, original.distance_km)
+        np.testing.assert_array_equal(loaded.known, original.known)
+        self.assertEqual(loaded.ids, original.ids)
+        self.assertEqual(loaded.polylines, original.polylines)
+        # Cached per process by digest
+        self.assertIs(resolve_matrix(ref), loaded)
+        registry.unpin(ref)
+
+    def test_pinned_files_outlive_eviction(self):
+        first = _matrix("aa")
+        registry = MatrixRegistry(max_bytes=first.nbytes + 10, spill_dir=self.spill)
+        registry.put(first)
+        ref = registry.pin(registry.get("aa"))
+        registry.put(_matrix("bb"))
+        self.assertNotIn("aa", registry)
+        self.assertTrue(os.path.exists(ref.path("distance_km.npy")))
+        registry.unpin(ref)
+        self.assertFalse(os.path.exists(ref.path("distance_km.npy")))
+        self.assertIsNone(registry.pin(first))
+
+    def test_without_spill_dir_nothing_is_pinned(self):
+        registry = MatrixRegistry(max_bytes=1 << 20)
+        matrix = _matrix("aa")
+        registry.put(matrix)
+        self.assertIsNone(registry.pin(matrix))
+        self.assertIs(resolve_matrix(matrix), matrix)
+
+    def test_close_removes_spill_dir(self):
+        registry = MatrixRegistry(max_bytes=1 << 20, spill_dir=self.spill)
+        registry.put(_matrix("aa"))
+        registry.close()
+        self.assertFalse(os.path.exists(self.spill))
+        self.assertEqual(registry.stats()["entries"], 0)
+
+    def test_ref_path(self):
+        self.assertEqual(MatrixRef("ab", "/x").path("meta.json"), os.path.join("/x", "ab.meta.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Admission footprint estimate (memory.py) and sector worker defaults.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import json
+import os
+import random
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from decomposition import default_sector_workers  # noqa: E402
+from memory import PayloadCounter, estimate_bytes, sector_bytes  # noqa: E402
+from synthetic import make_instance  # noqa: E402
+
+
+DECOMPOSE_ENV = {
+    "DECOMPOSE_METHOD": "sweep",
+    "DECOMPOSE_MIN_STATIONS": "250",
+    "DECOMPOSE_MIN_CARGOS": "5000",
+    "DECOMPOSE_SECTOR_STATIONS": "100",
+}
+
+
+class SectorWorkerTests(unittest.TestCase):
+    def test_auto_stays_in_process_with_several_solver_workers(self):
+        with mock.patch.dict(os.environ, {"DECOMPOSE_WORKERS": "auto", "OPTIMIZER_WORKERS": "4"}):
+            self.assertEqual(default_sector_workers(), 1)
+
+    def test_auto_uses_cpus_with_one_solver_worker(self):
+        with mock.patch.dict(os.environ, {"DECOMPOSE_WORKERS": "", "OPTIMIZER_WORKERS": "1"}):
+            self.assertEqual(default_sector_workers(), os.cpu_count() or 1)
+
+    def test_explicit_value_wins(self):
+        with mock.patch.dict(os.environ, {"DECOMPOSE_WORKERS": "3", "OPTIMIZER_WORKERS": "4"}):
+            self.assertEqual(default_sector_workers(), 3)
+
+
+class SectorMemoryTests(unittest.TestCase):
+    def test_small_plans_have_no_sector_term(self):
+        with mock.patch.dict(os.environ, dict(DECOMPOSE_ENV, DECOMPOSE_WORKERS="4")):
+            self.assertEqual(sector_bytes(200, 1000), 0)
+            self.assertEqual(estimate_bytes(200, 1000, 40000, 10 ** 6)["sectors"], 0)
+
+    def test_sector_term_scales_with_parallel_sectors(self):
+        with mock.patch.dict(os.environ, dict(DECOMPOSE_ENV, DECOMPOSE_WORKERS="1")):
+            one = sector_bytes(400, 2000)
+        with mock.patch.dict(os.environ, dict(DECOMPOSE_ENV, DECOMPOSE_WORKERS="2")):
+            two = sector_bytes(400, 2000)
+        with mock.patch.dict(os.environ, dict(DECOMPOSE_ENV, DECOMPOSE_WORKERS="16")):
+            # Capped by the sector count (4 sectors of 100 stations)
+            capped = sector_bytes(400, 2000)
+        self.assertGreater(one, 0)
+        self.assertEqual(two, 2 * one)
+        self.assertEqual(capped, 4 * one)
+
+    def test_total_includes_sectors(self):
+        with mock.patch.dict(os.environ, dict(DECOMPOSE_ENV, DECOMPOSE_WORKERS="2")):
+            est = estimate_bytes(400, 2000, 160000, 10 ** 7, process_mode=False)
+        self.assertGreater(est["sectors"], 0)
+        self.assertEqual(est["total"], est["parse"] + est["solve"] + est["sectors"])
+
+    def test_decomposition_off(self):
+        with mock.patch.dict(os.environ, dict(DECOMPOSE_ENV, DECOMPOSE_METHOD="off", DECOMPOSE_WORKERS="4")):
+            self.assertEqual(sector_bytes(1000, 20000), 0)
+
+
+def _count(body: bytes, sizes) -> PayloadCounter:
+    counter = PayloadCounter()
+    pos = 0
+    for size in sizes:
+        counter.feed(body[pos:pos + size])
+        pos += size
+    counter.feed(body[pos:])
+    return counter
+
+
+class PayloadCounterTests(unittest.TestCase):
+    def test_sparse_entries_counted_across_any_chunking(self):
+        payload = make_instance(30, seed=4, neighbors=5)
+        body = json.dumps(payload, indent=1).encode()
+        nnz = len(payload["sparse_matrix"]["indices"])
+        cargos = sum(len(st["cargos"]) for st in payload["stations"])
+        rng = random.Random(0)
+        for sizes in ([len(body)], [1] * len(body), [rng.randint(1, 40) for _ in range(len(body) // 10)]):
+            counter = _count(body, sizes)
+            self.assertEqual(counter.sparse_entries, nnz)
+            self.assertEqual(counter.stations, len(payload["stations"]))
+            self.assertEqual(counter.cargos, cargos)
+
+    def test_empty_and_string_indices(self):
+        body = b'{"name": "indices", "x": [1, 2, 3], "sparse_matrix": {"indices" : [ ], "ids": []}}'
+        self.assertEqual(_count(body, [7] * 20).sparse_entries, 0)
+        self.assertEqual(_count(b'{"indices":[4]}', [3, 3, 3]).sparse_entries, 1)
+
+    def test_sparse_entries_raise_the_estimate(self):
+        payload = make_instance(30, seed=4, neighbors=5)
+        counter = _count(json.dumps(payload).encode(), [])
+        est = counter.estimate()
+        without = estimate_bytes(counter.stations, counter.cargos, counter.entries, counter.body_bytes)
+        self.assertGreater(est["total"], without["total"])
+
+
+if __name__ == "__main__":
+    unittest.main()
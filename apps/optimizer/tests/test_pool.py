@@ -0,0 +1,88 @@
+"""
+Solver pool admission and backpressure (executor.py): 503 while not
+accepting, 429 + Retry-After once the queue is full.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from executor import PoolSaturatedError, SolverPool  # noqa: E402
+from tests.pool_jobs import wait_for_flag  # noqa: E402
+
+
+class AdmissionTests(unittest.TestCase):
+    def test_not_started_is_503(self):
+        pool = SolverPool(workers=1, max_queue=1, mode="thread", min_retry_after_s=3)
+        with self.assertRaises(PoolSaturatedError) as ctx:
+            pool._admit()
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(ctx.exception.retry_after_s, 3)
+        self.assertEqual(pool.stats()["rejected"], 1)
+
+    def test_shut_down_is_503(self):
+        pool = SolverPool(workers=1, max_queue=1, mode="thread")
+        pool.start()
+        pool.shutdown()
+        with self.assertRaises(PoolSaturatedError) as ctx:
+            pool._admit()
+        self.assertEqual(ctx.exception.status_code, 503)
+
+    def test_full_queue_is_429_with_retry_after(self):
+        pool = SolverPool(workers=2, max_queue=3, mode="thread")
+        pool.start()
+        try:
+            pool._avg_solve_s = 4.0
+            pool._running = 2
+            for _ in range(3):
+                pool._admit()
+            with self.assertRaises(PoolSaturatedError) as ctx:
+                pool._admit()
+            self.assertEqual(ctx.exception.status_code, 429)
+            # 5 jobs ahead on 2 workers: 2.5 waves of 4 s
+            self.assertEqual(ctx.exception.retry_after_s, 10)
+            self.assertTrue(pool.stats()["saturated"])
+            # A free worker admits even with a full queue
+            pool._running = 1
+            pool._admit()
+        finally:
+            pool._running = pool._queued = 0
+            pool.shutdown()
+
+    def test_retry_after_floor(self):
+        pool = SolverPool(workers=4, max_queue=0, mode="thread", min_retry_after_s=5)
+        pool._avg_solve_s = 0.1
+        self.assertEqual(pool.retry_after_s(), 5)
+
+    def test_submit_rejects_beyond_queue(self):
+        async def run():
+            pool = SolverPool(workers=1, max_queue=1, mode="thread")
+            pool.start()
+            release = threading.Event()
+            try:
+                running = asyncio.ensure_future(pool.submit(wait_for_flag, release))
+                queued = asyncio.ensure_future(pool.submit(wait_for_flag, release))
+                await asyncio.sleep(0.05)
+                with self.assertRaises(PoolSaturatedError) as ctx:
+                    await pool.submit(wait_for_flag, release)
+                self.assertEqual(ctx.exception.status_code, 429)
+                release.set()
+                return await asyncio.gather(running, queued), pool.stats()
+            finally:
+                release.set()
+                pool.shutdown()
+
+        results, stats = asyncio.run(run())
+        self.assertEqual(results, ["done", "done"])
+        self.assertEqual((stats["completed"], stats["rejected"]), (2, 1))
+        self.assertEqual((stats["busy_workers"], stats["queue_depth"]), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
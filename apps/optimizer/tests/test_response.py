@@ -0,0 +1,80 @@
+"""
+Compact response format and compressed transport.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import gzip
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transport  # noqa: E402
+from models import OptimizerInput  # noqa: E402
+from optimizer import VRPOptimizer  # noqa: E402
+from response import compact_output, expand_output  # noqa: E402
+from synthetic import make_instance  # noqa: E402
+
+
+def _strip_volatile(out: dict) -> dict:
+    out = dict(out, algorithm_info={})
+    out["routes"] = [dict(r, vehicle_id=None) for r in out["routes"]]
+    return out
+
+
+class CompactOutputTests(unittest.TestCase):
+    def test_round_trip_matches_full_output(self):
+        for seed, problem_type in ((1, "unlimited_vehicles"), (2, "limited_vehicles_max_weight")):
+            payload = make_instance(30, problem_type, seed=seed, cargos_per_station=(2, 12))
+            for v in payload["distance_matrix"].values():
+                v["polyline"] = "pl"
+            input_data = OptimizerInput(**payload)
+            full = VRPOptimizer(input_data).solve()
+            compact = compact_output(full, input_data)
+
+            self.assertEqual(compact.stations.id[0], payload["hub"]["id"])
+            self.assertEqual(len(set(compact.stations.id)), len(compact.stations.id))
+            self.assertEqual(
+                _strip_volatile(expand_output(compact.model_dump())),
+                _strip_volatile(full.model_dump()),
+                problem_type,
+            )
+
+    def test_polylines_can_be_left_out(self):
+        payload = make_instance(12, seed=3)
+        for v in payload["distance_matrix"].values():
+            v["polyline"] = "pl"
+        payload["parameters"]["include_polylines"] = False
+        input_data = OptimizerInput(**payload)
+        full = VRPOptimizer(input_data).solve()
+        self.assertTrue(all(r.polyline == "" for r in full.routes))
+        self.assertTrue(all(r.polyline is None for r in compact_output(full, input_data).routes))
+
+
+class TransportTests(unittest.TestCase):
+    def test_choose_encoding(self):
+        offered = ("zstd", "gzip")
+        self.assertEqual(transport.choose_encoding("gzip, deflate, br", offered), "gzip")
+        self.assertEqual(transport.choose_encoding("zstd;q=0, gzip;q=0.5", offered), "gzip")
+        self.assertEqual(transport.choose_encoding("*", offered), "zstd")
+        self.assertIsNone(transport.choose_encoding("identity", offered))
+
+    def test_gzip_decoder_caps_output(self):
+        decoder = transport._Decoder("gzip", max_bytes=1024 * 1024)
+        bomb = gzip.compress(b" " * (8 * 1024 * 1024))
+        with self.assertRaises(OverflowError):
+            decoder.feed(bomb)
+        self.assertLessEqual(decoder.out_bytes, 2 * 1024 * 1024 + transport._Decoder.GZIP_STEP_BYTES)
+
+    def test_gzip_decoder_streams_chunks(self):
+        data = b'{"a": 1}' * 10000
+        packed = gzip.compress(data)
+        decoder = transport._Decoder("gzip", max_bytes=0)
+        out = b"".join(decoder.feed(packed[i:i + 100]) for i in range(0, len(packed), 100))
+        self.assertEqual(out, data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Clarke-Wright savings construction (savings.py): route structure and the
+heterogeneous fleet check.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import os
+import random
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import savings  # noqa: E402
+from savings import assign_vehicles, savings_routes  # noqa: E402
+
+
+def _fleet_carries(loads, capacities) -> bool:
+    """Routes heavier than the smallest vehicle matched heaviest -> largest."""
+    caps = sorted(capacities, reverse=True)
+    big = sorted((w for w in loads if w > caps[-1] + 1e-6), reverse=True)
+    return len(big) <= len(caps) and all(w <= c + 1e-6 for w, c in zip(big, caps))
+
+
+def _instance(rng: random.Random, n_stations: int):
+    """Random asymmetric matrix; stations above the largest vehicle are split into several nodes."""
+    size = n_stations + 1
+    xy = np.array([[rng.uniform(0, 30), rng.uniform(0, 30)] for _ in range(size)])
+    dist = np.sqrt(((xy[:, None, :] - xy[None, :, :]) ** 2).sum(axis=2))
+    dist *= np.array([[rng.uniform(1.0, 1.4) for _ in range(size)] for _ in range(size)])
+    np.fill_diagonal(dist, 0.0)
+    capacities = [float(rng.choice((300, 500, 750, 1000))) for _ in range(rng.randint(1, 5))]
+    largest = max(capacities)
+    points, loads = [], []
+    for station in range(1, size):
+        weight = rng.uniform(10, 1.6 * largest)
+        while weight > largest:
+            points.append(station)
+            loads.append(largest)
+            weight -= largest
+        points.append(station)
+        loads.append(weight)
+    return dist, points, loads, capacities
+
+
+class SavingsRouteTests(unittest.TestCase):
+    def _check(self, dist, points, loads, capacities, neighbors=None):
+        routes = savings_routes(dist, 0, points, loads, capacities, neighbors)
+        visited = [k for route in routes for k in route]
+        # Every node exactly once (a cycle would repeat or drop nodes)
+        self.assertEqual(sorted(visited), list(range(len(points))))
+        route_loads = [sum(loads[k] for k in route) for route in routes]
+        self.assertTrue(all(w <= max(capacities) + 1e-6 for w in route_loads))
+        if _fleet_carries(loads, capacities):
+            self.assertTrue(_fleet_carries(route_loads, capacities), (route_loads, capacities))
+        return routes
+
+    def test_routes_cover_nodes_and_fit_the_fleet(self):
+        rng = random.Random(17)
+        for _ in range(150):
+            self._check(*_instance(rng, rng.randint(1, 14)))
+
+    def test_neighbor_list_pairs(self):
+        rng = random.Random(18)
+        for _ in range(40):
+            dist, points, loads, capacities = _instance(rng, rng.randint(2, 14))
+            k = 3
+            order = np.argsort(dist, axis=1)
+            neighbors = [[int(j) for j in row if j != i][:k] for i, row in enumerate(order)]
+            with mock.patch.object(savings, "DENSE_MAX_NODES", 0):
+                self._check(dist, points, loads, capacities, neighbors)
+
+    def test_split_station_nodes_never_share_an_overfull_route(self):
+        dist = np.array([[0.0, 5.0], [5.0, 0.0]])
+        # One 1800 kg station split over a 1000 + 800 kg fleet
+        routes = savings_routes(dist, 0, [1, 1], [1000.0, 800.0], [1000.0, 800.0])
+        self.assertEqual(sorted(map(sorted, routes)), [[0], [1]])
+
+    def test_single_vehicle_merges_what_fits(self):
+        dist = np.array([
+            [0.0, 10.0, 11.0, 12.0],
+            [10.0, 0.0, 1.0, 2.0],
+            [11.0, 1.0, 0.0, 1.0],
+            [12.0, 2.0, 1.0, 0.0],
+        ])
+        routes = savings_routes(dist, 0, [1, 2, 3], [100.0, 100.0, 100.0], [500.0])
+        self.assertEqual(len(routes), 1)
+        self.assertEqual(savings_routes(dist, 0, [], [], [500.0]), [])
+
+
+class AssignVehicleTests(unittest.TestCase):
+    def test_assignment_is_a_fitting_matching(self):
+        rng = random.Random(19)
+        for _ in range(200):
+            loads = [rng.uniform(10, 900) for _ in range(rng.randint(0, 8))]
+            value = [rng.uniform(0, 100) for _ in loads]
+            capacities = [float(rng.choice((300, 500, 750, 1000))) for _ in range(rng.randint(1, 5))]
+            pairs = assign_vehicles(loads, value, capacities)
+            self.assertEqual(len({r for r, _ in pairs}), len(pairs))
+            self.assertEqual(len({v for _, v in pairs}), len(pairs))
+            for r, v in pairs:
+                self.assertLessEqual(loads[r], capacities[v] + 1e-6)
+            # Only the len(capacities) most valuable routes are considered
+            top = set(sorted(range(len(loads)), key=lambda r: (-value[r], r))[: len(capacities)])
+            self.assertTrue({r for r, _ in pairs} <= top)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Sparse k-nearest distance matrix input and road factor calibration.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+from pydantic import ValidationError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matrix_registry import prepare_sparse  # noqa: E402
+from models import OptimizerInput  # noqa: E402
+from optimizer import VRPOptimizer  # noqa: E402
+from spatial import calibrate_road_factor  # noqa: E402
+from synthetic import make_instance  # noqa: E402
+from validation import validate_input  # noqa: E402
+
+
+class SparseMatrixTests(unittest.TestCase):
+    def test_submatrix_holds_listed_pairs_only(self):
+        matrix = prepare_sparse({
+            "ids": ["a", "b", "c"],
+            "indptr": [0, 2, 3, 3],
+            "indices": [1, 2, 0],
+            "distance_km": [1.0, 2.0, 3.0],
+            "polylines": ["ab", None, "ba"],
+        })
+        dist, dur, known = matrix.submatrix(np.array([2, 0, -1, 1]))
+        self.assertEqual(dist[1, 3], 1.0)
+        self.assertEqual(dist[1, 0], 2.0)
+        self.assertEqual(dist[3, 1], 3.0)
+        self.assertTrue(np.isnan(dist[0, 1]))
+        self.assertTrue(np.isnan(dur[1, 3]))
+        self.assertEqual(int(known.sum()), 3)
+        self.assertFalse(known[2].any() or known[:, 2].any())
+        self.assertEqual(matrix.polylines, {(0, 1): "ab", (1, 0): "ba"})
+
+    def test_layout_is_validated(self):
+        payload = make_instance(6, seed=1, neighbors=3)
+        payload["sparse_matrix"]["indptr"][-1] += 1
+        with self.assertRaises(ValidationError):
+            OptimizerInput(**payload)
+
+        both = make_instance(6, seed=1)
+        both["sparse_matrix"] = make_instance(6, seed=1, neighbors=3)["sparse_matrix"]
+        with self.assertRaises(ValidationError):
+            OptimizerInput(**both)
+
+    def test_solve_prefers_given_edges(self):
+        k = 6
+        payload = make_instance(40, "limited_vehicles_max_count", seed=2, neighbors=k)
+        opt = VRPOptimizer(OptimizerInput(**payload))
+        result = opt.solve()
+        self.assertTrue(result.success)
+        self.assertGreater(result.algorithm_info["distance_fallback_pairs"], 0)
+        factor = result.algorithm_info["road_factor"]
+        self.assertEqual(factor["source"], "calibrated")
+        self.assertTrue(1.2 <= factor["value"] <= 1.5)
+
+        # Given in either direction (the reverse pair is used as well)
+        sparse = payload["sparse_matrix"]
+        given = [set() for _ in sparse["ids"]]
+        for i in range(len(given)):
+            for j in sparse["indices"][sparse["indptr"][i]:sparse["indptr"][i + 1]]:
+                given[i].add(j)
+                given[j].add(i)
+        for i, row in enumerate(opt.neighbor_lists):
+            head = set(row[:len(given[i])])
+            self.assertTrue(head <= given[i])
+            if len(given[i]) <= len(row):
+                self.assertEqual(head, given[i])
+
+    def test_validate_reports_sparse_coverage(self):
+        payload = make_instance(20, seed=3, neighbors=4)
+        report = validate_input(OptimizerInput(**payload))
+        matrix = report["matrix"]
+        self.assertEqual(matrix["source"], "sparse")
+        self.assertEqual(matrix["given_pairs"], 21 * 4)
+        self.assertEqual(matrix["missing_station_count"], 0)
+        self.assertGreater(matrix["fallback_pairs"], 0)
+
+
+class RoadFactorTests(unittest.TestCase):
+    def test_calibration_recovers_factor(self):
+        rng = np.random.default_rng(0)
+        straight = rng.uniform(0.5, 30.0, size=500)
+        self.assertAlmostEqual(calibrate_road_factor(straight * 1.45, straight), 1.45)
+        noisy = calibrate_road_factor(straight * rng.uniform(1.3, 1.6, size=500), straight)
+        self.assertTrue(1.4 <= noisy <= 1.5)
+
+    def test_too_few_pairs_or_out_of_bounds(self):
+        straight = np.full(5, 3.0)
+        self.assertIsNone(calibrate_road_factor(straight * 1.4, straight))
+        straight = np.full(100, 3.0)
+        self.assertEqual(calibrate_road_factor(straight * 9.0, straight), 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Per-request solve tracing (Chrome trace-event JSON).
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from executor import run_optimize  # noqa: E402
+from models import OptimizerInput  # noqa: E402
+from optimizer import VRPOptimizer  # noqa: E402
+from synthetic import make_instance  # noqa: E402
+from tracing import NULL_TRACER, TRACE_EVENTS_KEY, Tracer, TraceSink  # noqa: E402
+
+
+class TracedSolveTests(unittest.TestCase):
+    def test_spans_cover_the_solve(self):
+        tracer = Tracer("req-1", "test")
+        payload = make_instance(15, "limited_vehicles_max_count", seed=4)
+        result = VRPOptimizer(OptimizerInput(**payload), tracer=tracer).solve()
+        self.assertTrue(result.success)
+
+        spans = [e for e in tracer.export() if e["ph"] == "X"]
+        names = {e["name"] for e in spans}
+        for name in ("solve", "parse_matrix", "fleet_scenario", "attempt", "two_opt", "build_output"):
+            self.assertIn(name, names)
+        self.assertTrue(all(e["args"]["request_id"] == "req-1" for e in spans))
+        solve = next(e for e in spans if e["name"] == "solve")
+        self.assertTrue(all(solve["ts"] <= e["ts"] for e in spans if e["name"] == "attempt"))
+
+    def test_tracing_does_not_change_the_plan(self):
+        payload = make_instance(20, "unlimited_vehicles", seed=5)
+        plain = VRPOptimizer(OptimizerInput(**payload)).solve()
+        traced = VRPOptimizer(OptimizerInput(**payload), tracer=Tracer("r", "test")).solve()
+        self.assertEqual(plain.summary.total_cost, traced.summary.total_cost)
+        self.assertIs(VRPOptimizer(OptimizerInput(**payload)).tracer, NULL_TRACER)
+
+    def test_worker_events_travel_in_algorithm_info(self):
+        payload = make_instance(10, seed=6)
+        out = run_optimize(OptimizerInput(**payload), None, "req-2")
+        events = out.algorithm_info.pop(TRACE_EVENTS_KEY)
+        self.assertIn("worker", {e["name"] for e in events})
+        self.assertNotIn(TRACE_EVENTS_KEY, run_optimize(OptimizerInput(**payload)).algorithm_info)
+
+    def test_span_cap_counts_dropped(self):
+        tracer = Tracer("r", "test", max_spans=3)
+        for _ in range(5):
+            with tracer.span("s"):
+                pass
+        events = tracer.export()
+        self.assertEqual(events[-1]["name"], "spans_dropped")
+        self.assertEqual(events[-1]["args"]["dropped"], 3)
+
+
+class TraceSinkTests(unittest.TestCase):
+    def test_header_overrides_sampling(self):
+        with tempfile.TemporaryDirectory() as d:
+            sink = TraceSink(d, 0.0, 10)
+            self.assertTrue(sink.should_trace("1"))
+            self.assertFalse(sink.should_trace(None))
+            self.assertFalse(TraceSink(d, 1.0, 10).should_trace("0"))
+            self.assertTrue(TraceSink(d, 1.0, 10).should_trace(None))
+
+    def test_write_keeps_newest_files(self):
+        with tempfile.TemporaryDirectory() as d:
+            sink = TraceSink(d, 0.0, 2)
+            for i in range(4):
+                tracer = Tracer(f"r{i}", "test")
+                with tracer.span("s"):
+                    pass
+                sink.write(tracer, os.path.join(d, f"{i}-r{i}.json"))
+            self.assertEqual(sorted(os.listdir(d)), ["2-r2.json", "3-r3.json"])
+            with open(os.path.join(d, "3-r3.json")) as f:
+                doc = json.load(f)
+            self.assertEqual(doc["otherData"]["request_id"], "r3")
+            self.assertEqual(doc["traceEvents"][-1]["name"], "s")
+
+
+if __name__ == "__main__":
+    unittest.main()
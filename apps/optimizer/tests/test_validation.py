@@ -0,0 +1,78 @@
+"""
+/validate checks (validation.py).
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import ValidationError  # noqa: E402
+
+from matrix_registry import prepare_matrix  # noqa: E402
+from synthetic import make_instance  # noqa: E402
+from validation import ValidationInput, size_class, validate_input  # noqa: E402
+
+
+class ValidationTests(unittest.TestCase):
+    def _payload(self):
+        return make_instance(10, "limited_vehicles_max_count", seed=5)
+
+    def test_matrix_coverage_counts_reverse_and_fallback_pairs(self):
+        payload = self._payload()
+        hub = payload["hub"]["id"]
+        first, second = payload["stations"][0]["id"], payload["stations"][1]["id"]
+        matrix = payload["distance_matrix"]
+        del matrix[f"{first}_{second}"]  # reverse pair still given
+        for key in [k for k in matrix if first in k.split("_") and second not in k.split("_")]:
+            del matrix[key]  # hub/others <-> first: haversine fallback
+        report = validate_input(ValidationInput.model_validate_json(json.dumps(payload)))
+
+        cov = report["matrix"]
+        n = cov["points"]
+        self.assertEqual(cov["directed_pairs"], n * (n - 1))
+        self.assertEqual(cov["reverse_filled_pairs"], 1)
+        self.assertEqual(cov["fallback_pairs"], 2 * (n - 2))
+        self.assertEqual(cov["given_pairs"] + cov["reverse_filled_pairs"] + cov["fallback_pairs"], n * (n - 1))
+        self.assertEqual(cov["missing_stations"], [])
+
+        # Same numbers from the parsed (registry) form.
+        prepared = prepare_matrix(ValidationInput.model_validate_json(json.dumps(payload)).distance_matrix)
+        cov2 = validate_input(ValidationInput.model_validate_json(json.dumps(payload)), matrix=prepared)["matrix"]
+        self.assertEqual({k: cov2[k] for k in cov if k != "source"}, {k: cov[k] for k in cov if k != "source"})
+        self.assertIn(hub, prepared.index)
+
+    def test_cargo_and_station_findings(self):
+        payload = self._payload()
+        st = payload["stations"][0]
+        st["cargos"][0]["weight_kg"] = 10 ** 6
+        st["total_weight_kg"] = sum(c["weight_kg"] for c in st["cargos"])
+        payload["stations"][1]["cargo_count"] += 1
+        report = validate_input(ValidationInput.model_validate_json(json.dumps(payload)))
+
+        self.assertTrue(report["valid"])
+        self.assertEqual(report["cargos"]["too_heavy"], [st["cargos"][0]["id"]])
+        self.assertEqual(report["stations"]["inconsistent"], [payload["stations"][1]["id"]])
+        self.assertGreater(report["capacity_shortfall_kg"], 0)
+        self.assertEqual(report["estimate"]["recommended_submission"], "sync")
+
+    def test_unknown_algorithm_is_rejected(self):
+        payload = self._payload()
+        payload["parameters"]["algorithm"] = "simulated_annealing"
+        with self.assertRaises(ValidationError):
+            ValidationInput.model_validate_json(json.dumps(payload))
+        payload["parameters"]["algorithm"] = "alns"
+        self.assertEqual(ValidationInput.model_validate_json(json.dumps(payload)).parameters.algorithm, "alns")
+
+    def test_size_class(self):
+        self.assertEqual(size_class(0.2), "small")
+        self.assertEqual(size_class(5), "medium")
+        self.assertEqual(size_class(600), "xlarge")
+
+
+if __name__ == "__main__":
+    unittest.main()
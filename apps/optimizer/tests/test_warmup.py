@@ -0,0 +1,52 @@
+"""
+Start-up warm-up (warmup.py) and SolverPool.wait_warm.
+
+Run from apps/optimizer:  python -m unittest discover -s tests
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from executor import SolverPool  # noqa: E402
+from warmup import READY, Readiness, process_start_time, warm_solve  # noqa: E402
+
+
+class WarmupTests(unittest.TestCase):
+    def test_builtin_payloads_solve(self):
+        report = warm_solve()
+        self.assertTrue(report["result"].success)
+        self.assertGreater(report["seconds"], 0)
+
+    def test_wait_warm_reports_every_worker(self):
+        async def run():
+            pool = SolverPool(workers=2, max_queue=0, mode="thread", warm_up=True)
+            pool.start()
+            try:
+                return await pool.wait_warm()
+            finally:
+                pool.shutdown()
+
+        reports = asyncio.run(run())
+        self.assertEqual(len({r["worker"] for r in reports}), 2)
+        self.assertTrue(all(r["result"].success for r in reports))
+
+    def test_readiness_timings(self):
+        readiness = Readiness()
+        readiness.begin()
+        with readiness.phase("workers"):
+            pass
+        self.assertFalse(readiness.ready)
+        readiness.mark_ready()
+        stats = readiness.stats()
+        self.assertEqual(stats["state"], READY)
+        self.assertIn("workers", stats["startup"]["phases_s"])
+        if process_start_time() is not None:
+            self.assertGreaterEqual(stats["startup"]["process_to_ready_s"], stats["startup"]["startup_to_ready_s"])
+
+
+if __name__ == "__main__":
+    unittest.main()
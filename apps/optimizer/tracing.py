@@ -0,0 +1,223 @@
+"""
+Per-request span tracing, exported in Chrome trace-event JSON (open the file
+in ui.perfetto.dev or chrome://tracing).
+
+A traced /optimize request gets one file, TRACE_DIR/<epoch ms>-<request id>.json,
+with the server's spans (matrix lookup, queue + solve, rendering) and the
+solver worker's spans (prepare, fleet scenario, attempt, strategy, greedy
+route, 2-opt, output build; sector sub-solves in decomposition mode). Every
+span carries the request id (request_id_ctx) in its args.
+
+Tracing is chosen per request:
+- `X-Trace: 1` traces the request, `X-Trace: 0` never traces it;
+- otherwise a TRACE_SAMPLE_RATE share of requests is traced.
+TRACE_DIR empty turns tracing off; TRACE_MAX_FILES keeps the newest files;
+TRACE_MAX_SPANS caps the spans kept per request (the rest are counted).
+
+Untraced solves use NULL_TRACER, whose span() returns one shared no-op
+context manager (a few hundred ns per instrumented call, no allocation
+beyond the call's keyword arguments).
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import functools
+import glob
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from env import env_int
+
+
+logger = logging.getLogger("optimizer")
+
+# algorithm_info key carrying a worker's spans back to the server
+TRACE_EVENTS_KEY = "_trace_events"
+
+# perf_counter_ns -> epoch ns, so spans from different processes line up.
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start_ns")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start_ns = 0
+
+    def set(self, **args: Any) -> None:
+        """Attach results known only at the end of the span (moves, cost...)."""
+        self.args.update(args)
+
+    def __enter__(self) -> "_Span":
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._complete(self, end_ns)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **args: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    enabled = False
+    request_id = ""
+
+    def span(self, name: str, cat: str = "solve", **args: Any) -> _NullSpan:
+        return _NULL_SPAN
+
+    def add_events(self, events: List[Dict[str, Any]]) -> None:
+        pass
+
+
+NULL_TRACER = NullTracer()
+
+
+def traced(name: str, cat: str = "solve") -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Span around a method of an object with a `tracer` attribute (one check when off)."""
+
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            tracer = self.tracer
+            if not tracer.enabled:
+                return fn(self, *args, **kwargs)
+            with tracer.span(name, cat):
+                return fn(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+class Tracer:
+    """Collects complete ("X") events for one request in this process."""
+
+    enabled = True
+
+    def __init__(self, request_id: str, process_name: str, max_spans: Optional[int] = None):
+        self.request_id = request_id
+        self.max_spans = env_int("TRACE_MAX_SPANS", 100000) if max_spans is None else max_spans
+        self.dropped = 0
+        self.pid = os.getpid()
+        self.events: List[Dict[str, Any]] = [
+            {"ph": "M", "name": "process_name", "pid": self.pid, "tid": 0, "args": {"name": f"{process_name} ({self.pid})"}},
+        ]
+
+    def span(self, name: str, cat: str = "solve", **args: Any) -> _Span:
+        return _Span(self, name, cat, args)
+
+    def _complete(self, span: _Span, end_ns: int) -> None:
+        if len(self.events) >= self.max_spans:
+            self.dropped += 1
+            return
+        span.args["request_id"] = self.request_id
+        self.events.append({
+            "ph": "X",
+            "name": span.name,
+            "cat": span.cat,
+            "ts": (span.start_ns + _EPOCH_OFFSET_NS) / 1000.0,
+            "dur": (end_ns - span.start_ns) / 1000.0,
+            "pid": self.pid,
+            "tid": threading.get_native_id(),
+            "args": span.args,
+        })
+
+    def add_events(self, events: List[Dict[str, Any]]) -> None:
+        """Merge events recorded by another process (worker, sector)."""
+        room = max(0, self.max_spans - len(self.events))
+        self.events.extend(events[:room])
+        self.dropped += max(0, len(events) - room)
+
+    def export(self) -> List[Dict[str, Any]]:
+        """Events to hand to another process's tracer (dropped count included)."""
+        if self.dropped:
+            self.events.append({
+                "ph": "i", "name": "spans_dropped", "s": "p", "pid": self.pid, "tid": 0,
+                "ts": (time.perf_counter_ns() + _EPOCH_OFFSET_NS) / 1000.0,
+                "args": {"dropped": self.dropped, "request_id": self.request_id},
+            })
+            self.dropped = 0
+        return self.events
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        return {
+            "traceEvents": self.export(),
+            "displayTimeUnit": "ms",
+            "otherData": {"request_id": self.request_id},
+        }
+
+
+class TraceSink:
+    """Decides which requests are traced and writes their files."""
+
+    def __init__(self, directory: str, sample_rate: float, max_files: int):
+        self.directory = directory
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.max_files = max(1, max_files)
+        self._lock = threading.Lock()
+        self.written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["TraceSink"]:
+        directory = str(os.getenv("TRACE_DIR", "")).strip()
+        if not directory:
+            return None
+        try:
+            rate = float(os.getenv("TRACE_SAMPLE_RATE", "0") or 0)
+        except ValueError:
+            rate = 0.0
+        return cls(directory, rate, env_int("TRACE_MAX_FILES", 200))
+
+    def should_trace(self, header: Optional[str]) -> bool:
+        value = str(header or "").strip().lower()
+        if value in ("1", "true", "yes", "on"):
+            return True
+        if value in ("0", "false", "no", "off"):
+            return False
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def path_for(self, request_id: str) -> str:
+        safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in request_id)[:80] or "request"
+        return os.path.join(self.directory, f"{int(time.time() * 1000)}-{safe}.json")
+
+    def write(self, tracer: Tracer, path: str) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(tracer.chrome_trace(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+        with self._lock:
+            self.written += 1
+            files = sorted(glob.glob(os.path.join(self.directory, "*.json")))
+            for old in files[:-self.max_files]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"dir": self.directory, "sample_rate": self.sample_rate, "written": self.written}
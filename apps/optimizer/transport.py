@@ -0,0 +1,228 @@
+"""
+Compressed HTTP transport (gzip / zstd) as ASGI middleware.
+
+Requests: a `Content-Encoding: gzip | zstd` body is decoded while it streams
+in (so MemoryAdmissionMiddleware downstream still counts the decoded JSON
+and can refuse early). The decoded size is capped at
+REQUEST_MAX_DECODED_MB (413 beyond it); other encodings get 415.
+
+Responses: bodies of at least RESPONSE_COMPRESS_MIN_BYTES are compressed
+with the best encoding the client accepts (zstd, then gzip) and sent with
+`Vary: Accept-Encoding`. zstd needs the optional `zstandard` package; without
+it only gzip is offered. Large bodies are compressed off the event loop.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import gzip
+import json
+import logging
+import zlib
+
+try:  # optional dependency
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+from env import env_int
+
+
+logger = logging.getLogger("optimizer")
+
+# Compress on a worker thread above this size (keeps the event loop responsive).
+THREAD_COMPRESS_BYTES = 256 * 1024
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str, offered: Tuple[str, ...]) -> Optional[str]:
+    """First of `offered` the client accepts (q > 0); `*` accepts any."""
+    accepted: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    for enc in offered:
+        q = accepted.get(enc, accepted.get("*", 0.0))
+        if q > 0:
+            return enc
+    return None
+
+
+class _Decoder:
+    """
+    Streaming gzip / zstd decoder with an output cap. Output is produced in
+    bounded steps so a tiny bomb cannot expand past the cap in one call.
+    """
+
+    GZIP_STEP_BYTES = 1024 * 1024
+    # zstd RLE blocks expand ~4 bytes to 128 KiB: feed small input slices.
+    ZSTD_SLICE_BYTES = 256
+
+    def __init__(self, encoding: str, max_bytes: int):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "zstd" and zstandard is not None:
+            self._obj = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            raise ValueError(encoding)
+        self.max_bytes = max_bytes
+        self.out_bytes = 0
+
+    def _take(self, part: bytes, parts: List[bytes]) -> None:
+        self.out_bytes += len(part)
+        if self.max_bytes and self.out_bytes > self.max_bytes:
+            raise OverflowError
+        parts.append(part)
+
+    def feed(self, data: bytes) -> bytes:
+        parts: List[bytes] = []
+        if self.encoding == "gzip":
+            while data:
+                self._take(self._obj.decompress(data, self.GZIP_STEP_BYTES), parts)
+                data = self._obj.unconsumed_tail
+        else:
+            for i in range(0, len(data), self.ZSTD_SLICE_BYTES):
+                self._take(self._obj.decompress(data[i:i + self.ZSTD_SLICE_BYTES]), parts)
+        return b"".join(parts)
+
+
+def compress(data: bytes, encoding: str, gzip_level: int, zstd_level: int) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=zstd_level).compress(data)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+async def _send_error(send: Any, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: Any,
+        min_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        zstd_level: Optional[int] = None,
+        max_decoded_bytes: Optional[int] = None,
+    ):
+        self.app = app
+        self.min_size = env_int("RESPONSE_COMPRESS_MIN_BYTES", 1024) if min_size is None else min_size
+        self.gzip_level = env_int("RESPONSE_GZIP_LEVEL", 5) if gzip_level is None else gzip_level
+        self.zstd_level = env_int("RESPONSE_ZSTD_LEVEL", 3) if zstd_level is None else zstd_level
+        self.max_decoded_bytes = (
+            env_int("REQUEST_MAX_DECODED_MB", 512) * 1024 * 1024 if max_decoded_bytes is None else max_decoded_bytes
+        )
+        self.offered = available_encodings()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[[], Awaitable[Any]], send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers") or []}
+        encoding = choose_encoding(headers.get("accept-encoding", ""), self.offered)
+        out_send = send if encoding is None else self._encoding_send(send, encoding)
+
+        content_encoding = headers.get("content-encoding", "identity").strip().lower()
+        if content_encoding in ("", "identity"):
+            await self.app(scope, receive, out_send)
+            return
+        if content_encoding not in self.offered:
+            await _send_error(send, 415, f"Desteklenmeyen Content-Encoding: {content_encoding}")
+            return
+
+        scope = dict(scope)
+        scope["headers"] = [
+            (k, v) for k, v in scope["headers"] if k.lower() not in (b"content-encoding", b"content-length")
+        ]
+        decoder = _Decoder(content_encoding, self.max_decoded_bytes)
+        rejected = False
+
+        async def decoding_receive() -> Any:
+            nonlocal rejected
+            message = await receive()
+            if message["type"] != "http.request" or rejected:
+                return message
+            try:
+                body = decoder.feed(message.get("body", b""))
+            except OverflowError:
+                status, detail = 413, "Açılmış istek gövdesi sınırı aşıyor"
+            except Exception as e:  # corrupt stream
+                status, detail = 400, f"İstek gövdesi açılamadı: {type(e).__name__}"
+            else:
+                return {"type": "http.request", "body": body, "more_body": message.get("more_body", False)}
+            # Answer here and make the app see a disconnect; its own reply is dropped.
+            rejected = True
+            logger.warning("request body rejected status=%s encoding=%s: %s", status, content_encoding, detail)
+            await _send_error(send, status, detail)
+            return {"type": "http.disconnect"}
+
+        async def guarded_send(message: Dict[str, Any]) -> None:
+            if not rejected:
+                await out_send(message)
+
+        try:
+            await self.app(scope, decoding_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
+
+    def _encoding_send(self, send: Any, encoding: str) -> Any:
+        start: Optional[Dict[str, Any]] = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def wrapped(message: Dict[str, Any]) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                names = {k.lower() for k, _ in message.get("headers") or []}
+                if b"content-encoding" in names:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            chunks.clear()
+            headers = [(k, v) for k, v in start.get("headers") or [] if k.lower() != b"content-length"]
+            if len(body) >= self.min_size:
+                if len(body) >= THREAD_COMPRESS_BYTES:
+                    body = await asyncio.to_thread(compress, body, encoding, self.gzip_level, self.zstd_level)
+                else:
+                    body = compress(body, encoding, self.gzip_level, self.zstd_level)
+                headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"vary", b"Accept-Encoding"))
+            headers.append((b"content-length", str(len(body)).encode()))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        return wrapped
+
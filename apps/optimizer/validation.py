@@ -0,0 +1,319 @@
+"""
+/validate checks without building a VRPOptimizer.
+
+One pass over the parsed payload (no station/cargo copies, no dense
+distance arrays) reports:
+
+- the old totals (stations, vehicles, cargo weight, vehicle capacity);
+- matrix completeness over the points a solve would use (hub + stations
+  with cargo): directed pairs given, filled from the reverse direction, and
+  left to the haversine x road factor fallback (sparse k-nearest inputs
+  leave most pairs to it); stations absent from the matrix altogether;
+- cargos heavier than every vehicle that could carry them (rentals count
+  for unlimited_vehicles), which can never be assigned;
+- station totals that disagree with their cargo lists, duplicate ids,
+  non-positive weights / capacities, capacity shortfall for limited fleets;
+- estimated solve time, memory and a size class with a sync / async hint
+  (estimated_seconds <= VALIDATE_SYNC_MAX_SECONDS -> sync).
+
+The payload is parsed into ValidationInput: OptimizerInput with the matrix
+values checked as plain dicts instead of one DistanceInfo per pair, which
+halves parse time for an inline matrix (300 stations: ~0.95 s -> ~0.45 s).
+
+Solve time model, calibrated on synthetic inputs (25-400 stations, all
+problem types, compiled kernels): SOLVE_SECONDS_PER_PAIR x stations^2,
+or x stations x sector size x 2 once the plan is decomposed into sectors;
+ALNS runs for its time budget.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Set
+import math
+import os
+
+import numpy as np
+from typing_extensions import NotRequired, TypedDict
+
+from decomposition import DecompositionConfig
+from matrix_registry import PreparedMatrix, SparseMatrix, prepare_sparse, split_pair_key
+from memory import MB, estimate_bytes
+from models import OptimizerInput
+
+
+SOLVE_SECONDS_PER_PAIR = 3e-5
+SIZE_CLASSES = ((1.0, "small"), (10.0, "medium"), (60.0, "large"))
+# Ids listed per finding (counts are always complete)
+MAX_LISTED = 20
+WEIGHT_TOLERANCE_KG = 0.01
+
+
+class PairValues(TypedDict):
+    distance_km: float
+    duration_minutes: float
+    polyline: NotRequired[Optional[str]]
+
+
+class ValidationInput(OptimizerInput):
+    """Same schema as OptimizerInput; matrix values are not turned into models."""
+
+    distance_matrix: Dict[str, PairValues] = {}
+
+
+def default_sync_max_seconds() -> float:
+    try:
+        return max(0.0, float(os.getenv("VALIDATE_SYNC_MAX_SECONDS", "10") or 10))
+    except ValueError:
+        return 10.0
+
+
+def size_class(seconds: float) -> str:
+    for limit, name in SIZE_CLASSES:
+        if seconds <= limit:
+            return name
+    return "xlarge"
+
+
+def estimate_solve_seconds(input_data: OptimizerInput, stations: int, cargos: int) -> float:
+    params = input_data.parameters
+    if params.algorithm == "alns":
+        # Imported here: alns pulls in the solver (and numba) the server does not need.
+        from alns import default_time_budget_s
+
+        budget = params.time_budget_s
+        return float(budget) if budget is not None else default_time_budget_s()
+
+    cfg = DecompositionConfig.from_env()
+    decomposed = cfg.method != "off" and (stations >= cfg.min_stations or cargos >= cfg.min_cargos)
+    if decomposed and input_data.problem_type != "unlimited_vehicles":
+        owned = sum(1 for v in input_data.vehicles if v.ownership != "rented")
+        decomposed = min(math.ceil(stations / float(cfg.sector_stations)), owned) >= 2
+    if decomposed:
+        return SOLVE_SECONDS_PER_PAIR * stations * min(stations, cfg.sector_stations) * 2
+    return SOLVE_SECONDS_PER_PAIR * stations * stations
+
+
+def _listed(ids: List[str]) -> List[str]:
+    return ids[:MAX_LISTED]
+
+
+def _coverage_counts(n: int, resolved_unordered: int, given_directed: int) -> Dict[str, Any]:
+    directed = n * (n - 1)
+    resolved = 2 * resolved_unordered
+    return {
+        "points": n,
+        "directed_pairs": directed,
+        "given_pairs": given_directed,
+        "reverse_filled_pairs": max(0, resolved - given_directed),
+        "fallback_pairs": max(0, directed - resolved),
+        "coverage_percent": round(resolved / directed * 100.0, 2) if directed else 100.0,
+    }
+
+
+def inline_coverage(entries: Dict[str, Any], point_ids: Sequence[str]) -> Dict[str, Any]:
+    """Coverage from the "<from>_<to>" keys alone (values are not touched)."""
+    pos = {sid: i for i, sid in enumerate(point_ids)}
+    known: Set[str] = set(pos)
+    codes: List[int] = []
+    seen: Set[str] = set()
+    n = len(point_ids)
+    for key in entries:
+        ab = split_pair_key(key, known)
+        if ab is None:
+            continue
+        i, j = pos.get(ab[0]), pos.get(ab[1])
+        if i is None or j is None or i == j:
+            continue
+        codes.append(i * n + j)
+        seen.add(ab[0])
+        seen.add(ab[1])
+    out = _code_coverage(np.asarray(codes, dtype=np.int64), n)
+    out["missing_point_ids"] = [sid for sid in point_ids if sid not in seen] if n > 1 else []
+    return out
+
+
+def _code_coverage(codes: np.ndarray, n: int) -> Dict[str, Any]:
+    """Coverage counts from directed pair codes (from * n + to)."""
+    directed = np.unique(codes)
+    a, b = np.divmod(directed, n) if n else (directed, directed)
+    unordered = np.unique(np.minimum(a, b) * n + np.maximum(a, b))
+    return _coverage_counts(n, int(unordered.size), int(directed.size))
+
+
+def sparse_coverage(matrix: SparseMatrix, point_ids: Sequence[str]) -> Dict[str, Any]:
+    """Coverage of a k-nearest (CSR) matrix, without densifying it."""
+    n = len(point_ids)
+    pos = np.full(matrix.size, -1, dtype=np.int64)
+    m_idx = np.array([matrix.index.get(sid, -1) for sid in point_ids], dtype=np.int64)
+    present = np.nonzero(m_idx >= 0)[0]
+    pos[m_idx[present]] = present
+    rows, cols = pos[matrix.row_of_entry()], pos[matrix.indices]
+    keep = (rows >= 0) & (cols >= 0) & (rows != cols)
+    out = _code_coverage(rows[keep] * n + cols[keep], n)
+    out["missing_point_ids"] = [sid for sid, i in zip(point_ids, m_idx.tolist()) if i < 0]
+    return out
+
+
+def prepared_coverage(matrix: PreparedMatrix, point_ids: Sequence[str]) -> Dict[str, Any]:
+    """Coverage against an already parsed matrix (registry / network store)."""
+    m_idx = np.array([matrix.index.get(sid, -1) for sid in point_ids], dtype=np.int64)
+    present = m_idx[m_idx >= 0]
+    known = np.asarray(matrix.known[np.ix_(present, present)], dtype=bool).copy()
+    np.fill_diagonal(known, False)
+    resolved = known | known.T
+    out = _coverage_counts(len(point_ids), int(resolved.sum()) // 2, int(known.sum()))
+    out["missing_point_ids"] = [sid for sid, i in zip(point_ids, m_idx.tolist()) if i < 0]
+    return out
+
+
+def validate_input(
+    input_data: OptimizerInput,
+    matrix: Optional[PreparedMatrix] = None,
+    matrix_store: Any = None,
+    body_bytes: int = 0,
+    process_mode: bool = True,
+) -> Dict[str, Any]:
+    params = input_data.parameters
+    unlimited = input_data.problem_type == "unlimited_vehicles"
+
+    # ---------- vehicles ----------
+    capacities = [float(v.capacity_kg) for v in input_data.vehicles]
+    bad_vehicles = [v.id for v in input_data.vehicles if v.capacity_kg <= 0]
+    max_capacity = max(capacities, default=0.0)
+    if unlimited:
+        max_capacity = max(max_capacity, float(params.rental_capacity_kg))
+
+    # ---------- stations / cargos (single pass) ----------
+    point_ids = [input_data.hub.id]
+    station_ids: Set[str] = set()
+    duplicate_stations: List[str] = []
+    cargo_ids: Set[str] = set()
+    duplicate_cargos: List[str] = []
+    inconsistent: List[str] = []
+    non_positive: List[str] = []
+    too_heavy: List[str] = []
+    too_heavy_weight = 0.0
+    cargo_total = 0
+    cargo_weight = 0.0
+    stated_weight = 0.0
+
+    for st in input_data.stations:
+        if st.id in station_ids:
+            duplicate_stations.append(st.id)
+        station_ids.add(st.id)
+        stated_weight += st.total_weight_kg
+        cargos = st.cargos or []
+        weight = 0.0
+        for c in cargos:
+            if c.id in cargo_ids:
+                duplicate_cargos.append(c.id)
+            cargo_ids.add(c.id)
+            w = float(c.weight_kg)
+            weight += w
+            if w <= 0:
+                non_positive.append(c.id)
+            elif w > max_capacity + 1e-6:
+                too_heavy.append(c.id)
+                too_heavy_weight += w
+        if st.cargo_count != len(cargos) or abs(st.total_weight_kg - weight) > WEIGHT_TOLERANCE_KG:
+            inconsistent.append(st.id)
+        if st.cargo_count > 0:
+            point_ids.append(st.id)
+        cargo_total += len(cargos)
+        cargo_weight += weight
+
+    # ---------- matrix ----------
+    if matrix is not None:
+        coverage = prepared_coverage(matrix, point_ids)
+        coverage["source"] = "registry"
+    elif input_data.distance_matrix:
+        coverage = inline_coverage(input_data.distance_matrix, point_ids)
+        coverage["source"] = "inline"
+    elif input_data.sparse_matrix is not None:
+        coverage = sparse_coverage(prepare_sparse(input_data.sparse_matrix), point_ids)
+        coverage["source"] = "sparse"
+    else:
+        resolved = matrix_store.resolve(point_ids) if matrix_store is not None else None
+        if resolved is not None:
+            coverage = prepared_coverage(resolved, point_ids)
+            coverage["source"] = "network"
+        else:
+            coverage = _coverage_counts(len(point_ids), 0, 0)
+            coverage["missing_point_ids"] = point_ids[1:]
+            coverage["source"] = "none"
+    missing_points = coverage.pop("missing_point_ids")
+    coverage["missing_station_count"] = len(missing_points)
+    coverage["missing_stations"] = _listed(missing_points)
+
+    # ---------- findings ----------
+    errors: List[str] = []
+    warnings: List[str] = []
+    if len(point_ids) == 1:
+        errors.append("Taşınacak kargo bulunmuyor")
+    if not input_data.vehicles and not unlimited:
+        errors.append("Araç listesi boş")
+    if duplicate_stations:
+        errors.append(f"{len(duplicate_stations)} tekrarlanan istasyon id")
+    if duplicate_cargos:
+        warnings.append(f"{len(duplicate_cargos)} tekrarlanan kargo id")
+    if bad_vehicles:
+        warnings.append(f"{len(bad_vehicles)} araç kapasitesi <= 0")
+    if non_positive:
+        warnings.append(f"{len(non_positive)} kargo ağırlığı <= 0")
+    if too_heavy:
+        warnings.append(f"{len(too_heavy)} kargo hiçbir araca sığmıyor (> {max_capacity:g} kg)")
+    if inconsistent:
+        warnings.append(f"{len(inconsistent)} istasyonun cargo_count / total_weight_kg değeri kargo listesiyle uyuşmuyor")
+    if coverage["fallback_pairs"]:
+        warnings.append(f"{coverage['fallback_pairs']} yönlü çift için mesafe tahmini (haversine) kullanılacak")
+
+    total_capacity = sum(capacities)
+    shortfall = 0.0 if unlimited else max(0.0, cargo_weight - total_capacity)
+    if shortfall > 0:
+        warnings.append(f"Toplam kapasite {shortfall:.1f} kg yetersiz; bazı kargolar atanamayacak")
+
+    # ---------- cost of solving ----------
+    stations_with_cargo = len(point_ids) - 1
+    seconds = estimate_solve_seconds(input_data, stations_with_cargo, cargo_total)
+    sparse = input_data.sparse_matrix
+    memory = estimate_bytes(
+        stations_with_cargo,
+        cargo_total,
+        len(input_data.distance_matrix),
+        body_bytes,
+        process_mode,
+        sparse_entries=len(sparse.indices) if sparse is not None else 0,
+    )
+    sync_max = default_sync_max_seconds()
+
+    return {
+        "valid": not errors,
+        "errors": errors,
+        "warnings": warnings,
+        "station_count": len(input_data.stations),
+        "vehicle_count": len(input_data.vehicles),
+        "total_cargo_weight": stated_weight,
+        "total_vehicle_capacity": total_capacity,
+        "stations_with_cargo": stations_with_cargo,
+        "cargo_count": cargo_total,
+        "cargo_weight_kg": round(cargo_weight, 3),
+        "capacity_shortfall_kg": round(shortfall, 3),
+        "matrix": coverage,
+        "cargos": {
+            "too_heavy_count": len(too_heavy),
+            "too_heavy_weight_kg": round(too_heavy_weight, 3),
+            "too_heavy": _listed(too_heavy),
+            "max_vehicle_capacity_kg": max_capacity,
+            "non_positive_weight": _listed(non_positive),
+            "duplicate_ids": _listed(duplicate_cargos),
+        },
+        "stations": {
+            "inconsistent_count": len(inconsistent),
+            "inconsistent": _listed(inconsistent),
+            "duplicate_ids": _listed(duplicate_stations),
+        },
+        "estimate": {
+            "solve_seconds": round(seconds, 3),
+            "memory_mb": round(memory["total"] / MB, 1),
+            "size_class": size_class(seconds),
+            "recommended_submission": "sync" if seconds <= sync_max else "async",
+        },
+    }
@@ -0,0 +1,157 @@
+"""
+Start-up warm-up and readiness.
+
+A fresh replica answers /health (liveness) as soon as uvicorn is up, but
+only reports /ready once warm-up has finished:
+
+1. workers: every solver worker starts (imports, compiled kernels loaded
+   from the disk cache, network matrix mapped) and, in its initializer,
+   solves a tiny built-in instance per problem type (+ compact output,
+   missing pairs, ALNS). The first worker starts alone so only it compiles
+   kernels into an empty cache; restarted workers warm up the same way.
+2. server: the same payloads go through request parsing, /validate,
+   response rendering, compression and the OpenAPI schema build.
+
+WARMUP=0 skips the solves (ready right after the pool starts). Past
+WARMUP_TIMEOUT_S the replica is marked ready with a warning; a failing
+warm-up solve keeps it unready (/ready -> 503).
+
+Startup time (process start -> ready, split into imports / startup /
+warm-up phases) is logged and reported under "startup" in /health and /ready.
+"""
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+import os
+import time
+
+from synthetic import PROBLEM_TYPES, make_instance
+
+
+WARMUP_STATIONS = 8
+# Short ALNS run: enough to load and exercise its operators
+WARMUP_ALNS_BUDGET_S = 0.05
+
+STARTING = "starting"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+STOPPING = "stopping"
+
+
+def warmup_enabled() -> bool:
+    return str(os.getenv("WARMUP", "1")).strip().lower() not in ("0", "false", "no", "off")
+
+
+def default_timeout_s() -> float:
+    try:
+        return max(1.0, float(os.getenv("WARMUP_TIMEOUT_S", "60") or 60))
+    except ValueError:
+        return 60.0
+
+
+def process_start_time() -> Optional[float]:
+    """Epoch seconds when this process was started (Linux /proc), else None."""
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            # comm (field 2) may contain spaces: split after its closing ")".
+            fields = f.read().rsplit(b")", 1)[1].split()
+        start_ticks = int(fields[19])
+        with open("/proc/stat", "rb") as f:
+            btime = next(int(line.split()[1]) for line in f if line.startswith(b"btime"))
+        return btime + start_ticks / float(os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
+
+
+def builtin_payloads() -> List[Dict[str, Any]]:
+    """Tiny deterministic payloads covering the main solve paths."""
+    payloads = [make_instance(WARMUP_STATIONS, pt, seed=i) for i, pt in enumerate(PROBLEM_TYPES)]
+    payloads[0]["parameters"]["response_format"] = "compact"
+    payloads.append(make_instance(WARMUP_STATIONS, PROBLEM_TYPES[1], seed=7, missing=0.3))
+    alns = make_instance(WARMUP_STATIONS, PROBLEM_TYPES[0], seed=8)
+    alns["parameters"].update(algorithm="alns", time_budget_s=WARMUP_ALNS_BUDGET_S)
+    payloads.append(alns)
+    return payloads
+
+
+def warm_solve() -> Dict[str, Any]:
+    """Worker initializer step: solve every built-in payload; returns timings and one result."""
+    import kernels
+    from executor import run_optimize
+    from models import OptimizerInput
+
+    t0 = time.perf_counter()
+    result = None
+    for payload in builtin_payloads():
+        out = run_optimize(OptimizerInput(**payload))
+        if not out.success:
+            raise RuntimeError(f"warm-up solve failed: {out.error}")
+        result = result or out
+    return {
+        "pid": os.getpid(),
+        "seconds": round(time.perf_counter() - t0, 3),
+        "kernels": kernels.backend(),
+        "result": result,
+    }
+
+
+class Readiness:
+    """Start-up state machine + timings behind /ready."""
+
+    def __init__(self) -> None:
+        self.state = STARTING
+        self.error: Optional[str] = None
+        self.process_started = process_start_time()
+        self.imported = time.time()
+        self.startup_began: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.workers: List[Dict[str, Any]] = []
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def begin(self) -> None:
+        self.startup_began = time.time()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - t0, 3)
+
+    def mark_warming(self) -> None:
+        self.state = WARMING
+
+    def mark_ready(self) -> None:
+        self.state = READY
+        self.ready_at = time.time()
+
+    def mark_failed(self, error: str) -> None:
+        self.state = FAILED
+        self.error = error
+
+    def mark_stopping(self) -> None:
+        self.state = STOPPING
+
+    def startup(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"phases_s": dict(self.phases)}
+        if self.process_started is not None:
+            out["imports_s"] = round(self.imported - self.process_started, 3)
+        if self.startup_began is not None and self.ready_at is not None:
+            out["startup_to_ready_s"] = round(self.ready_at - self.startup_began, 3)
+        if self.process_started is not None and self.ready_at is not None:
+            out["process_to_ready_s"] = round(self.ready_at - self.process_started, 3)
+        if self.workers:
+            out["workers"] = self.workers
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"state": self.state, "startup": self.startup()}
+        if self.error:
+            out["error"] = self.error
+        return out